@@ -1,17 +1,38 @@
 """
 Admin Endpoints - Temporary endpoints for administration
 """
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from typing import List, Optional
+import base64
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
 from datetime import datetime
 
-from core.database import get_session
+from core.database import get_read_session, read_session_scope
+from core.query_stats import query_budget
 from core.security import require_admin, UserRole
-from domain.auth.models import AuthUser, AccountStatus
+from domain.auth.models import AuthUser, AccountStatus, UserRole as AccountRole
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id", "email", "username", "nombre_completo", "rol", "estado",
+    "email_verificado", "nutritionist_id", "nutriologo", "creado"
+]
+
+Nutritionist = aliased(AuthUser, name="nutritionist")
+
+# (created_at, id) of the last row returned; pages are ordered newest first
+Cursor = Tuple[datetime, int]
+
 class UserListResponse:
     """User list response model"""
     def __init__(self, user: AuthUser):
@@ -26,45 +47,166 @@ class UserListResponse:
         self.nutritionist_id = user.nutritionist_id
         self.created_at = user.created_at
 
-@router.get("/users")
-def list_all_users(
-    session: Session = Depends(get_session),
+def encode_cursor(cursor: Cursor) -> str:
+    created_at, user_id = cursor
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{user_id}".encode()).decode()
+
+def decode_cursor(value: str) -> Cursor:
+    try:
+        created_at, user_id = base64.urlsafe_b64decode(value.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _users_query(
+    role: Optional[AccountRole],
+    account_status: Optional[AccountStatus],
+    after: Optional[Cursor],
+    limit: int
+):
+    """
+    One page of users with their nutritionist's name (self-join, no per-row lookups)
+
+    Keyset pagination on (created_at, id): each page costs the same no matter
+    how deep it is, unlike OFFSET.
+    """
+    query = (
+        select(
+            AuthUser.id,
+            AuthUser.email,
+            AuthUser.username,
+            AuthUser.first_name,
+            AuthUser.last_name,
+            AuthUser.primary_role,
+            AuthUser.account_status,
+            AuthUser.is_email_verified,
+            AuthUser.nutritionist_id,
+            AuthUser.created_at,
+            Nutritionist.first_name.label("nutritionist_first_name"),
+            Nutritionist.last_name.label("nutritionist_last_name"),
+        )
+        .outerjoin(Nutritionist, Nutritionist.id == AuthUser.nutritionist_id)
+        .order_by(AuthUser.created_at.desc(), AuthUser.id.desc())
+        .limit(limit)
+    )
+    if role is not None:
+        query = query.where(AuthUser.primary_role == role)
+    if account_status is not None:
+        query = query.where(AuthUser.account_status == account_status)
+    if after is not None:
+        created_at, user_id = after
+        query = query.where(or_(
+            AuthUser.created_at < created_at,
+            and_(AuthUser.created_at == created_at, AuthUser.id < user_id)
+        ))
+    return query
+
+def _user_row(row) -> Dict[str, Any]:
+    user_data = {
+        "id": row.id,
+        "email": row.email,
+        "username": row.username,
+        "nombre_completo": f"{row.first_name} {row.last_name}",
+        "rol": row.primary_role.value,
+        "estado": row.account_status.value,
+        "email_verificado": row.is_email_verified,
+        "nutritionist_id": row.nutritionist_id,
+        "creado": row.created_at.isoformat() if row.created_at else None
+    }
+    if row.nutritionist_first_name is not None:
+        user_data["nutriologo"] = f"{row.nutritionist_first_name} {row.nutritionist_last_name}"
+    return user_data
+
+@router.get("/users", dependencies=[Depends(query_budget(1))])
+async def list_all_users(
+    role: Optional[AccountRole] = Query(default=None),
+    status: Optional[AccountStatus] = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    session: AsyncSession = Depends(get_read_session),
     _: UserRole = Depends(require_admin)
 ):
     """
-    List all registered users (Admin only)
+    List registered users, newest first (Admin only)
 
-    Returns user information including role and nutritionist assignments
+    Returns user information including role and nutritionist assignments.
+    Filter by ``role`` and ``status``; pass ``next_cursor`` back as ``cursor``
+    to get the following page (``null`` on the last one). For a full dump use
+    ``/admin/users/export``.
 
     Authorization: Admin only
     """
-    users = session.exec(
-        select(AuthUser).order_by(AuthUser.created_at.desc())
-    ).all()
-
-    user_list = []
-    for user in users:
-        user_data = {
-            "id": user.id,
-            "email": user.email,
-            "username": user.username,
-            "nombre_completo": f"{user.first_name} {user.last_name}",
-            "rol": user.primary_role.value,
-            "estado": user.account_status.value,
-            "email_verificado": user.is_email_verified,
-            "nutritionist_id": user.nutritionist_id,
-            "creado": user.created_at.isoformat() if user.created_at else None
-        }
-
-        # If has nutritionist, add name
-        if user.nutritionist_id:
-            nutritionist = session.get(AuthUser, user.nutritionist_id)
-            if nutritionist:
-                user_data["nutriologo"] = f"{nutritionist.first_name} {nutritionist.last_name}"
-
-        user_list.append(user_data)
+    after = decode_cursor(cursor) if cursor else None
+    rows = (await session.exec(_users_query(role, status, after, limit + 1))).all()
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor((page[-1].created_at, page[-1].id))
 
     return {
-        "total": len(user_list),
-        "users": user_list
+        "count": len(page),
+        "next_cursor": next_cursor,
+        "users": [_user_row(row) for row in page]
     }
+
+async def _export_batches(
+    role: Optional[AccountRole],
+    account_status: Optional[AccountStatus]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Walk all matching users in keyset batches; each batch checks out a connection briefly"""
+    after = None
+    while True:
+        async with read_session_scope() as session:
+            rows = (await session.exec(_users_query(role, account_status, after, EXPORT_BATCH_SIZE))).all()
+        if not rows:
+            return
+        yield [_user_row(row) for row in rows]
+        if len(rows) < EXPORT_BATCH_SIZE:
+            return
+        after = (rows[-1].created_at, rows[-1].id)
+
+async def _ndjson_lines(role, account_status) -> AsyncIterator[bytes]:
+    async for batch in _export_batches(role, account_status):
+        lines = [json.dumps(user, ensure_ascii=False) for user in batch]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+async def _csv_lines(role, account_status) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    async for batch in _export_batches(role, account_status):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+@router.get("/users/export")
+async def export_users(
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    role: Optional[AccountRole] = Query(default=None),
+    status: Optional[AccountStatus] = Query(default=None),
+    _: UserRole = Depends(require_admin)
+):
+    """
+    Export every matching user as NDJSON or CSV (Admin only)
+
+    The response is streamed in batches of ``EXPORT_BATCH_SIZE`` users, so
+    memory stays flat however many users there are. Same fields and filters
+    as ``/admin/users``.
+
+    Authorization: Admin only
+    """
+    if format == "csv":
+        return StreamingResponse(
+            _csv_lines(role, status),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="users.csv"'}
+        )
+    return StreamingResponse(
+        _ndjson_lines(role, status),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'}
+    )
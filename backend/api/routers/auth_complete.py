@@ -4,13 +4,14 @@ Login, Register, Password Recovery
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import timedelta, datetime
 from typing import Optional
 from pydantic import BaseModel, EmailStr, Field, validator
 import re
 
-from core.database import get_session
+from core.database import get_async_session
 from core.auth import create_access_token, create_refresh_token
 from domain.auth.models import AuthUser, UserRole, AccountStatus, PasswordResetToken, TokenStatus
 from core.logging import log_success, log_error
@@ -138,7 +139,7 @@ class LoginResponse(BaseModel):
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     request: RegisterRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Register a new user
@@ -150,9 +151,9 @@ async def register(
     - Nutritionist accounts require verification
     """
     # Check if email already exists
-    existing_email = session.exec(
+    existing_email = (await session.exec(
         select(AuthUser).where(AuthUser.email == request.email)
-    ).first()
+    )).first()
 
     if existing_email:
         raise HTTPException(
@@ -161,9 +162,9 @@ async def register(
         )
 
     # Check if username already exists
-    existing_username = session.exec(
+    existing_username = (await session.exec(
         select(AuthUser).where(AuthUser.username == request.username)
-    ).first()
+    )).first()
 
     if existing_username:
         raise HTTPException(
@@ -181,9 +182,9 @@ async def register(
             )
 
         # Find nutritionist by email
-        nutritionist = session.exec(
+        nutritionist = (await session.exec(
             select(AuthUser).where(AuthUser.email == request.nutritionist_email)
-        ).first()
+        )).first()
 
         if not nutritionist:
             raise HTTPException(
@@ -233,26 +234,20 @@ async def register(
     new_user.set_password(request.password)
 
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    await session.commit()
+    await session.refresh(new_user)
 
     log_success(f"New user registered: {new_user.email} ({new_user.primary_role})")
 
-    # Send welcome email
+    # Send welcome email in the background (registration doesn't wait on SMTP)
     try:
         user_name = new_user.first_name or new_user.username
-        email_sent = email_service.send_welcome_email(
+        await email_service.enqueue_welcome_email(
             to_email=new_user.email,
             user_name=user_name
         )
-        
-        if email_sent:
-            log_success(f"Welcome email sent to: {new_user.email}")
-        else:
-            log_error(f"Failed to send welcome email to: {new_user.email}")
-            
     except Exception as e:
-        log_error(f"Error sending welcome email: {str(e)}")
+        log_error(f"Error queuing welcome email: {str(e)}")
         # Continue registration even if email fails
 
 
@@ -274,7 +269,7 @@ async def register(
 async def login(
     request: LoginRequest,
     http_request: Request,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     User login
@@ -285,9 +280,9 @@ async def login(
     - Tracks failed login attempts
     """
     # Find user by email
-    user = session.exec(
+    user = (await session.exec(
         select(AuthUser).where(AuthUser.email == request.email)
-    ).first()
+    )).first()
 
     if not user:
         raise HTTPException(
@@ -301,7 +296,7 @@ async def login(
         # Track failed login attempt
         user.failed_login_attempts += 1
         user.last_failed_login = datetime.utcnow()
-        session.commit()
+        await session.commit()
 
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -324,8 +319,8 @@ async def login(
     user.last_login = datetime.utcnow()
     user.login_count += 1
     user.failed_login_attempts = 0
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     log_success(f"User logged in: {user.email}")
 
@@ -351,7 +346,7 @@ async def login(
 async def forgot_password(
     request: ForgotPasswordRequest,
     http_request: Request,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Request password reset
@@ -362,9 +357,9 @@ async def forgot_password(
     - Always returns success to prevent email enumeration
     """
     # Find user by email
-    user = session.exec(
+    user = (await session.exec(
         select(AuthUser).where(AuthUser.email == request.email)
-    ).first()
+    )).first()
 
     # Always return success to prevent email enumeration
     response_message = {
@@ -377,12 +372,12 @@ async def forgot_password(
         return response_message
 
     # Revoke any existing active tokens for this user
-    existing_tokens = session.exec(
+    existing_tokens = (await session.exec(
         select(PasswordResetToken).where(
             PasswordResetToken.user_id == user.id,
             PasswordResetToken.status == TokenStatus.ACTIVE
         )
-    ).all()
+    )).all()
 
     for token in existing_tokens:
         token.revoke()
@@ -396,24 +391,18 @@ async def forgot_password(
     )
 
     session.add(reset_token)
-    session.commit()
+    await session.commit()
 
-    # Enviar email de recuperación
+    # Encolar email de recuperación (la respuesta no espera al servidor SMTP)
     try:
         user_name = user.first_name or user.username
-        email_sent = email_service.send_password_reset_email(
+        await email_service.enqueue_password_reset_email(
             to_email=user.email,
             user_name=user_name,
             reset_token=reset_token.token
         )
-
-        if email_sent:
-            log_success(f"Email de recuperación enviado exitosamente a: {user.email}")
-        else:
-            log_error(f"No se pudo enviar el email a: {user.email}")
-
     except Exception as e:
-        log_error(f"Error al enviar email de recuperación: {str(e)}")
+        log_error(f"Error al encolar email de recuperación: {str(e)}")
         # No revelar el error al usuario por seguridad
 
     # Siempre retornar éxito para prevenir enumeración de emails
@@ -422,7 +411,7 @@ async def forgot_password(
 @router.post("/reset-password")
 async def reset_password(
     request: ResetPasswordRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Reset password with token
@@ -433,11 +422,11 @@ async def reset_password(
     - Marks token as used
     """
     # Find token
-    token_record = session.exec(
+    token_record = (await session.exec(
         select(PasswordResetToken).where(
             PasswordResetToken.token == request.token
         )
-    ).first()
+    )).first()
 
     if not token_record:
         raise HTTPException(
@@ -453,7 +442,7 @@ async def reset_password(
         )
 
     # Get user
-    user = session.get(AuthUser, token_record.user_id)
+    user = await session.get(AuthUser, token_record.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -464,7 +453,7 @@ async def reset_password(
     user.set_password(request.new_password)
     token_record.mark_as_used()
 
-    session.commit()
+    await session.commit()
 
     log_success(f"Password reset successful for: {user.email}")
 
@@ -486,7 +475,7 @@ async def logout():
 @router.get("/validate-nutritionist/{email}")
 async def validate_nutritionist_email(
     email: str,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Validate if an email belongs to an active nutritionist
@@ -496,9 +485,9 @@ async def validate_nutritionist_email(
     - Returns error if email is not found or user is not a nutritionist
     """
     # Find user by email
-    user = session.exec(
+    user = (await session.exec(
         select(AuthUser).where(AuthUser.email == email)
-    ).first()
+    )).first()
 
     if not user:
         raise HTTPException(
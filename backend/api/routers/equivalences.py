@@ -10,9 +10,10 @@ from core.database import get_async_session
 from core.security import get_current_user_id, get_current_user_role
 from domain.foods.equivalences import (
     FoodEquivalence, EquivalenceGroup, EquivalenceGroupStandard,
-    PatientEquivalenceGoal, DailyEquivalenceTracking, SMAE_GROUP_STANDARDS
+    PatientEquivalenceGoal, DailyEquivalenceTracking
 )
-from domain.foods.models import Food
+from domain.foods.smae_table import SMAE_TABLE
+from services.foods.equivalence_index import get_equivalence_index
 
 router = APIRouter()
 
@@ -22,18 +23,18 @@ async def get_equivalence_groups(
 ):
     """Obtener todos los grupos de equivalencias con sus estándares"""
     groups = []
-    for group, standards in SMAE_GROUP_STANDARDS.items():
+    for standards in SMAE_TABLE.rows:
         groups.append({
-            "group": group.value,
-            "name": standards["name"],
-            "description": standards["description"],
-            "color": standards["color"],
-            "standard_calories": standards["calories"],
-            "standard_protein": standards["protein"],
-            "standard_carbs": standards["carbs"],
-            "standard_fat": standards["fat"],
-            "min_daily": standards["min_daily"],
-            "max_daily": standards["max_daily"]
+            "group": standards.group.value,
+            "name": standards.name,
+            "description": standards.description,
+            "color": standards.color,
+            "standard_calories": standards.calories,
+            "standard_protein": standards.protein,
+            "standard_carbs": standards.carbs,
+            "standard_fat": standards.fat,
+            "min_daily": standards.min_daily,
+            "max_daily": standards.max_daily
         })
     return groups
 
@@ -62,36 +63,20 @@ async def get_food_equivalences(
 async def get_group_alternatives(
     group: EquivalenceGroup,
     session: Session = Depends(get_async_session),
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    exclude_foods: List[int] = Query(default=[]),
+    exclude_allergens: List[str] = Query(default=[])
 ):
-    """Obtener alimentos alternativos del mismo grupo de equivalencias"""
-    result = await session.execute(
-        select(FoodEquivalence, Food)
-        .join(Food, FoodEquivalence.food_id == Food.id)
-        .where(FoodEquivalence.equivalence_group == group)
-        .where(FoodEquivalence.is_active == True)
-        .where(Food.status == "approved")
-        .limit(limit)
-    )
-    
-    alternatives = []
-    for equivalence, food in result:
-        alternatives.append({
-            "food_id": food.id,
-            "food_name": food.name,
-            "standard_portion": equivalence.standard_portion,
-            "standard_unit": equivalence.standard_unit,
-            "calories_per_equivalent": equivalence.calories_per_equivalent,
-            "protein_per_equivalent": equivalence.protein_per_equivalent,
-            "carbs_per_equivalent": equivalence.carbs_per_equivalent,
-            "fat_per_equivalent": equivalence.fat_per_equivalent,
-            "notes": equivalence.notes
-        })
-    
+    """Obtener alimentos alternativos del mismo grupo de equivalencias (los más cercanos al estándar primero)"""
+    index = get_equivalence_index()
+    await index.ensure_fresh(session)
+
     return {
         "group": group.value,
-        "group_info": SMAE_GROUP_STANDARDS[group],
-        "alternatives": alternatives
+        "group_info": SMAE_TABLE.info(group),
+        "alternatives": index.alternatives(
+            group, limit=limit, exclude_food_ids=exclude_foods, exclude_allergens=exclude_allergens
+        )
     }
 
 @router.post("/calculate-equivalents")
@@ -167,17 +152,17 @@ async def get_patient_equivalence_goals(
     # Formatear con información del grupo
     goals_with_info = []
     for goal in goals:
-        group_info = SMAE_GROUP_STANDARDS[goal.equivalence_group]
+        group_info = SMAE_TABLE.row(goal.equivalence_group)
         goals_with_info.append({
             "id": goal.id,
             "equivalence_group": goal.equivalence_group.value,
-            "group_name": group_info["name"],
-            "group_color": group_info["color"],
+            "group_name": group_info.name,
+            "group_color": group_info.color,
             "daily_target": goal.daily_target_equivalents,
             "min_equivalents": goal.min_equivalents,
             "max_equivalents": goal.max_equivalents,
-            "standard_calories": group_info["calories"],
-            "target_calories": goal.daily_target_equivalents * group_info["calories"],
+            "standard_calories": group_info.calories,
+            "target_calories": goal.daily_target_equivalents * group_info.calories,
             "notes": goal.notes
         })
     
@@ -215,24 +200,17 @@ async def track_daily_equivalents(
     # Calcular progreso
     goals_met = 0
     total_goals = len(goals)
-    total_calories = 0
-    
-    macros = {"protein": 0, "carbs": 0, "fat": 0}
     
     for group_key, consumed in equivalents_data.items():
         if group_key in goals:
             target = goals[group_key]
             if 0.8 <= consumed / target <= 1.2:  # ±20% tolerancia
                 goals_met += 1
-        
-        # Calcular nutrición
-        if group_key in [g.value for g in EquivalenceGroup]:
-            group_enum = EquivalenceGroup(group_key)
-            standards = SMAE_GROUP_STANDARDS[group_enum]
-            total_calories += consumed * standards["calories"]
-            macros["protein"] += consumed * standards["protein"]
-            macros["carbs"] += consumed * standards["carbs"]
-            macros["fat"] += consumed * standards["fat"]
+    
+    # Calcular nutrición (grupos desconocidos se ignoran)
+    totals = SMAE_TABLE.totals(equivalents_data)
+    total_calories = totals["calories"]
+    macros = {"protein": totals["protein"], "carbs": totals["carbs"], "fat": totals["fat"]}
     
     completion_percentage = (goals_met / total_goals * 100) if total_goals > 0 else 0
     
@@ -333,41 +311,51 @@ async def get_meal_builder_suggestions(
     target_group: EquivalenceGroup,
     target_equivalents: float = Query(..., ge=0.1, le=10.0),
     exclude_foods: List[int] = Query(default=[]),
+    exclude_allergens: List[str] = Query(default=[]),
+    patient_id: Optional[int] = Query(None, description="Excluir también las alergias e intolerancias del paciente"),
+    target_calories: Optional[float] = Query(None, ge=0),
+    target_protein: Optional[float] = Query(None, ge=0),
+    target_carbs: Optional[float] = Query(None, ge=0),
+    target_fat: Optional[float] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
     session: Session = Depends(get_async_session)
 ):
-    """Sugerencias para el constructor de comidas basado en equivalentes"""
-    query = (
-        select(FoodEquivalence, Food)
-        .join(Food, FoodEquivalence.food_id == Food.id)
-        .where(FoodEquivalence.equivalence_group == target_group)
-        .where(FoodEquivalence.is_active == True)
-        .where(Food.status == "approved")
+    """
+    Sugerencias para el constructor de comidas basado en equivalentes
+
+    Ordenadas por cercanía a los macros objetivo; los que no se indican se
+    toman del estándar SMAE del grupo por ``target_equivalents``.
+    """
+    index = get_equivalence_index()
+    await index.ensure_fresh(session)
+
+    allergens = list(exclude_allergens)
+    if patient_id is not None:
+        allergens.extend(await index.patient_allergens(session, patient_id))
+
+    suggestions = index.suggestions(
+        target_group,
+        target_equivalents,
+        limit=limit,
+        exclude_food_ids=exclude_foods,
+        exclude_allergens=allergens,
+        target_macros={
+            "calories": target_calories,
+            "protein": target_protein,
+            "carbs": target_carbs,
+            "fat": target_fat
+        }
     )
-    
-    if exclude_foods:
-        query = query.where(Food.id.notin_(exclude_foods))
-    
-    result = await session.execute(query.limit(20))
-    
-    suggestions = []
-    for equivalence, food in result:
-        # Calcular porción necesaria para alcanzar los equivalentes objetivo
-        portion_needed = target_equivalents * equivalence.standard_portion
-        
-        suggestions.append({
-            "food_id": food.id,
-            "food_name": food.name,
-            "portion_needed": round(portion_needed, 2),
-            "unit": equivalence.standard_unit,
-            "calories": round(target_equivalents * equivalence.calories_per_equivalent, 1),
-            "protein": round(target_equivalents * equivalence.protein_per_equivalent, 1),
-            "carbs": round(target_equivalents * equivalence.carbs_per_equivalent, 1),
-            "fat": round(target_equivalents * equivalence.fat_per_equivalent, 1)
-        })
-    
+
     return {
         "target_group": target_group.value,
         "target_equivalents": target_equivalents,
-        "group_info": SMAE_GROUP_STANDARDS[target_group],
+        "group_info": SMAE_TABLE.info(target_group),
         "suggestions": suggestions
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/meal-builder/index-stats")
+async def get_meal_builder_index_stats():
+    """Estado del índice de sugerencias (candidatos por grupo, latencia media)"""
+    return get_equivalence_index().stats()
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Any, List
 from pydantic import BaseModel
 
-from core.database import get_session
+from core.database import get_async_session, get_read_session
 from api.routers.auth_new import get_current_user
 from domain.users.models import User
 from services.gamification.gamification_service import GamificationService
@@ -31,12 +31,12 @@ class GamificationProfileResponse(BaseModel):
     badges_disponibles: List[BadgeResponse]
 
 @router.get("/profile", response_model=GamificationProfileResponse)
-def get_profile(
-    session: Session = Depends(get_session),
+async def get_profile(
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     service = GamificationService(session)
-    profile = service.get_or_create_profile(current_user.id)
+    profile = await service.get_or_create_profile(current_user.id)
     
     # Calculate level name and next XP
     niveles = [
@@ -59,18 +59,17 @@ def get_profile(
             
     # Fetch earned badges
     earned_badges_data = []
-    if current_user.badges:
-        for ub in current_user.badges:
-            if ub.badge:
-                earned_badges_data.append(BadgeResponse(
-                    id=ub.badge.id,
-                    nombre=ub.badge.name,
-                    icono=ub.badge.icon,
-                    descripcion=ub.badge.description,
-                    fecha_obtenido=ub.earned_at.strftime("%Y-%m-%d"),
-                    progreso=100,
-                    total=100
-                ))
+    for ub in await service.get_user_badges(current_user.id):
+        if ub.badge:
+            earned_badges_data.append(BadgeResponse(
+                id=ub.badge.id,
+                nombre=ub.badge.name,
+                icono=ub.badge.icon,
+                descripcion=ub.badge.description,
+                fecha_obtenido=ub.earned_at.strftime("%Y-%m-%d"),
+                progreso=100,
+                total=100
+            ))
 
     # Fetch available badges (not earned yet)
     # This requires a service method to get all badges, for now we can leave empty or implement if BadgeService exists
@@ -90,12 +89,12 @@ def get_profile(
     )
 
 @router.get("/leaderboard")
-def get_leaderboard(
-    session: Session = Depends(get_session),
+async def get_leaderboard(
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     service = GamificationService(session)
-    leaderboard = service.get_leaderboard()
+    leaderboard = await service.get_leaderboard()
     
     # Add rank and check if it's current user
     for i, entry in enumerate(leaderboard):
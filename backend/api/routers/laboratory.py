@@ -3,17 +3,26 @@ Laboratory Data API Routes
 Complete implementation for managing laboratory results with AI interpretation
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlmodel import Session, select, and_, or_, func, desc
+from sqlmodel import select, or_, func, desc
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 import os
-import shutil
 from pathlib import Path
 import uuid
 
-from core.database import get_session
-from domain.patients.laboratory import LaboratoryData, LabTrend, ClinicalFile
+import numpy as np
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
+
+from core.config import get_settings
+from core.database import get_async_session, get_read_session
+from domain.patients.laboratory import LaboratoryData, LabTrend, ClinicalFile, OcrStatus
 from domain.patients.models import Patient
+from domain.nutritionists.models import Nutritionist
+from services.laboratory import LabSeries, OcrJob, get_lab_series_cache, get_ocr_pipeline
+from services.laboratory.lab_series import LOWER_IS_BETTER
+from services.laboratory.reanalysis import LabReanalysisJob, ReanalysisJobConflict, get_reanalysis_runner
 from schemas.laboratory import (
     LaboratoryDataCreate,
     LaboratoryDataUpdate,
@@ -22,7 +31,11 @@ from schemas.laboratory import (
     LabTrendResponse,
     ClinicalFileCreate,
     ClinicalFileResponse,
+    ClinicalFileOcrStatus,
     LabComparison,
+    LabReanalysisRequest,
+    LabReanalysisJobResponse,
+    PatientLabTrends,
     Trend
 )
 import logging
@@ -31,6 +44,11 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/laboratory", tags=["Laboratory Data"])
 
 
+def _with_trends():
+    """Eager-load ``trends``: LaboratoryDataResponse serializes it and async sessions cannot lazy-load"""
+    return [selectinload(LaboratoryData.trends)]
+
+
 # ============================================================================
 # LABORATORY DATA CRUD ENDPOINTS
 # ============================================================================
@@ -38,7 +56,7 @@ router = APIRouter(prefix="/laboratory", tags=["Laboratory Data"])
 @router.post("/", response_model=LaboratoryDataResponse, status_code=status.HTTP_201_CREATED)
 async def create_laboratory_data(
     lab_data: LaboratoryDataCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Create new laboratory data record with AI interpretation
@@ -48,7 +66,7 @@ async def create_laboratory_data(
     """
     try:
         # Verify patient exists
-        patient = session.get(Patient, lab_data.patient_id)
+        patient = await session.get(Patient, lab_data.patient_id)
         if not patient:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -65,18 +83,19 @@ async def create_laboratory_data(
         db_lab_data.generate_ai_interpretation()
 
         session.add(db_lab_data)
-        session.commit()
-        session.refresh(db_lab_data)
+        await session.commit()
+        await session.refresh(db_lab_data)
 
         # Calculate trends if previous data exists
         await _calculate_trends(session, db_lab_data)
+        await session.refresh(db_lab_data, ["trends"])
 
         logger.info(f"Created laboratory data record {db_lab_data.id} for patient {lab_data.patient_id}")
 
         return db_lab_data
 
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         logger.error(f"Error creating laboratory data: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -88,7 +107,7 @@ async def create_laboratory_data(
 async def get_laboratory_data(
     lab_id: int,
     include_trends: bool = Query(default=False),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get specific laboratory data record by ID
@@ -97,7 +116,7 @@ async def get_laboratory_data(
         lab_id: Laboratory data record ID
         include_trends: Whether to include trend analysis
     """
-    lab_data = session.get(LaboratoryData, lab_id)
+    lab_data = await session.get(LaboratoryData, lab_id, options=_with_trends())
 
     if not lab_data:
         raise HTTPException(
@@ -107,9 +126,9 @@ async def get_laboratory_data(
 
     if include_trends:
         # Load trends
-        trends = session.exec(
+        trends = (await session.exec(
             select(LabTrend).where(LabTrend.lab_data_id == lab_id)
-        ).all()
+        )).all()
         lab_data.trends = trends
 
     return lab_data
@@ -123,7 +142,7 @@ async def get_patient_laboratory_data(
     test_type: Optional[str] = Query(default=None),
     date_from: Optional[date] = Query(default=None),
     date_to: Optional[date] = Query(default=None),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get all laboratory data for a specific patient with filters
@@ -137,7 +156,7 @@ async def get_patient_laboratory_data(
         date_to: Filter to date
     """
     # Verify patient exists
-    patient = session.get(Patient, patient_id)
+    patient = await session.get(Patient, patient_id)
     if not patient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -158,12 +177,12 @@ async def get_patient_laboratory_data(
 
     # Get total count
     count_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Execute paginated query
     query = query.order_by(desc(LaboratoryData.study_date))
-    query = query.offset(skip).limit(limit)
-    items = session.exec(query).all()
+    query = query.offset(skip).limit(limit).options(*_with_trends())
+    items = (await session.exec(query)).all()
 
     return LaboratoryDataListResponse(
         total=total,
@@ -177,14 +196,14 @@ async def get_patient_laboratory_data(
 async def update_laboratory_data(
     lab_id: int,
     lab_update: LaboratoryDataUpdate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Update laboratory data record
 
     Recalculates derived values and AI interpretation after update
     """
-    db_lab_data = session.get(LaboratoryData, lab_id)
+    db_lab_data = await session.get(LaboratoryData, lab_id)
 
     if not db_lab_data:
         raise HTTPException(
@@ -207,18 +226,19 @@ async def update_laboratory_data(
         db_lab_data.updated_at = datetime.utcnow()
 
         session.add(db_lab_data)
-        session.commit()
-        session.refresh(db_lab_data)
+        await session.commit()
+        await session.refresh(db_lab_data)
 
         # Recalculate trends
         await _calculate_trends(session, db_lab_data)
+        await session.refresh(db_lab_data, ["trends"])
 
         logger.info(f"Updated laboratory data record {lab_id}")
 
         return db_lab_data
 
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         logger.error(f"Error updating laboratory data: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -229,10 +249,10 @@ async def update_laboratory_data(
 @router.delete("/{lab_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_laboratory_data(
     lab_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Delete laboratory data record"""
-    db_lab_data = session.get(LaboratoryData, lab_id)
+    db_lab_data = await session.get(LaboratoryData, lab_id)
 
     if not db_lab_data:
         raise HTTPException(
@@ -242,19 +262,19 @@ async def delete_laboratory_data(
 
     try:
         # Delete associated trends first
-        trends = session.exec(
+        trends = (await session.exec(
             select(LabTrend).where(LabTrend.lab_data_id == lab_id)
-        ).all()
+        )).all()
         for trend in trends:
-            session.delete(trend)
+            await session.delete(trend)
 
-        session.delete(db_lab_data)
-        session.commit()
+        await session.delete(db_lab_data)
+        await session.commit()
 
         logger.info(f"Deleted laboratory data record {lab_id}")
 
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         logger.error(f"Error deleting laboratory data: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -274,7 +294,7 @@ async def get_patient_lab_trends(
         description="Comma-separated list of parameters to analyze (e.g., 'fasting_glucose_mgdl,hemoglobin_a1c_pct')"
     ),
     months_back: int = Query(default=6, ge=1, le=24),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Get laboratory trends for specific parameters over time
@@ -282,96 +302,120 @@ async def get_patient_lab_trends(
     Shows how lab values have changed and their interpretation
     """
     # Verify patient exists
-    patient = session.get(Patient, patient_id)
+    patient = await session.get(Patient, patient_id)
     if not patient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Patient with id {patient_id} not found"
         )
 
-    # Calculate date range
     date_from = datetime.now().date() - timedelta(days=months_back * 30)
+    series = (await get_lab_series_cache().get_async(session, patient_id)).since(date_from)
 
-    # Get all lab data in range
-    query = select(LaboratoryData).where(
-        and_(
-            LaboratoryData.patient_id == patient_id,
-            LaboratoryData.study_date >= date_from
-        )
-    ).order_by(LaboratoryData.study_date)
+    return _build_comparisons(series, _parse_parameters(parameters))
 
-    lab_records = session.exec(query).all()
 
-    if not lab_records:
-        return []
+@router.get("/trends/nutritionist/{nutritionist_id}", response_model=List[PatientLabTrends])
+async def get_nutritionist_panel_lab_trends(
+    nutritionist_id: int,
+    parameters: Optional[str] = Query(
+        default=None,
+        description="Comma-separated list of parameters to analyze (e.g., 'fasting_glucose_mgdl,hemoglobin_a1c_pct')"
+    ),
+    months_back: int = Query(default=6, ge=1, le=24),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Get laboratory trends for every patient assigned to a nutritionist
 
-    # Define parameters to analyze
-    if parameters:
-        param_list = [p.strip() for p in parameters.split(',')]
-    else:
-        # Default important parameters
-        param_list = [
-            'fasting_glucose_mgdl',
-            'hemoglobin_a1c_pct',
-            'total_cholesterol_mgdl',
-            'ldl_cholesterol_mgdl',
-            'hdl_cholesterol_mgdl',
-            'triglycerides_mgdl',
-            'creatinine_mgdl',
-            'alt_tgp_UI_l'
-        ]
+    Series for patients not already cached are loaded with a single query
+    """
+    nutritionist = await session.get(Nutritionist, nutritionist_id)
+    if not nutritionist:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nutritionist with id {nutritionist_id} not found"
+        )
 
-    comparisons = []
+    patient_ids = (await session.exec(
+        select(Patient.id)
+        .where(Patient.active_nutritionist_id == nutritionist_id)
+        .order_by(Patient.id)
+    )).all()
 
-    for param in param_list:
-        values = []
-        for record in lab_records:
-            value = getattr(record, param, None)
-            if value is not None:
-                values.append({
-                    "date": record.study_date.isoformat(),
-                    "value": value
-                })
-
-        if len(values) >= 2:
-            # Calculate trend
-            first_value = values[0]['value']
-            last_value = values[-1]['value']
-
-            if last_value < first_value:
-                trend = Trend.IMPROVING if _is_lower_better(param) else Trend.WORSENING
-            elif last_value > first_value:
-                trend = Trend.WORSENING if _is_lower_better(param) else Trend.IMPROVING
-            else:
-                trend = Trend.STABLE
-
-            comparison = LabComparison(
-                parameter_name=_format_parameter_name(param),
-                values=values,
-                trend=trend,
-                normal_range=_get_normal_range(param),
-                interpretation=_get_trend_interpretation(param, trend, first_value, last_value)
-            )
-            comparisons.append(comparison)
+    date_from = datetime.now().date() - timedelta(days=months_back * 30)
+    param_list = _parse_parameters(parameters)
+    panel = await get_lab_series_cache().get_many_async(session, patient_ids)
+
+    results = []
+    for patient_id in patient_ids:
+        series = panel[patient_id].since(date_from)
+        comparisons = _build_comparisons(series, param_list)
+        results.append(PatientLabTrends(
+            patient_id=patient_id,
+            studies=len(series),
+            out_of_range_parameters=[c.parameter_name for c in comparisons if c.out_of_range],
+            comparisons=comparisons
+        ))
 
-    return comparisons
+    return results
 
 
 # ============================================================================
 # AI ANALYSIS ENDPOINTS
 # ============================================================================
 
+@router.post("/reanalyze", response_model=LabReanalysisJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_bulk_reanalysis(request: LabReanalysisRequest):
+    """
+    Regenerate AI interpretation and derived values for many records
+
+    Runs in the background over all records matching the filters (a patient,
+    a nutritionist's panel, or the whole history when no filter is given).
+    Poll GET /laboratory/reanalyze/{job_id} for progress; any worker can
+    answer it. Only one job runs at a time: repeating the request of the
+    running job returns that job, other filters get 409.
+    """
+    try:
+        job = await get_reanalysis_runner().submit(LabReanalysisJob(
+            patient_id=request.patient_id,
+            nutritionist_id=request.nutritionist_id,
+            study_date_from=request.study_date_from,
+            batch_size=request.batch_size
+        ))
+    except ReanalysisJobConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{e}; poll GET /laboratory/reanalyze/{e.active.id} until it finishes"
+        )
+    logger.info(f"Bulk lab reanalysis {job.id} is {job.status}")
+    return job.to_dict()
+
+
+@router.get("/reanalyze/{job_id}", response_model=LabReanalysisJobResponse)
+async def get_bulk_reanalysis(job_id: str):
+    """Get the progress of a bulk reanalysis job"""
+    job = await get_reanalysis_runner().get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Reanalysis job {job_id} not found"
+        )
+    return job.to_dict()
+
+
 @router.post("/{lab_id}/reanalyze", response_model=LaboratoryDataResponse)
 async def reanalyze_laboratory_data(
     lab_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Regenerate AI interpretation for laboratory data
 
-    Useful after updating reference ranges or AI algorithms
+    Useful after updating reference ranges or AI algorithms.
+    Use POST /laboratory/reanalyze to reprocess many records at once.
     """
-    db_lab_data = session.get(LaboratoryData, lab_id)
+    db_lab_data = await session.get(LaboratoryData, lab_id, options=_with_trends())
 
     if not db_lab_data:
         raise HTTPException(
@@ -389,15 +433,15 @@ async def reanalyze_laboratory_data(
         db_lab_data.updated_at = datetime.utcnow()
 
         session.add(db_lab_data)
-        session.commit()
-        session.refresh(db_lab_data)
+        await session.commit()
+        await session.refresh(db_lab_data)
 
         logger.info(f"Reanalyzed laboratory data record {lab_id}")
 
         return db_lab_data
 
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         logger.error(f"Error reanalyzing laboratory data: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -412,7 +456,7 @@ async def reanalyze_laboratory_data(
 @router.post("/files/", response_model=ClinicalFileResponse, status_code=status.HTTP_201_CREATED)
 async def create_clinical_file(
     file_data: ClinicalFileCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Create clinical file record
@@ -421,7 +465,7 @@ async def create_clinical_file(
     """
     try:
         # Verify patient exists
-        patient = session.get(Patient, file_data.patient_id)
+        patient = await session.get(Patient, file_data.patient_id)
         if not patient:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -431,15 +475,15 @@ async def create_clinical_file(
         db_file = ClinicalFile(**file_data.model_dump())
 
         session.add(db_file)
-        session.commit()
-        session.refresh(db_file)
+        await session.commit()
+        await session.refresh(db_file)
 
         logger.info(f"Created clinical file {db_file.id} for patient {file_data.patient_id}")
 
         return db_file
 
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         logger.error(f"Error creating clinical file: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -451,11 +495,11 @@ async def create_clinical_file(
 async def get_patient_clinical_files(
     patient_id: int,
     file_type: Optional[str] = Query(default=None),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get all clinical files for a patient"""
     # Verify patient exists
-    patient = session.get(Patient, patient_id)
+    patient = await session.get(Patient, patient_id)
     if not patient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -468,7 +512,7 @@ async def get_patient_clinical_files(
         query = query.where(ClinicalFile.file_type == file_type)
 
     query = query.order_by(desc(ClinicalFile.uploaded_at))
-    files = session.exec(query).all()
+    files = (await session.exec(query)).all()
 
     return files
 
@@ -482,17 +526,20 @@ async def upload_clinical_file(
     document_date: Optional[str] = None,
     uploaded_by: str = "nutritionist",
     uploaded_by_id: int = 1,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
-    Upload clinical file with OCR processing
+    Upload clinical file and queue it for OCR processing
+
+    Returns immediately with ocr_status=pending; poll
+    GET /laboratory/files/{file_id}/ocr for progress.
 
     Supported formats: PDF, JPG, PNG, JPEG
     File types: laboratory, radiology, ultrasound, prescription, consent, other
     """
     try:
         # Verify patient exists
-        patient = session.get(Patient, patient_id)
+        patient = await session.get(Patient, patient_id)
         if not patient:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -518,17 +565,17 @@ async def upload_clinical_file(
         safe_filename = f"{unique_id}_{file.filename}"
         file_path = uploads_dir / safe_filename
 
-        # Save file
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Get file size
-        file_size_mb = file_path.stat().st_size / (1024 * 1024)
-
-        # Process OCR
-        extracted_data = await _process_ocr(file_path, file_extension)
+        # Stream to disk in chunks off the event loop
+        max_bytes = get_settings().clinical_upload_max_mb * 1024 * 1024
+        try:
+            size_bytes = await run_in_threadpool(_stream_to_disk, file.file, file_path, max_bytes)
+        except _UploadTooLarge:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File exceeds {get_settings().clinical_upload_max_mb} MB"
+            )
 
-        # Create database record
+        # Create database record; OCR runs in the background pipeline
         db_file = ClinicalFile(
             patient_id=patient_id,
             file_type=file_type,
@@ -537,18 +584,24 @@ async def upload_clinical_file(
             document_date=datetime.strptime(document_date, "%Y-%m-%d").date() if document_date else None,
             file_url=str(file_path),
             file_format=file_extension.replace('.', ''),
-            file_size_mb=round(file_size_mb, 2),
-            ocr_processed=extracted_data is not None,
-            extracted_data=extracted_data,
+            file_size_mb=round(size_bytes / (1024 * 1024), 2),
+            ocr_processed=False,
+            ocr_status=OcrStatus.PENDING.value,
             uploaded_by=uploaded_by,
             uploaded_by_id=uploaded_by_id
         )
 
         session.add(db_file)
-        session.commit()
-        session.refresh(db_file)
+        await session.commit()
+        await session.refresh(db_file)
+
+        get_ocr_pipeline().submit(OcrJob(
+            file_id=db_file.id,
+            path=db_file.file_url,
+            file_format=db_file.file_format
+        ))
 
-        logger.info(f"Uploaded clinical file {db_file.id} for patient {patient_id}")
+        logger.info(f"Uploaded clinical file {db_file.id} for patient {patient_id}, OCR queued")
         return db_file
 
     except HTTPException:
@@ -563,13 +616,52 @@ async def upload_clinical_file(
         file.file.close()
 
 
+@router.get("/files/ocr/metrics")
+async def get_ocr_pipeline_metrics():
+    """Background OCR pipeline counters (jobs, pages, pages per second)"""
+    return get_ocr_pipeline().metrics()
+
+
+@router.get("/files/{file_id}/ocr", response_model=ClinicalFileOcrStatus)
+async def get_clinical_file_ocr_status(
+    file_id: int,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Poll the OCR progress of an uploaded clinical file"""
+    db_file = await session.get(ClinicalFile, file_id)
+    if not db_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Clinical file with id {file_id} not found"
+        )
+
+    pages_total = db_file.ocr_pages_total
+    if db_file.ocr_status == OcrStatus.COMPLETED.value:
+        progress = 1.0
+    elif pages_total:
+        progress = round(db_file.ocr_pages_done / pages_total, 3)
+    else:
+        progress = 0.0
+
+    return ClinicalFileOcrStatus(
+        file_id=db_file.id,
+        ocr_status=db_file.ocr_status,
+        ocr_pages_total=pages_total,
+        ocr_pages_done=db_file.ocr_pages_done,
+        progress=progress,
+        ocr_processed=db_file.ocr_processed,
+        ocr_error=db_file.ocr_error,
+        extracted_data=db_file.extracted_data
+    )
+
+
 @router.get("/files/{file_id}", response_model=ClinicalFileResponse)
 async def get_clinical_file(
     file_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get a specific clinical file"""
-    db_file = session.get(ClinicalFile, file_id)
+    db_file = await session.get(ClinicalFile, file_id)
     if not db_file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -581,10 +673,10 @@ async def get_clinical_file(
 @router.delete("/files/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_clinical_file(
     file_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Delete a clinical file"""
-    db_file = session.get(ClinicalFile, file_id)
+    db_file = await session.get(ClinicalFile, file_id)
     if not db_file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -600,8 +692,8 @@ async def delete_clinical_file(
         logger.warning(f"Could not delete physical file: {e}")
 
     # Delete database record
-    session.delete(db_file)
-    session.commit()
+    await session.delete(db_file)
+    await session.commit()
 
     logger.info(f"Deleted clinical file {file_id}")
     return None
@@ -611,81 +703,85 @@ async def delete_clinical_file(
 # HELPER FUNCTIONS
 # ============================================================================
 
-async def _calculate_trends(session: Session, lab_data: LaboratoryData):
+# Parameters tracked in LabTrend, with their display names
+TRACKED_PARAMETERS = [
+    ('fasting_glucose_mgdl', 'Glucosa en ayunas'),
+    ('hemoglobin_a1c_pct', 'Hemoglobina A1c'),
+    ('total_cholesterol_mgdl', 'Colesterol total'),
+    ('ldl_cholesterol_mgdl', 'LDL'),
+    ('hdl_cholesterol_mgdl', 'HDL'),
+    ('triglycerides_mgdl', 'Triglicéridos'),
+    ('creatinine_mgdl', 'Creatinina'),
+    ('alt_tgp_UI_l', 'ALT/TGP')
+]
+
+DEFAULT_TREND_PARAMETERS = [param for param, _ in TRACKED_PARAMETERS]
+
+_TREND_BY_DIRECTION = {1: Trend.IMPROVING, -1: Trend.WORSENING, 0: Trend.STABLE}
+
+
+async def _calculate_trends(session: AsyncSession, lab_data: LaboratoryData):
     """Calculate trends by comparing with previous lab data"""
-    # Get previous lab data for this patient
-    previous_lab = session.exec(
-        select(LaboratoryData)
-        .where(
-            and_(
-                LaboratoryData.patient_id == lab_data.patient_id,
-                LaboratoryData.study_date < lab_data.study_date
-            )
-        )
-        .order_by(desc(LaboratoryData.study_date))
-        .limit(1)
-    ).first()
+    series = await get_lab_series_cache().get_async(session, lab_data.patient_id)
+    names = dict(TRACKED_PARAMETERS)
 
-    if not previous_lab:
+    changes = series.compare(lab_data.id, names)
+    if not changes:
         return
 
-    # Define parameters to track
-    parameters = [
-        ('fasting_glucose_mgdl', 'Glucosa en ayunas'),
-        ('hemoglobin_a1c_pct', 'Hemoglobina A1c'),
-        ('total_cholesterol_mgdl', 'Colesterol total'),
-        ('ldl_cholesterol_mgdl', 'LDL'),
-        ('hdl_cholesterol_mgdl', 'HDL'),
-        ('triglycerides_mgdl', 'Triglicéridos'),
-        ('creatinine_mgdl', 'Creatinina'),
-        ('alt_tgp_UI_l', 'ALT/TGP')
-    ]
-
-    for param_key, param_name in parameters:
-        current_value = getattr(lab_data, param_key, None)
-        previous_value = getattr(previous_lab, param_key, None)
-
-        if current_value is not None and previous_value is not None:
-            # Calculate trend
-            if current_value < previous_value:
-                direction = Trend.IMPROVING if _is_lower_better(param_key) else Trend.WORSENING
-            elif current_value > previous_value:
-                direction = Trend.WORSENING if _is_lower_better(param_key) else Trend.IMPROVING
-            else:
-                direction = Trend.STABLE
-
-            percent_change = ((current_value - previous_value) / previous_value) * 100 if previous_value != 0 else 0
-
-            trend = LabTrend(
-                lab_data_id=lab_data.id,
-                patient_id=lab_data.patient_id,
-                parameter_name=param_name,
-                current_value=current_value,
-                previous_value=previous_value,
-                direction=direction,
-                percent_change=round(percent_change, 2)
-            )
+    session.add_all([
+        LabTrend(
+            lab_data_id=lab_data.id,
+            patient_id=lab_data.patient_id,
+            parameter_name=names[param_key],
+            current_value=current_value,
+            previous_value=previous_value,
+            direction=_TREND_BY_DIRECTION[direction],
+            percent_change=round(percent_change, 2)
+        )
+        for param_key, current_value, previous_value, direction, percent_change in changes
+    ])
+    await session.commit()
+
+
+def _parse_parameters(parameters: Optional[str]) -> List[str]:
+    """Parse the comma-separated parameter list, defaulting to the tracked ones"""
+    if parameters:
+        return [p.strip() for p in parameters.split(',')]
+    return DEFAULT_TREND_PARAMETERS
 
-            session.add(trend)
 
-    session.commit()
+def _build_comparisons(series: LabSeries, param_list: List[str]) -> List[LabComparison]:
+    """Build LabComparison entries for parameters with at least two values"""
+    if not len(series):
+        return []
+
+    summary = series.summarize(param_list)
+    comparisons = []
+    for i in np.flatnonzero(summary.count >= 2).tolist():
+        param = summary.parameters[i]
+        first_value = float(summary.first[i])
+        last_value = float(summary.last[i])
+        trend = _TREND_BY_DIRECTION[int(summary.direction[i])]
+
+        comparisons.append(LabComparison(
+            parameter_name=_format_parameter_name(param),
+            values=series.points(param),
+            trend=trend,
+            normal_range=_get_normal_range(param),
+            interpretation=_get_trend_interpretation(param, trend, first_value, last_value),
+            percent_change=round(float(summary.percent_change[i]), 2),
+            slope_per_month=round(float(summary.slope_per_month[i]), 4),
+            out_of_range=bool(summary.last_out_of_range[i]),
+            out_of_range_count=int(summary.out_of_range_count[i])
+        ))
+
+    return comparisons
 
 
 def _is_lower_better(parameter: str) -> bool:
     """Determine if lower values are better for this parameter"""
-    lower_is_better = [
-        'fasting_glucose_mgdl',
-        'postprandial_glucose_mgdl',
-        'hemoglobin_a1c_pct',
-        'total_cholesterol_mgdl',
-        'ldl_cholesterol_mgdl',
-        'triglycerides_mgdl',
-        'creatinine_mgdl',
-        'uric_acid_mgdl',
-        'alt_tgp_UI_l',
-        'ast_tgo_UI_l'
-    ]
-    return parameter in lower_is_better
+    return parameter in LOWER_IS_BETTER
 
 
 def _format_parameter_name(param: str) -> str:
@@ -731,118 +827,24 @@ def _get_trend_interpretation(param: str, trend: Trend, first_value: float, last
         return "Estable: Sin cambios significativos"
 
 
-async def _process_ocr(file_path: Path, file_extension: str) -> Optional[dict]:
-    """
-    Process OCR on uploaded file
+class _UploadTooLarge(Exception):
+    pass
 
-    For PDFs: Extract embedded text
-    For Images: Use OCR (placeholder for now, can integrate Tesseract later)
-    """
-    try:
-        extracted_text = ""
-
-        if file_extension == '.pdf':
-            # For PDFs, try to extract embedded text using PyMuPDF
-            try:
-                import fitz  # PyMuPDF
-                doc = fitz.open(file_path)
-                for page in doc:
-                    extracted_text += page.get_text()
-                doc.close()
-            except ImportError:
-                logger.warning("PyMuPDF (fitz) not installed. PDF text extraction disabled.")
-                return None
-            except Exception as e:
-                logger.error(f"Error extracting text from PDF: {e}")
-                return None
-
-        elif file_extension in {'.jpg', '.jpeg', '.png'}:
-            # For images, use OCR (placeholder - can integrate Tesseract)
-            try:
-                # Placeholder for OCR
-                # In production, integrate pytesseract or cloud OCR service
-                logger.info("Image OCR processing - placeholder (install pytesseract for actual OCR)")
-
-                # Try tesseract if available
-                try:
-                    import pytesseract
-                    from PIL import Image
-
-                    image = Image.open(file_path)
-                    extracted_text = pytesseract.image_to_string(image, lang='spa')
-                except ImportError:
-                    logger.warning("pytesseract not installed. Image OCR disabled.")
-                    return None
-
-            except Exception as e:
-                logger.error(f"Error processing image OCR: {e}")
-                return None
-
-        if extracted_text.strip():
-            # Analyze extracted text for clinical data
-            analysis = _analyze_clinical_text(extracted_text)
-
-            return {
-                "raw_text": extracted_text[:5000],  # Limit to 5000 chars
-                "text_length": len(extracted_text),
-                "analysis": analysis,
-                "processing_date": datetime.utcnow().isoformat()
-            }
-
-        return None
-
-    except Exception as e:
-        logger.error(f"Unexpected error in OCR processing: {e}")
-        return None
-
-
-def _analyze_clinical_text(text: str) -> dict:
-    """
-    Analyze extracted text for clinical data
-    Uses simple keyword matching - can be enhanced with NLP/AI
-    """
-    analysis = {
-        "detected_values": [],
-        "keywords_found": [],
-        "document_type": "unknown"
-    }
 
-    text_lower = text.lower()
-
-    # Detect document type
-    if any(word in text_lower for word in ['glucosa', 'hemoglobina', 'colesterol', 'triglicéridos']):
-        analysis["document_type"] = "laboratory"
-        analysis["keywords_found"].extend(['resultados de laboratorio'])
-
-    if any(word in text_lower for word in ['ultrasonido', 'ecografía', 'radiografía']):
-        analysis["document_type"] = "radiology"
-        analysis["keywords_found"].extend(['estudio de imagen'])
-
-    if any(word in text_lower for word in ['receta', 'medicamento', 'tratamiento']):
-        analysis["document_type"] = "prescription"
-        analysis["keywords_found"].extend(['receta médica'])
-
-    # Extract simple numeric values (very basic - can be enhanced)
-    import re
-
-    # Look for glucose values
-    glucose_pattern = r'glucosa[:\s]+(\d+\.?\d*)\s*mg/dl'
-    glucose_match = re.search(glucose_pattern, text_lower)
-    if glucose_match:
-        analysis["detected_values"].append({
-            "parameter": "Glucosa",
-            "value": float(glucose_match.group(1)),
-            "unit": "mg/dL"
-        })
-
-    # Look for cholesterol
-    cholesterol_pattern = r'colesterol\s+total[:\s]+(\d+\.?\d*)\s*mg/dl'
-    cholesterol_match = re.search(cholesterol_pattern, text_lower)
-    if cholesterol_match:
-        analysis["detected_values"].append({
-            "parameter": "Colesterol Total",
-            "value": float(cholesterol_match.group(1)),
-            "unit": "mg/dL"
-        })
-
-    return analysis
+def _stream_to_disk(source, destination: Path, max_bytes: int, chunk_size: int = 1024 * 1024) -> int:
+    """Copy an upload to disk in chunks, enforcing a size limit; returns bytes written"""
+    written = 0
+    try:
+        with destination.open("wb") as buffer:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise _UploadTooLarge()
+                buffer.write(chunk)
+    except _UploadTooLarge:
+        destination.unlink(missing_ok=True)
+        raise
+    return written
@@ -3,12 +3,13 @@ Medicinal Plants API endpoints
 Traditional Mexican Medicine Module
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import select, and_, or_, func
+from sqlmodel import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 from core.database import get_async_session
+from core.counters import get_view_counter
 from core.security import get_current_user_id, get_current_user_role, UserRole
 from domain.medicinal_plants.models import (
     MedicinalPlant,
@@ -34,9 +35,11 @@ from schemas.medicinal_plants import (
     HerbalShopResponse,
     PlantSearchFilters,
     PlantListResponse,
+    PlantFacetedSearchResponse,
     PlantRecommendationRequest,
     PlantRecommendationResponse
 )
+from services.medicinal_plants.facet_index import get_plant_facet_index
 
 router = APIRouter()
 
@@ -63,75 +66,22 @@ async def get_medicinal_plants(
     Applies philosophy: No making assumptions - ask what filters user wants
     """
     try:
-        # Build base query
-        query = select(MedicinalPlant).where(MedicinalPlant.is_active == True)
-
-        # Apply filters
-        filters = []
-
-        if category:
-            filters.append(MedicinalPlant.primary_category == category)
-
-        if evidence_level:
-            filters.append(MedicinalPlant.evidence_level == evidence_level)
-
-        if safety_level:
-            filters.append(MedicinalPlant.safety_level == safety_level)
-
-        if state:
-            # Search in states_found JSON array
-            filters.append(func.json_contains(MedicinalPlant.states_found, f'"{state}"'))
-
-        if safe_in_pregnancy is not None:
-            filters.append(MedicinalPlant.safe_in_pregnancy == safe_in_pregnancy)
-
-        if safe_for_children is not None:
-            filters.append(MedicinalPlant.safe_for_children == safe_for_children)
-
-        if search:
-            search_filter = or_(
-                MedicinalPlant.scientific_name.ilike(f"%{search}%"),
-                func.json_contains(MedicinalPlant.popular_names, f'"%{search}%"')
-            )
-            filters.append(search_filter)
-
-        if featured_only:
-            filters.append(MedicinalPlant.featured == True)
-
-        if validated_only:
-            filters.append(MedicinalPlant.validated_by_expert == True)
-
-        if filters:
-            query = query.where(and_(*filters))
-
-        # Count total results
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await session.execute(count_query)
-        total = total_result.scalar()
-
-        # Apply pagination
-        offset = (page - 1) * page_size
-        query = query.offset(offset).limit(page_size)
-
-        # Execute query
-        result = await session.execute(query)
-        plants = result.scalars().all()
-
-        # Calculate total pages
-        total_pages = (total + page_size - 1) // page_size
-
-        # Convert to summary format
-        plant_summaries = [
-            MedicinalPlantSummary.from_orm(plant) for plant in plants
-        ]
-
-        return PlantListResponse(
-            plants=plant_summaries,
-            total=total,
+        result = await _search_plants(
+            session,
+            category=category,
+            evidence_level=evidence_level,
+            safety_level=safety_level,
+            state=state,
+            safe_in_pregnancy=safe_in_pregnancy,
+            safe_for_children=safe_for_children,
+            featured=True if featured_only else None,
+            validated=True if validated_only else None,
+            search=search,
             page=page,
             page_size=page_size,
-            total_pages=total_pages
+            with_facets=False
         )
+        return PlantListResponse(**result)
 
     except Exception as e:
         print(f"Error in get_medicinal_plants: {e}")
@@ -173,29 +123,98 @@ async def get_plant_categories(
 ):
     """Get all plant categories with counts"""
     try:
-        categories = []
-        for cat in PlantCategory:
-            count_query = select(func.count()).where(
-                and_(
-                    MedicinalPlant.primary_category == cat,
-                    MedicinalPlant.is_active == True
-                )
-            )
-            result = await session.execute(count_query)
-            count = result.scalar()
+        index = get_plant_facet_index()
+        await index.ensure_fresh(session)
+        counts = index.facet_counts("category")
 
-            categories.append({
-                "category": cat.value,
-                "count": count
-            })
-
-        return categories
+        return [
+            {"category": cat.value, "count": counts.get(cat.value, 0)}
+            for cat in PlantCategory
+        ]
 
     except Exception as e:
         print(f"Error in get_plant_categories: {e}")
         return []
 
 
+@router.get("/search", response_model=PlantFacetedSearchResponse)
+async def search_medicinal_plants(
+    category: Optional[PlantCategory] = Query(None),
+    evidence_level: Optional[EvidenceLevel] = Query(None),
+    safety_level: Optional[SafetyLevel] = Query(None),
+    state: Optional[str] = Query(None),
+    safe_in_pregnancy: Optional[bool] = Query(None),
+    safe_for_children: Optional[bool] = Query(None),
+    search: Optional[str] = Query(None),
+    featured_only: Optional[bool] = Query(False),
+    validated_only: Optional[bool] = Query(False),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Faceted plant search
+
+    Same filters as the list endpoint; the response also carries, for every
+    facet, the number of plants per value given the other active filters.
+    """
+    try:
+        result = await _search_plants(
+            session,
+            category=category,
+            evidence_level=evidence_level,
+            safety_level=safety_level,
+            state=state,
+            safe_in_pregnancy=safe_in_pregnancy,
+            safe_for_children=safe_for_children,
+            featured=True if featured_only else None,
+            validated=True if validated_only else None,
+            search=search,
+            page=page,
+            page_size=page_size
+        )
+        return PlantFacetedSearchResponse(**result)
+
+    except Exception as e:
+        print(f"Error in search_medicinal_plants: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error searching medicinal plants"
+        )
+
+
+async def _search_plants(
+    session: AsyncSession,
+    search: Optional[str],
+    page: int,
+    page_size: int,
+    with_facets: bool = True,
+    **filters
+) -> dict:
+    """Run a query against the in-memory facet index"""
+    index = get_plant_facet_index()
+    await index.ensure_fresh(session)
+    result = index.search(
+        filters=filters,
+        search=search,
+        page=page,
+        page_size=page_size,
+        with_facets=with_facets
+    )
+
+    total = result["total"]
+    response = {
+        "plants": [MedicinalPlantSummary.model_validate(doc) for doc in result["plants"]],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": (total + page_size - 1) // page_size,
+    }
+    if with_facets:
+        response["facets"] = result["facets"]
+    return response
+
+
 @router.get("/{plant_id}", response_model=MedicinalPlantResponse)
 async def get_medicinal_plant(
     plant_id: int,
@@ -204,7 +223,7 @@ async def get_medicinal_plant(
     """
     Get specific medicinal plant by ID
 
-    Increments view count automatically
+    Records a view; counts are written to the database in batches
     """
     plant = await session.get(MedicinalPlant, plant_id)
 
@@ -220,11 +239,10 @@ async def get_medicinal_plant(
             detail="Medicinal plant not available"
         )
 
-    # Increment view count
-    plant.view_count += 1
-    session.add(plant)
-    await session.commit()
-    await session.refresh(plant)
+    # Record the view and include not-yet-flushed views in the response
+    pending_views = await get_view_counter("medicinal_plants").incr(plant_id)
+    session.expunge(plant)
+    plant.view_count += pending_views
 
     return plant
 
@@ -2,14 +2,19 @@
 API Router para Calculadora de Nutrición
 Endpoints para nutricionistas para calcular requerimientos y generar planes
 """
+import json
+import time
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, List, Optional
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from typing import Annotated, Dict, Iterator, List, Optional
+from pydantic import BaseModel, Field, model_validator
 
 from domain.nutritionists.kilocalorie_calculator import (
     KilocalorieCalculator, PatientProfile, MacroDistribution,
     ActivityLevel, Gender, NutritionalGoal
 )
+from domain.nutritionists.cohort_calculator import CohortCalculator
+from domain.foods.equivalents_solver import get_equivalents_solver
 from core.logging import log_success, log_error
 
 router = APIRouter()
@@ -51,6 +56,10 @@ class NutritionPlanRequest(BaseModel):
     macro_distribution: Optional[MacroDistributionRequest] = None
     nutritionist_id: Optional[int] = Field(None, description="ID del nutricionista")
     notes: Optional[str] = Field(None, description="Notas adicionales")
+    optimize_equivalents: bool = Field(
+        default=False,
+        description="Elegir equivalentes con el solver de mínimo error en lugar de la distribución por prioridades"
+    )
 
 # Endpoints
 @router.post("/calculate-bmr", response_model=Dict)
@@ -259,7 +268,9 @@ async def create_nutrition_plan(request: NutritionPlanRequest):
             )
         
         # Generar plan completo
-        nutrition_plan = calculator.create_nutrition_plan(patient_profile, macro_distribution)
+        nutrition_plan = calculator.create_nutrition_plan(
+            patient_profile, macro_distribution, optimize_equivalents=request.optimize_equivalents
+        )
         
         # Agregar metadatos adicionales
         nutrition_plan["nutritionist_id"] = request.nutritionist_id
@@ -283,6 +294,114 @@ async def create_nutrition_plan(request: NutritionPlanRequest):
         log_error(f"Error creando plan nutricional: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error creando plan nutricional: {str(e)}")
 
+# Cohortes: máximo de pacientes por solicitud y tamaño de cada bloque vectorizado
+MAX_COHORT_SIZE = 50000
+COHORT_CHUNK_SIZE = 2000
+
+class CohortPlanRequest(BaseModel):
+    """
+    Esquema columnar para recalcular planes de una cohorte: un arreglo por
+    atributo, todos de la misma longitud (posición i = paciente i)
+    """
+    patient_ids: Optional[List[int]] = Field(None, description="IDs de los pacientes (se devuelven en cada línea)")
+    age: List[Annotated[int, Field(ge=1, le=120)]] = Field(..., min_length=1, max_length=MAX_COHORT_SIZE)
+    weight: List[Annotated[float, Field(gt=0, le=500)]]
+    height: List[Annotated[float, Field(gt=0, le=300)]]
+    gender: List[Gender]
+    activity_level: List[ActivityLevel]
+    goal: List[NutritionalGoal]
+    is_pregnant: Optional[List[bool]] = None
+    is_lactating: Optional[List[bool]] = None
+    macro_distribution: Optional[MacroDistributionRequest] = None
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        size = len(self.age)
+        for name in ("patient_ids", "weight", "height", "gender", "activity_level", "goal", "is_pregnant", "is_lactating"):
+            values = getattr(self, name)
+            if values is not None and len(values) != size:
+                raise ValueError(f"'{name}' tiene {len(values)} elementos; se esperaban {size}")
+        return self
+
+def _cohort_plan_lines(request: CohortPlanRequest, distribution: MacroDistribution) -> Iterator[bytes]:
+    """Calcula la cohorte por bloques y emite una línea JSON por paciente"""
+    calculator = CohortCalculator()
+    started = time.perf_counter()
+    size = len(request.age)
+
+    for start in range(0, size, COHORT_CHUNK_SIZE):
+        stop = min(start + COHORT_CHUNK_SIZE, size)
+        plan = calculator.calculate(
+            age=request.age[start:stop],
+            weight=request.weight[start:stop],
+            height=request.height[start:stop],
+            gender=request.gender[start:stop],
+            activity_level=request.activity_level[start:stop],
+            goal=request.goal[start:stop],
+            is_pregnant=request.is_pregnant[start:stop] if request.is_pregnant else None,
+            is_lactating=request.is_lactating[start:stop] if request.is_lactating else None,
+            distribution=distribution
+        )
+        lines = []
+        for offset, row in enumerate(plan.rows()):
+            index = start + offset
+            row = {
+                "index": index,
+                "patient_id": request.patient_ids[index] if request.patient_ids else None,
+                **row
+            }
+            lines.append(json.dumps(row, ensure_ascii=False))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    log_success(
+        f"Planes de cohorte calculados: {size} pacientes en {time.perf_counter() - started:.2f}s",
+        business_context={
+            "action": "cohort_nutrition_plans",
+            "patients": size
+        }
+    )
+
+@router.post("/cohort/nutrition-plans")
+async def create_cohort_nutrition_plans(request: CohortPlanRequest):
+    """
+    Recalcula TMB, GET, macros y equivalentes SMAE para toda una cohorte
+
+    La cohorte se calcula vectorizada por bloques y la respuesta se transmite
+    como NDJSON (una línea por paciente, en el orden recibido). Cada línea
+    contiene ``calculations``, ``equivalents_prescription`` y ``plan_summary``
+    con los mismos valores que ``/create-nutrition-plan``.
+    """
+    macro_distribution = MacroDistribution()
+    if request.macro_distribution:
+        total_percentage = (
+            request.macro_distribution.protein_percentage +
+            request.macro_distribution.carbs_percentage +
+            request.macro_distribution.fat_percentage
+        )
+        if abs(total_percentage - 100.0) > 0.1:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Los porcentajes deben sumar 100%. Actual: {total_percentage}%"
+            )
+        macro_distribution = MacroDistribution(
+            protein_percentage=request.macro_distribution.protein_percentage,
+            carbs_percentage=request.macro_distribution.carbs_percentage,
+            fat_percentage=request.macro_distribution.fat_percentage
+        )
+
+    return StreamingResponse(
+        _cohort_plan_lines(request, macro_distribution),
+        media_type="application/x-ndjson",
+        headers={"X-Cohort-Size": str(len(request.age))}
+    )
+
+@router.get("/equivalents-solver/stats", response_model=Dict)
+async def get_equivalents_solver_stats():
+    """
+    Estadísticas de la caché del solver de equivalentes (tamaño y tasa de aciertos)
+    """
+    return get_equivalents_solver().cache_info()
+
 @router.get("/activity-levels", response_model=List[Dict])
 async def get_activity_levels():
     """
@@ -9,8 +9,6 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import logging
 import os
-import google.generativeai as genai
-from anthropic import Anthropic
 from dotenv import load_dotenv
 from sqlmodel import Session, select
 
@@ -18,7 +16,11 @@ from core.auth import get_current_user, verify_token
 from domain.auth.models import AuthUser
 from domain.patients.models import Patient, MedicalHistory, AnthropometricRecord
 from domain.medicinal_plants.models import MedicinalPlant
+from core.config import get_settings
 from core.database import get_async_session
+from core.providers import provider_configured
+from services.ai.providers import anthropic_client, gemini_model
+from services.ai.response_cache import get_chat_response_cache, prompt_version
 
 load_dotenv()
 
@@ -26,22 +28,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Configure AI models
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
+# Configure AI models (Gemini and Claude clients are created on first use)
 AI_VISION_MODEL = os.getenv("AI_VISION_MODEL", "gemini")
 
-# Initialize Gemini
-gemini_model = None
-if GOOGLE_API_KEY and GOOGLE_API_KEY != "your-google-gemini-api-key-here":
-    genai.configure(api_key=GOOGLE_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-1.5-pro-latest')
-
-# Initialize Claude
-anthropic_client = None
-if ANTHROPIC_API_KEY and ANTHROPIC_API_KEY != "your-anthropic-api-key-here":
-    anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
-
 # Optional security scheme
 security_optional = HTTPBearer(auto_error=False)
 
@@ -68,24 +57,6 @@ async def get_current_user_optional(
     except Exception:
         return None
 
-router = APIRouter()
-
-# Configure AI models
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
-AI_VISION_MODEL = os.getenv("AI_VISION_MODEL", "gemini")
-
-# Initialize Gemini
-gemini_model = None
-if GOOGLE_API_KEY and GOOGLE_API_KEY != "your-google-gemini-api-key-here":
-    genai.configure(api_key=GOOGLE_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-1.5-pro-latest')
-
-# Initialize Claude
-anthropic_client = None
-if ANTHROPIC_API_KEY and ANTHROPIC_API_KEY != "your-anthropic-api-key-here":
-    anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
-
 
 # Pydantic models
 class ChatMessage(BaseModel):
@@ -96,6 +67,7 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     conversation_history: Optional[List[ChatMessage]] = []
+    use_cache: bool = True
 
 
 class ChatResponse(BaseModel):
@@ -158,18 +130,28 @@ Eres un nutriólogo experto mexicano certificado, especializado en el Sistema Me
 Responde siempre en español de México, siendo empático, educativo y práctico.
 """
 
+# Cache keys include the prompt version so prompt edits never serve stale answers
+SYSTEM_PROMPT_VERSION = prompt_version(NUTRITIONIST_SYSTEM_PROMPT)
+
 
 async def generate_chat_response(
     user_message: str, 
     conversation_history: List[ChatMessage] = None,
-    user_context: Dict[str, Any] = None
+    user_context: Dict[str, Any] = None,
+    use_cache: bool = True
 ) -> dict:
     """
     Generate chat response using Gemini or Claude AI
 
+    Anonymous, context-free requests are served from the response cache when
+    an equivalent (normalized) question was already answered by an AI model.
+    Personalized requests always bypass the cache.
+
     Args:
         user_message: The user's message
         conversation_history: Previous conversation messages
+        user_context: Personalized context for authenticated users
+        use_cache: Allow serving/storing this request in the response cache
 
     Returns:
         dict with response and tags
@@ -178,8 +160,21 @@ async def generate_chat_response(
         # Build conversation context
         conversation_history = conversation_history or []
 
+        cache = get_chat_response_cache()
+        cache_key = None
+        if use_cache and get_settings().chat_cache_enabled and cache.is_cacheable(conversation_history, user_context):
+            cache_key = cache.make_key(user_message, SYSTEM_PROMPT_VERSION)
+        else:
+            cache.record_bypass()
+
+        if cache_key:
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         # Try Gemini first if available
-        if gemini_model:
+        gemini = gemini_model()
+        if gemini:
             try:
                 # Build conversation for Gemini with personalized context
                 base_prompt = NUTRITIONIST_SYSTEM_PROMPT
@@ -198,7 +193,7 @@ async def generate_chat_response(
 
                 # Generate response
                 full_prompt = "\n\n".join(chat_messages)
-                response = gemini_model.generate_content(full_prompt)
+                response = gemini.generate_content(full_prompt)
 
                 response_text = response.text.strip()
 
@@ -207,17 +202,21 @@ async def generate_chat_response(
 
                 logger.info(f"Gemini chat response generated successfully")
 
-                return {
+                result = {
                     "response": response_text,
                     "tags": tags
                 }
+                if cache_key:
+                    await cache.set(cache_key, result)
+                return result
 
             except Exception as e:
                 logger.error(f"Gemini chat generation failed: {e}")
                 # Fall through to Claude or fallback
 
         # Try Claude if available
-        if anthropic_client:
+        claude = anthropic_client()
+        if claude:
             try:
                 # Build conversation for Claude
                 messages = []
@@ -240,7 +239,7 @@ async def generate_chat_response(
                 if user_context:
                     system_prompt = build_personalized_prompt(system_prompt, user_context)
                 
-                response = anthropic_client.messages.create(
+                response = claude.messages.create(
                     model="claude-3-5-sonnet-20241022",
                     max_tokens=1024,
                     system=system_prompt,
@@ -254,10 +253,13 @@ async def generate_chat_response(
 
                 logger.info(f"Claude chat response generated successfully")
 
-                return {
+                result = {
                     "response": response_text,
                     "tags": tags
                 }
+                if cache_key:
+                    await cache.set(cache_key, result)
+                return result
 
             except Exception as e:
                 logger.error(f"Claude chat generation failed: {e}")
@@ -610,7 +612,8 @@ async def nutritionist_chat(
         result = await generate_chat_response(
             user_message=request.message,
             conversation_history=request.conversation_history,
-            user_context=user_context
+            user_context=user_context,
+            use_cache=request.use_cache
         )
 
         return JSONResponse(
@@ -632,7 +635,14 @@ async def chat_health():
     return {
         "status": "healthy",
         "service": "nutritionist-chat",
-        "gemini_available": gemini_model is not None,
-        "claude_available": anthropic_client is not None,
-        "ai_mode": AI_VISION_MODEL
+        "gemini_available": provider_configured("gemini"),
+        "claude_available": provider_configured("anthropic"),
+        "ai_mode": AI_VISION_MODEL,
+        "response_cache": get_chat_response_cache().stats()
     }
+
+
+@router.get("/cache/stats")
+async def chat_cache_stats():
+    """Response cache hit-rate metrics for anonymous chat requests"""
+    return get_chat_response_cache().stats()
@@ -29,6 +29,7 @@ async def create_patient_nutritional_profile(
     patient_id: int,
     goal: NutritionalGoal,
     custom_adjustments: Optional[Dict] = None,
+    optimize_equivalents: bool = Query(False, description="Elegir equivalentes con el solver de mínimo error"),
     current_user_id: int = Depends(get_current_user_id),
     session: Session = Depends(get_async_session)
 ):
@@ -64,7 +65,10 @@ async def create_patient_nutritional_profile(
     
     # Distribuir en equivalentes
     distributor = EquivalenceDistributor(target_calories, goal)
-    equivalents = distributor.distribute_to_equivalents()
+    if optimize_equivalents:
+        equivalents = distributor.distribute_optimal(macros)
+    else:
+        equivalents = distributor.distribute_to_equivalents()
     
     # Aplicar ajustes personalizados
     if custom_adjustments:
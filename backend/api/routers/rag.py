@@ -12,10 +12,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from core.auth import get_current_user
+from core.config import get_settings
 from core.database import get_async_session
-from domain.auth.models import AuthUser
+from domain.auth.models import AuthUser, UserRole
 from services.rag.search_service import RAGSearchService
 from services.rag.context_builder import RAGContextBuilder
+from services.rag.vector_index import VectorIndex, build_index_from_db, set_vector_index
 from services.ai.gemini_service import GeminiService
 
 
@@ -48,6 +50,14 @@ class SearchCombinedRequest(BaseModel):
     limit_per_source: int = 5
 
 
+class SemanticSearchRequest(BaseModel):
+    """Request para búsqueda semántica"""
+    query: str
+    limit: int = 10
+    kinds: Optional[List[str]] = None  # food, product, plant
+    alpha: float = 0.75
+
+
 class BuildContextRequest(BaseModel):
     """Request para construir contexto de usuario"""
     include_scan_history: bool = True
@@ -157,6 +167,70 @@ async def search_combined(
     }
 
 
+@router.post("/search/semantic")
+async def search_semantic(
+    request: SemanticSearchRequest,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Búsqueda semántica híbrida
+
+    Busca en el índice vectorial local (alimentos SMAE, productos NOM-051
+    y plantas medicinales) combinando similitud vectorial y léxica.
+
+    **Permisos**: Usuario autenticado
+    """
+    search_service = RAGSearchService(db)
+
+    results = await search_service.semantic_search(
+        query=request.query,
+        user_id=current_user.id,
+        limit=request.limit,
+        kinds=request.kinds,
+        alpha=request.alpha,
+    )
+
+    return {
+        "query": request.query,
+        "total_results": len(results),
+        "index_size": len(search_service.vector_index),
+        "results": results,
+    }
+
+
+@router.post("/index/rebuild")
+async def rebuild_semantic_index(
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Reconstruir el índice vectorial desde la base de datos
+
+    Construye un índice nuevo, lo persiste en ``RAG_INDEX_PATH`` y lo
+    activa de inmediato en este proceso. Los demás workers lo recargan desde
+    disco al detectar el cambio (a lo sumo ``_CHECK_SECONDS`` después, ver
+    ``get_vector_index``).
+
+    **Permisos**: Solo administradores
+    """
+    if not current_user.has_role(UserRole.ADMIN):
+        raise HTTPException(
+            status_code=403,
+            detail="Solo los administradores pueden reconstruir el índice"
+        )
+
+    index = await build_index_from_db(db, VectorIndex())
+    index.save(get_settings().rag_index_path)
+    set_vector_index(index)
+
+    return {
+        "status": "rebuilt",
+        "documents": len(index),
+        "trained": index.is_trained,
+    }
+
+
 # ============================================================================
 # Context Endpoints
 # ============================================================================
@@ -301,6 +375,8 @@ async def chat_with_rag(
             context=user_context,
             max_products=20,
         )
+    if search_results:
+        formatted_context += context_builder.format_search_results_for_prompt(search_results)
 
     # Inicializar servicio de IA
     gemini_service = GeminiService()
@@ -347,6 +423,7 @@ Siempre:
         "search_results_summary": {
             "products_count": len(search_results.get("products", [])) if search_results else 0,
             "foods_count": len(search_results.get("foods", [])) if search_results else 0,
+            "semantic_count": len(search_results.get("semantic", [])) if search_results else 0,
         } if search_results else None,
     }
 
@@ -371,6 +448,7 @@ async def rag_health():
                 "/rag/search/products",
                 "/rag/search/foods",
                 "/rag/search/combined",
+                "/rag/search/semantic",
             ],
             "context": [
                 "/rag/context/user",
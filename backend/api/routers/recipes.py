@@ -3,7 +3,9 @@ Recipe management endpoints with rating and commenting system
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi import status as http_status
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from datetime import datetime
@@ -11,7 +13,8 @@ from datetime import datetime
 from core.database import get_async_session
 from core.auth import get_current_active_user, get_patient_or_nutritionist
 from core.logging import log_success, log_error
-from domain.recipes.models import Recipe, RecipeStatus, RecipeRating, MealType, DifficultyLevel
+from core.counters import get_view_counter
+from domain.recipes.models import Recipe, RecipeStatus, RecipeRating, RecipeRatingStats, MealType, DifficultyLevel
 from domain.auth.models import AuthUser
 
 router = APIRouter()
@@ -163,25 +166,14 @@ async def get_recipe(
     recipe_id: int,
     session: Session = Depends(get_async_session)
 ):
-    """Get recipe by ID with rating information and increment view count"""
+    """Get recipe by ID with rating information and record a view"""
     try:
         recipe = await session.get(Recipe, recipe_id)
         if not recipe:
             raise HTTPException(status_code=404, detail="Recipe not found")
         
-        # Increment view count
-        recipe.view_count += 1
-        session.add(recipe)
-        await session.commit()
-        
-        log_success(
-            f"Receta visualizada: {recipe.title} (ID: {recipe_id})",
-            business_context={
-                "action": "recipe_view",
-                "recipe_id": recipe_id,
-                "view_count": recipe.view_count
-            }
-        )
+        # Record the view; it is written to recipes.view_count in batches
+        pending_views = await get_view_counter("recipes").incr(recipe_id)
         
         return RecipeWithRatingResponse(
             id=recipe.id,
@@ -201,7 +193,7 @@ async def get_recipe(
             status=recipe.status,
             rating_average=recipe.rating_average,
             rating_count=recipe.rating_count,
-            view_count=recipe.view_count,
+            view_count=recipe.view_count + pending_views,
             created_at=recipe.created_at
         )
         
@@ -235,6 +227,9 @@ async def create_or_update_rating(
                 detail="Recipe not found"
             )
         
+        # Agregado de ratings (bloqueado hasta el commit)
+        stats = await _get_rating_stats(session, recipe_id, for_update=True)
+        
         # Verificar si el usuario ya tiene un rating para esta receta
         existing_rating_query = select(RecipeRating).where(
             RecipeRating.recipe_id == recipe_id,
@@ -254,6 +249,9 @@ async def create_or_update_rating(
             rating_to_return = existing_rating
             action = "rating_update"
             
+            if stats.rating_changed(existing_rating, old_rating):
+                await _refill_rating_lists(session, stats, helpful=True)
+            
             log_success(
                 f"Rating actualizado para receta {recipe_id} por usuario {current_user.id}",
                 business_context={
@@ -274,12 +272,11 @@ async def create_or_update_rating(
             )
             
             session.add(new_rating)
+            await session.flush()
             rating_to_return = new_rating
             action = "rating_creation"
             
-            # Incrementar contador de ratings en la receta
-            recipe.rating_count += 1
-            session.add(recipe)
+            stats.rating_added(new_rating)
             
             log_success(
                 f"Nuevo rating creado para receta {recipe_id} por usuario {current_user.id}",
@@ -292,12 +289,11 @@ async def create_or_update_rating(
                 }
             )
         
+        # Actualizar promedio y contador de la receta desde el agregado
+        _apply_rating_stats(session, recipe, stats)
         await session.commit()
         await session.refresh(rating_to_return)
         
-        # Recalcular promedio de rating
-        await _recalculate_recipe_rating_average(session, recipe_id)
-        
         return RecipeRatingResponse(
             id=rating_to_return.id,
             recipe_id=rating_to_return.recipe_id,
@@ -400,60 +396,17 @@ async def get_recipe_rating_stats(
                 detail="Recipe not found"
             )
         
-        # Obtener todos los ratings
-        ratings_query = select(RecipeRating).where(RecipeRating.recipe_id == recipe_id)
-        ratings_result = await session.exec(ratings_query)
-        all_ratings = ratings_result.all()
+        # Agregado mantenido en cada escritura: lectura de una sola fila
+        stats = await _get_rating_stats(session, recipe_id)
+        await _persist_new_stats(session, stats)
         
-        if not all_ratings:
-            return RecipeStatsResponse(
-                recipe_id=recipe_id,
-                average_rating=0.0,
-                total_ratings=0,
-                rating_distribution={"5": 0, "4": 0, "3": 0, "2": 0, "1": 0},
-                recent_ratings=[],
-                most_helpful_comments=[]
-            )
+        average_rating = stats.average or 0.0
+        total_ratings = stats.rating_count
+        rating_distribution = stats.distribution()
         
-        # Calcular estadísticas
-        total_ratings = len(all_ratings)
-        average_rating = sum(r.rating for r in all_ratings) / total_ratings
-        
-        # Distribución de ratings
-        rating_distribution = {"5": 0, "4": 0, "3": 0, "2": 0, "1": 0}
-        for rating in all_ratings:
-            rating_distribution[str(rating.rating)] += 1
-        
-        # Ratings recientes (últimos 10)
-        recent_ratings = sorted(all_ratings, key=lambda x: x.created_at, reverse=True)[:10]
-        recent_ratings_response = [RecipeRatingResponse(
-            id=r.id,
-            recipe_id=r.recipe_id,
-            user_id=r.user_id,
-            rating=r.rating,
-            comment=r.comment,
-            helpful_votes=r.helpful_votes,
-            created_at=r.created_at,
-            updated_at=r.updated_at,
-            user_name=f"Usuario {r.user_id}",
-            user_role="patient"
-        ) for r in recent_ratings]
-        
-        # Comentarios más útiles (con más votos)
-        helpful_comments = [r for r in all_ratings if r.comment and len(r.comment.strip()) > 0]
-        helpful_comments = sorted(helpful_comments, key=lambda x: x.helpful_votes, reverse=True)[:5]
-        helpful_comments_response = [RecipeRatingResponse(
-            id=r.id,
-            recipe_id=r.recipe_id,
-            user_id=r.user_id,
-            rating=r.rating,
-            comment=r.comment,
-            helpful_votes=r.helpful_votes,
-            created_at=r.created_at,
-            updated_at=r.updated_at,
-            user_name=f"Usuario {r.user_id}",
-            user_role="patient"
-        ) for r in helpful_comments]
+        # Ratings recientes (últimos 10) y comentarios más útiles
+        recent_ratings_response = [_snapshot_response(r) for r in stats.recent_ratings or []]
+        helpful_comments_response = [_snapshot_response(r) for r in stats.helpful_ratings or []]
         
         return RecipeStatsResponse(
             recipe_id=recipe_id,
@@ -492,8 +445,11 @@ async def mark_rating_helpful(
         
         # En una implementación real, verificarías que el usuario no haya marcado ya este rating
         # Por simplicidad, solo incrementamos el contador
+        stats = await _get_rating_stats(session, rating.recipe_id, for_update=True)
         rating.helpful_votes += 1
         session.add(rating)
+        stats.helpful_vote_added(rating)
+        _apply_rating_stats(session, None, stats)
         await session.commit()
         
         log_success(
@@ -541,20 +497,25 @@ async def delete_rating(
                 detail="Can only delete your own ratings"
             )
         
-        # Actualizar contador en la receta
-        recipe = await session.get(Recipe, rating.recipe_id)
-        if recipe:
-            recipe.rating_count = max(0, recipe.rating_count - 1)
-            session.add(recipe)
+        recipe_id = rating.recipe_id
+        stats = await _get_rating_stats(session, recipe_id, for_update=True)
         
         # Eliminar rating
         await session.delete(rating)
+        await session.flush()
+        
+        # Actualizar agregado, promedio y contador en la receta
+        refill = stats.rating_removed(rating)
+        if any(refill.values()):
+            await _refill_rating_lists(
+                session, stats,
+                recent=refill["recent_ratings"],
+                helpful=refill["helpful_ratings"]
+            )
+        recipe = await session.get(Recipe, recipe_id)
+        _apply_rating_stats(session, recipe, stats)
         await session.commit()
         
-        # Recalcular promedio
-        if recipe:
-            await _recalculate_recipe_rating_average(session, recipe.id)
-        
         log_success(
             f"Rating {rating_id} eliminado por usuario {current_user.id}",
             business_context={
@@ -576,27 +537,110 @@ async def delete_rating(
             detail="Failed to delete rating"
         )
 
-# Helper function
-async def _recalculate_recipe_rating_average(session: Session, recipe_id: int):
+# Helper functions
+def _snapshot_response(snapshot: Dict[str, Any]) -> RecipeRatingResponse:
+    """Convierte un snapshot del agregado en respuesta"""
+    return RecipeRatingResponse(
+        **snapshot,
+        user_name=f"Usuario {snapshot['user_id']}",
+        user_role="patient"
+    )
+
+async def _refill_rating_lists(
+    session: Session,
+    stats: RecipeRatingStats,
+    recent: bool = False,
+    helpful: bool = False
+):
     """
-    Recalcula el promedio de rating de una receta
+    Rellena las listas acotadas del agregado con consultas limitadas
+    (solo cuando una eliminación deja huecos que otro rating podría ocupar)
     """
+    if recent:
+        result = await session.exec(
+            select(RecipeRating)
+            .where(RecipeRating.recipe_id == stats.recipe_id)
+            .order_by(RecipeRating.created_at.desc())
+            .limit(RecipeRatingStats.RECENT_SIZE)
+        )
+        stats.recent_ratings = [RecipeRatingStats.snapshot(r) for r in result.all()]
+    if helpful:
+        result = await session.exec(
+            select(RecipeRating)
+            .where(
+                RecipeRating.recipe_id == stats.recipe_id,
+                RecipeRating.comment.is_not(None),
+                func.length(func.trim(RecipeRating.comment)) > 0
+            )
+            .order_by(RecipeRating.helpful_votes.desc(), RecipeRating.created_at.desc())
+            .limit(RecipeRatingStats.HELPFUL_SIZE)
+        )
+        stats.helpful_ratings = [RecipeRatingStats.snapshot(r) for r in result.all()]
+
+async def _build_rating_stats(session: Session, recipe_id: int) -> RecipeRatingStats:
+    """
+    Construye el agregado de una receta que aún no lo tiene
+    (una sola vez: conteo por estrellas en SQL y dos consultas limitadas)
+    """
+    stats = RecipeRatingStats(recipe_id=recipe_id)
+    result = await session.exec(
+        select(RecipeRating.rating, func.count())
+        .where(RecipeRating.recipe_id == recipe_id)
+        .group_by(RecipeRating.rating)
+    )
+    for stars, count in result.all():
+        setattr(stats, f"count_{stars}", count)
+        stats.rating_count += count
+        stats.rating_sum += stars * count
+    await _refill_rating_lists(session, stats, recent=True, helpful=True)
+    return stats
+
+async def _get_rating_stats(session: Session, recipe_id: int, for_update: bool = False) -> RecipeRatingStats:
+    """Obtiene el agregado de ratings de una receta (lo construye si no existe)"""
+    stats = await session.get(RecipeRatingStats, recipe_id, with_for_update=for_update)
+    if stats is None:
+        stats = await _build_rating_stats(session, recipe_id)
+        if for_update:
+            return await _upsert_rating_stats(session, stats)
+        session.add(stats)
+    return stats
+
+async def _upsert_rating_stats(session: Session, stats: RecipeRatingStats) -> RecipeRatingStats:
+    """
+    Inserta un agregado recién construido y lo devuelve bloqueado
+
+    Dos primeros ratings simultáneos construyen el agregado a la vez; con
+    ``INSERT ... ON CONFLICT DO UPDATE`` el segundo espera al primero en lugar
+    de fallar por la llave primaria. El ``DO UPDATE`` no cambia nada: conserva
+    la fila ya guardada (la construida aquí no incluye el rating del otro
+    request) y, a diferencia de ``DO NOTHING``, deja la fila bloqueada.
+    """
+    table = RecipeRatingStats.__table__
+    insert = sqlite_insert if session.bind.dialect.name == "sqlite" else pg_insert
+    statement = insert(table).values({column.name: getattr(stats, column.name) for column in table.columns})
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.recipe_id],
+        set_={"recipe_id": statement.excluded.recipe_id}
+    )
+    await session.exec(statement)
+    return await session.get(
+        RecipeRatingStats, stats.recipe_id, with_for_update=True, populate_existing=True
+    )
+
+async def _persist_new_stats(session: Session, stats: RecipeRatingStats):
+    """Guarda un agregado recién construido en una lectura (ignora carreras)"""
+    if stats not in session.new:
+        return
     try:
-        ratings_query = select(RecipeRating).where(RecipeRating.recipe_id == recipe_id)
-        ratings_result = await session.exec(ratings_query)
-        ratings = ratings_result.all()
-        
-        recipe = await session.get(Recipe, recipe_id)
-        if recipe:
-            if ratings:
-                recipe.rating_average = sum(r.rating for r in ratings) / len(ratings)
-                recipe.rating_count = len(ratings)
-            else:
-                recipe.rating_average = None
-                recipe.rating_count = 0
-            
-            session.add(recipe)
-            await session.commit()
-            
-    except Exception as e:
-        log_error(f"Error recalculando promedio de rating para receta {recipe_id}: {str(e)}")
\ No newline at end of file
+        await session.commit()
+    except Exception:
+        await session.rollback()
+
+def _apply_rating_stats(session: Session, recipe: Optional[Recipe], stats: RecipeRatingStats):
+    """Copia promedio y contador del agregado a la receta"""
+    stats.updated_at = datetime.utcnow()
+    session.add(stats)
+    if recipe is not None:
+        recipe.rating_average = stats.average
+        recipe.rating_count = stats.rating_count
+        session.add(recipe)
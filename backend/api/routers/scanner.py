@@ -6,6 +6,7 @@ Also supports label scanning using Vision AI with intelligent deduplication
 from fastapi import APIRouter, HTTPException, status, Depends, File, UploadFile
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from sqlalchemy import text
 from typing import Optional, List, Dict, Any
 from decimal import Decimal
 import logging
@@ -15,6 +16,9 @@ from core.database import get_async_session
 from core.auth import get_current_user
 from services.openfoodfacts.client import openfoodfacts_client
 from services.nom051.calculator import nom051_calculator
+from services.nom051.product_cache import get_product_cache, render_off_product
+from services.nom051.scan_buffer import get_scan_buffer
+from services.nom051.scan_rollup import SEALS, get_user_scan_rollup, scan_stats
 from services.ai.vision import extract_nutrition_label
 from services.utils.image_utils import (
     calculate_image_hash,
@@ -109,7 +113,7 @@ async def scan_barcode(
 
         logger.info(f"Scanning barcode {barcode_clean} for user {user.get('user_id')}")
 
-        # Step 1: Check local database first
+        # Step 1: Check local cache, offline catalog and database first
         result = await _search_local_db(barcode_clean, db)
         if result:
             logger.info(f"Product found in local database: {result['nombre']}")
@@ -123,7 +127,8 @@ async def scan_barcode(
                 found=True,
                 source='cache_local',
                 response_time_ms=int(response_time),
-                db=db
+                db=db,
+                seals={seal: result.get(seal) for seal in SEALS}
             )
 
             return JSONResponse(content=result, status_code=status.HTTP_200_OK)
@@ -135,51 +140,8 @@ async def scan_barcode(
         if off_product:
             logger.info(f"Product found in Open Food Facts: {off_product.product_name}")
 
-            # Extract nutrition data
-            nutrition = off_product.nutrition
-
-            # Determine if product is liquid
-            is_liquid = _is_liquid_product(off_product.categories or "")
-
-            # Calculate NOM-051 seals
-            seals = nom051_calculator.calculate_seals(
-                calorias=nutrition.calories or 0,
-                azucares=nutrition.sugars or 0,
-                grasas_saturadas=nutrition.saturated_fat or 0,
-                grasas_trans=nutrition.trans_fat or 0,
-                sodio=nutrition.sodium or 0,
-                is_liquid=is_liquid,
-                contiene_edulcorantes=False,  # TODO: detect from ingredients
-                contiene_cafeina=_contains_caffeine(off_product.ingredients_text or "")
-            )
-
-            # Calculate health score
-            health_score, health_level, health_color = nom051_calculator.get_health_score(seals)
-
-            # Build response
-            product_data = {
-                "codigo_barras": barcode_clean,
-                "nombre": off_product.product_name,
-                "marca": off_product.brands,
-                "porcion_gramos": 100.0,  # OFF normalizes to 100g
-                "calorias": nutrition.calories or 0,
-                "proteinas": nutrition.proteins or 0,
-                "carbohidratos": nutrition.carbohydrates or 0,
-                "azucares": nutrition.sugars or 0,
-                "grasas_totales": nutrition.fat or 0,
-                "grasas_saturadas": nutrition.saturated_fat or 0,
-                "grasas_trans": nutrition.trans_fat or 0,
-                "fibra": nutrition.fiber or 0,
-                "sodio": nutrition.sodium or 0,
-                **seals.to_dict(),
-                "imagen_url": off_product.image_url,
-                "ingredientes": off_product.ingredients_text,
-                "categoria": _map_category(off_product.categories or ""),
-                "fuente": "open_food_facts",
-                "health_score": health_score,
-                "health_level": health_level,
-                "health_color": health_color
-            }
+            # Calculate NOM-051 seals and health score, build response
+            product_data = render_off_product(barcode_clean, off_product)
 
             # Step 3: Save to local database
             product_id = await _save_to_local_db(product_data, user.get('user_id'), db)
@@ -194,7 +156,8 @@ async def scan_barcode(
                 found=True,
                 source='open_food_facts',
                 response_time_ms=int(response_time),
-                db=db
+                db=db,
+                seals={seal: product_data[seal] for seal in SEALS}
             )
 
             return JSONResponse(content=product_data, status_code=status.HTTP_200_OK)
@@ -292,37 +255,15 @@ async def get_scan_stats(
     """
     Get scanning statistics for current user
 
+    Read from the per-user scan rollup (one primary-key lookup) instead of
+    aggregating the whole scan history.
+
     Returns:
         Statistics about scans (total, found rate, etc.)
     """
     try:
-        user_id = user.get('user_id')
-
-        query = """
-            SELECT
-                COUNT(*) as total_scans,
-                SUM(CASE WHEN encontrado THEN 1 ELSE 0 END) as found_count,
-                AVG(tiempo_respuesta_ms) as avg_response_time,
-                COUNT(DISTINCT codigo_barras) as unique_products
-            FROM escaneos_historia
-            WHERE usuario_id = $1
-        """
-
-        row = await db.fetchrow(query, user_id)
-
-        total = row['total_scans'] or 0
-        found = row['found_count'] or 0
-
-        stats = {
-            "total_scans": total,
-            "found_count": found,
-            "not_found_count": total - found,
-            "found_rate": round((found / total * 100) if total > 0 else 0, 1),
-            "avg_response_time_ms": round(row['avg_response_time'] or 0, 0),
-            "unique_products": row['unique_products'] or 0
-        }
-
-        return JSONResponse(content=stats, status_code=status.HTTP_200_OK)
+        rollup = await get_user_scan_rollup(user.get('user_id'))
+        return JSONResponse(content=scan_stats(rollup), status_code=status.HTTP_200_OK)
 
     except Exception as e:
         logger.error(f"Error fetching scan stats: {e}", exc_info=True)
@@ -334,99 +275,25 @@ async def get_scan_stats(
 
 # Helper functions
 
-async def _search_local_db(barcode: str, db) -> Optional[Dict[str, Any]]:
-    """Search product in local database"""
-    try:
-        query = """
-            SELECT
-                id,
-                codigo_barras,
-                nombre,
-                marca,
-                porcion_gramos,
-                calorias,
-                proteinas,
-                carbohidratos,
-                azucares,
-                grasas_totales,
-                grasas_saturadas,
-                grasas_trans,
-                fibra,
-                sodio,
-                exceso_calorias,
-                exceso_azucares,
-                exceso_grasas_saturadas,
-                exceso_grasas_trans,
-                exceso_sodio,
-                contiene_edulcorantes,
-                contiene_cafeina,
-                imagen_url,
-                ingredientes,
-                categoria,
-                fuente
-            FROM productos_nom051
-            WHERE codigo_barras = $1
-            LIMIT 1
-        """
-
-        row = await db.fetchrow(query, barcode)
-
-        if not row:
-            return None
-
-        # Calculate health score
-        from services.nom051.calculator import NOM051Seals
-        seals = NOM051Seals(
-            exceso_calorias=row['exceso_calorias'],
-            exceso_azucares=row['exceso_azucares'],
-            exceso_grasas_saturadas=row['exceso_grasas_saturadas'],
-            exceso_grasas_trans=row['exceso_grasas_trans'],
-            exceso_sodio=row['exceso_sodio'],
-            contiene_edulcorantes=row['contiene_edulcorantes'],
-            contiene_cafeina=row['contiene_cafeina']
-        )
-        health_score, health_level, health_color = nom051_calculator.get_health_score(seals)
-
-        return {
-            "id": row['id'],
-            "codigo_barras": row['codigo_barras'],
-            "nombre": row['nombre'],
-            "marca": row['marca'],
-            "porcion_gramos": float(row['porcion_gramos']) if row['porcion_gramos'] else 100.0,
-            "calorias": float(row['calorias']) if row['calorias'] else 0,
-            "proteinas": float(row['proteinas']) if row['proteinas'] else 0,
-            "carbohidratos": float(row['carbohidratos']) if row['carbohidratos'] else 0,
-            "azucares": float(row['azucares']) if row['azucares'] else 0,
-            "grasas_totales": float(row['grasas_totales']) if row['grasas_totales'] else 0,
-            "grasas_saturadas": float(row['grasas_saturadas']) if row['grasas_saturadas'] else 0,
-            "grasas_trans": float(row['grasas_trans']) if row['grasas_trans'] else 0,
-            "fibra": float(row['fibra']) if row['fibra'] else 0,
-            "sodio": float(row['sodio']) if row['sodio'] else 0,
-            "exceso_calorias": row['exceso_calorias'],
-            "exceso_azucares": row['exceso_azucares'],
-            "exceso_grasas_saturadas": row['exceso_grasas_saturadas'],
-            "exceso_grasas_trans": row['exceso_grasas_trans'],
-            "exceso_sodio": row['exceso_sodio'],
-            "contiene_edulcorantes": row['contiene_edulcorantes'],
-            "contiene_cafeina": row['contiene_cafeina'],
-            "imagen_url": row['imagen_url'],
-            "ingredientes": row['ingredientes'],
-            "categoria": row['categoria'],
-            "fuente": row['fuente'],
-            "health_score": health_score,
-            "health_level": health_level,
-            "health_color": health_color
-        }
+# Required columns shared by product_data and productos_nom051
+_PRODUCT_COLUMNS = (
+    'codigo_barras', 'nombre', 'porcion_gramos',
+    'calorias', 'proteinas', 'carbohidratos', 'azucares',
+    'grasas_totales', 'grasas_saturadas', 'grasas_trans', 'fibra', 'sodio',
+    'exceso_calorias', 'exceso_azucares', 'exceso_grasas_saturadas',
+    'exceso_grasas_trans', 'exceso_sodio', 'contiene_edulcorantes', 'contiene_cafeina',
+    'fuente'
+)
 
-    except Exception as e:
-        logger.error(f"Error searching local DB: {e}")
-        return None
+async def _search_local_db(barcode: str, db) -> Optional[Dict[str, Any]]:
+    """Search product in local database (through the barcode product cache)"""
+    return await get_product_cache().lookup(barcode, db)
 
 
 async def _save_to_local_db(product_data: Dict[str, Any], user_id: int, db) -> Optional[int]:
     """Save product to local database"""
     try:
-        query = """
+        query = text("""
             INSERT INTO productos_nom051 (
                 codigo_barras, nombre, marca, porcion_gramos,
                 calorias, proteinas, carbohidratos, azucares,
@@ -436,48 +303,36 @@ async def _save_to_local_db(product_data: Dict[str, Any], user_id: int, db) -> O
                 imagen_url, ingredientes, categoria, fuente, usuario_id, validado
             )
             VALUES (
-                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13,
-                $14, $15, $16, $17, $18, $19, $20, $21, $22, $23, $24, $25, $26
+                :codigo_barras, :nombre, :marca, :porcion_gramos,
+                :calorias, :proteinas, :carbohidratos, :azucares,
+                :grasas_totales, :grasas_saturadas, :grasas_trans, :fibra, :sodio,
+                :exceso_calorias, :exceso_azucares, :exceso_grasas_saturadas,
+                :exceso_grasas_trans, :exceso_sodio, :contiene_edulcorantes, :contiene_cafeina,
+                :imagen_url, :ingredientes, :categoria, :fuente, :usuario_id, :validado
             )
             ON CONFLICT (codigo_barras) DO UPDATE SET
                 fecha_actualizacion = CURRENT_TIMESTAMP
             RETURNING id
-        """
-
-        row = await db.fetchrow(
-            query,
-            product_data['codigo_barras'],
-            product_data['nombre'],
-            product_data.get('marca'),
-            product_data['porcion_gramos'],
-            product_data['calorias'],
-            product_data['proteinas'],
-            product_data['carbohidratos'],
-            product_data['azucares'],
-            product_data['grasas_totales'],
-            product_data['grasas_saturadas'],
-            product_data['grasas_trans'],
-            product_data['fibra'],
-            product_data['sodio'],
-            product_data['exceso_calorias'],
-            product_data['exceso_azucares'],
-            product_data['exceso_grasas_saturadas'],
-            product_data['exceso_grasas_trans'],
-            product_data['exceso_sodio'],
-            product_data['contiene_edulcorantes'],
-            product_data['contiene_cafeina'],
-            product_data.get('imagen_url'),
-            product_data.get('ingredientes'),
-            product_data.get('categoria'),
-            product_data['fuente'],
-            user_id,
-            False  # Not validated yet
-        )
-
-        return row['id'] if row else None
+        """)
+
+        result = await db.execute(query, {
+            **{column: product_data[column] for column in _PRODUCT_COLUMNS},
+            'marca': product_data.get('marca'),
+            'imagen_url': product_data.get('imagen_url'),
+            'ingredientes': product_data.get('ingredientes'),
+            'categoria': product_data.get('categoria'),
+            'usuario_id': user_id,
+            'validado': False  # Not validated yet
+        })
+        product_id = result.scalar()
+        await db.commit()
+
+        await get_product_cache().invalidate(product_data['codigo_barras'])
+        return product_id
 
     except Exception as e:
         logger.error(f"Error saving to local DB: {e}")
+        await db.rollback()
         return None
 
 
@@ -488,64 +343,19 @@ async def _record_scan(
     found: bool,
     source: Optional[str],
     response_time_ms: int,
-    db
+    db,
+    seals: Optional[Dict[str, bool]] = None
 ):
-    """Record scan in history"""
-    try:
-        query = """
-            INSERT INTO escaneos_historia (
-                usuario_id, producto_id, codigo_barras, encontrado,
-                fuente, tiempo_respuesta_ms
-            )
-            VALUES ($1, $2, $3, $4, $5, $6)
-        """
-
-        await db.execute(
-            query,
-            user_id,
-            product_id,
-            barcode,
-            found,
-            source,
-            response_time_ms
-        )
-
-    except Exception as e:
-        logger.error(f"Error recording scan: {e}")
-
-
-def _is_liquid_product(categories: str) -> bool:
-    """Determine if product is liquid based on categories"""
-    liquid_keywords = ['bebida', 'drink', 'juice', 'agua', 'water', 'refresco', 'soda']
-    categories_lower = categories.lower()
-    return any(keyword in categories_lower for keyword in liquid_keywords)
-
-
-def _contains_caffeine(ingredients: str) -> bool:
-    """Check if product contains caffeine"""
-    caffeine_keywords = ['cafeína', 'caffeine', 'café', 'coffee', 'té', 'tea', 'guaraná', 'guarana']
-    ingredients_lower = ingredients.lower()
-    return any(keyword in ingredients_lower for keyword in caffeine_keywords)
-
-
-def _map_category(categories: str) -> str:
-    """Map Open Food Facts categories to SMAE categories"""
-    categories_lower = categories.lower()
-
-    if any(word in categories_lower for word in ['bebida', 'drink', 'juice', 'agua', 'refresco']):
-        return 'BEVERAGES'
-    elif any(word in categories_lower for word in ['snack', 'galleta', 'cookie', 'chip']):
-        return 'CEREALS'
-    elif any(word in categories_lower for word in ['dairy', 'leche', 'yogur', 'queso']):
-        return 'DAIRY'
-    elif any(word in categories_lower for word in ['carne', 'meat', 'pollo', 'chicken']):
-        return 'ANIMAL_PRODUCTS'
-    elif any(word in categories_lower for word in ['fruta', 'fruit']):
-        return 'FRUITS'
-    elif any(word in categories_lower for word in ['verdura', 'vegetable']):
-        return 'VEGETABLES'
-    else:
-        return 'OTROS'
+    """Record scan in history (queued; written in batches by the scan buffer)"""
+    get_scan_buffer().record_scan(
+        user_id=user_id,
+        barcode=barcode,
+        product_id=product_id,
+        found=found,
+        source=source,
+        response_time_ms=response_time_ms,
+        seals=seals
+    )
 
 
 @router.post("/label")
@@ -619,10 +429,11 @@ async def scan_label(
                 user_id=user_id,
                 product_id=existing_product['id'],
                 scan_type='label',
-                db=db
+                db=db,
+                seals={seal: existing_product.get(seal) for seal in SEALS}
             )
 
-            logger.info(f"Registered in user scan history (ID: {scan_history_id})")
+            logger.info(f"Queued scan of product {existing_product['id']} for user scan history")
 
             # Return existing product data with updated metadata
             response_time = (datetime.now() - start_time).total_seconds() * 1000
@@ -724,7 +535,8 @@ async def scan_label(
             user_id=user_id,
             product_id=product_id,
             scan_type='label',
-            db=db
+            db=db,
+            seals=seals.to_dict()
         )
 
         response_time = (datetime.now() - start_time).total_seconds() * 1000
@@ -946,7 +758,7 @@ async def _create_global_product(
     Returns the product ID
     """
     try:
-        query = """
+        query = text("""
             INSERT INTO productos_nom051 (
                 nombre, marca, porcion_gramos,
                 calorias, proteinas, carbohidratos, azucares,
@@ -958,47 +770,48 @@ async def _create_global_product(
                 confidence_score, is_global, validado
             )
             VALUES (
-                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12,
-                $13, $14, $15, $16, $17, $18, $19, $20, $21, $22,
-                $23, $24, $25, $26, $27, $28, $29
+                :nombre, :marca, :porcion_gramos,
+                :calorias, :proteinas, :carbohidratos, :azucares,
+                :grasas_totales, :grasas_saturadas, :grasas_trans, :fibra, :sodio,
+                :exceso_calorias, :exceso_azucares, :exceso_grasas_saturadas,
+                :exceso_grasas_trans, :exceso_sodio, :contiene_edulcorantes, :contiene_cafeina,
+                :ingredientes, :categoria, :fuente,
+                :image_hash, :created_by_user_id, :scan_count, :verified,
+                :confidence_score, :is_global, :validado
             )
             RETURNING id
-        """
-
-        row = await db.fetchrow(
-            query,
-            nombre,
-            marca,
-            porcion_gramos,
-            calorias,
-            proteinas,
-            carbohidratos,
-            azucares,
-            grasas_totales,
-            grasas_saturadas,
-            grasas_trans,
-            fibra,
-            sodio,
-            seals.exceso_calorias,
-            seals.exceso_azucares,
-            seals.exceso_grasas_saturadas,
-            seals.exceso_grasas_trans,
-            seals.exceso_sodio,
-            seals.contiene_edulcorantes,
-            seals.contiene_cafeina,
-            ingredientes,
-            "OTROS",  # categoria
-            "ai_vision",  # fuente
-            image_hash,
-            created_by_user_id,
-            1,  # scan_count (first scan)
-            False,  # verified
-            confidence_score,
-            True,  # is_global
-            False  # validado (not validated yet)
-        )
+        """)
+
+        result = await db.execute(query, {
+            "nombre": nombre,
+            "marca": marca,
+            "porcion_gramos": porcion_gramos,
+            "calorias": calorias,
+            "proteinas": proteinas,
+            "carbohidratos": carbohidratos,
+            "azucares": azucares,
+            "grasas_totales": grasas_totales,
+            "grasas_saturadas": grasas_saturadas,
+            "grasas_trans": grasas_trans,
+            "fibra": fibra,
+            "sodio": sodio,
+            **seals.to_dict(),
+            "ingredientes": ingredientes,
+            "categoria": "OTROS",
+            "fuente": "ai_vision",
+            "image_hash": image_hash,
+            "created_by_user_id": created_by_user_id,
+            "scan_count": 1,  # first scan
+            "verified": False,
+            "confidence_score": confidence_score,
+            "is_global": True,
+            "validado": False  # not validated yet
+        })
+        product_id = result.scalar_one()
+        await db.commit()
 
-        return row['id']
+        await get_product_cache().invalidate_product(product_id)
+        return product_id
 
     except Exception as e:
         logger.error(f"Error creating global product: {e}")
@@ -1056,40 +869,31 @@ async def _register_user_scan(
     user_id: int,
     product_id: int,
     scan_type: str,
-    db
+    db,
+    seals: Optional[Dict[str, bool]] = None
 ) -> Optional[int]:
     """
-    Register scan in user's private history using register_product_scan SQL function
+    Register scan in user's private history
 
-    Also increments global scan_count for the product
-
-    Returns scan history ID
+    Queued in the scan buffer, which inserts user_scan_history rows and
+    applies the global scan_count increments in batches (same effect as the
+    register_product_scan SQL function). The history row has no ID yet, so
+    this returns None.
     """
-    try:
-        query = """
-            SELECT register_product_scan($1, $2, $3, $4, $5) as scan_history_id
-        """
-
-        # Device info (could be passed from frontend in future)
-        device_info = {
-            "platform": "web",
-            "timestamp": datetime.now().isoformat()
-        }
-
-        row = await db.fetchrow(
-            query,
-            user_id,
-            product_id,
-            scan_type,
-            device_info,  # JSONB
-            None  # location_context
-        )
-
-        return row['scan_history_id'] if row else None
+    # Device info (could be passed from frontend in future)
+    device_info = {
+        "platform": "web",
+        "timestamp": datetime.now().isoformat()
+    }
 
-    except Exception as e:
-        logger.error(f"Error registering user scan: {e}")
-        return None
+    get_scan_buffer().register_user_scan(
+        user_id=user_id,
+        product_id=product_id,
+        scan_type=scan_type,
+        device_info=device_info,
+        seals=seals
+    )
+    return None
 
 
 @router.get("/health")
@@ -1101,5 +905,13 @@ async def scanner_health():
     return {
         "status": "healthy",
         "service": "nom051-scanner",
-        "openfoodfacts_available": off_available
+        "openfoodfacts_available": off_available,
+        "product_cache": get_product_cache().stats(),
+        "scan_buffer": get_scan_buffer().stats()
     }
+
+
+@router.get("/cache/stats")
+async def product_cache_stats():
+    """Hit rates of the barcode product cache (local LRU, Redis, database)"""
+    return get_product_cache().stats()
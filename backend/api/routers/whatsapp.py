@@ -1,13 +1,16 @@
 """
 WhatsApp API Routes
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Form, Request
 from fastapi.responses import Response
-from sqlmodel import Session, select, desc, func
-from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, desc, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Dict, List, Optional
 from datetime import datetime
+from xml.sax.saxutils import escape
 
-from core.database import get_session
+from core.database import get_async_session, get_read_session
 from domain.messaging.whatsapp import WhatsAppMessage, WhatsAppTemplate, MessageType, MessageStatus
 from domain.patients.models import Patient
 from schemas.whatsapp import (
@@ -20,13 +23,24 @@ from schemas.whatsapp import (
     SendMotivationalMessageRequest,
     SendFollowUpMessageRequest,
     SendCustomMessageRequest,
+    SendBulkMessageRequest,
+    BulkMessageQueuedResponse,
     MessageSentResponse,
     WhatsAppTemplateCreate,
     WhatsAppTemplateUpdate,
     WhatsAppTemplateResponse,
 )
-from services.whatsapp.twilio_service import whatsapp_service
+from services.whatsapp.twilio_service import (
+    appointment_reminder_body,
+    follow_up_message_body,
+    lab_results_notification_body,
+    meal_plan_notification_body,
+    motivational_message_body,
+)
+from services.whatsapp.outbound_queue import OutboundMessage, get_outbound_queue
+from services.whatsapp.inbound import get_inbound_ingestor
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/whatsapp", tags=["WhatsApp"])
@@ -37,16 +51,14 @@ router = APIRouter(prefix="/whatsapp", tags=["WhatsApp"])
 # ============================================================================
 
 @router.post("/webhook", response_class=Response)
-async def whatsapp_webhook(
-    request: Request,
-    session: Session = Depends(get_session)
-):
+async def whatsapp_webhook(request: Request):
     """
     Webhook endpoint for receiving incoming WhatsApp messages from Twilio
 
     This endpoint receives POST requests from Twilio when a user sends a message
-    to your WhatsApp number. It saves the message to the database and can send
-    an automated response.
+    to your WhatsApp number. The payload is queued for batched persistence and
+    the reply is built from the in-memory phone index, so the request never
+    waits on the database.
 
     Configure this URL in Twilio Console:
     https://console.twilio.com/us1/develop/sms/settings/whatsapp-senders
@@ -56,46 +68,14 @@ async def whatsapp_webhook(
     try:
         # Parse form data from Twilio
         form_data = await request.form()
+        payload = {key: value for key, value in form_data.items() if isinstance(value, str)}
 
-        # Extract message data
-        from_number = form_data.get("From", "")  # Format: whatsapp:+5219841372369
-        to_number = form_data.get("To", "")      # Your WhatsApp number
-        message_body = form_data.get("Body", "")
-        message_sid = form_data.get("MessageSid", "")
-        num_media = int(form_data.get("NumMedia", "0"))
-
-        # Clean phone number (remove whatsapp: prefix)
-        sender_phone = from_number.replace("whatsapp:", "")
-
-        logger.info(f"Received WhatsApp message from {sender_phone}: {message_body[:50]}...")
-
-        # Try to find patient by phone number
-        query = select(Patient).where(Patient.telefono == sender_phone)
-        patient = session.exec(query).first()
-
-        # Save incoming message to database
-        incoming_message = WhatsAppMessage(
-            patient_id=patient.id if patient else None,
-            recipient_phone=sender_phone,
-            recipient_name=patient.nombre if patient else "Unknown",
-            message_type=MessageType.CUSTOM,
-            message_body=message_body,
-            twilio_sid=message_sid,
-            status=MessageStatus.DELIVERED,
-            delivered_at=datetime.utcnow(),
-            created_at=datetime.utcnow(),
-            created_by_id=1  # System user
-        )
-
-        session.add(incoming_message)
-        session.commit()
-
-        logger.info(f"Incoming message saved. Patient: {patient.nombre if patient else 'Unknown'}")
+        patient = await get_inbound_ingestor().submit(payload)
 
         # Optional: Send automatic response
         response_text = None
         if patient:
-            response_text = f"¡Hola {patient.nombre}! 👋 Gracias por contactarnos. Tu nutriólogo revisará tu mensaje pronto."
+            response_text = f"¡Hola {escape(patient.first_name)}! 👋 Gracias por contactarnos. Tu nutriólogo revisará tu mensaje pronto."
         else:
             response_text = "¡Hola! 👋 Gracias por contactarnos. Para brindarte mejor atención, por favor proporciona tu nombre completo."
 
@@ -115,56 +95,153 @@ async def whatsapp_webhook(
                        status_code=200)
 
 
+@router.get("/webhook/metrics")
+async def get_webhook_metrics():
+    """Inbound ingestion metrics (queued, persisted, batch sizes, phone index size)"""
+    return get_inbound_ingestor().metrics()
+
+
 # ============================================================================
 # MESSAGE ENDPOINTS
 # ============================================================================
 
+async def _reserve_idempotency_key(
+    message: OutboundMessage,
+    session: AsyncSession,
+    key: str
+) -> WhatsAppMessage:
+    """
+    Insert the message row holding ``key`` before anything is sent
+
+    The unique ``idempotency_key`` column makes the reservation atomic across
+    workers: a repeated request either finds the finished message (returned
+    as is) or one still being sent (409).
+    """
+    db_message = _message_row(message, idempotency_key=key)
+    session.add(db_message)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        existing = (await session.exec(
+            select(WhatsAppMessage).where(WhatsAppMessage.idempotency_key == key)
+        )).first()
+        if existing is None:
+            raise
+        if existing.status == MessageStatus.QUEUED:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being sent"
+            )
+        return existing
+    await session.refresh(db_message)
+    return db_message
+
+
+def _message_row(message: OutboundMessage, **values) -> WhatsAppMessage:
+    return WhatsAppMessage(
+        patient_id=message.patient_id,
+        recipient_phone=message.to_phone,
+        recipient_name=message.recipient_name,
+        message_type=message.message_type,
+        message_body=message.summary or message.body,
+        created_by_id=message.created_by_id,
+        **values
+    )
+
+
+async def _send_single(
+    message: OutboundMessage,
+    session: AsyncSession,
+    idempotency_key: Optional[str]
+) -> MessageSentResponse:
+    """
+    Deliver one message through the outbound queue and record it
+
+    ``send_now`` applies the same rate limits and retries as campaigns and
+    returns the Twilio SID, which the response needs. With an
+    ``Idempotency-Key`` header the key is reserved in the database before
+    sending, so a repeated request returns the stored message instead of
+    sending it again. A failed send releases the key so it can be retried.
+    """
+    db_message = None
+    if idempotency_key:
+        key = f"single:{idempotency_key}"
+        db_message = await _reserve_idempotency_key(message, session, key)
+        if db_message.status != MessageStatus.QUEUED:
+            # Failed sends release their key, so a stored one was delivered
+            return MessageSentResponse(
+                success=True,
+                message_id=db_message.id,
+                twilio_sid=db_message.twilio_sid,
+                status=db_message.status.value,
+                sent_at=db_message.sent_at.isoformat() if db_message.sent_at else None,
+                note="Idempotent replay: message already sent"
+            )
+        message.idempotency_key = key
+
+    try:
+        result = await get_outbound_queue().send_now(message)
+    except Exception as e:
+        if db_message is not None:
+            db_message.status = MessageStatus.FAILED
+            db_message.error_message = str(e)[:500]
+            db_message.idempotency_key = None
+            await session.commit()
+        raise
+
+    if db_message is None:
+        db_message = _message_row(message)
+        session.add(db_message)
+    db_message.twilio_sid = result.get("twilio_sid")
+    db_message.status = MessageStatus.SENT if result["success"] else MessageStatus.FAILED
+    db_message.error_message = result.get("error")
+    db_message.sent_at = datetime.utcnow() if result["success"] else None
+    if not result["success"]:
+        db_message.idempotency_key = None
+    await session.commit()
+    await session.refresh(db_message)
+
+    return MessageSentResponse(
+        success=result["success"],
+        message_id=db_message.id,
+        twilio_sid=db_message.twilio_sid,
+        status=result["status"],
+        sent_at=result.get("sent_at"),
+        error=result.get("error"),
+        note=result.get("note")
+    )
+
+
 @router.post("/send/appointment-reminder", response_model=MessageSentResponse)
 async def send_appointment_reminder(
     request: SendAppointmentReminderRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(default=None, max_length=100)
 ):
     """Send appointment reminder via WhatsApp"""
     try:
-        # Send via Twilio
-        result = await whatsapp_service.send_appointment_reminder(
-            patient_name=request.patient_name,
-            patient_phone=request.patient_phone,
-            appointment_date=request.appointment_date,
-            appointment_time=request.appointment_time,
-            nutritionist_name=request.nutritionist_name
-        )
-
-        # Save to database
-        db_message = WhatsAppMessage(
+        message = OutboundMessage(
+            to_phone=request.patient_phone,
+            body=appointment_reminder_body(
+                patient_name=request.patient_name,
+                appointment_date=request.appointment_date,
+                appointment_time=request.appointment_time,
+                nutritionist_name=request.nutritionist_name
+            ),
+            message_type=MessageType.APPOINTMENT_REMINDER,
             patient_id=request.patient_id,
-            recipient_phone=request.patient_phone,
             recipient_name=request.patient_name,
-            message_type=MessageType.APPOINTMENT_REMINDER,
-            message_body=f"Recordatorio de cita: {request.appointment_date} a las {request.appointment_time}",
-            twilio_sid=result.get("twilio_sid"),
-            status=MessageStatus.SENT if result["success"] else MessageStatus.FAILED,
-            error_message=result.get("error"),
-            sent_at=datetime.utcnow() if result["success"] else None,
-            created_by_id=request.nutritionist_id
+            created_by_id=request.nutritionist_id,
+            summary=f"Recordatorio de cita: {request.appointment_date} a las {request.appointment_time}"
         )
-
-        session.add(db_message)
-        session.commit()
-        session.refresh(db_message)
+        response = await _send_single(message, session, idempotency_key)
 
         logger.info(f"Appointment reminder sent to patient {request.patient_id}")
+        return response
 
-        return MessageSentResponse(
-            success=result["success"],
-            message_id=db_message.id,
-            twilio_sid=result.get("twilio_sid"),
-            status=result["status"],
-            sent_at=result.get("sent_at"),
-            error=result.get("error"),
-            note=result.get("note")
-        )
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending appointment reminder: {e}")
         raise HTTPException(
@@ -176,45 +253,30 @@ async def send_appointment_reminder(
 @router.post("/send/meal-plan-notification", response_model=MessageSentResponse)
 async def send_meal_plan_notification(
     request: SendMealPlanNotificationRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(default=None, max_length=100)
 ):
     """Send meal plan ready notification"""
     try:
-        result = await whatsapp_service.send_meal_plan_notification(
-            patient_name=request.patient_name,
-            patient_phone=request.patient_phone,
-            nutritionist_name=request.nutritionist_name
-        )
-
-        db_message = WhatsAppMessage(
+        message = OutboundMessage(
+            to_phone=request.patient_phone,
+            body=meal_plan_notification_body(
+                patient_name=request.patient_name,
+                nutritionist_name=request.nutritionist_name
+            ),
+            message_type=MessageType.MEAL_PLAN_READY,
             patient_id=request.patient_id,
-            recipient_phone=request.patient_phone,
             recipient_name=request.patient_name,
-            message_type=MessageType.MEAL_PLAN_READY,
-            message_body="Plan de alimentación listo",
-            twilio_sid=result.get("twilio_sid"),
-            status=MessageStatus.SENT if result["success"] else MessageStatus.FAILED,
-            error_message=result.get("error"),
-            sent_at=datetime.utcnow() if result["success"] else None,
-            created_by_id=request.nutritionist_id
+            created_by_id=request.nutritionist_id,
+            summary="Plan de alimentación listo"
         )
-
-        session.add(db_message)
-        session.commit()
-        session.refresh(db_message)
+        response = await _send_single(message, session, idempotency_key)
 
         logger.info(f"Meal plan notification sent to patient {request.patient_id}")
+        return response
 
-        return MessageSentResponse(
-            success=result["success"],
-            message_id=db_message.id,
-            twilio_sid=result.get("twilio_sid"),
-            status=result["status"],
-            sent_at=result.get("sent_at"),
-            error=result.get("error"),
-            note=result.get("note")
-        )
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending meal plan notification: {e}")
         raise HTTPException(
@@ -226,45 +288,30 @@ async def send_meal_plan_notification(
 @router.post("/send/lab-results-notification", response_model=MessageSentResponse)
 async def send_lab_results_notification(
     request: SendLabResultsNotificationRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(default=None, max_length=100)
 ):
     """Send lab results notification"""
     try:
-        result = await whatsapp_service.send_lab_results_notification(
-            patient_name=request.patient_name,
-            patient_phone=request.patient_phone,
-            lab_type=request.lab_type
-        )
-
-        db_message = WhatsAppMessage(
+        message = OutboundMessage(
+            to_phone=request.patient_phone,
+            body=lab_results_notification_body(
+                patient_name=request.patient_name,
+                lab_type=request.lab_type
+            ),
+            message_type=MessageType.LAB_RESULTS,
             patient_id=request.patient_id,
-            recipient_phone=request.patient_phone,
             recipient_name=request.patient_name,
-            message_type=MessageType.LAB_RESULTS,
-            message_body=f"Resultados de {request.lab_type} disponibles",
-            twilio_sid=result.get("twilio_sid"),
-            status=MessageStatus.SENT if result["success"] else MessageStatus.FAILED,
-            error_message=result.get("error"),
-            sent_at=datetime.utcnow() if result["success"] else None,
-            created_by_id=request.nutritionist_id
+            created_by_id=request.nutritionist_id,
+            summary=f"Resultados de {request.lab_type} disponibles"
         )
-
-        session.add(db_message)
-        session.commit()
-        session.refresh(db_message)
+        response = await _send_single(message, session, idempotency_key)
 
         logger.info(f"Lab results notification sent to patient {request.patient_id}")
+        return response
 
-        return MessageSentResponse(
-            success=result["success"],
-            message_id=db_message.id,
-            twilio_sid=result.get("twilio_sid"),
-            status=result["status"],
-            sent_at=result.get("sent_at"),
-            error=result.get("error"),
-            note=result.get("note")
-        )
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending lab results notification: {e}")
         raise HTTPException(
@@ -276,45 +323,30 @@ async def send_lab_results_notification(
 @router.post("/send/motivational-message", response_model=MessageSentResponse)
 async def send_motivational_message(
     request: SendMotivationalMessageRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(default=None, max_length=100)
 ):
     """Send motivational message"""
     try:
-        result = await whatsapp_service.send_motivational_message(
-            patient_name=request.patient_name,
-            patient_phone=request.patient_phone,
-            message_text=request.message_text
-        )
-
-        db_message = WhatsAppMessage(
+        message = OutboundMessage(
+            to_phone=request.patient_phone,
+            body=motivational_message_body(
+                patient_name=request.patient_name,
+                message_text=request.message_text
+            ),
+            message_type=MessageType.MOTIVATIONAL,
             patient_id=request.patient_id,
-            recipient_phone=request.patient_phone,
             recipient_name=request.patient_name,
-            message_type=MessageType.MOTIVATIONAL,
-            message_body=request.message_text,
-            twilio_sid=result.get("twilio_sid"),
-            status=MessageStatus.SENT if result["success"] else MessageStatus.FAILED,
-            error_message=result.get("error"),
-            sent_at=datetime.utcnow() if result["success"] else None,
-            created_by_id=request.nutritionist_id
+            created_by_id=request.nutritionist_id,
+            summary=request.message_text
         )
-
-        session.add(db_message)
-        session.commit()
-        session.refresh(db_message)
+        response = await _send_single(message, session, idempotency_key)
 
         logger.info(f"Motivational message sent to patient {request.patient_id}")
+        return response
 
-        return MessageSentResponse(
-            success=result["success"],
-            message_id=db_message.id,
-            twilio_sid=result.get("twilio_sid"),
-            status=result["status"],
-            sent_at=result.get("sent_at"),
-            error=result.get("error"),
-            note=result.get("note")
-        )
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending motivational message: {e}")
         raise HTTPException(
@@ -326,46 +358,31 @@ async def send_motivational_message(
 @router.post("/send/follow-up-message", response_model=MessageSentResponse)
 async def send_follow_up_message(
     request: SendFollowUpMessageRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(default=None, max_length=100)
 ):
     """Send follow-up message"""
     try:
-        result = await whatsapp_service.send_follow_up_message(
-            patient_name=request.patient_name,
-            patient_phone=request.patient_phone,
-            days_since_last_visit=request.days_since_last_visit,
-            nutritionist_name=request.nutritionist_name
-        )
-
-        db_message = WhatsAppMessage(
+        message = OutboundMessage(
+            to_phone=request.patient_phone,
+            body=follow_up_message_body(
+                patient_name=request.patient_name,
+                days_since_last_visit=request.days_since_last_visit,
+                nutritionist_name=request.nutritionist_name
+            ),
+            message_type=MessageType.FOLLOW_UP,
             patient_id=request.patient_id,
-            recipient_phone=request.patient_phone,
             recipient_name=request.patient_name,
-            message_type=MessageType.FOLLOW_UP,
-            message_body=f"Seguimiento después de {request.days_since_last_visit} días",
-            twilio_sid=result.get("twilio_sid"),
-            status=MessageStatus.SENT if result["success"] else MessageStatus.FAILED,
-            error_message=result.get("error"),
-            sent_at=datetime.utcnow() if result["success"] else None,
-            created_by_id=request.nutritionist_id
+            created_by_id=request.nutritionist_id,
+            summary=f"Seguimiento después de {request.days_since_last_visit} días"
         )
-
-        session.add(db_message)
-        session.commit()
-        session.refresh(db_message)
+        response = await _send_single(message, session, idempotency_key)
 
         logger.info(f"Follow-up message sent to patient {request.patient_id}")
+        return response
 
-        return MessageSentResponse(
-            success=result["success"],
-            message_id=db_message.id,
-            twilio_sid=result.get("twilio_sid"),
-            status=result["status"],
-            sent_at=result.get("sent_at"),
-            error=result.get("error"),
-            note=result.get("note")
-        )
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending follow-up message: {e}")
         raise HTTPException(
@@ -377,44 +394,26 @@ async def send_follow_up_message(
 @router.post("/send/custom-message", response_model=MessageSentResponse)
 async def send_custom_message(
     request: SendCustomMessageRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session),
+    idempotency_key: Optional[str] = Header(default=None, max_length=100)
 ):
     """Send custom message"""
     try:
-        result = await whatsapp_service.send_message(
+        message = OutboundMessage(
             to_phone=request.recipient_phone,
-            message_body=request.message_body
-        )
-
-        db_message = WhatsAppMessage(
+            body=request.message_body,
+            message_type=MessageType.CUSTOM,
             patient_id=request.patient_id,
-            recipient_phone=request.recipient_phone,
             recipient_name=request.recipient_name,
-            message_type=MessageType.CUSTOM,
-            message_body=request.message_body,
-            twilio_sid=result.get("twilio_sid"),
-            status=MessageStatus.SENT if result["success"] else MessageStatus.FAILED,
-            error_message=result.get("error"),
-            sent_at=datetime.utcnow() if result["success"] else None,
             created_by_id=request.nutritionist_id
         )
-
-        session.add(db_message)
-        session.commit()
-        session.refresh(db_message)
+        response = await _send_single(message, session, idempotency_key)
 
         logger.info(f"Custom message sent to {request.recipient_phone}")
+        return response
 
-        return MessageSentResponse(
-            success=result["success"],
-            message_id=db_message.id,
-            twilio_sid=result.get("twilio_sid"),
-            status=result["status"],
-            sent_at=result.get("sent_at"),
-            error=result.get("error"),
-            note=result.get("note")
-        )
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending custom message: {e}")
         raise HTTPException(
@@ -423,16 +422,85 @@ async def send_custom_message(
         )
 
 
+# Only ``{name}`` placeholders are recognised; anything else is sent as written
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def render_bulk_message(template: str, variables: Dict[str, str]) -> str:
+    """
+    Fill ``{name}`` placeholders of a bulk message from ``variables``
+
+    Unknown placeholders and any other braces are left untouched, so user
+    text such as "50% {promo" or "{0}" can never fail or reach attribute
+    lookups the way ``str.format`` would.
+    """
+    return _PLACEHOLDER.sub(lambda m: variables.get(m.group(1), m.group(0)), template)
+
+
+@router.post("/send/bulk", response_model=BulkMessageQueuedResponse, status_code=status.HTTP_202_ACCEPTED)
+async def send_bulk_message(request: SendBulkMessageRequest):
+    """
+    Queue a bulk send (campaign) for background delivery
+
+    Messages go through the outbound queue, which applies Twilio rate limits,
+    retries transient errors with exponential backoff and persists results in
+    batches. Poll ``/campaigns/{campaign_id}`` for progress.
+    """
+    messages = []
+    for recipient in request.recipients:
+        variables = {**recipient.variables, "patient_name": recipient.patient_name}
+        body = render_bulk_message(request.message_body, variables)
+        key = f"{request.campaign_key}:{recipient.patient_phone}" if request.campaign_key else None
+        message = OutboundMessage(
+            to_phone=recipient.patient_phone,
+            body=body,
+            message_type=request.message_type,
+            patient_id=recipient.patient_id,
+            recipient_name=recipient.patient_name,
+            created_by_id=request.nutritionist_id,
+        )
+        if key:
+            message.idempotency_key = key
+        messages.append(message)
+
+    progress = await get_outbound_queue().enqueue_campaign(messages)
+    logger.info(f"Queued WhatsApp campaign {progress.campaign_id} with {progress.total} recipients")
+
+    return BulkMessageQueuedResponse(
+        campaign_id=progress.campaign_id,
+        total_recipients=progress.total,
+        status="queued"
+    )
+
+
+@router.get("/campaigns/{campaign_id}")
+async def get_campaign_progress(campaign_id: str):
+    """Delivery progress and throughput of a bulk send"""
+    progress = get_outbound_queue().campaign_progress(campaign_id)
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Campaign {campaign_id} not found"
+        )
+    return progress
+
+
+@router.get("/queue/metrics")
+async def get_queue_metrics():
+    """Outbound queue depth, outcome counters and throughput"""
+    return get_outbound_queue().metrics()
+
+
 @router.get("/messages/patient/{patient_id}", response_model=MessageListResponse)
 async def get_patient_messages(
     patient_id: int,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get all messages for a patient"""
     # Verify patient exists
-    patient = session.get(Patient, patient_id)
+    patient = await session.get(Patient, patient_id)
     if not patient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -441,7 +509,7 @@ async def get_patient_messages(
 
     # Get total count
     count_query = select(func.count()).select_from(WhatsAppMessage).where(WhatsAppMessage.patient_id == patient_id)
-    total = session.exec(count_query).one()
+    total = (await session.exec(count_query)).one()
 
     # Get messages with pagination
     offset = (page - 1) * page_size
@@ -453,7 +521,7 @@ async def get_patient_messages(
         .limit(page_size)
     )
 
-    messages = session.exec(query).all()
+    messages = (await session.exec(query)).all()
 
     total_pages = (total + page_size - 1) // page_size
 
@@ -469,10 +537,10 @@ async def get_patient_messages(
 @router.get("/messages/{message_id}", response_model=WhatsAppMessageResponse)
 async def get_message(
     message_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get specific message"""
-    message = session.get(WhatsAppMessage, message_id)
+    message = await session.get(WhatsAppMessage, message_id)
     if not message:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -489,7 +557,7 @@ async def get_message(
 async def create_template(
     template: WhatsAppTemplateCreate,
     nutritionist_id: int = 1,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Create WhatsApp message template"""
     try:
@@ -499,8 +567,8 @@ async def create_template(
         )
 
         session.add(db_template)
-        session.commit()
-        session.refresh(db_template)
+        await session.commit()
+        await session.refresh(db_template)
 
         logger.info(f"Created WhatsApp template: {db_template.name}")
         return db_template
@@ -517,7 +585,7 @@ async def create_template(
 async def get_templates(
     message_type: Optional[MessageType] = None,
     is_active: Optional[bool] = None,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get all message templates"""
     query = select(WhatsAppTemplate)
@@ -528,7 +596,7 @@ async def get_templates(
         query = query.where(WhatsAppTemplate.is_active == is_active)
 
     query = query.order_by(WhatsAppTemplate.name)
-    templates = session.exec(query).all()
+    templates = (await session.exec(query)).all()
 
     return templates
 
@@ -536,10 +604,10 @@ async def get_templates(
 @router.get("/templates/{template_id}", response_model=WhatsAppTemplateResponse)
 async def get_template(
     template_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get specific template"""
-    template = session.get(WhatsAppTemplate, template_id)
+    template = await session.get(WhatsAppTemplate, template_id)
     if not template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -552,10 +620,10 @@ async def get_template(
 async def update_template(
     template_id: int,
     template_update: WhatsAppTemplateUpdate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Update template"""
-    db_template = session.get(WhatsAppTemplate, template_id)
+    db_template = await session.get(WhatsAppTemplate, template_id)
     if not db_template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -567,8 +635,8 @@ async def update_template(
         setattr(db_template, field, value)
 
     session.add(db_template)
-    session.commit()
-    session.refresh(db_template)
+    await session.commit()
+    await session.refresh(db_template)
 
     logger.info(f"Updated WhatsApp template {template_id}")
     return db_template
@@ -577,18 +645,18 @@ async def update_template(
 @router.delete("/templates/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_template(
     template_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Delete template"""
-    db_template = session.get(WhatsAppTemplate, template_id)
+    db_template = await session.get(WhatsAppTemplate, template_id)
     if not db_template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Template with id {template_id} not found"
         )
 
-    session.delete(db_template)
-    session.commit()
+    await session.delete(db_template)
+    await session.commit()
 
     logger.info(f"Deleted WhatsApp template {template_id}")
     return None
@@ -13,6 +13,8 @@ class Settings(BaseSettings):
     # Environment
     environment: str = Field(default="development", env="ENVIRONMENT")
     debug: bool = Field(default=False, env="DEBUG")
+    # Grupos de routers de este proceso: all, core, clinical, ai, scanner, admin (core.deployment)
+    app_profile: str = Field(default="all", env="APP_PROFILE")
 
     # API Configuration
     api_title: str = "Nutrition Intelligence API"
@@ -23,6 +25,22 @@ class Settings(BaseSettings):
     # Database
     database_url: str = Field(env="DATABASE_URL")
     database_echo: bool = Field(default=False, env="DATABASE_ECHO")
+    # Réplica de solo lectura para dependencias de lectura (get_read_session); vacío = primaria
+    database_read_url: Optional[str] = Field(default=None, env="DATABASE_READ_URL")
+
+    # Connection pool (por proceso y por engine; ver core.database)
+    db_pool_size: int = Field(default=10, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, env="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=10.0, env="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=1800, env="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(default=False, env="DB_POOL_PRE_PING")
+    db_statement_cache_size: int = Field(default=500, env="DB_STATEMENT_CACHE_SIZE")  # 0 detrás de PgBouncer
+    db_command_timeout: float = Field(default=30.0, env="DB_COMMAND_TIMEOUT")
+
+    # Consultas SQL por request (core.query_stats): presupuesto (0 = sin límite), 500 en modo estricto
+    db_query_budget: int = Field(default=50, env="DB_QUERY_BUDGET")
+    db_query_budget_strict: bool = Field(default=False, env="DB_QUERY_BUDGET_STRICT")
+    db_repeated_query_threshold: int = Field(default=5, env="DB_REPEATED_QUERY_THRESHOLD")
     
     # Redis
     redis_url: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
@@ -43,6 +61,27 @@ class Settings(BaseSettings):
     gemini_api_key: Optional[str] = Field(default=None, env="GEMINI_API_KEY")
     anthropic_api_key: Optional[str] = Field(default=None, env="ANTHROPIC_API_KEY")
     default_ai_model: str = Field(default="gemini-pro", env="DEFAULT_AI_MODEL")
+
+    # RAG
+    rag_index_path: str = Field(default="data/rag_index", env="RAG_INDEX_PATH")
+
+    # Chat response cache (anonymous, context-free prompts)
+    chat_cache_enabled: bool = Field(default=True, env="CHAT_CACHE_ENABLED")
+    chat_cache_ttl_seconds: int = Field(default=86400, env="CHAT_CACHE_TTL_SECONDS")
+    chat_cache_max_entries: int = Field(default=2048, env="CHAT_CACHE_MAX_ENTRIES")
+    chat_cache_redis_enabled: bool = Field(default=True, env="CHAT_CACHE_REDIS_ENABLED")
+
+    # Scanner barcode product cache
+    product_cache_max_entries: int = Field(default=20000, env="PRODUCT_CACHE_MAX_ENTRIES")
+    product_cache_local_ttl_seconds: int = Field(default=300, env="PRODUCT_CACHE_LOCAL_TTL_SECONDS")
+    product_cache_redis_ttl_seconds: int = Field(default=86400, env="PRODUCT_CACHE_REDIS_TTL_SECONDS")
+    product_cache_redis_enabled: bool = Field(default=True, env="PRODUCT_CACHE_REDIS_ENABLED")
+    barcode_catalog_path: str = Field(default="data/barcode_catalog.bin", env="BARCODE_CATALOG_PATH")
+
+    # Scanner scan-event buffer (batched history inserts)
+    scan_buffer_batch_size: int = Field(default=200, env="SCAN_BUFFER_BATCH_SIZE")
+    scan_buffer_flush_ms: int = Field(default=500, env="SCAN_BUFFER_FLUSH_MS")
+    scan_buffer_max_pending: int = Field(default=50000, env="SCAN_BUFFER_MAX_PENDING")
     
     # Rate Limiting
     rate_limit_requests: int = Field(default=100, env="RATE_LIMIT_REQUESTS")
@@ -58,6 +97,27 @@ class Settings(BaseSettings):
     smtp_username: Optional[str] = Field(default=None, env="SMTP_USERNAME")
     smtp_password: Optional[str] = Field(default=None, env="SMTP_PASSWORD")
     
+    # WhatsApp outbound queue (Twilio limits)
+    whatsapp_global_rate_per_second: float = Field(default=80.0, env="WHATSAPP_GLOBAL_RATE_PER_SECOND")
+    whatsapp_per_number_rate_per_second: float = Field(default=1.0, env="WHATSAPP_PER_NUMBER_RATE_PER_SECOND")
+    whatsapp_queue_workers: int = Field(default=16, env="WHATSAPP_QUEUE_WORKERS")
+    whatsapp_max_attempts: int = Field(default=5, env="WHATSAPP_MAX_ATTEMPTS")
+
+    # Write-behind view counters
+    view_counter_flush_seconds: float = Field(default=5.0, env="VIEW_COUNTER_FLUSH_SECONDS")
+    view_counter_redis_enabled: bool = Field(default=False, env="VIEW_COUNTER_REDIS_ENABLED")
+
+    # WhatsApp inbound webhook ingestion
+    whatsapp_inbound_batch_size: int = Field(default=200, env="WHATSAPP_INBOUND_BATCH_SIZE")
+    whatsapp_inbound_flush_ms: int = Field(default=250, env="WHATSAPP_INBOUND_FLUSH_MS")
+    whatsapp_inbound_max_pending: int = Field(default=10000, env="WHATSAPP_INBOUND_MAX_PENDING")
+
+    # Clinical file uploads and background OCR
+    clinical_upload_max_mb: int = Field(default=25, env="CLINICAL_UPLOAD_MAX_MB")
+    ocr_process_workers: int = Field(default=2, env="OCR_PROCESS_WORKERS")  # 0 = thread pool
+    ocr_pages_per_task: int = Field(default=4, env="OCR_PAGES_PER_TASK")
+    ocr_max_concurrent_jobs: int = Field(default=2, env="OCR_MAX_CONCURRENT_JOBS")
+
     # Monitoring
     sentry_dsn: Optional[str] = Field(default=None, env="SENTRY_DSN")
     otel_exporter_endpoint: Optional[str] = Field(default=None, env="OTEL_EXPORTER_ENDPOINT")
@@ -0,0 +1,288 @@
+"""
+Write-Behind Counters
+=====================
+
+Contadores de vistas con escritura diferida.
+
+Los endpoints de detalle solo incrementan un contador en memoria (o en Redis
+si se comparte entre workers); una tarea en segundo plano aplica los
+incrementos acumulados a la base de datos cada pocos segundos con un único
+UPDATE por lote. Así un GET no abre una transacción de escritura ni compite
+por el bloqueo de la fila de una receta popular.
+
+Lectura de lo escrito: el valor mostrado es ``columna en BD + pendientes``.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import Table, bindparam, update
+
+logger = logging.getLogger(__name__)
+
+
+class ShardedCounter:
+    """Mapa ``id -> incremento`` repartido en shards con su propio lock"""
+
+    def __init__(self, shards: int = 16):
+        self._shards: List[Dict[int, int]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard(self, key: int) -> int:
+        return hash(key) % len(self._shards)
+
+    def add(self, key: int, amount: int = 1) -> int:
+        index = self._shard(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            shard[key] = shard.get(key, 0) + amount
+            return shard[key]
+
+    def get(self, key: int) -> int:
+        index = self._shard(key)
+        with self._locks[index]:
+            return self._shards[index].get(key, 0)
+
+    def merge(self, values: Dict[int, int]) -> None:
+        for key, amount in values.items():
+            self.add(key, amount)
+
+    def drain(self) -> Dict[int, int]:
+        """Vaciar todos los shards y devolver los incrementos acumulados"""
+        drained: Dict[int, int] = {}
+        for index, lock in enumerate(self._locks):
+            with lock:
+                shard, self._shards[index] = self._shards[index], {}
+            drained.update(shard)
+        return drained
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class WriteBehindCounter:
+    """
+    Contador diferido para una columna entera de una tabla
+
+    Args:
+        name: Nombre del contador (clave en Redis y en métricas)
+        table: Tabla SQLAlchemy con columna ``id``
+        column: Columna a incrementar
+        shards: Número de shards en memoria
+        flush_interval: Segundos entre escrituras a la base de datos
+        use_redis: Acumular en un hash de Redis compartido entre workers
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table: Table,
+        column: str = "view_count",
+        shards: int = 16,
+        flush_interval: float = 5.0,
+        use_redis: bool = False,
+    ):
+        self.name = name
+        self.table = table
+        self.column = column
+        self.flush_interval = flush_interval
+        self.use_redis = use_redis
+
+        self._local = ShardedCounter(shards)
+        self._inflight: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._redis_disabled_until = 0.0
+        self._stats = {"increments": 0, "flushes": 0, "rows_flushed": 0, "flush_errors": 0, "redis_errors": 0}
+
+        col = table.c[column]
+        self._statement = (
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values({column: col + bindparam("amount")})
+        )
+
+    @property
+    def redis_key(self) -> str:
+        return f"counters:{self.name}"
+
+    # ------------------------------------------------------------------
+    # Incrementos y lecturas
+    # ------------------------------------------------------------------
+
+    async def incr(self, row_id: int, amount: int = 1) -> int:
+        """Registrar ``amount`` vistas y devolver el total pendiente del id"""
+        self._stats["increments"] += 1
+        self.start()
+        if self._redis_available():
+            try:
+                redis = await self._redis()
+                pending = await redis.hincrby(self.redis_key, row_id, amount)
+                return int(pending) + self._local.get(row_id) + self._inflight.get(row_id, 0)
+            except Exception as e:
+                self._redis_failed(e)
+        self._local.add(row_id, amount)
+        return await self.pending(row_id)
+
+    async def pending(self, row_id: int) -> int:
+        """Incrementos aún no escritos en la base de datos"""
+        total = self._local.get(row_id) + self._inflight.get(row_id, 0)
+        if self._redis_available():
+            try:
+                redis = await self._redis()
+                total += int(await redis.hget(self.redis_key, row_id) or 0)
+            except Exception as e:
+                self._redis_failed(e)
+        return total
+
+    # ------------------------------------------------------------------
+    # Escritura a la base de datos
+    # ------------------------------------------------------------------
+
+    async def _collect(self) -> Dict[int, int]:
+        batch = self._local.drain()
+        if self._redis_available():
+            try:
+                # HGETALL + DEL en un MULTI: la lectura y el reinicio son
+                # atómicos, así que cada incremento lo toma exactamente un
+                # flush (aunque varios workers vacíen a la vez) y un hash
+                # inexistente es simplemente un lote vacío
+                redis = await self._redis()
+                pipe = redis.pipeline(transaction=True)
+                pipe.hgetall(self.redis_key)
+                pipe.delete(self.redis_key)
+                pending, _ = await pipe.execute()
+                for key, value in pending.items():
+                    row_id = int(key)
+                    batch[row_id] = batch.get(row_id, 0) + int(value)
+            except Exception as e:
+                self._redis_failed(e)
+        return batch
+
+    async def flush(self) -> int:
+        """Aplicar los incrementos acumulados; devuelve las filas actualizadas"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch = await self._collect()
+            if not batch:
+                return 0
+            self._inflight = batch
+            # Orden por id: workers concurrentes bloquean filas en el mismo orden
+            params = [{"row_id": row_id, "amount": amount} for row_id, amount in sorted(batch.items())]
+            try:
+                await self._execute(params)
+                self._stats["flushes"] += 1
+                self._stats["rows_flushed"] += len(params)
+                return len(params)
+            except Exception as e:
+                self._stats["flush_errors"] += 1
+                self._local.merge(batch)
+                logger.error(f"Failed to flush {self.name} counters ({len(params)} rows): {e}")
+                return 0
+            except BaseException:
+                # Cancelado a mitad de la escritura: la transacción no se
+                # confirma, el lote vuelve a memoria para el siguiente flush
+                self._local.merge(batch)
+                raise
+            finally:
+                self._inflight = {}
+
+    async def _execute(self, params: List[Dict[str, int]]) -> None:
+        import core.database as database
+
+        if database.async_engine is None:
+            database.init_database()
+        async with database.async_engine.begin() as conn:
+            await conn.execute(self._statement, params)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Iniciar la tarea de flush periódico (idempotente)"""
+        if self._task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._stopping = asyncio.Event()
+        self._task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    async def stop(self) -> None:
+        """
+        Detener el flush periódico y escribir lo pendiente
+
+        La tarea no se cancela: se le avisa y se espera a que termine el
+        flush en curso, para no perder el lote que está escribiendo.
+        """
+        if self._task is not None:
+            self._stopping.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._stopping = None
+        await self.flush()
+
+    # ------------------------------------------------------------------
+    # Redis
+    # ------------------------------------------------------------------
+
+    async def _redis(self):
+        from core.cache import get_cache
+        return await get_cache().get_redis()
+
+    def _redis_available(self) -> bool:
+        return self.use_redis and time.monotonic() >= self._redis_disabled_until
+
+    def _redis_failed(self, error: Exception) -> None:
+        self._stats["redis_errors"] += 1
+        self._redis_disabled_until = time.monotonic() + 60
+        logger.warning(f"Counter {self.name}: Redis unavailable, using in-process shards: {error}")
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        stats["pending_rows"] = len(self._local)
+        return stats
+
+
+_counters: Dict[str, WriteBehindCounter] = {}
+
+
+def get_view_counter(name: str) -> WriteBehindCounter:
+    """
+    Contador de vistas registrado por nombre
+
+    Nombres disponibles: ``recipes``, ``medicinal_plants``
+    """
+    if name not in _counters:
+        from core.config import get_settings
+        from domain.recipes.models import Recipe
+        from domain.medicinal_plants.models import MedicinalPlant
+
+        tables = {"recipes": Recipe.__table__, "medicinal_plants": MedicinalPlant.__table__}
+        settings = get_settings()
+        _counters[name] = WriteBehindCounter(
+            name=name,
+            table=tables[name],
+            flush_interval=settings.view_counter_flush_seconds,
+            use_redis=settings.view_counter_redis_enabled,
+        )
+    return _counters[name]
+
+
+async def flush_all_counters() -> None:
+    """Detener y vaciar todos los contadores (apagado de la aplicación)"""
+    for counter in list(_counters.values()):
+        await counter.stop()
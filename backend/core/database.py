@@ -1,62 +1,188 @@
 """
 Database configuration and session management
+
+Engines are built with explicit pool settings (``DB_POOL_*`` in core.config)
+instead of the driver defaults:
+
+- ``pool_size`` / ``max_overflow`` / ``pool_timeout`` bound the connections a
+  worker may hold and how long a request waits for one; size them so that
+  ``workers * (pool_size + max_overflow)`` fits under Postgres
+  ``max_connections``
+- no pre-ping by default: it costs a round trip on every checkout. Stale
+  connections are retired by ``pool_recycle`` and, if the server drops one,
+  SQLAlchemy invalidates the pool on the disconnect error
+- asyncpg prepared statements are cached per connection
+  (``DB_STATEMENT_CACHE_SIZE``; set 0 behind PgBouncer in transaction mode)
+- ``DATABASE_READ_URL`` routes read-only dependencies (``get_read_session``)
+  to a replica; without it they use the primary
+
+``pool_metrics()`` reports checkouts and saturation per engine for /metrics;
+every engine also feeds the per-request query counts of core.query_stats.
 """
 from sqlmodel import SQLModel, create_engine, Session
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 import logging
 
 from core.config import get_settings
+from core.query_stats import instrument_engine
 
 logger = logging.getLogger(__name__)
 
 # Database engines
 engine = None
 async_engine = None
+async_read_engine = None
 SessionLocal = None
 AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+
+# engine name -> (engine, pool counters)
+_pools: Dict[str, Any] = {}
+
+
+def _sync_database_url(url: str) -> str:
+    # Force psycopg2 driver; default postgresql:// uses psycopg2 when available
+    sync_url = url.replace("postgresql+asyncpg://", "postgresql://")
+    if "postgresql://" not in sync_url:
+        sync_url = sync_url.replace("postgresql+psycopg2://", "postgresql://")
+    return sync_url
+
+
+def _async_database_url(url: str) -> str:
+    async_url = url.replace("postgresql://", "postgresql+asyncpg://")
+    if "postgresql+asyncpg://" not in async_url:
+        async_url = async_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
+    return async_url
+
+
+def engine_options(url: str, settings=None) -> Dict[str, Any]:
+    """Keyword arguments for ``create_engine`` / ``create_async_engine`` from settings"""
+    settings = settings or get_settings()
+    options: Dict[str, Any] = {
+        "echo": settings.database_echo,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        # SQLite & co. (tests, scripts) keep their dialect's default pool
+        return options
+
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        # Reuse the most recent connection: idle extras stay idle and get recycled
+        pool_use_lifo=True,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        connect_args: Dict[str, Any] = {
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "command_timeout": settings.db_command_timeout,
+            "server_settings": {"application_name": "nutrition-intelligence"},
+        }
+        if settings.db_statement_cache_size == 0:
+            # PgBouncer (transaction mode) cannot keep named statements
+            connect_args["statement_cache_size"] = 0
+        options["connect_args"] = connect_args
+    return options
+
+
+def _track_pool(name: str, sync_engine) -> None:
+    """Count connections and checkouts of an engine's pool for pool_metrics()"""
+    counters = {"connections_created": 0, "checkouts": 0, "invalidated": 0, "peak_checked_out": 0}
+    pool = sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        counters["connections_created"] += 1
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        if checked_out > counters["peak_checked_out"]:
+            counters["peak_checked_out"] = checked_out
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        counters["invalidated"] += 1
+
+    _pools[name] = (sync_engine, counters)
+    # Per-request query counting (X-DB-Queries / X-DB-Time)
+    instrument_engine(sync_engine)
+
+
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Pool usage per engine: current checkouts, overflow and saturation (0-1)"""
+    settings = get_settings()
+    metrics = {}
+    for name, (sync_engine, counters) in _pools.items():
+        pool = sync_engine.pool
+        stats: Dict[str, Any] = {"pool": type(pool).__name__, **counters}
+        if hasattr(pool, "checkedout"):
+            capacity = pool.size() + max(settings.db_max_overflow, 0)
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                capacity=capacity,
+                saturation=round(pool.checkedout() / capacity, 3) if capacity else None,
+            )
+        metrics[name] = stats
+    return metrics
+
 
 def init_database():
     """Initialize database engines and session factories"""
-    global engine, async_engine, SessionLocal, AsyncSessionLocal
-    
+    global engine, async_engine, async_read_engine
+    global SessionLocal, AsyncSessionLocal, AsyncReadSessionLocal
+
     settings = get_settings()
+    _pools.clear()
 
-    # Sync engine - force psycopg2 driver
-    sync_database_url = settings.database_url.replace("postgresql+asyncpg://", "postgresql://")
-    # Use default postgresql:// which uses psycopg2 when available
-    if "postgresql://" not in sync_database_url:
-        sync_database_url = sync_database_url.replace("postgresql+psycopg2://", "postgresql://")
-
-    engine = create_engine(
-        sync_database_url,
-        echo=settings.database_echo,
-        pool_pre_ping=True,
-        pool_recycle=300
-    )
+    # Sync engine (scripts, background jobs)
+    sync_database_url = _sync_database_url(settings.database_url)
+    engine = create_engine(sync_database_url, **engine_options(sync_database_url, settings))
+    _track_pool("sync", engine)
 
     # Async engine for API operations
-    async_database_url = settings.database_url.replace("postgresql://", "postgresql+asyncpg://")
-    if "postgresql+asyncpg://" not in async_database_url:
-        async_database_url = async_database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
-    async_engine = create_async_engine(
-        async_database_url,
-        echo=settings.database_echo,
-        pool_pre_ping=True,
-        pool_recycle=300
-    )
-    
+    async_database_url = _async_database_url(settings.database_url)
+    async_engine = create_async_engine(async_database_url, **engine_options(async_database_url, settings))
+    _track_pool("async", async_engine.sync_engine)
+
+    # Optional read replica for read-only dependencies
+    if settings.database_read_url:
+        read_database_url = _async_database_url(settings.database_read_url)
+        async_read_engine = create_async_engine(read_database_url, **engine_options(read_database_url, settings))
+        _track_pool("async_read", async_read_engine.sync_engine)
+    else:
+        async_read_engine = async_engine
+
     # Session factories
     SessionLocal = sessionmaker(engine, class_=Session, expire_on_commit=False)
     AsyncSessionLocal = sessionmaker(
-        async_engine, 
-        class_=AsyncSession, 
+        async_engine,
+        class_=AsyncSession,
+        expire_on_commit=False
+    )
+    AsyncReadSessionLocal = sessionmaker(
+        async_read_engine,
+        class_=AsyncSession,
         expire_on_commit=False
     )
-    
-    logger.info("Database engines initialized")
+
+    logger.info(
+        f"Database engines initialized (pool {settings.db_pool_size}+{settings.db_max_overflow}, "
+        f"read replica: {'yes' if settings.database_read_url else 'no'})"
+    )
 
 async def init_db():
     """Initialize database connection"""
@@ -66,11 +192,21 @@ async def init_db():
     # Not using SQLModel.metadata.create_all to avoid duplicate index issues
     logger.info("Database initialized")
 
+
+async def close_db():
+    """Dispose engine pools on shutdown"""
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+
 def get_session() -> Session:
-    """Get synchronous database session"""
+    """Get synchronous database session (scripts and background jobs; not for async handlers)"""
     if not SessionLocal:
         init_database()
-    
+
     with SessionLocal() as session:
         yield session
 
@@ -78,18 +214,48 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """Get asynchronous database session"""
     if not AsyncSessionLocal:
         init_database()
-    
+
     async with AsyncSessionLocal() as session:
         yield session
 
 get_db = get_async_session
 
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Get asynchronous session for read-only handlers
+
+    Uses the replica when ``DATABASE_READ_URL`` is set (data may lag the
+    primary slightly); never write through it.
+    """
+    if not AsyncReadSessionLocal:
+        init_database()
+
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session_scope():
+    """
+    Read-only session outside of a request dependency
+
+    For streaming responses, whose body is produced after the handler's
+    dependencies have been torn down.
+    """
+    if not AsyncReadSessionLocal:
+        init_database()
+
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
 @asynccontextmanager
 async def get_db_transaction():
     """Get database session with transaction management"""
     if not AsyncSessionLocal:
         init_database()
-    
+
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -98,4 +264,4 @@ async def get_db_transaction():
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
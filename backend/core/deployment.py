@@ -0,0 +1,105 @@
+"""
+Deployment Profiles
+===================
+
+Un mismo código, varios tipos de proceso: ``APP_PROFILE`` elige qué grupos de
+routers monta ``create_application`` (y qué servicios de fondo arranca), para
+que el trabajo pesado de escáner, visión u OCR no comparta el event loop con
+auth, alimentos o notificaciones y cada pool escale por separado.
+
+Grupos:
+
+- ``core``: auth, usuarios, alimentos, recetas, notificaciones, WhatsApp y
+  los módulos de bienestar
+- ``clinical``: pacientes, planes, laboratorio (OCR) y progreso
+- ``ai``: visión, chat del nutriólogo y RAG
+- ``scanner``: escáner NOM-051
+- ``admin``: administración
+
+``APP_PROFILE`` acepta un grupo, varios separados por coma (``core,admin``) o
+``all`` (por defecto, todo en un proceso). ``/health`` y ``/metrics`` existen
+en todos los perfiles.
+"""
+import importlib
+import logging
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PROFILE_GROUPS = ("core", "clinical", "ai", "scanner", "admin")
+ALL_PROFILES = "all"
+
+# Métricas de cada grupo: nombre -> "módulo:función que devuelve el singleton".
+# Solo se importan las de los grupos montados en el proceso.
+METRIC_SOURCES: Dict[str, Dict[str, str]] = {
+    "core": {
+        "whatsapp_inbound": "services.whatsapp.inbound:get_inbound_ingestor",
+        "whatsapp_outbound": "services.whatsapp.outbound_queue:get_outbound_queue",
+    },
+    "clinical": {
+        "ocr_pipeline": "services.laboratory.ocr_pipeline:get_ocr_pipeline",
+        "lab_series_cache": "services.laboratory.lab_series:get_lab_series_cache",
+    },
+    "ai": {
+        "chat_response_cache": "services.ai.response_cache:get_chat_response_cache",
+    },
+    "scanner": {
+        "product_cache": "services.nom051.product_cache:get_product_cache",
+        "scan_buffer": "services.nom051.scan_buffer:get_scan_buffer",
+    },
+    "admin": {},
+}
+
+
+def resolve_profiles(value: Optional[Union[str, Iterable[str]]]) -> FrozenSet[str]:
+    """
+    Grupos activos a partir de ``APP_PROFILE``
+
+    Raises:
+        ValueError: si algún grupo no existe (mejor fallar al arrancar que
+            servir un proceso sin rutas)
+    """
+    if value is None:
+        value = ALL_PROFILES
+    if isinstance(value, str):
+        value = value.split(",")
+    names = {name.strip().lower() for name in value if name and name.strip()}
+    if not names or ALL_PROFILES in names:
+        return frozenset(PROFILE_GROUPS)
+    unknown = names - set(PROFILE_GROUPS)
+    if unknown:
+        raise ValueError(
+            f"Unknown APP_PROFILE group(s): {', '.join(sorted(unknown))}; "
+            f"expected {', '.join(PROFILE_GROUPS)} or '{ALL_PROFILES}'"
+        )
+    return frozenset(names)
+
+
+def profile_label(profiles: Iterable[str]) -> str:
+    """Nombre del perfil para logs y ``/health`` (``all`` si están todos)"""
+    profiles = set(profiles)
+    if profiles == set(PROFILE_GROUPS):
+        return ALL_PROFILES
+    return ",".join(group for group in PROFILE_GROUPS if group in profiles)
+
+
+def _load_source(path: str) -> Callable[[], Any]:
+    module_name, attribute = path.split(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def collect_metrics(profiles: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Métricas de los componentes de los grupos activos (``metrics()`` o ``stats()``)"""
+    collected: Dict[str, Dict[str, Any]] = {}
+    for group in PROFILE_GROUPS:
+        if group not in profiles:
+            continue
+        for name, path in METRIC_SOURCES[group].items():
+            try:
+                component = _load_source(path)()
+                read = getattr(component, "metrics", None) or component.stats
+                collected[name] = read()
+            except Exception as e:
+                logger.warning(f"Could not collect metrics for '{name}': {e}")
+                collected[name] = {"error": str(e)}
+    return collected
@@ -0,0 +1,73 @@
+"""
+Invalidación por escrituras confirmadas
+=======================================
+
+Las cachés en memoria de cada proceso (índices de equivalencias, facetas de
+plantas, series de laboratorio, teléfonos de WhatsApp) se invalidan cuando
+se confirma una escritura ORM de sus modelos.
+
+Los valores se capturan al hacer flush (tras el commit las instancias están
+expiradas y en sesiones async no se pueden recargar desde un evento), se
+acumulan en ``session.info`` y se aplican una sola vez tras el commit; un
+rollback los descarta.
+
+Solo se ven las escrituras de este proceso: las de otros workers llegan
+cuando cada caché se recarga por su cuenta (p. ej. al expirar su
+``max_age``).
+"""
+import itertools
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession, object_session
+
+WRITE_EVENTS = ("after_insert", "after_update", "after_delete")
+
+_keys = itertools.count()
+
+
+def on_committed_writes(
+    models: Iterable[type],
+    callback: Callable[[List[Any]], None],
+    collect: Optional[Callable[[Any, str], Iterable[Any]]] = None,
+    events: Sequence[str] = WRITE_EVENTS,
+) -> None:
+    """
+    Llamar ``callback`` tras confirmar una escritura de ``models``
+
+    Args:
+        models: Clases mapeadas a observar
+        callback: Recibe los valores de ``collect`` de todas las escrituras
+            de la transacción, en orden (lista vacía si no hay ``collect``)
+        collect: ``collect(target, event_name)`` devuelve los valores a
+            guardar de cada escritura, p. ej. ids de paciente
+        events: Eventos de mapper que cuentan como escritura
+
+    Una escritura sin sesión (``connection.execute`` sobre el mapper) llama
+    a ``callback`` de inmediato.
+    """
+    key = f"committed_writes_{next(_keys)}"
+
+    def on_write(event_name: str):
+        def listener(mapper, connection, target) -> None:
+            values = list(collect(target, event_name)) if collect else []
+            session = object_session(target)
+            if session is None:
+                callback(values)
+            else:
+                session.info.setdefault(key, []).extend(values)
+        return listener
+
+    def on_commit(session) -> None:
+        values = session.info.pop(key, None)
+        if values is not None:
+            callback(values)
+
+    def on_rollback(session, previous_transaction) -> None:
+        session.info.pop(key, None)
+
+    for model in models:
+        for event_name in events:
+            event.listen(model, event_name, on_write(event_name))
+    event.listen(OrmSession, "after_commit", on_commit)
+    event.listen(OrmSession, "after_soft_rollback", on_rollback)
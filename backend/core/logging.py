@@ -1,6 +1,6 @@
 """
 Comprehensive Logging System for Nutrition Intelligence Platform
-Provides structured logging with rotation, JSON formatting, and middleware
+Provides structured logging with rotation and JSON formatting
 """
 import logging
 import json
@@ -10,10 +10,6 @@ from datetime import datetime
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Dict, Any, Optional
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-import time
 import traceback
 
 
@@ -299,88 +295,6 @@ def log_error(
         )
 
 
-# ============================================================================
-# FASTAPI LOGGING MIDDLEWARE
-# ============================================================================
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """
-    FastAPI middleware for request/response logging
-    Logs all HTTP requests with timing, status codes, and context
-    """
-
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.access_logger = logging.getLogger("nutrition_intelligence.access")
-
-    async def dispatch(self, request: Request, call_next):
-        """
-        Process request and log details
-
-        Args:
-            request: FastAPI request object
-            call_next: Next middleware in chain
-
-        Returns:
-            Response object
-        """
-        # Generate request ID if not present
-        request_id = getattr(request.state, "request_id", None)
-        if not request_id:
-            import uuid
-            request_id = str(uuid.uuid4())
-            request.state.request_id = request_id
-
-        # Extract request details
-        method = request.method
-        url = str(request.url)
-        endpoint = request.url.path
-        client_host = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get("user-agent", "unknown")
-
-        # Start timer
-        start_time = time.time()
-
-        # Process request
-        try:
-            response = await call_next(request)
-            status_code = response.status_code
-            error = None
-        except Exception as e:
-            status_code = 500
-            error = e
-            raise
-        finally:
-            # Calculate duration
-            duration_ms = round((time.time() - start_time) * 1000, 2)
-
-            # Extract user info if available
-            user_id = None
-            if hasattr(request.state, "user"):
-                user_id = getattr(request.state.user, "id", None)
-
-            # Log access
-            log_level = logging.INFO if status_code < 400 else logging.ERROR
-
-            self.access_logger.log(
-                log_level,
-                f"{method} {endpoint} - {status_code}",
-                extra={
-                    "request_id": request_id,
-                    "method": method,
-                    "endpoint": endpoint,
-                    "url": url,
-                    "status_code": status_code,
-                    "duration_ms": duration_ms,
-                    "client_host": client_host,
-                    "user_agent": user_agent,
-                    "user_id": user_id,
-                }
-            )
-
-        return response
-
-
 # ============================================================================
 # EXPORTS
 # ============================================================================
@@ -392,6 +306,5 @@ __all__ = [
     "log_success",
     "log_warning",
     "log_error",
-    "LoggingMiddleware",
     "JSONFormatter",
 ]
@@ -15,7 +15,6 @@ from .nutrition_logger import (
 )
 
 from .middleware import (
-    LoggingMiddleware,
     LoggingContext,
     log_operation
 )
@@ -41,8 +40,7 @@ __all__ = [
     "log_meal_plan_assignment",
     "log_equivalences_tracking",
 
-    # Middleware y herramientas
-    "LoggingMiddleware",
+    # Herramientas
     "LoggingContext",
     "log_operation"
 ]
\ No newline at end of file
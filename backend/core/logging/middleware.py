@@ -1,230 +1,12 @@
 """
-Middleware de Logging Automático para FastAPI
-Captura automáticamente todas las requests y responses
+Herramientas de logging de operaciones para FastAPI
+El logging automático de requests vive en middleware.instrumentation
 """
 import time
 import uuid
-from typing import Callable, Dict, Any, Optional
-import json
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
-import traceback
+from typing import Dict, Any, Optional
 
-from .nutrition_logger import nutrition_logger, LogLevel
-
-class LoggingMiddleware:
-    """Middleware para captura automática de logs de requests"""
-    
-    def __init__(self, app):
-        self.app = app
-    
-    async def __call__(self, scope, receive, send):
-        if scope["type"] == "http":
-            request = Request(scope, receive)
-            
-            # Generar ID único para la request
-            request_id = f"req_{uuid.uuid4().hex[:8]}"
-            request.state.request_id = request_id
-            
-            # Capturar información de la request
-            start_time = time.time()
-            client_ip = request.client.host if request.client else "unknown"
-            user_agent = request.headers.get("user-agent", "")
-            
-            # Extraer user_id del token si está disponible
-            user_id = await self._extract_user_id(request)
-            
-            try:
-                # Procesar request
-                async def send_wrapper(message):
-                    if message["type"] == "http.response.start":
-                        # Calcular tiempo de respuesta
-                        response_time_ms = int((time.time() - start_time) * 1000)
-                        status_code = message["status"]
-                        
-                        # Determinar si es success o error
-                        is_success = 200 <= status_code < 400
-                        status = LogLevel.SUCCESS if is_success else LogLevel.ERROR
-                        
-                        # Construir mensaje
-                        endpoint = request.url.path
-                        method = request.method
-                        
-                        if is_success:
-                            message_text = f"{method} {endpoint} - {status_code}"
-                        else:
-                            message_text = f"Error en {method} {endpoint} - Status {status_code}"
-                        
-                        # Metadatos técnicos
-                        metadata = {
-                            "ip": client_ip,
-                            "user_agent": user_agent,
-                            "content_type": request.headers.get("content-type", ""),
-                            "query_params": dict(request.query_params) if request.query_params else None
-                        }
-                        
-                        # Contexto de negocio basado en endpoint
-                        business_context = await self._extract_business_context(request, status_code)
-                        
-                        # Log automático
-                        nutrition_logger.log_request(
-                            status=status,
-                            message=message_text,
-                            request_id=request_id,
-                            endpoint=endpoint,
-                            method=method,
-                            user_id=user_id,
-                            response_time_ms=response_time_ms,
-                            status_code=status_code,
-                            metadata=metadata,
-                            business_context=business_context
-                        )
-                    
-                    await send(message)
-                
-                await self.app(scope, receive, send_wrapper)
-                
-            except Exception as e:
-                # Log de error de la aplicación
-                response_time_ms = int((time.time() - start_time) * 1000)
-                error_type = type(e).__name__
-                
-                nutrition_logger.log_error(
-                    message=f"Excepción no manejada en {request.method} {request.url.path}: {str(e)}",
-                    request_id=request_id,
-                    endpoint=request.url.path,
-                    method=request.method,
-                    user_id=user_id,
-                    response_time_ms=response_time_ms,
-                    status_code=500,
-                    metadata={
-                        "ip": client_ip,
-                        "user_agent": user_agent,
-                        "error_type": error_type,
-                        "traceback": traceback.format_exc()
-                    }
-                )
-                
-                # Re-raise la excepción para que FastAPI la maneje
-                raise
-        else:
-            # Para websockets u otros tipos, pasar sin procesamiento
-            await self.app(scope, receive, send)
-    
-    async def _extract_user_id(self, request: Request) -> Optional[str]:
-        """Extraer user ID del token de autorización"""
-        try:
-            auth_header = request.headers.get("authorization")
-            if auth_header and auth_header.startswith("Bearer "):
-                # Aquí podrías decodificar el JWT para extraer el user_id
-                # Por simplicidad, usamos el request state si está disponible
-                return getattr(request.state, 'current_user_id', None)
-            return None
-        except Exception:
-            return None
-    
-    async def _extract_business_context(self, request: Request, status_code: int) -> Dict[str, Any]:
-        """Extraer contexto de negocio basado en el endpoint"""
-        context = {}
-        path = request.url.path
-        
-        try:
-            # Extraer IDs de la URL
-            path_parts = path.split('/')
-            
-            # Detectar patrones comunes
-            if '/patients/' in path:
-                for i, part in enumerate(path_parts):
-                    if part == 'patients' and i + 1 < len(path_parts):
-                        if path_parts[i + 1].isdigit():
-                            context['patient_id'] = int(path_parts[i + 1])
-                        break
-            
-            if '/recipes/' in path:
-                for i, part in enumerate(path_parts):
-                    if part == 'recipes' and i + 1 < len(path_parts):
-                        if path_parts[i + 1].isdigit():
-                            context['recipe_id'] = int(path_parts[i + 1])
-                        break
-            
-            if '/nutritionists/' in path:
-                for i, part in enumerate(path_parts):
-                    if part == 'nutritionists' and i + 1 < len(path_parts):
-                        if path_parts[i + 1].isdigit():
-                            context['nutritionist_id'] = int(path_parts[i + 1])
-                        break
-            
-            # Detectar tipo de acción basado en endpoint
-            if path.endswith('/nutritional-profile'):
-                context['action'] = 'nutritional_profile_management'
-            elif '/equivalences/' in path:
-                context['action'] = 'equivalences_management'
-            elif '/weekly-plans' in path:
-                context['action'] = 'meal_planning'
-            elif '/auth/' in path:
-                context['action'] = 'authentication'
-            
-            # Agregar información del método HTTP
-            context['http_method'] = request.method
-            context['endpoint_category'] = self._categorize_endpoint(path)
-            
-            # Si es error, marcar como tal
-            if status_code >= 400:
-                context['has_error'] = True
-                context['error_category'] = self._categorize_error(status_code)
-            
-        except Exception as e:
-            # No fallar si hay error extrayendo contexto
-            context['context_extraction_error'] = str(e)
-        
-        return context
-    
-    def _categorize_endpoint(self, path: str) -> str:
-        """Categorizar endpoint para métricas"""
-        if '/auth/' in path:
-            return 'authentication'
-        elif '/equivalences/' in path:
-            return 'nutrition_equivalences'
-        elif '/patients/' in path:
-            return 'patient_management'
-        elif '/nutritionists/' in path:
-            return 'nutritionist_management'
-        elif '/recipes/' in path:
-            return 'recipe_management'
-        elif '/meal-plans/' in path or '/weekly-plans' in path:
-            return 'meal_planning'
-        elif '/foods/' in path:
-            return 'food_management'
-        elif '/users/' in path:
-            return 'user_management'
-        elif '/health' in path or '/docs' in path:
-            return 'system'
-        else:
-            return 'other'
-    
-    def _categorize_error(self, status_code: int) -> str:
-        """Categorizar tipo de error"""
-        if status_code == 400:
-            return 'bad_request'
-        elif status_code == 401:
-            return 'authentication_error'
-        elif status_code == 403:
-            return 'authorization_error'
-        elif status_code == 404:
-            return 'not_found'
-        elif status_code == 422:
-            return 'validation_error'
-        elif 500 <= status_code < 600:
-            return 'server_error'
-        else:
-            return 'client_error'
-
-def create_request_logging_middleware():
-    """Factory function para crear el middleware"""
-    def logging_middleware(request: Request, call_next: Callable) -> Callable:
-        return LoggingMiddleware.process_request(request, call_next)
-    
-    return logging_middleware
+from .nutrition_logger import nutrition_logger
 
 # Context manager para logging de operaciones específicas
 class LoggingContext:
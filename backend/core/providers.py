@@ -0,0 +1,122 @@
+"""
+Provider Registry
+=================
+
+Clientes de servicios externos (Gemini, Claude, Twilio) creados al primer
+uso en lugar de al importar el módulo.
+
+Sus SDKs (``google.generativeai``, ``anthropic``, ``twilio``) tardan cientos
+de milisegundos en importarse y ocupan decenas de MB; un worker que nunca
+atiende rutas de IA o WhatsApp ya no los carga. Cada proveedor declara:
+
+- ``configured``: chequeo barato (sin importar el SDK) de si hay credenciales,
+  para los endpoints de salud y las banderas ``*_available``
+- ``factory``: crea el cliente; se llama una sola vez por proceso
+
+Uso::
+
+    register_provider("anthropic", _create_anthropic, configured=_has_anthropic_key)
+    client = get_provider("anthropic")  # None si no está configurado o falló
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Provider:
+    factory: Callable[[], Any]
+    configured: Callable[[], bool]
+    instance: Any = None
+    loaded: bool = False
+    load_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+_providers: Dict[str, _Provider] = {}
+_lock = threading.Lock()
+
+
+def register_provider(
+    name: str,
+    factory: Callable[[], Any],
+    configured: Callable[[], bool] = lambda: True
+) -> None:
+    """Registrar (o reemplazar) un proveedor; no crea el cliente"""
+    with _lock:
+        _providers[name] = _Provider(factory=factory, configured=configured)
+
+
+def provider_configured(name: str) -> bool:
+    """¿Tiene credenciales? No importa el SDK ni crea el cliente"""
+    provider = _providers.get(name)
+    if provider is None:
+        return False
+    if provider.loaded:
+        return provider.instance is not None
+    try:
+        return bool(provider.configured())
+    except Exception:
+        return False
+
+
+def get_provider(name: str) -> Optional[Any]:
+    """
+    Cliente del proveedor, creado en la primera llamada
+
+    Devuelve ``None`` si no está registrado, no está configurado o la
+    creación falló (el error se registra una sola vez).
+    """
+    provider = _providers.get(name)
+    if provider is None:
+        return None
+    if provider.loaded:
+        return provider.instance
+
+    with _lock:
+        if provider.loaded:
+            return provider.instance
+        started = time.perf_counter()
+        try:
+            if provider.configured():
+                provider.instance = provider.factory()
+                logger.info(f"Provider '{name}' initialized")
+            else:
+                logger.warning(f"Provider '{name}' not configured")
+        except ImportError as e:
+            provider.error = str(e)
+            logger.warning(f"Provider '{name}' library not installed: {e}")
+        except Exception as e:
+            provider.error = str(e)
+            logger.error(f"Error initializing provider '{name}': {e}")
+        provider.load_ms = round((time.perf_counter() - started) * 1000, 1)
+        provider.loaded = True
+        return provider.instance
+
+
+def reset_provider(name: Optional[str] = None) -> None:
+    """Descartar el cliente creado (todos si ``name`` es None); se recrea al siguiente uso"""
+    with _lock:
+        for key, provider in _providers.items():
+            if name is None or key == name:
+                provider.instance = None
+                provider.loaded = False
+                provider.load_ms = None
+                provider.error = None
+
+
+def provider_status() -> Dict[str, Dict[str, Any]]:
+    """Estado de cada proveedor (para endpoints de salud)"""
+    return {
+        name: {
+            "configured": provider_configured(name),
+            "loaded": provider.loaded,
+            "load_ms": provider.load_ms,
+            "error": provider.error,
+        }
+        for name, provider in sorted(_providers.items())
+    }
@@ -0,0 +1,149 @@
+"""
+Request Query Statistics
+========================
+
+Cuenta las consultas SQL de cada request: número, tiempo total en la base de
+datos y cuántas veces se repite cada forma de sentencia (la misma SQL con
+distintos parámetros), que es la firma de un N+1.
+
+- ``instrument_engine`` engancha ``before/after_cursor_execute`` de un engine
+  (``core.database`` lo hace con todos los suyos)
+- ``track_queries()`` abre el ámbito de medición; el middleware de
+  instrumentación lo usa por request y lo expone como ``X-DB-Queries`` /
+  ``X-DB-Time`` y en el log del request
+- ``query_budget(n)`` como dependencia fija el presupuesto de un endpoint;
+  ``DB_QUERY_BUDGET`` es el presupuesto global. Con ``DB_QUERY_BUDGET_STRICT``
+  (desarrollo/pruebas) un endpoint que lo excede responde 500 en lugar de solo
+  registrar la advertencia
+
+El ámbito vive en un ``ContextVar``, que SQLAlchemy (greenlet del engine
+asíncrono) y ``run_in_threadpool`` propagan, así que cuenta también las
+sesiones síncronas de handlers ``def``. Consultas fuera de un ámbito (tareas de
+fondo, scripts) no se cuentan.
+
+En pruebas::
+
+    with track_queries() as stats:
+        await client.get("/api/v1/admin/users")
+    assert stats.count <= 3, stats.repeated()
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+# Marcadores de parámetros de los drivers usados: ?, $1 (asyncpg), %(name)s (psycopg2)
+_PLACEHOLDER = r"(?:\?|\$\d+|%\(\w+\)s|%s)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_NUMBERED = re.compile(r"\$\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+MAX_SHAPE_LENGTH = 300
+
+
+def statement_shape(statement: str) -> str:
+    """Forma normalizada de una sentencia: listas IN colapsadas y sin numeración de parámetros"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    shape = _NUMBERED.sub("?", shape)
+    return shape[:MAX_SHAPE_LENGTH]
+
+
+@dataclass
+class QueryStats:
+    """Consultas de un ámbito (normalmente un request)"""
+
+    budget: Optional[int] = None
+    count: int = 0
+    total_ms: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed * 1000
+        self.shapes[statement_shape(statement)] += 1
+
+    @property
+    def over_budget(self) -> bool:
+        return bool(self.budget) and self.count > self.budget
+
+    def repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """Formas ejecutadas al menos ``threshold`` veces, de más a menos frecuente"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def as_log_fields(self, threshold: int = 2) -> Dict[str, Any]:
+        """Campos estructurados para el log del request"""
+        fields: Dict[str, Any] = {"db_queries": self.count, "db_time_ms": round(self.total_ms, 2)}
+        repeated = self.repeated(threshold)
+        if repeated:
+            fields["db_repeated_queries"] = [{"statement": shape, "count": n} for shape, n in repeated[:5]]
+        if self.budget:
+            fields["db_query_budget"] = self.budget
+        return fields
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Estadísticas del ámbito activo, o ``None`` fuera de un request"""
+    return _current.get()
+
+
+@contextmanager
+def track_queries(budget: Optional[int] = None) -> Iterator[QueryStats]:
+    """Contar las consultas ejecutadas dentro del bloque"""
+    stats = QueryStats(budget=budget)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def query_budget(max_queries: int):
+    """
+    Dependencia FastAPI que fija el presupuesto de consultas de un endpoint
+
+    Uso::
+
+        @router.get("/users", dependencies=[Depends(query_budget(3))])
+    """
+    async def _set_budget() -> None:
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = max_queries
+    return _set_budget
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_stats_started")
+    if stats is None or not started:
+        return
+    stats.record(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    started = connection.info.get("query_stats_started") if connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(sync_engine) -> None:
+    """Registrar el conteo por request en un engine (``AsyncEngine.sync_engine`` para los asíncronos)"""
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
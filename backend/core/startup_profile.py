@@ -0,0 +1,185 @@
+"""
+Startup Import Profiler
+=======================
+
+Modo de diagnóstico que mide, por módulo, el tiempo de importación (propio y
+acumulado) y el crecimiento del RSS durante el arranque de la aplicación.
+
+Se activa con ``STARTUP_PROFILE=1`` antes de importar ``main``; al terminar
+``create_application()`` se registra un resumen en el log. El presupuesto
+``STARTUP_IMPORT_BUDGET_MS`` (por defecto 3000) solo produce una advertencia.
+``scripts/profile_startup.py`` imprime la tabla completa y puede fallar si se
+excede el presupuesto o si se importó algún módulo de ``HEAVY_MODULES``.
+
+Solo para diagnóstico: envuelve los loaders de ``sys.meta_path`` mientras está
+activo.
+"""
+import importlib.abc
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# SDKs que solo deben cargarse al primer uso (ver core.providers)
+HEAVY_MODULES = (
+    "google.generativeai",
+    "anthropic",
+    "twilio",
+    "PIL",
+    "imagehash",
+    "fitz",
+    "pytesseract",
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> Optional[int]:
+    """RSS actual del proceso (Linux), o ``None`` si no está disponible"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def heavy_modules_loaded() -> List[str]:
+    """Módulos de ``HEAVY_MODULES`` ya importados en este proceso"""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+class _TimingLoader:
+    """Proxy de un loader que mide ``exec_module``"""
+
+    def __init__(self, loader, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        self._profiler._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__)
+
+
+class StartupProfiler(importlib.abc.MetaPathFinder):
+    """Finder que envuelve los loaders de los demás finders para medirlos"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.started_rss = current_rss_bytes()
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        self._stack: List[list] = []
+        self._finding = set()
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self._finding:
+            return None
+        self._finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimingLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._finding.discard(fullname)
+
+    def _enter(self, name: str) -> None:
+        # [nombre, inicio, rss inicial, tiempo de hijos]
+        self._stack.append([name, time.perf_counter(), current_rss_bytes(), 0.0])
+
+    def _exit(self, name: str) -> None:
+        _, started, rss_before, children = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        rss_after = current_rss_bytes()
+        if self._stack:
+            self._stack[-1][3] += elapsed
+        self.modules[name] = {
+            "module": name,
+            "cumulative_ms": round(elapsed * 1000, 2),
+            "self_ms": round((elapsed - children) * 1000, 2),
+            "rss_delta_kb": (
+                (rss_after - rss_before) // 1024
+                if rss_before is not None and rss_after is not None else None
+            ),
+        }
+
+    def report(self, top: int = 25, sort_by: str = "self_ms") -> Dict[str, Any]:
+        """Resumen: totales y los ``top`` módulos más costosos"""
+        rss = current_rss_bytes()
+        return {
+            "total_ms": round((time.perf_counter() - self.started_at) * 1000, 1),
+            "modules_imported": len(self.modules),
+            "rss_mb": round(rss / 1e6, 1) if rss is not None else None,
+            "rss_delta_mb": (
+                round((rss - self.started_rss) / 1e6, 1)
+                if rss is not None and self.started_rss is not None else None
+            ),
+            "heavy_modules_loaded": heavy_modules_loaded(),
+            "modules": sorted(self.modules.values(), key=lambda m: m[sort_by], reverse=True)[:top],
+        }
+
+
+_profiler: Optional[StartupProfiler] = None
+_last_report: Optional[Dict[str, Any]] = None
+
+
+def enable() -> StartupProfiler:
+    """Empezar a medir las importaciones (idempotente)"""
+    global _profiler
+    if _profiler is None:
+        _profiler = StartupProfiler()
+        sys.meta_path.insert(0, _profiler)
+    return _profiler
+
+
+def enable_from_env() -> bool:
+    """Activar el perfilado si ``STARTUP_PROFILE`` está encendido"""
+    if os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "yes"):
+        enable()
+        return True
+    return False
+
+
+def finish(top: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Dejar de medir y registrar el resumen; ``None`` si no estaba activo"""
+    global _profiler, _last_report
+    if _profiler is None:
+        return None
+    if _profiler in sys.meta_path:
+        sys.meta_path.remove(_profiler)
+    report = _profiler.report(top=top or int(os.getenv("STARTUP_PROFILE_TOP", "25")))
+    _profiler = None
+    _last_report = report
+
+    budget_ms = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "3000"))
+    logger.info(
+        f"Startup import profile: {report['total_ms']} ms, {report['modules_imported']} modules, "
+        f"RSS {report['rss_mb']} MB",
+        extra={"business_context": report},
+    )
+    if report["total_ms"] > budget_ms:
+        logger.warning(f"Startup import time {report['total_ms']} ms exceeds budget of {budget_ms:.0f} ms")
+    if report["heavy_modules_loaded"]:
+        logger.warning(f"Heavy modules imported at startup: {', '.join(report['heavy_modules_loaded'])}")
+    return report
+
+
+def last_report() -> Optional[Dict[str, Any]]:
+    """Último resumen producido por ``finish()``"""
+    return _last_report
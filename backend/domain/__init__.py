@@ -17,7 +17,7 @@ from .patients.models import Patient
 
 # Import recipe models (depend on users/foods)
 from .recipes.models import (
-    Recipe, RecipeItem, MealPlan, MealEntry, RecipeRating,
+    Recipe, RecipeItem, MealPlan, MealEntry, RecipeRating, RecipeRatingStats,
     RecipeStatus, MealType, DifficultyLevel
 )
 
@@ -44,7 +44,7 @@ __all__ = [
     # Foods
     "Food", "FoodCategory",
     # Recipes
-    "Recipe", "RecipeItem", "MealPlan", "MealEntry", "RecipeRating",
+    "Recipe", "RecipeItem", "MealPlan", "MealEntry", "RecipeRating", "RecipeRatingStats",
     "RecipeStatus", "MealType", "DifficultyLevel",
     # Trophology
     "TrophologyFoodCategory", "FoodCompatibility",
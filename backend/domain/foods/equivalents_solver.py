@@ -0,0 +1,339 @@
+"""
+Solver de Distribución de Equivalentes SMAE
+Elige cuántos equivalentes asignar a cada grupo (en medios equivalentes y
+dentro de los mínimos/máximos de la tabla SMAE) minimizando el error
+relativo en calorías, proteínas, carbohidratos y grasas.
+
+El problema es un programa cuadrático entero pequeño (un entero por grupo):
+
+1. Se resuelve la relajación continua con límites por descenso coordenado
+   (exacto para un QP convexo con cajas).
+2. Se redondea a medios equivalentes y se mejora con búsqueda local entera:
+   movimientos de ±0.5 en un grupo o en un par de grupos, tomando siempre el
+   de mayor mejora hasta que ninguno mejora el objetivo.
+
+Un término de regularización pequeño acerca la solución a una distribución
+de referencia (patrón por objetivo o punto medio de los rangos), de modo que
+entre planes con el mismo error se elige el más balanceado.
+
+Las soluciones se memorizan con una clave cuantizada (calorías, reparto de
+macros, grupos, condiciones y patrón), así que repetir un plan equivalente
+cuesta una búsqueda en diccionario.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .equivalences import EquivalenceGroup
+from .smae_table import NUTRIENTS, SMAE_TABLE
+
+# Orden de los objetivos en vectores y matrices (el de las filas de SMAE_TABLE.nutrients)
+TARGETS = NUTRIENTS
+
+# Peso de cada error relativo en el objetivo
+DEFAULT_WEIGHTS = {"calories": 2.0, "protein": 1.0, "carbs": 1.0, "fat": 1.0}
+
+# Ajustes de límites (mínimo, máximo) por condición del paciente; None conserva el límite SMAE
+CONDITION_BOUNDS: Dict[str, Dict[EquivalenceGroup, Tuple[Optional[float], Optional[float]]]] = {
+    "has_diabetes": {
+        EquivalenceGroup.AZUCARES_SIN_GRASA: (0, 0),
+        EquivalenceGroup.AZUCARES_CON_GRASA: (0, 0),
+    },
+    "is_pregnant": {EquivalenceGroup.LECHE_DESCREMADA: (3, None)},
+    "is_lactating": {EquivalenceGroup.LECHE_DESCREMADA: (3, None)},
+}
+
+
+@dataclass(frozen=True)
+class EquivalentsSolution:
+    """Distribución resultante y su aporte nutricional"""
+    equivalents: Tuple[Tuple[EquivalenceGroup, float], ...]
+    calories: float
+    protein_g: float
+    carbs_g: float
+    fat_g: float
+    target_calories: float
+    target_protein_g: float
+    target_carbs_g: float
+    target_fat_g: float
+
+    def as_dict(self) -> Dict[str, float]:
+        """``{grupo: equivalentes}`` omitiendo grupos en cero, como EquivalenceDistributor"""
+        return {group.value: amount for group, amount in self.equivalents if amount > 0}
+
+    @property
+    def errors_pct(self) -> Dict[str, float]:
+        """Error relativo (%) contra los objetivos solicitados"""
+        pairs = (
+            ("calories", self.calories, self.target_calories),
+            ("protein", self.protein_g, self.target_protein_g),
+            ("carbs", self.carbs_g, self.target_carbs_g),
+            ("fat", self.fat_g, self.target_fat_g),
+        )
+        return {
+            name: round((actual - target) / target * 100, 1) if target else 0.0
+            for name, actual, target in pairs
+        }
+
+
+class EquivalentsSolver:
+    """
+    Solver memorizado de equivalentes por grupo
+
+    Args:
+        step: Granularidad de los equivalentes (0.5 = medios equivalentes)
+        calorie_quantum: Cuantización de calorías para la clave de caché (kcal)
+        split_quantum: Cuantización del reparto de macros (% de calorías)
+        regularization: Peso del acercamiento a la distribución de referencia
+        weights: Peso de cada error relativo
+        max_cached: Soluciones conservadas (LRU)
+    """
+
+    def __init__(
+        self,
+        step: float = 0.5,
+        calorie_quantum: float = 10.0,
+        split_quantum: float = 0.5,
+        regularization: float = 1e-3,
+        weights: Optional[Mapping[str, float]] = None,
+        max_cached: int = 4096
+    ):
+        self.step = step
+        self.calorie_quantum = calorie_quantum
+        self.split_quantum = split_quantum
+        self.regularization = regularization
+        self.weights = np.array([(weights or DEFAULT_WEIGHTS)[name] for name in TARGETS], dtype=float)
+        self.max_cached = max_cached
+        # clave -> (equivalentes por grupo, totales de TARGETS)
+        self._cache: "OrderedDict[tuple, Tuple[Tuple[float, ...], Tuple[float, ...]]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def solve(
+        self,
+        groups: Sequence[EquivalenceGroup],
+        calories: float,
+        protein_g: float,
+        carbs_g: float,
+        fat_g: float,
+        conditions: Iterable[str] = (),
+        preference: Optional[Mapping[EquivalenceGroup, float]] = None
+    ) -> EquivalentsSolution:
+        """
+        Distribuir ``calories`` y macros (g) en equivalentes de ``groups``
+
+        Args:
+            conditions: Banderas activas (``has_diabetes``, ``is_pregnant``...)
+                que ajustan los límites según CONDITION_BOUNDS
+            preference: Fracción de calorías esperada por grupo; define la
+                distribución de referencia. Por defecto, el punto medio del rango.
+        """
+        groups = tuple(groups)
+        key = self.cache_key(groups, calories, protein_g, carbs_g, fat_g, conditions, preference)
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+
+        if entry is None:
+            amounts = self._solve_key(key)
+            totals = self._matrix(groups) @ np.array(amounts, dtype=float)
+            entry = (amounts, tuple(round(float(v), 1) for v in totals))
+            with self._lock:
+                self.misses += 1
+                self._cache[key] = entry
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+
+        amounts, totals = entry
+        return EquivalentsSolution(
+            equivalents=tuple(zip(groups, amounts)),
+            calories=totals[0],
+            protein_g=totals[1],
+            carbs_g=totals[2],
+            fat_g=totals[3],
+            target_calories=calories,
+            target_protein_g=protein_g,
+            target_carbs_g=carbs_g,
+            target_fat_g=fat_g,
+        )
+
+    def cache_key(
+        self,
+        groups: Tuple[EquivalenceGroup, ...],
+        calories: float,
+        protein_g: float,
+        carbs_g: float,
+        fat_g: float,
+        conditions: Iterable[str] = (),
+        preference: Optional[Mapping[EquivalenceGroup, float]] = None
+    ) -> tuple:
+        """Clave cuantizada: calorías, reparto % de macros, grupos, condiciones y patrón"""
+        # Reparto como % de las calorías objetivo (no necesariamente suma 100)
+        if calories > 0:
+            split = tuple(
+                int(round(share * 100 / calories / self.split_quantum))
+                for share in (protein_g * 4, carbs_g * 4, fat_g * 9)
+            )
+        else:
+            split = (0, 0, 0)
+        known = tuple(sorted(c for c in conditions if c in CONDITION_BOUNDS))
+        pattern = tuple(round(preference.get(g, 0.0), 4) for g in groups) if preference else None
+        return (groups, int(round(calories / self.calorie_quantum)), split, known, pattern)
+
+    def cache_info(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "max_size": self.max_cached,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Resolución
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _matrix(groups: Sequence[EquivalenceGroup]) -> np.ndarray:
+        """Aporte por equivalente: filas = TARGETS, columnas = grupos"""
+        return SMAE_TABLE.matrix(groups)
+
+    def bounds(self, groups: Sequence[EquivalenceGroup], conditions: Iterable[str] = ()) -> Tuple[np.ndarray, np.ndarray]:
+        """Límites (mínimo, máximo) por grupo, ajustados por condiciones"""
+        low, high = SMAE_TABLE.bounds(groups)
+        for condition in conditions:
+            for group, (new_low, new_high) in CONDITION_BOUNDS.get(condition, {}).items():
+                if group in groups:
+                    i = groups.index(group)
+                    if new_high is not None:
+                        high[i] = min(high[i], new_high)
+                    if new_low is not None:
+                        low[i] = min(max(low[i], new_low), high[i])
+                    low[i] = min(low[i], high[i])
+        return low, high
+
+    def _solve_key(self, key: tuple) -> Tuple[float, ...]:
+        """Resolver a partir de la clave cuantizada (la caché no depende del valor exacto)"""
+        groups, calorie_units, split, conditions, pattern = key
+        calories = calorie_units * self.calorie_quantum
+        shares = [units * self.split_quantum / 100 for units in split]
+        targets = np.array([calories, calories * shares[0] / 4, calories * shares[1] / 4, calories * shares[2] / 9])
+
+        matrix = self._matrix(groups)
+        low, high = self.bounds(groups, conditions)
+        if pattern is not None:
+            reference = np.array(pattern) * calories / matrix[0]
+        else:
+            reference = (low + high) / 2
+        reference = np.clip(reference, low, high)
+
+        return tuple(float(v) for v in self.minimize(matrix, targets, low, high, reference))
+
+    def minimize(
+        self,
+        matrix: np.ndarray,
+        targets: np.ndarray,
+        low: np.ndarray,
+        high: np.ndarray,
+        reference: np.ndarray
+    ) -> np.ndarray:
+        """
+        Minimizar ``Σ w_k ((A x - t)_k / t_k)² + λ/n Σ ((x - r)_g / s_g)²`` con
+        ``x`` en múltiplos de ``step`` dentro de ``[low, high]``
+        """
+        size = matrix.shape[1]
+        scale = np.where(targets > 0, targets, 1.0)
+        row_weights = self.weights / scale ** 2
+        spread = np.maximum(high - low, 1.0)
+        reg = self.regularization / size / spread ** 2
+
+        # Objetivo cuadrático f(x) = xᵀQx - 2cᵀx + cte
+        quad = matrix.T @ (row_weights[:, None] * matrix) + np.diag(reg)
+        lin = matrix.T @ (row_weights * targets) + reg * reference
+
+        # 1) Relajación continua con límites: descenso coordenado
+        x = reference.copy()
+        diag = np.diag(quad)
+        for _ in range(500):
+            largest = 0.0
+            for g in range(size):
+                value = (lin[g] - quad[g] @ x + diag[g] * x[g]) / diag[g]
+                value = min(max(value, low[g]), high[g])
+                largest = max(largest, abs(value - x[g]))
+                x[g] = value
+            if largest < 1e-9:
+                break
+
+        # 2) Redondeo a la malla y búsqueda local entera
+        step = self.step
+        low_grid = np.ceil(low / step - 1e-9) * step
+        high_grid = np.floor(high / step + 1e-9) * step
+        x = np.clip(np.round(x / step) * step, low_grid, high_grid)
+
+        moves = np.array([step, -step])
+        for _ in range(10 * size * size + 100):
+            grad = quad @ x - lin
+            # Un grupo: Δ = 2·d·g + d²·Q_gg
+            single = 2 * moves[:, None] * grad[None, :] + moves[:, None] ** 2 * diag[None, :]
+            single_ok = (x[None, :] + moves[:, None] >= low_grid - 1e-9) & (x[None, :] + moves[:, None] <= high_grid + 1e-9)
+            single = np.where(single_ok, single, np.inf)
+
+            best = single.min()
+            best_move = ("single", np.unravel_index(single.argmin(), single.shape))
+
+            # Dos grupos: Δ = 2·d_g·g_g + 2·d_h·g_h + d_g²·Q_gg + d_h²·Q_hh + 2·d_g·d_h·Q_gh
+            for a in moves:
+                for b in moves:
+                    pair = (
+                        2 * a * grad[:, None] + 2 * b * grad[None, :]
+                        + a * a * diag[:, None] + b * b * diag[None, :] + 2 * a * b * quad
+                    )
+                    pair_ok = (
+                        (x[:, None] + a >= low_grid[:, None] - 1e-9) & (x[:, None] + a <= high_grid[:, None] + 1e-9)
+                        & (x[None, :] + b >= low_grid[None, :] - 1e-9) & (x[None, :] + b <= high_grid[None, :] + 1e-9)
+                    )
+                    pair_ok &= ~np.eye(size, dtype=bool)
+                    pair = np.where(pair_ok, pair, np.inf)
+                    if pair.min() < best:
+                        best = pair.min()
+                        best_move = ("pair", np.unravel_index(pair.argmin(), pair.shape), a, b)
+
+            if not best < -1e-12:
+                break
+            if best_move[0] == "single":
+                sign, g = best_move[1]
+                x[g] += moves[sign]
+            else:
+                (g, h), a, b = best_move[1], best_move[2], best_move[3]
+                x[g] += a
+                x[h] += b
+
+        return np.round(x / step) * step
+
+
+_solver: Optional[EquivalentsSolver] = None
+
+
+def get_equivalents_solver() -> EquivalentsSolver:
+    """Obtener el solver compartido del proceso (con su caché)"""
+    global _solver
+    if _solver is None:
+        _solver = EquivalentsSolver()
+    return _solver
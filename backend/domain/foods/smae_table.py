@@ -0,0 +1,156 @@
+"""
+Tabla de Estándares SMAE
+Versión inmutable y en arreglos de SMAE_GROUP_STANDARDS, compartida por las
+calculadoras de equivalentes.
+
+Cada grupo ocupa una fila (índice fijo) con columnas de kcal, proteínas,
+carbohidratos, grasas y mínimos/máximos diarios:
+
+- ``SMAE_TABLE.index`` traduce el grupo (enum o su valor en texto) a su fila
+- ``SMAE_TABLE.rows`` guarda cada fila como NamedTuple para acceso escalar
+  sin búsquedas por clave de texto
+- ``SMAE_TABLE.nutrients`` es la matriz (4 × grupos) de solo lectura para
+  calcular totales con un producto punto
+"""
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .equivalences import EquivalenceGroup, SMAE_GROUP_STANDARDS
+
+# Orden de las filas de ``nutrients``
+NUTRIENTS = ("calories", "protein", "carbs", "fat")
+
+GroupKey = Union[EquivalenceGroup, str]
+
+
+class SmaeGroupRow(NamedTuple):
+    """Estándar de un grupo (valores originales, sin convertir a float)"""
+    group: EquivalenceGroup
+    name: str
+    description: str
+    color: str
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+    min_daily: float
+    max_daily: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Mismo formato que una entrada de SMAE_GROUP_STANDARDS"""
+        return {
+            "name": self.name,
+            "calories": self.calories,
+            "protein": self.protein,
+            "carbs": self.carbs,
+            "fat": self.fat,
+            "color": self.color,
+            "min_daily": self.min_daily,
+            "max_daily": self.max_daily,
+            "description": self.description
+        }
+
+
+def _frozen(values) -> np.ndarray:
+    array = np.array(values, dtype=float)
+    array.setflags(write=False)
+    return array
+
+
+class SmaeStandardsTable:
+    """Tabla inmutable de estándares por grupo"""
+
+    __slots__ = (
+        "groups", "rows", "index", "calories", "protein", "carbs", "fat",
+        "min_daily", "max_daily", "nutrients", "_dicts"
+    )
+
+    def __init__(self, standards: Mapping[EquivalenceGroup, Mapping[str, Any]]):
+        groups = tuple(standards)
+        rows = tuple(
+            SmaeGroupRow(
+                group=group,
+                name=standard["name"],
+                description=standard["description"],
+                color=standard["color"],
+                calories=standard["calories"],
+                protein=standard["protein"],
+                carbs=standard["carbs"],
+                fat=standard["fat"],
+                min_daily=standard.get("min_daily", 0),
+                max_daily=standard.get("max_daily", 20),
+            )
+            for group, standard in standards.items()
+        )
+        # EquivalenceGroup hereda de str: el enum y su valor comparten clave
+        index = {group: i for i, group in enumerate(groups)}
+
+        setter = object.__setattr__
+        setter(self, "groups", groups)
+        setter(self, "rows", rows)
+        setter(self, "index", MappingProxyType(index))
+        for name in ("calories", "protein", "carbs", "fat", "min_daily", "max_daily"):
+            setter(self, name, _frozen([getattr(row, name) for row in rows]))
+        setter(self, "nutrients", _frozen([[getattr(row, name) for row in rows] for name in NUTRIENTS]))
+        setter(self, "_dicts", tuple(row.as_dict() for row in rows))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SmaeStandardsTable is immutable")
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def __contains__(self, group: GroupKey) -> bool:
+        return group in self.index
+
+    def row(self, group: GroupKey) -> SmaeGroupRow:
+        """Fila de un grupo; KeyError si no tiene estándar"""
+        return self.rows[self.index[group]]
+
+    def info(self, group: GroupKey) -> Dict[str, Any]:
+        """Copia con el formato de SMAE_GROUP_STANDARDS (para respuestas de API)"""
+        return dict(self._dicts[self.index[group]])
+
+    def indices(self, groups: Iterable[GroupKey]) -> np.ndarray:
+        """Índices de fila de ``groups`` (todos deben tener estándar)"""
+        return np.array([self.index[group] for group in groups], dtype=np.intp)
+
+    def vector(self, equivalents: Mapping[GroupKey, float]) -> np.ndarray:
+        """
+        Equivalentes por grupo como vector de la tabla; las claves que no son
+        grupos con estándar se ignoran
+        """
+        vector = np.zeros(len(self.groups))
+        index = self.index
+        for key, amount in equivalents.items():
+            i = index.get(key)
+            if i is not None:
+                vector[i] += amount
+        return vector
+
+    def totals(self, equivalents: Union[Mapping[GroupKey, float], np.ndarray]) -> Dict[str, float]:
+        """Calorías y macros (g) aportados por ``equivalents`` (dict o vector)"""
+        if not isinstance(equivalents, np.ndarray):
+            equivalents = self.vector(equivalents)
+        values = self.nutrients @ equivalents
+        return {name: float(value) for name, value in zip(NUTRIENTS, values)}
+
+    def calories_of(self, equivalents: Mapping[GroupKey, float]) -> float:
+        """Calorías aportadas por ``equivalents``"""
+        return float(self.calories @ self.vector(equivalents))
+
+    def matrix(self, groups: Optional[Iterable[GroupKey]] = None) -> np.ndarray:
+        """Submatriz de nutrientes (4 × len(groups)) en el orden de ``groups``"""
+        if groups is None:
+            return self.nutrients
+        return self.nutrients[:, self.indices(groups)]
+
+    def bounds(self, groups: Iterable[GroupKey]) -> Tuple[np.ndarray, np.ndarray]:
+        """Copias modificables de (min_daily, max_daily) para ``groups``"""
+        rows = self.indices(groups)
+        return self.min_daily[rows].copy(), self.max_daily[rows].copy()
+
+
+SMAE_TABLE = SmaeStandardsTable(SMAE_GROUP_STANDARDS)
@@ -43,6 +43,8 @@ class WhatsAppMessage(SQLModel, table=True):
 
     # Twilio details
     twilio_sid: Optional[str] = Field(default=None, max_length=100)
+    # Idempotency-Key of the /send/* request that created it (reserved before sending)
+    idempotency_key: Optional[str] = Field(default=None, max_length=120, unique=True)
     status: MessageStatus = Field(default=MessageStatus.QUEUED)
     error_message: Optional[str] = Field(default=None, max_length=500)
 
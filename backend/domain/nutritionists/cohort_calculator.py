@@ -0,0 +1,282 @@
+"""
+Calculadora de Kilocalorías por Cohorte
+Versión vectorizada (NumPy) de KilocalorieCalculator para recalcular los planes
+de todos los pacientes de una clínica en una sola pasada.
+
+Cada paso replica la aritmética del cálculo escalar en el mismo orden de
+operaciones, de modo que los resultados son idénticos a create_nutrition_plan
+paciente por paciente.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..foods.equivalences import EquivalenceGroup
+from ..foods.smae_table import NUTRIENTS, SMAE_TABLE
+from .kilocalorie_calculator import (
+    ActivityLevel, Gender, KilocalorieCalculator, MacroDistribution, NutritionalGoal, PatientProfile
+)
+
+# Regla de equivalentes objetivo por grupo, igual que distribute_to_equivalents:
+# ("fixed", tope) o (macro restante, fracción cubierta por el grupo). Los grupos
+# sin regla usan su mínimo diario.
+_TARGET_RULES: Dict[EquivalenceGroup, Tuple[str, float]] = {
+    EquivalenceGroup.VERDURAS: ("fixed", 8),
+    EquivalenceGroup.FRUTAS: ("fixed", 3),
+    EquivalenceGroup.CEREALES: ("carbs", 0.6),
+    EquivalenceGroup.AOA_BAJO_GRASA: ("protein", 0.5),
+}
+
+
+def round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    ``round(x, ndigits)`` elemento a elemento
+
+    ``np.round`` escala, redondea y divide; solo puede diferir del ``round``
+    de Python cuando el valor escalado queda prácticamente en .5, así que esos
+    casos se resuelven con ``round`` directamente.
+    """
+    rounded = np.round(values, ndigits)
+    if ndigits == 0:
+        return rounded
+    scaled = values * 10 ** ndigits
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [round(value, ndigits) for value in values[ties].tolist()]
+    return rounded
+
+
+@dataclass
+class CohortPlan:
+    """Resultados del cálculo de una cohorte; una columna por paciente"""
+    bmr: np.ndarray
+    tdee: np.ndarray
+    macros: Dict[str, np.ndarray]
+    groups: Tuple[EquivalenceGroup, ...]
+    accepted: np.ndarray          # (grupos, pacientes) bool
+    equivalents: np.ndarray       # (grupos, pacientes)
+    calories: np.ndarray
+    protein: np.ndarray
+    carbs: np.ndarray
+    fat: np.ndarray
+    totals: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.bmr)
+
+    def rows(self) -> Iterator[Dict]:
+        """
+        Un diccionario por paciente con las mismas secciones ``calculations``,
+        ``equivalents_prescription`` y ``plan_summary`` de create_nutrition_plan
+        """
+        bmr, tdee = self.bmr.tolist(), self.tdee.tolist()
+        macros = {name: values.tolist() for name, values in self.macros.items()}
+        accepted = self.accepted.T.tolist()
+        equivalents = self.equivalents.T.tolist()
+        calories, protein = self.calories.T.tolist(), self.protein.T.tolist()
+        carbs, fat = self.carbs.T.tolist(), self.fat.T.tolist()
+        totals = {name: values.tolist() for name, values in self.totals.items()}
+        labels = [
+            (group.value, SMAE_TABLE.row(group).name, f"Aporta {SMAE_TABLE.row(group).description}")
+            for group in self.groups
+        ]
+
+        for i in range(len(bmr)):
+            yield {
+                "calculations": {
+                    "bmr": bmr[i],
+                    "tdee": tdee[i],
+                    "target_calories": tdee[i],
+                    "macro_targets": {name: values[i] for name, values in macros.items()}
+                },
+                "equivalents_prescription": [
+                    {
+                        "group": value,
+                        "group_name": name,
+                        "daily_equivalents": equivalents[i][g],
+                        "calories": calories[i][g],
+                        "protein_g": protein[i][g],
+                        "carbs_g": carbs[i][g],
+                        "fat_g": fat[i][g],
+                        "notes": notes
+                    }
+                    for g, (value, name, notes) in enumerate(labels)
+                    if accepted[i][g]
+                ],
+                "plan_summary": {name: values[i] for name, values in totals.items()}
+            }
+
+
+class CohortCalculator:
+    """Calcula TMB, GET, macros y equivalentes SMAE para arreglos de pacientes"""
+
+    def __init__(self, calculator: Optional[KilocalorieCalculator] = None):
+        calculator = calculator or KilocalorieCalculator()
+        self.activity_factors = calculator.ACTIVITY_FACTORS
+        self.goal_adjustments = calculator.GOAL_ADJUSTMENTS
+        self.groups = tuple(g for g in calculator.EQUIVALENTS_PRIORITY if g in SMAE_TABLE)
+
+    def calculate_bmr(
+        self,
+        age: np.ndarray,
+        weight: np.ndarray,
+        height: np.ndarray,
+        is_male: np.ndarray,
+        is_pregnant: np.ndarray,
+        is_lactating: np.ndarray
+    ) -> np.ndarray:
+        """Mifflin-St Jeor vectorizada (ver KilocalorieCalculator.calculate_bmr)"""
+        base = (10 * weight) + (6.25 * height) - (5 * age)
+        bmr = np.where(is_male, base + 5, base - 161)
+        bmr = np.where(is_pregnant, bmr + 300, np.where(is_lactating, bmr + 500, bmr))
+        return round_like_python(bmr, 1)
+
+    def calculate_tdee(self, bmr: np.ndarray, activity_factor: np.ndarray, goal_adjustment: np.ndarray) -> np.ndarray:
+        """GET ajustado por objetivo a partir de la TMB ya redondeada"""
+        return round_like_python(bmr * activity_factor * (1 + goal_adjustment), 0)
+
+    def calculate_macros(self, total_calories: np.ndarray, distribution: MacroDistribution) -> Dict[str, np.ndarray]:
+        """Gramos de macronutrientes (ver KilocalorieCalculator.calculate_macros)"""
+        protein_calories = total_calories * (distribution.protein_percentage / 100)
+        carbs_calories = total_calories * (distribution.carbs_percentage / 100)
+        fat_calories = total_calories * (distribution.fat_percentage / 100)
+
+        return {
+            "protein_grams": round_like_python(protein_calories / 4, 1),
+            "carbs_grams": round_like_python(carbs_calories / 4, 1),
+            "fat_grams": round_like_python(fat_calories / 9, 1),
+            "protein_calories": protein_calories,
+            "carbs_calories": carbs_calories,
+            "fat_calories": fat_calories
+        }
+
+    def distribute_to_equivalents(self, total_calories: np.ndarray, macros: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Distribución greedy en equivalentes SMAE, un grupo a la vez para toda
+        la cohorte (ver KilocalorieCalculator.distribute_to_equivalents)
+        """
+        remaining = {
+            "calories": total_calories.copy(),
+            "protein": macros["protein_grams"].copy(),
+            "carbs": macros["carbs_grams"].copy(),
+            "fat": macros["fat_grams"].copy(),
+        }
+        shape = (len(self.groups), len(total_calories))
+        result = {name: np.zeros(shape) for name in ("equivalents", "calories", "protein", "carbs", "fat")}
+        result["accepted"] = np.zeros(shape, dtype=bool)
+
+        for g, group in enumerate(self.groups):
+            standard = SMAE_TABLE.row(group)
+            min_equivalents = standard.min_daily
+            max_equivalents = standard.max_daily
+
+            kind, amount = _TARGET_RULES.get(group, ("minimum", 0))
+            if kind == "fixed":
+                target = np.full(shape[1], float(max(min_equivalents, min(amount, max_equivalents))))
+            elif kind == "minimum":
+                target = np.full(shape[1], float(min_equivalents))
+            else:
+                needed = remaining[kind] * amount / getattr(standard, kind)
+                target = np.maximum(min_equivalents, np.minimum(needed, max_equivalents))
+            target = round_like_python(target, 1)
+
+            column = SMAE_TABLE.nutrients[:, SMAE_TABLE.index[group]]
+            contributions = dict(zip(NUTRIENTS, column[:, None] * target[None, :]))
+            accepted = (target > 0) & (contributions["calories"] <= remaining["calories"])
+
+            result["accepted"][g] = accepted
+            result["equivalents"][g] = np.where(accepted, target, 0.0)
+            for name, contribution in contributions.items():
+                result[name][g] = np.where(accepted, contribution, 0.0)
+                remaining[name] = np.where(accepted, remaining[name] - contribution, remaining[name])
+
+        return result
+
+    def calculate(
+        self,
+        age: Sequence[int],
+        weight: Sequence[float],
+        height: Sequence[float],
+        gender: Sequence[Gender],
+        activity_level: Sequence[ActivityLevel],
+        goal: Sequence[NutritionalGoal],
+        is_pregnant: Optional[Sequence[bool]] = None,
+        is_lactating: Optional[Sequence[bool]] = None,
+        distribution: MacroDistribution = MacroDistribution()
+    ) -> CohortPlan:
+        """
+        Calcula el plan completo de una cohorte
+
+        Todos los arreglos deben tener la misma longitud; ``gender``,
+        ``activity_level`` y ``goal`` aceptan enums o sus valores.
+        """
+        size = len(age)
+        for name, values in (("weight", weight), ("height", height), ("gender", gender),
+                             ("activity_level", activity_level), ("goal", goal),
+                             ("is_pregnant", is_pregnant), ("is_lactating", is_lactating)):
+            if values is not None and len(values) != size:
+                raise ValueError(f"{name} has {len(values)} values, expected {size}")
+
+        is_male = np.array([Gender(g) == Gender.MASCULINO for g in gender], dtype=bool)
+        activity_factor = np.array([self.activity_factors[ActivityLevel(a)] for a in activity_level], dtype=float)
+        goal_adjustment = np.array([self.goal_adjustments[NutritionalGoal(g)] for g in goal], dtype=float)
+        pregnant = np.zeros(size, dtype=bool) if is_pregnant is None else np.asarray(is_pregnant, dtype=bool)
+        lactating = np.zeros(size, dtype=bool) if is_lactating is None else np.asarray(is_lactating, dtype=bool)
+
+        bmr = self.calculate_bmr(
+            np.asarray(age, dtype=float), np.asarray(weight, dtype=float), np.asarray(height, dtype=float),
+            is_male, pregnant, lactating
+        )
+        tdee = self.calculate_tdee(bmr, activity_factor, goal_adjustment)
+        macros = self.calculate_macros(tdee, distribution)
+        equivalents = self.distribute_to_equivalents(tdee, macros)
+
+        # Sumas en el orden de prioridad, como en la versión escalar
+        totals = {name: np.zeros(size) for name in ("calories", "protein", "carbs", "fat")}
+        for g in range(len(self.groups)):
+            for name in totals:
+                totals[name] = totals[name] + equivalents[name][g]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            calories_accuracy = round_like_python((totals["calories"] / tdee) * 100, 1)
+            protein_accuracy = round_like_python((totals["protein"] / macros["protein_grams"]) * 100, 1)
+
+        return CohortPlan(
+            bmr=bmr,
+            tdee=tdee,
+            macros=macros,
+            groups=self.groups,
+            accepted=equivalents["accepted"],
+            equivalents=equivalents["equivalents"],
+            calories=equivalents["calories"],
+            protein=equivalents["protein"],
+            carbs=equivalents["carbs"],
+            fat=equivalents["fat"],
+            totals={
+                "total_calories_from_equivalents": totals["calories"],
+                "total_protein_from_equivalents": totals["protein"],
+                "total_carbs_from_equivalents": totals["carbs"],
+                "total_fat_from_equivalents": totals["fat"],
+                "calories_accuracy": calories_accuracy,
+                "protein_accuracy": protein_accuracy
+            }
+        )
+
+    def calculate_profiles(
+        self,
+        profiles: Sequence[PatientProfile],
+        distribution: MacroDistribution = MacroDistribution()
+    ) -> CohortPlan:
+        """Atajo para una lista de PatientProfile"""
+        return self.calculate(
+            age=[p.age for p in profiles],
+            weight=[p.weight for p in profiles],
+            height=[p.height for p in profiles],
+            gender=[p.gender for p in profiles],
+            activity_level=[p.activity_level for p in profiles],
+            goal=[p.goal for p in profiles],
+            is_pregnant=[p.is_pregnant for p in profiles],
+            is_lactating=[p.is_lactating for p in profiles],
+            distribution=distribution
+        )
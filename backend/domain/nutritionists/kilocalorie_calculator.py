@@ -7,7 +7,9 @@ from enum import Enum
 from dataclasses import dataclass
 from datetime import datetime
 
-from ..foods.equivalences import EquivalenceGroup, SMAE_GROUP_STANDARDS
+from ..foods.equivalences import EquivalenceGroup
+from ..foods.smae_table import SMAE_TABLE
+from ..foods.equivalents_solver import get_equivalents_solver
 
 class ActivityLevel(str, Enum):
     """Niveles de actividad física"""
@@ -85,6 +87,19 @@ class KilocalorieCalculator:
         NutritionalGoal.GANAR_MODERADO: 0.15
     }
     
+    # Orden de prioridad para distribuir equivalentes (básicos primero)
+    EQUIVALENTS_PRIORITY = (
+        EquivalenceGroup.VERDURAS,           # Base de vitaminas/minerales
+        EquivalenceGroup.FRUTAS,             # Vitaminas y fibra
+        EquivalenceGroup.CEREALES,           # Carbohidratos base
+        EquivalenceGroup.AOA_BAJO_GRASA,     # Proteína principal
+        EquivalenceGroup.LECHE_DESCREMADA,   # Calcio y proteína
+        EquivalenceGroup.LEGUMINOSAS,        # Proteína vegetal y fibra
+        EquivalenceGroup.GRASAS_SIN_PROTEINA, # Ácidos grasos esenciales
+        EquivalenceGroup.AOA_MODERADA_GRASA, # Proteína adicional
+        EquivalenceGroup.AZUCARES_SIN_GRASA  # Energía adicional si necesaria
+    )
+    
     def calculate_bmr(self, profile: PatientProfile) -> float:
         """
         Calcula la Tasa Metabólica Basal usando ecuación de Mifflin-St Jeor
@@ -148,28 +163,15 @@ class KilocalorieCalculator:
         remaining_carbs = macro_targets["carbs_grams"]
         remaining_fat = macro_targets["fat_grams"]
         
-        # Orden de prioridad (básicos primero)
-        priority_order = [
-            EquivalenceGroup.VERDURAS,           # Base de vitaminas/minerales
-            EquivalenceGroup.FRUTAS,             # Vitaminas y fibra
-            EquivalenceGroup.CEREALES,           # Carbohidratos base
-            EquivalenceGroup.AOA_BAJO_GRASA,     # Proteína principal
-            EquivalenceGroup.LECHE_DESCREMADA,   # Calcio y proteína
-            EquivalenceGroup.LEGUMINOSAS,        # Proteína vegetal y fibra
-            EquivalenceGroup.GRASAS_SIN_PROTEINA, # Ácidos grasos esenciales
-            EquivalenceGroup.AOA_MODERADA_GRASA, # Proteína adicional
-            EquivalenceGroup.AZUCARES_SIN_GRASA  # Energía adicional si necesaria
-        ]
-        
-        for group in priority_order:
-            if group not in SMAE_GROUP_STANDARDS:
+        for group in self.EQUIVALENTS_PRIORITY:
+            if group not in SMAE_TABLE:
                 continue
                 
-            standard = SMAE_GROUP_STANDARDS[group]
+            standard = SMAE_TABLE.row(group)
             
             # Calcular equivalentes necesarios basado en recomendaciones mínimas
-            min_equivalents = standard.get("min_daily", 0)
-            max_equivalents = standard.get("max_daily", 10)
+            min_equivalents = standard.min_daily
+            max_equivalents = standard.max_daily
             
             # Ajustar según necesidades nutricionales restantes
             if group == EquivalenceGroup.VERDURAS:
@@ -179,13 +181,13 @@ class KilocalorieCalculator:
             elif group == EquivalenceGroup.CEREALES:
                 # Basado en carbohidratos restantes
                 carbs_needed = remaining_carbs
-                carbs_per_equiv = standard["carbs"]
+                carbs_per_equiv = standard.carbs
                 cereales_needed = carbs_needed * 0.6 / carbs_per_equiv  # 60% de carbs de cereales
                 target_equivalents = max(min_equivalents, min(cereales_needed, max_equivalents))
             elif group == EquivalenceGroup.AOA_BAJO_GRASA:
                 # Basado en proteína restante
                 protein_needed = remaining_protein
-                protein_per_equiv = standard["protein"]
+                protein_per_equiv = standard.protein
                 protein_needed_equiv = protein_needed * 0.5 / protein_per_equiv  # 50% de proteína animal
                 target_equivalents = max(min_equivalents, min(protein_needed_equiv, max_equivalents))
             else:
@@ -195,10 +197,10 @@ class KilocalorieCalculator:
             target_equivalents = round(target_equivalents, 1)
             
             if target_equivalents > 0:
-                calories_contrib = target_equivalents * standard["calories"]
-                protein_contrib = target_equivalents * standard["protein"]
-                carbs_contrib = target_equivalents * standard["carbs"]
-                fat_contrib = target_equivalents * standard["fat"]
+                calories_contrib = target_equivalents * standard.calories
+                protein_contrib = target_equivalents * standard.protein
+                carbs_contrib = target_equivalents * standard.carbs
+                fat_contrib = target_equivalents * standard.fat
                 
                 # Verificar que no excedamos los límites
                 if calories_contrib <= remaining_calories:
@@ -209,7 +211,7 @@ class KilocalorieCalculator:
                         protein_grams=protein_contrib,
                         carbs_grams=carbs_contrib,
                         fat_grams=fat_contrib,
-                        notes=f"Aporta {standard['description']}"
+                        notes=f"Aporta {standard.description}"
                     )
                     prescriptions.append(prescription)
                     
@@ -220,13 +222,59 @@ class KilocalorieCalculator:
         
         return prescriptions
     
+    def optimize_equivalents(
+        self,
+        total_calories: float,
+        macro_targets: Dict[str, float],
+        profile: Optional[PatientProfile] = None
+    ) -> List[EquivalentsPrescription]:
+        """
+        Distribuye calorías en equivalentes SMAE minimizando el error de
+        calorías y macros (ver EquivalentsSolver), en lugar del orden fijo
+        de prioridades de distribute_to_equivalents
+        """
+        conditions = []
+        if profile is not None:
+            conditions = [
+                name for name in ("is_pregnant", "is_lactating", "has_diabetes", "has_hypertension")
+                if getattr(profile, name)
+            ]
+        solution = get_equivalents_solver().solve(
+            self.EQUIVALENTS_PRIORITY,
+            total_calories,
+            macro_targets["protein_grams"],
+            macro_targets["carbs_grams"],
+            macro_targets["fat_grams"],
+            conditions=conditions
+        )
+        
+        prescriptions = []
+        for group, equivalents in solution.equivalents:
+            if equivalents <= 0:
+                continue
+            standard = SMAE_TABLE.row(group)
+            prescriptions.append(EquivalentsPrescription(
+                group=group,
+                daily_equivalents=equivalents,
+                calories_contribution=equivalents * standard.calories,
+                protein_grams=equivalents * standard.protein,
+                carbs_grams=equivalents * standard.carbs,
+                fat_grams=equivalents * standard.fat,
+                notes=f"Aporta {standard.description}"
+            ))
+        return prescriptions
+    
     def create_nutrition_plan(
         self, 
         profile: PatientProfile, 
-        macro_distribution: MacroDistribution = MacroDistribution()
+        macro_distribution: MacroDistribution = MacroDistribution(),
+        optimize_equivalents: bool = False
     ) -> Dict:
         """
         Crea un plan nutricional completo
+        
+        Con optimize_equivalents=True los equivalentes se eligen con el solver
+        de mínimo error en lugar de la distribución por prioridades.
         """
         # Cálculos base
         bmr = self.calculate_bmr(profile)
@@ -234,7 +282,10 @@ class KilocalorieCalculator:
         macros = self.calculate_macros(tdee, macro_distribution)
         
         # Distribución en equivalentes
-        equivalents = self.distribute_to_equivalents(tdee, macros)
+        if optimize_equivalents:
+            equivalents = self.optimize_equivalents(tdee, macros, profile)
+        else:
+            equivalents = self.distribute_to_equivalents(tdee, macros)
         
         # Resumen nutricional
         total_equiv_calories = sum(eq.calories_contribution for eq in equivalents)
@@ -253,7 +304,7 @@ class KilocalorieCalculator:
             "equivalents_prescription": [
                 {
                     "group": eq.group.value,
-                    "group_name": SMAE_GROUP_STANDARDS[eq.group]["name"],
+                    "group_name": SMAE_TABLE.row(eq.group).name,
                     "daily_equivalents": eq.daily_equivalents,
                     "calories": eq.calories_contribution,
                     "protein_g": eq.protein_grams,
@@ -271,6 +322,7 @@ class KilocalorieCalculator:
                 "calories_accuracy": round((total_equiv_calories / tdee) * 100, 1),
                 "protein_accuracy": round((total_equiv_protein / macros["protein_grams"]) * 100, 1)
             },
+            "distribution_method": "optimized" if optimize_equivalents else "priority",
             "created_at": datetime.utcnow().isoformat(),
             "nutritionist_notes": {
                 "activity_level": f"Nivel de actividad: {profile.activity_level.value}",
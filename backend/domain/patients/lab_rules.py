@@ -0,0 +1,375 @@
+"""
+Laboratory Interpretation Rules - Declarative rule table for lab results
+
+Each rule covers one value band of one parameter and carries the severity,
+clinical meaning and advice that ``LaboratoryData.generate_ai_interpretation``
+reports. The table is compiled once into NumPy arrays so that a whole batch of
+records (one column per record) is evaluated with a few array comparisons.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from domain.patients.laboratory import Severity
+
+
+@dataclass(frozen=True)
+class LabParameter:
+    """A measurable lab parameter and the names it appears under in documents"""
+    key: str  # LaboratoryData attribute
+    label: str  # Name reported by text extraction
+    unit: str
+    aliases: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class LabRule:
+    """
+    Interpretation for values of ``parameter`` within ``[low, high)``
+
+    ``low_inclusive=False`` turns the lower bound into ``> low``. Bands of the
+    same parameter must not overlap: at most one rule fires per parameter.
+    """
+    parameter: str
+    label: str
+    normal_range: str
+    severity: Severity
+    clinical_meaning: str
+    low: Optional[float] = None
+    high: Optional[float] = None
+    low_inclusive: bool = True
+    diagnoses: Tuple[str, ...] = ()
+    diet_adjustments: Tuple[str, ...] = ()
+    additional_tests: Tuple[str, ...] = ()
+    critical_alerts: Tuple[str, ...] = ()
+
+
+LAB_PARAMETERS: Tuple[LabParameter, ...] = (
+    LabParameter("fasting_glucose_mgdl", "Glucosa", "mg/dL",
+                 ("glucosa en ayunas", "glucosa", "glucemia")),
+    LabParameter("postprandial_glucose_mgdl", "Glucosa Postprandial", "mg/dL",
+                 ("glucosa postprandial", "glucosa post prandial")),
+    LabParameter("hemoglobin_a1c_pct", "Hemoglobina A1c", "%",
+                 ("hemoglobina glucosilada", "hemoglobina glicosilada", "hemoglobina a1c", "hba1c")),
+    LabParameter("fasting_insulin_uUI_ml", "Insulina", "µUI/mL", ("insulina basal", "insulina")),
+    LabParameter("total_cholesterol_mgdl", "Colesterol Total", "mg/dL", ("colesterol total",)),
+    LabParameter("ldl_cholesterol_mgdl", "Colesterol LDL", "mg/dL", ("colesterol ldl", "c-ldl", "ldl")),
+    LabParameter("hdl_cholesterol_mgdl", "Colesterol HDL", "mg/dL", ("colesterol hdl", "c-hdl", "hdl")),
+    LabParameter("triglycerides_mgdl", "Triglicéridos", "mg/dL", ("triglicéridos",)),
+    LabParameter("creatinine_mgdl", "Creatinina", "mg/dL", ("creatinina",)),
+    LabParameter("urea_mgdl", "Urea", "mg/dL", ("urea",)),
+    LabParameter("uric_acid_mgdl", "Ácido Úrico", "mg/dL", ("ácido úrico",)),
+    LabParameter("alt_tgp_UI_l", "ALT/TGP", "UI/L", ("alt/tgp", "tgp", "alt")),
+    LabParameter("ast_tgo_UI_l", "AST/TGO", "UI/L", ("ast/tgo", "tgo", "ast")),
+    LabParameter("tsh_uUI_ml", "TSH", "µUI/mL", ("tsh",)),
+    LabParameter("hemoglobin_g_dl", "Hemoglobina", "g/dL", ("hemoglobina",)),
+    LabParameter("vitamin_d_ng_ml", "Vitamina D", "ng/mL", ("25-oh vitamina d", "vitamina d")),
+    LabParameter("ferritin_ng_ml", "Ferritina", "ng/mL", ("ferritina",)),
+)
+
+LAB_RULES: Tuple[LabRule, ...] = (
+    # Glycemic values
+    LabRule(
+        "fasting_glucose_mgdl", "Glucosa en ayunas", "70-99 mg/dL", Severity.SEVERE,
+        "Posible diabetes mellitus", low=126,
+        diagnoses=("Diabetes mellitus tipo 2",),
+        diet_adjustments=("Reducir consumo de carbohidratos simples", "Aumentar fibra soluble"),
+    ),
+    LabRule(
+        "fasting_glucose_mgdl", "Glucosa en ayunas", "70-99 mg/dL", Severity.MILD,
+        "Prediabetes - Glucosa alterada en ayunas", low=100, high=126,
+        diagnoses=("Prediabetes",),
+        additional_tests=("Hemoglobina glucosilada (HbA1c)",),
+    ),
+    LabRule(
+        "hemoglobin_a1c_pct", "Hemoglobina A1c", "<5.7%", Severity.SEVERE,
+        "Diabetes mellitus establecida", low=6.5,
+        critical_alerts=("HbA1c elevada - Requiere manejo médico urgente",),
+    ),
+    LabRule(
+        "hemoglobin_a1c_pct", "Hemoglobina A1c", "<5.7%", Severity.MILD,
+        "Prediabetes - HbA1c en rango de riesgo", low=5.7, high=6.5,
+        diagnoses=("Prediabetes",),
+        diet_adjustments=("Reducir consumo de carbohidratos simples",),
+    ),
+    # Lipid profile
+    LabRule(
+        "total_cholesterol_mgdl", "Colesterol total", "<200 mg/dL", Severity.MODERATE,
+        "Hipercolesterolemia", low=240,
+        diet_adjustments=("Reducir grasas saturadas y trans", "Aumentar omega-3 (pescado, nueces)"),
+    ),
+    LabRule(
+        "ldl_cholesterol_mgdl", "LDL (colesterol malo)", "<100 mg/dL", Severity.MODERATE,
+        "LDL elevado - Riesgo cardiovascular", low=160,
+    ),
+    LabRule(
+        "hdl_cholesterol_mgdl", "HDL (colesterol bueno)", ">40 mg/dL (H), >50 mg/dL (M)", Severity.MILD,
+        "HDL bajo - Riesgo cardiovascular", high=40,
+        diet_adjustments=("Aumentar ejercicio aeróbico",),
+    ),
+    LabRule(
+        "triglycerides_mgdl", "Triglicéridos", "<150 mg/dL", Severity.MODERATE,
+        "Hipertrigliceridemia", low=200,
+        diet_adjustments=("Reducir azúcares simples y alcohol", "Aumentar ejercicio aeróbico"),
+    ),
+    # Renal function
+    LabRule(
+        "creatinine_mgdl", "Creatinina", "0.6-1.2 mg/dL", Severity.MODERATE,
+        "Posible deterioro de función renal", low=1.5,
+        critical_alerts=("Creatinina elevada - Evaluar función renal",),
+        additional_tests=("Depuración de creatinina en orina de 24h",),
+    ),
+    LabRule(
+        "uric_acid_mgdl", "Ácido úrico", "3.5-7.0 mg/dL", Severity.MILD,
+        "Hiperuricemia", low=7.0, low_inclusive=False,
+        diet_adjustments=("Reducir carnes rojas, vísceras y bebidas azucaradas",),
+    ),
+    # Liver function
+    LabRule(
+        "alt_tgp_UI_l", "ALT/TGP", "7-40 UI/L", Severity.MILD,
+        "Posible daño hepático o hígado graso", low=40, high=80, low_inclusive=False,
+        diet_adjustments=("Evitar alcohol completamente", "Reducir grasas saturadas"),
+    ),
+    LabRule(
+        "alt_tgp_UI_l", "ALT/TGP", "7-40 UI/L", Severity.MODERATE,
+        "Posible daño hepático o hígado graso", low=80,
+        diet_adjustments=("Evitar alcohol completamente", "Reducir grasas saturadas"),
+    ),
+    # Thyroid
+    LabRule(
+        "tsh_uUI_ml", "TSH", "0.4-4.5 µUI/mL", Severity.MILD,
+        "Posible hipotiroidismo", low=4.5, low_inclusive=False,
+        additional_tests=("Perfil tiroideo completo (T3, T4 libre)",),
+    ),
+    # Anemia
+    LabRule(
+        "hemoglobin_g_dl", "Hemoglobina", "12-16 g/dL (mujeres), 14-18 g/dL (hombres)", Severity.MODERATE,
+        "Anemia", high=12,  # For women
+        diet_adjustments=("Aumentar hierro (carnes rojas magras, legumbres)",
+                          "Vitamina C para mejorar absorción de hierro"),
+        additional_tests=("Perfil de hierro sérico",),
+    ),
+    # Vitamins
+    LabRule(
+        "vitamin_d_ng_ml", "Vitamina D", "30-100 ng/mL", Severity.MILD,
+        "Deficiencia de vitamina D", high=20,
+        diet_adjustments=("Aumentar exposición solar 15-20 min diarios",
+                          "Alimentos fortificados con vitamina D"),
+    ),
+)
+
+
+def _empty_interpretation() -> Dict[str, List[Any]]:
+    return {
+        "out_of_range_values": [],
+        "suggested_diagnoses": [],
+        "diet_adjustments": [],
+        "additional_tests": [],
+        "critical_alerts": []
+    }
+
+
+class LabRuleEngine:
+    """
+    Rule table compiled into arrays for batch evaluation
+
+    Values are passed as a ``(len(parameters), n_records)`` float matrix with
+    ``NaN`` for missing results. As in the original hand-written checks, a
+    value of ``0`` is treated as not reported.
+    """
+
+    def __init__(self, rules: Sequence[LabRule]):
+        self.rules = tuple(rules)
+        self.parameters: Tuple[str, ...] = tuple(dict.fromkeys(rule.parameter for rule in self.rules))
+        self.parameter_index = {name: i for i, name in enumerate(self.parameters)}
+        self._check_bands()
+
+        self._rule_rows = np.array([self.parameter_index[r.parameter] for r in self.rules], dtype=np.intp)
+        self._low = np.array([-np.inf if r.low is None else r.low for r in self.rules], dtype=float)[:, None]
+        self._high = np.array([np.inf if r.high is None else r.high for r in self.rules], dtype=float)[:, None]
+        self._low_inclusive = np.array([r.low_inclusive for r in self.rules])[:, None]
+
+        self._entries = [(r.label, r.normal_range, r.severity.value, r.clinical_meaning) for r in self.rules]
+
+    def _check_bands(self) -> None:
+        by_parameter: Dict[str, List[LabRule]] = {}
+        for rule in self.rules:
+            by_parameter.setdefault(rule.parameter, []).append(rule)
+        for parameter, rules in by_parameter.items():
+            bands = sorted(
+                (-np.inf if r.low is None else r.low, np.inf if r.high is None else r.high) for r in rules
+            )
+            for (_, previous_high), (low, _) in zip(bands, bands[1:]):
+                if low < previous_high:
+                    raise ValueError(f"Overlapping rule bands for {parameter}")
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def values_matrix(self, records: Iterable[Any]) -> np.ndarray:
+        """Build the value matrix from objects exposing the parameter attributes"""
+        rows = [[getattr(record, name, None) for name in self.parameters] for record in records]
+        if not rows:
+            return np.empty((len(self.parameters), 0))
+        return np.array(rows, dtype=float).T
+
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+        """Boolean matrix ``(len(rules), n_records)`` of rules that fire"""
+        selected = values[self._rule_rows]
+        with np.errstate(invalid="ignore"):
+            reported = ~np.isnan(selected) & (selected != 0)
+            above_low = np.where(self._low_inclusive, selected >= self._low, selected > self._low)
+            return reported & above_low & (selected < self._high)
+
+    def interpret_matrix(self, values: np.ndarray) -> List[Dict[str, List[Any]]]:
+        """Interpretation dictionary for every column of ``values``"""
+        fired = self.evaluate(values)
+        results = [_empty_interpretation() for _ in range(values.shape[1])]
+
+        # Column-major walk keeps each record's entries in rule-table order
+        records, rule_ids = np.nonzero(fired.T)
+        selected = values[self._rule_rows]
+        for record, rule_id in zip(records.tolist(), rule_ids.tolist()):
+            rule = self.rules[rule_id]
+            label, normal_range, severity, clinical_meaning = self._entries[rule_id]
+            interpretation = results[record]
+            interpretation["out_of_range_values"].append({
+                "parameter": label,
+                "value": float(selected[rule_id, record]),
+                "normal_range": normal_range,
+                "severity": severity,
+                "clinical_meaning": clinical_meaning,
+            })
+            interpretation["suggested_diagnoses"].extend(rule.diagnoses)
+            interpretation["diet_adjustments"].extend(rule.diet_adjustments)
+            interpretation["additional_tests"].extend(rule.additional_tests)
+            interpretation["critical_alerts"].extend(rule.critical_alerts)
+        return results
+
+    def interpret(self, records: Iterable[Any]) -> List[Dict[str, List[Any]]]:
+        return self.interpret_matrix(self.values_matrix(records))
+
+    def interpret_record(self, record: Any) -> Dict[str, List[Any]]:
+        return self.interpret([record])[0]
+
+
+# ----------------------------------------------------------------------
+# Clinical text scanning
+# ----------------------------------------------------------------------
+
+def _accent_table() -> Dict[int, str]:
+    table = {}
+    for code in range(0xC0, 0x250):
+        decomposed = unicodedata.normalize("NFKD", chr(code))
+        base = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+        if base != chr(code) and len(base) == 1:
+            table[code] = base
+    return table
+
+
+_ACCENT_TABLE = _accent_table()
+_ACCENTED = re.compile("[" + "".join(map(chr, _ACCENT_TABLE)) + "]")
+
+
+def fold_accents(text: str) -> str:
+    """Lowercase and strip accents (``Triglicéridos`` -> ``trigliceridos``)"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    # Accented characters are sparse: substituting only those is much faster
+    # than ``str.translate`` over the whole document
+    return _ACCENTED.sub(lambda match: _ACCENT_TABLE[ord(match.group())], text)
+
+
+_SPACE = " "
+
+
+def _trie_pattern(aliases: Iterable[str]) -> str:
+    """
+    Regex alternation shaped as a prefix trie
+
+    ``re`` tries alternatives one by one at every position of the text; a
+    trie shares common prefixes ("colesterol total|ldl|hdl") so most
+    positions are rejected after one character. Greedy optional groups keep
+    the longest alias when one is a prefix of another.
+    """
+    trie: Dict[str, Any] = {}
+    for alias in aliases:
+        node = trie
+        for char in _SPACE.join(alias.split()):
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict[str, Any]) -> str:
+        terminal = "" in node
+        branches = []
+        for char in sorted(k for k in node if k):
+            token = r"[^\S\n]+" if char == _SPACE else re.escape(char)
+            branches.append(token + render(node[char]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            body = (body if len(branches) > 1 else "(?:" + body + ")") + "?"
+        return body
+
+    return render(trie)
+
+
+# Tiempo de toma ("2h", "30 min") entre el parámetro y su valor, como en
+# "Glucosa postprandial 2h: 180"; nunca es el valor.
+_TIME_QUALIFIER = r"\d+(?:[.,]\d+)?[^\S\n]*(?:h|hrs?|horas?|min|minutos?)(?!\w)"
+
+
+def _compile_value_scanner(parameters: Sequence[LabParameter]) -> Tuple["re.Pattern", Dict[str, LabParameter]]:
+    by_alias: Dict[str, LabParameter] = {}
+    for parameter in parameters:
+        for alias in parameter.aliases:
+            by_alias.setdefault(" ".join(fold_accents(alias).split()), parameter)
+    pattern = re.compile(
+        rf"(?<![\w/-])(?P<alias>{_trie_pattern(by_alias)})(?![\w/-])"
+        r"[^\S\n]*(?:\([^)\n]{0,20}\))?"
+        rf"(?:[^\S\n]*{_TIME_QUALIFIER})?[^\S\n]*[:=]?[^\S\n]*"
+        r"(?P<value>\d+(?:[.,]\d+)?)"
+        rf"(?![.,]?\d|[^\S\n]*(?:h|hrs?|horas?|min|minutos?)(?!\w))"
+    )
+    return pattern, by_alias
+
+
+_VALUE_SCANNER, _PARAMETER_BY_ALIAS = _compile_value_scanner(LAB_PARAMETERS)
+
+
+def scan_lab_values(text: str) -> List[Dict[str, Any]]:
+    """
+    Find ``<parameter name> [:] <number>`` occurrences for every parameter
+
+    One pass of a single precompiled pattern; the first value found for each
+    parameter is kept. Results follow the order of ``LAB_PARAMETERS``.
+    """
+    found: Dict[str, Tuple[LabParameter, float]] = {}
+    for match in _VALUE_SCANNER.finditer(fold_accents(text)):
+        parameter = _PARAMETER_BY_ALIAS[" ".join(match.group("alias").split())]
+        if parameter.key not in found:
+            found[parameter.key] = (parameter, float(match.group("value").replace(",", ".")))
+            if len(found) == len(LAB_PARAMETERS):
+                break
+
+    return [
+        {"parameter": parameter.label, "value": value, "unit": parameter.unit}
+        for parameter, value in (found[p.key] for p in LAB_PARAMETERS if p.key in found)
+    ]
+
+
+_engine: Optional[LabRuleEngine] = None
+
+
+def get_lab_rule_engine() -> LabRuleEngine:
+    """Compiled engine for ``LAB_RULES`` (built on first use)"""
+    global _engine
+    if _engine is None:
+        _engine = LabRuleEngine(LAB_RULES)
+    return _engine
@@ -35,6 +35,15 @@ class Trend(str, Enum):
     STABLE = "stable"
 
 
+class OcrStatus(str, Enum):
+    """Background OCR processing state of a clinical file"""
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    SKIPPED = "skipped"  # No OCR requested or OCR engine not installed
+
+
 class LaboratoryData(SQLModel, table=True):
     """
     Complete laboratory data model based on Mexican clinical standards
@@ -134,132 +143,13 @@ class LaboratoryData(SQLModel, table=True):
         """
         Generate AI interpretation of lab results
         This would call an AI service in production
+
+        Ranges, severities and advice come from the rule table in
+        ``domain.patients.lab_rules``
         """
-        interpretation = {
-            "out_of_range_values": [],
-            "suggested_diagnoses": [],
-            "diet_adjustments": [],
-            "additional_tests": [],
-            "critical_alerts": []
-        }
-
-        # Check glycemic values
-        if self.fasting_glucose_mgdl:
-            if self.fasting_glucose_mgdl >= 126:
-                interpretation["out_of_range_values"].append({
-                    "parameter": "Glucosa en ayunas",
-                    "value": self.fasting_glucose_mgdl,
-                    "normal_range": "70-99 mg/dL",
-                    "severity": Severity.SEVERE.value,
-                    "clinical_meaning": "Posible diabetes mellitus"
-                })
-                interpretation["suggested_diagnoses"].append("Diabetes mellitus tipo 2")
-                interpretation["diet_adjustments"].append("Reducir consumo de carbohidratos simples")
-                interpretation["diet_adjustments"].append("Aumentar fibra soluble")
-            elif self.fasting_glucose_mgdl >= 100:
-                interpretation["out_of_range_values"].append({
-                    "parameter": "Glucosa en ayunas",
-                    "value": self.fasting_glucose_mgdl,
-                    "normal_range": "70-99 mg/dL",
-                    "severity": Severity.MILD.value,
-                    "clinical_meaning": "Prediabetes - Glucosa alterada en ayunas"
-                })
-                interpretation["suggested_diagnoses"].append("Prediabetes")
-                interpretation["additional_tests"].append("Hemoglobina glucosilada (HbA1c)")
-
-        # Check HbA1c
-        if self.hemoglobin_a1c_pct:
-            if self.hemoglobin_a1c_pct >= 6.5:
-                interpretation["out_of_range_values"].append({
-                    "parameter": "Hemoglobina A1c",
-                    "value": self.hemoglobin_a1c_pct,
-                    "normal_range": "<5.7%",
-                    "severity": Severity.SEVERE.value,
-                    "clinical_meaning": "Diabetes mellitus establecida"
-                })
-                interpretation["critical_alerts"].append("HbA1c elevada - Requiere manejo médico urgente")
-
-        # Check lipid profile
-        if self.total_cholesterol_mgdl and self.total_cholesterol_mgdl >= 240:
-            interpretation["out_of_range_values"].append({
-                "parameter": "Colesterol total",
-                "value": self.total_cholesterol_mgdl,
-                "normal_range": "<200 mg/dL",
-                "severity": Severity.MODERATE.value,
-                "clinical_meaning": "Hipercolesterolemia"
-            })
-            interpretation["diet_adjustments"].append("Reducir grasas saturadas y trans")
-            interpretation["diet_adjustments"].append("Aumentar omega-3 (pescado, nueces)")
-
-        if self.ldl_cholesterol_mgdl and self.ldl_cholesterol_mgdl >= 160:
-            interpretation["out_of_range_values"].append({
-                "parameter": "LDL (colesterol malo)",
-                "value": self.ldl_cholesterol_mgdl,
-                "normal_range": "<100 mg/dL",
-                "severity": Severity.MODERATE.value,
-                "clinical_meaning": "LDL elevado - Riesgo cardiovascular"
-            })
-
-        if self.triglycerides_mgdl and self.triglycerides_mgdl >= 200:
-            interpretation["out_of_range_values"].append({
-                "parameter": "Triglicéridos",
-                "value": self.triglycerides_mgdl,
-                "normal_range": "<150 mg/dL",
-                "severity": Severity.MODERATE.value,
-                "clinical_meaning": "Hipertrigliceridemia"
-            })
-            interpretation["diet_adjustments"].append("Reducir azúcares simples y alcohol")
-            interpretation["diet_adjustments"].append("Aumentar ejercicio aeróbico")
-
-        # Check renal function
-        if self.creatinine_mgdl and self.creatinine_mgdl >= 1.5:
-            interpretation["out_of_range_values"].append({
-                "parameter": "Creatinina",
-                "value": self.creatinine_mgdl,
-                "normal_range": "0.6-1.2 mg/dL",
-                "severity": Severity.MODERATE.value,
-                "clinical_meaning": "Posible deterioro de función renal"
-            })
-            interpretation["critical_alerts"].append("Creatinina elevada - Evaluar función renal")
-            interpretation["additional_tests"].append("Depuración de creatinina en orina de 24h")
-
-        # Check liver function
-        if self.alt_tgp_UI_l and self.alt_tgp_UI_l > 40:
-            interpretation["out_of_range_values"].append({
-                "parameter": "ALT/TGP",
-                "value": self.alt_tgp_UI_l,
-                "normal_range": "7-40 UI/L",
-                "severity": Severity.MILD.value if self.alt_tgp_UI_l < 80 else Severity.MODERATE.value,
-                "clinical_meaning": "Posible daño hepático o hígado graso"
-            })
-            interpretation["diet_adjustments"].append("Evitar alcohol completamente")
-            interpretation["diet_adjustments"].append("Reducir grasas saturadas")
-
-        # Check anemia
-        if self.hemoglobin_g_dl:
-            if self.hemoglobin_g_dl < 12:  # For women
-                interpretation["out_of_range_values"].append({
-                    "parameter": "Hemoglobina",
-                    "value": self.hemoglobin_g_dl,
-                    "normal_range": "12-16 g/dL (mujeres), 14-18 g/dL (hombres)",
-                    "severity": Severity.MODERATE.value,
-                    "clinical_meaning": "Anemia"
-                })
-                interpretation["diet_adjustments"].append("Aumentar hierro (carnes rojas magras, legumbres)")
-                interpretation["diet_adjustments"].append("Vitamina C para mejorar absorción de hierro")
-                interpretation["additional_tests"].append("Perfil de hierro sérico")
-
-        # Check vitamin D
-        if self.vitamin_d_ng_ml and self.vitamin_d_ng_ml < 20:
-            interpretation["out_of_range_values"].append({
-                "parameter": "Vitamina D",
-                "value": self.vitamin_d_ng_ml,
-                "normal_range": "30-100 ng/mL",
-                "severity": Severity.MILD.value,
-                "clinical_meaning": "Deficiencia de vitamina D"
-            })
-            interpretation["diet_adjustments"].append("Aumentar exposición solar 15-20 min diarios")
-            interpretation["diet_adjustments"].append("Alimentos fortificados con vitamina D")
+        from domain.patients.lab_rules import get_lab_rule_engine
+
+        interpretation = get_lab_rule_engine().interpret_record(self)
 
         self.ai_interpretation = interpretation
         return interpretation
@@ -313,6 +203,12 @@ class ClinicalFile(SQLModel, table=True):
     # OCR & AI extraction
     ocr_processed: bool = Field(default=False)
     extracted_data: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    ocr_status: str = Field(default=OcrStatus.SKIPPED.value, max_length=20)
+    ocr_pages_total: Optional[int] = Field(default=None)
+    ocr_pages_done: int = Field(default=0)
+    ocr_error: Optional[str] = Field(default=None, max_length=500)
+    ocr_owner: Optional[str] = Field(default=None, max_length=100)  # OCR pipeline that claimed it
+    ocr_heartbeat_at: Optional[datetime] = Field(default=None)
 
     # Tagging for quick search
     tags: Optional[List[str]] = Field(default=None, sa_column=Column(JSON))
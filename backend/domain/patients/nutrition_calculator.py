@@ -8,7 +8,9 @@ from datetime import datetime, date
 import math
 
 from .models import Patient, Gender, ActivityLevel, AnthropometricRecord
-from ..foods.equivalences import EquivalenceGroup, SMAE_GROUP_STANDARDS
+from ..foods.equivalences import EquivalenceGroup
+from ..foods.smae_table import SMAE_TABLE
+from ..foods.equivalents_solver import get_equivalents_solver
 
 class NutritionalGoal(str, Enum):
     WEIGHT_LOSS = "weight_loss"
@@ -205,16 +207,19 @@ class EquivalenceDistributor:
         equivalents_by_group = {}
         
         for group, percentage in pattern.items():
+            # Grupos del patrón sin estándar SMAE (p. ej. leche semidescremada)
+            if group not in SMAE_TABLE:
+                continue
+            standard = SMAE_TABLE.row(group)
             calories_for_group = self.target_calories * percentage
-            standard_calories = SMAE_GROUP_STANDARDS[group]["calories"]
-            equivalents = calories_for_group / standard_calories
+            equivalents = calories_for_group / standard.calories
             
             # Redondear a medios equivalentes (0.5, 1.0, 1.5, etc.)
             equivalents = round(equivalents * 2) / 2
             
             # Mínimos y máximos de seguridad
-            min_equiv = SMAE_GROUP_STANDARDS[group].get("min_daily", 0)
-            max_equiv = SMAE_GROUP_STANDARDS[group].get("max_daily", 20)
+            min_equiv = standard.min_daily
+            max_equiv = standard.max_daily
             
             equivalents = max(min_equiv, min(equivalents, max_equiv))
             
@@ -223,19 +228,45 @@ class EquivalenceDistributor:
         
         return equivalents_by_group
     
+    def distribute_optimal(self, macros: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        Convertir calorías objetivo a equivalentes minimizando el error de
+        calorías y macronutrientes
+        
+        Usa los grupos del patrón del objetivo, y el patrón como distribución
+        de referencia. ``macros`` es el resultado de
+        NutritionalCalculator.calculate_macronutrients; si se omite se usa la
+        distribución de macros del objetivo.
+        """
+        pattern = self.DISTRIBUTION_PATTERNS.get(
+            self.goal,
+            self.DISTRIBUTION_PATTERNS[NutritionalGoal.WEIGHT_MAINTENANCE]
+        )
+        if macros is None:
+            split = NutritionalCalculator.MACRO_DISTRIBUTIONS.get(
+                self.goal,
+                NutritionalCalculator.MACRO_DISTRIBUTIONS[NutritionalGoal.WEIGHT_MAINTENANCE]
+            )
+            macros = {
+                "protein_g": self.target_calories * split["protein"] / 4,
+                "carbs_g": self.target_calories * split["carbs"] / 4,
+                "fat_g": self.target_calories * split["fat"] / 9
+            }
+        
+        solution = get_equivalents_solver().solve(
+            tuple(group for group in pattern if group in SMAE_TABLE),
+            self.target_calories,
+            macros["protein_g"],
+            macros["carbs_g"],
+            macros["fat_g"],
+            preference=pattern
+        )
+        return solution.as_dict()
+    
     def calculate_actual_calories(self, equivalents: Dict[str, float]) -> float:
         """Calcular calorías reales basadas en los equivalentes asignados"""
-        total_calories = 0
-        
-        for group_key, equiv_count in equivalents.items():
-            try:
-                group = EquivalenceGroup(group_key)
-                standard_calories = SMAE_GROUP_STANDARDS[group]["calories"]
-                total_calories += equiv_count * standard_calories
-            except ValueError:
-                continue  # Skip invalid groups
-                
-        return round(total_calories, 2)
+        # Grupos inválidos o sin estándar se ignoran
+        return round(SMAE_TABLE.calories_of(equivalents), 2)
     
     def get_distribution_summary(self, equivalents: Dict[str, float]) -> Dict[str, any]:
         """Obtener resumen completo de la distribución"""
@@ -251,21 +282,19 @@ class EquivalenceDistributor:
         
         # Detalles por grupo
         for group_key, equiv_count in equivalents.items():
-            try:
-                group = EquivalenceGroup(group_key)
-                standards = SMAE_GROUP_STANDARDS[group]
-                group_calories = equiv_count * standards["calories"]
-                
-                summary["daily_distribution"].append({
-                    "group": group_key,
-                    "group_name": standards["name"],
-                    "equivalents": equiv_count,
-                    "calories": round(group_calories, 2),
-                    "percentage": round((group_calories / actual_calories) * 100, 1) if actual_calories > 0 else 0,
-                    "color": standards["color"]
-                })
-            except ValueError:
+            if group_key not in SMAE_TABLE:
                 continue
+            standards = SMAE_TABLE.row(group_key)
+            group_calories = equiv_count * standards.calories
+            
+            summary["daily_distribution"].append({
+                "group": group_key,
+                "group_name": standards.name,
+                "equivalents": equiv_count,
+                "calories": round(group_calories, 2),
+                "percentage": round((group_calories / actual_calories) * 100, 1) if actual_calories > 0 else 0,
+                "color": standards.color
+            })
                 
         return summary
 
@@ -99,18 +99,9 @@ class NutritionalProfile(SQLModel, table=True):
     @property
     def calories_from_equivalents(self) -> float:
         """Calcular calorías reales basadas en equivalentes asignados"""
-        from ..foods.equivalences import EquivalenceGroup, SMAE_GROUP_STANDARDS
+        from ..foods.smae_table import SMAE_TABLE
         
-        total_calories = 0
-        for group_key, equiv_count in self.equivalents_distribution.items():
-            try:
-                group = EquivalenceGroup(group_key)
-                standard_calories = SMAE_GROUP_STANDARDS[group]["calories"]
-                total_calories += equiv_count * standard_calories
-            except ValueError:
-                continue
-        
-        return round(total_calories, 2)
+        return round(SMAE_TABLE.calories_of(self.equivalents_distribution), 2)
     
     @property 
     def adherence_tolerance(self) -> Dict[str, float]:
@@ -2,7 +2,7 @@
 Recipe and meal planning domain models
 """
 from sqlmodel import SQLModel, Field, Relationship, Column
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, ClassVar
 from datetime import datetime, date
 from enum import Enum
 from sqlalchemy import JSON
@@ -242,4 +242,127 @@ class RecipeRating(SQLModel, table=True):
     
     class Config:
         # Ensure one rating per user per recipe
-        table_args = ({"unique": ("recipe_id", "user_id")},)
\ No newline at end of file
+        table_args = ({"unique": ("recipe_id", "user_id")},)
+
+class RecipeRatingStats(SQLModel, table=True):
+    """
+    Rating aggregate per recipe, updated with every rating write
+
+    Keeps count, sum and the 1-5 histogram plus bounded lists with snapshots
+    of the most recent ratings and the most helpful comments, so rating stats
+    are read from one row regardless of how many ratings a recipe has.
+    """
+    __tablename__ = "recipe_rating_stats"
+
+    RECENT_SIZE: ClassVar[int] = 10
+    HELPFUL_SIZE: ClassVar[int] = 5
+
+    recipe_id: int = Field(foreign_key="recipes.id", primary_key=True)
+
+    rating_count: int = Field(default=0)
+    rating_sum: int = Field(default=0)
+    count_1: int = Field(default=0)
+    count_2: int = Field(default=0)
+    count_3: int = Field(default=0)
+    count_4: int = Field(default=0)
+    count_5: int = Field(default=0)
+
+    # Snapshots ordered by created_at desc / helpful_votes desc
+    recent_ratings: List[Dict[str, Any]] = Field(default_factory=list, sa_column=Column(JSON))
+    helpful_ratings: List[Dict[str, Any]] = Field(default_factory=list, sa_column=Column(JSON))
+
+    updated_at: Optional[datetime] = Field(default=None)
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    def distribution(self) -> Dict[str, int]:
+        return {str(stars): getattr(self, f"count_{stars}") for stars in (5, 4, 3, 2, 1)}
+
+    @staticmethod
+    def snapshot(rating: "RecipeRating") -> Dict[str, Any]:
+        return {
+            "id": rating.id,
+            "recipe_id": rating.recipe_id,
+            "user_id": rating.user_id,
+            "rating": rating.rating,
+            "comment": rating.comment,
+            "helpful_votes": rating.helpful_votes,
+            "created_at": rating.created_at.isoformat() if rating.created_at else None,
+            "updated_at": rating.updated_at.isoformat() if rating.updated_at else None,
+        }
+
+    @staticmethod
+    def _has_comment(snapshot: Dict[str, Any]) -> bool:
+        return bool(snapshot.get("comment") and snapshot["comment"].strip())
+
+    def _bucket(self, stars: int, delta: int) -> None:
+        setattr(self, f"count_{stars}", getattr(self, f"count_{stars}") + delta)
+
+    # JSON columns are not mutation-tracked: lists are always reassigned
+
+    def _without(self, entries: List[Dict[str, Any]], rating_id: int) -> List[Dict[str, Any]]:
+        return [entry for entry in entries if entry["id"] != rating_id]
+
+    def _offer_helpful(self, snapshot: Dict[str, Any]) -> None:
+        """Insert into the helpful list if it belongs in the top entries"""
+        if not self._has_comment(snapshot):
+            return
+        helpful = self._without(self.helpful_ratings or [], snapshot["id"])
+        if len(helpful) >= self.HELPFUL_SIZE and snapshot["helpful_votes"] <= helpful[-1]["helpful_votes"]:
+            self.helpful_ratings = helpful
+            return
+        position = len(helpful)
+        while position > 0 and helpful[position - 1]["helpful_votes"] < snapshot["helpful_votes"]:
+            position -= 1
+        helpful.insert(position, snapshot)
+        self.helpful_ratings = helpful[:self.HELPFUL_SIZE]
+
+    def _replace_recent(self, snapshot: Dict[str, Any]) -> None:
+        self.recent_ratings = [
+            snapshot if entry["id"] == snapshot["id"] else entry
+            for entry in self.recent_ratings or []
+        ]
+
+    def rating_added(self, rating: "RecipeRating") -> None:
+        snapshot = self.snapshot(rating)
+        self.rating_count += 1
+        self.rating_sum += rating.rating
+        self._bucket(rating.rating, 1)
+        self.recent_ratings = ([snapshot] + (self.recent_ratings or []))[:self.RECENT_SIZE]
+        self._offer_helpful(snapshot)
+
+    def rating_changed(self, rating: "RecipeRating", old_rating: int) -> bool:
+        """Apply an edit; returns True if the helpful list must be refilled"""
+        snapshot = self.snapshot(rating)
+        self.rating_sum += rating.rating - old_rating
+        self._bucket(old_rating, -1)
+        self._bucket(rating.rating, 1)
+        self._replace_recent(snapshot)
+
+        was_full = len(self.helpful_ratings or []) >= self.HELPFUL_SIZE
+        listed = any(entry["id"] == rating.id for entry in self.helpful_ratings or [])
+        self.helpful_ratings = self._without(self.helpful_ratings or [], rating.id)
+        self._offer_helpful(snapshot)
+        # A listed comment that was cleared may leave room for an unlisted one
+        return listed and was_full and not self._has_comment(snapshot)
+
+    def rating_removed(self, rating: "RecipeRating") -> Dict[str, bool]:
+        """Apply a delete; returns which lists must be refilled"""
+        self.rating_count = max(0, self.rating_count - 1)
+        self.rating_sum -= rating.rating
+        self._bucket(rating.rating, -1)
+
+        refill = {}
+        for attr, size in (("recent_ratings", self.RECENT_SIZE), ("helpful_ratings", self.HELPFUL_SIZE)):
+            entries = getattr(self, attr) or []
+            remaining = self._without(entries, rating.id)
+            setattr(self, attr, remaining)
+            refill[attr] = len(entries) >= size and len(remaining) < len(entries)
+        return refill
+
+    def helpful_vote_added(self, rating: "RecipeRating") -> None:
+        snapshot = self.snapshot(rating)
+        self._replace_recent(snapshot)
+        self._offer_helpful(snapshot)
@@ -0,0 +1,40 @@
+"""Add recipe rating stats aggregate
+
+Revision ID: b71c4e2d9a10
+Revises: f3be90dacb0
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71c4e2d9a10'
+down_revision = 'f3be90dacb0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rows are built lazily from recipe_ratings on first access
+    op.create_table(
+        'recipe_rating_stats',
+        sa.Column('recipe_id', sa.Integer(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('count_1', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('count_2', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('count_3', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('count_4', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('count_5', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('recent_ratings', sa.JSON(), nullable=True),
+        sa.Column('helpful_ratings', sa.JSON(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('recipe_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('recipe_rating_stats')
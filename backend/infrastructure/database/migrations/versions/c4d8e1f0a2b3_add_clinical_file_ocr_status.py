@@ -0,0 +1,43 @@
+"""Add background OCR status to clinical files
+
+Revision ID: c4d8e1f0a2b3
+Revises: b71c4e2d9a10
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e1f0a2b3'
+down_revision = 'b71c4e2d9a10'
+branch_labels = None
+depends_on = None
+
+
+def _has_clinical_files() -> bool:
+    # clinical_files is created outside of these migrations in some deployments
+    return 'clinical_files' in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    if not _has_clinical_files():
+        return
+    # Existing rows were processed inline at upload time
+    op.add_column('clinical_files', sa.Column('ocr_status', sa.String(length=20), nullable=False, server_default='skipped'))
+    op.add_column('clinical_files', sa.Column('ocr_pages_total', sa.Integer(), nullable=True))
+    op.add_column('clinical_files', sa.Column('ocr_pages_done', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('clinical_files', sa.Column('ocr_error', sa.String(length=500), nullable=True))
+    op.execute("UPDATE clinical_files SET ocr_status = 'completed' WHERE ocr_processed")
+    op.create_index('ix_clinical_files_ocr_status', 'clinical_files', ['ocr_status'])
+
+
+def downgrade() -> None:
+    if not _has_clinical_files():
+        return
+    op.drop_index('ix_clinical_files_ocr_status', table_name='clinical_files')
+    op.drop_column('clinical_files', 'ocr_error')
+    op.drop_column('clinical_files', 'ocr_pages_done')
+    op.drop_column('clinical_files', 'ocr_pages_total')
+    op.drop_column('clinical_files', 'ocr_status')
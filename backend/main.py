@@ -1,35 +1,76 @@
 """
 Nutrition Intelligence Platform - Main FastAPI Application
 """
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.exceptions import RequestValidationError
-from fastapi.responses import HTMLResponse
-from starlette.exceptions import HTTPException as StarletteHTTPException
-from contextlib import asynccontextmanager
-import logging
-import time
-import uuid
-
-from core.config import get_settings
-from core.database import init_db
-from core.logging import LoggingMiddleware, log_success, log_error
-from core.sentry import init_sentry
+# Must run before any other import to measure them (STARTUP_PROFILE=1)
+from core import startup_profile
+startup_profile.enable_from_env()
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.middleware.trustedhost import TrustedHostMiddleware  # noqa: E402
+from fastapi.exceptions import RequestValidationError  # noqa: E402
+from fastapi.responses import HTMLResponse  # noqa: E402
+from starlette.exceptions import HTTPException as StarletteHTTPException  # noqa: E402
+from contextlib import asynccontextmanager  # noqa: E402
+import asyncio  # noqa: E402
+import importlib  # noqa: E402
+import logging  # noqa: E402
+from typing import Optional  # noqa: E402
+
+from core.config import get_settings  # noqa: E402
+from core.database import close_db, init_db, pool_metrics  # noqa: E402
+from core.deployment import collect_metrics, profile_label, resolve_profiles  # noqa: E402
+from core.logging import log_success, log_error  # noqa: E402
+from core.security import require_admin  # noqa: E402
+from core.sentry import init_sentry  # noqa: E402
 
 # Import all domain models to ensure SQLAlchemy mappers are configured
-import domain  # noqa: F401
-from middleware.error_handler import (
+import domain  # noqa: E402, F401
+from middleware.error_handler import (  # noqa: E402
     http_exception_handler,
     validation_exception_handler,
     general_exception_handler
 )
-from middleware.security_headers import SecurityHeadersMiddleware, RateLimitByIPMiddleware
-from api.routers import auth_simple, users, foods, recipes, meal_plans, nutritionists, patients, nutrition_calculator, weekly_planning, vision, laboratory, whatsapp, admin, notifications, patient_progress, nutritionist_chat, scanner, rag, medicinal_plants, admin_medicinal_plants, logs, trophology, fasting, gamification, digestion, mindfulness
-from api.routers import auth_new, auth_complete
+from middleware.instrumentation import RequestInstrumentationMiddleware  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
+# (profile group, module under api.routers, prefix, tags), in inclusion order.
+# create_application imports only the routers of the groups in APP_PROFILE
+# (core.deployment); AI/vision/WhatsApp clients inside them are created on
+# first use (core.providers), not at import.
+ROUTERS = [
+    ("core", "auth_complete", "/api/v1", ["authentication"]),  # New complete auth system
+    # ("core", "auth_simple", "/api/v1/auth", ["auth"]),  # Disabled - conflicts with auth_complete
+    ("core", "auth_new", "/api/v1/auth-hybrid", ["auth-hybrid"]),
+    ("core", "users", "/api/v1/users", ["users"]),
+    ("core", "foods", "/api/v1/foods", ["foods"]),
+    ("core", "recipes", "/api/v1/recipes", ["recipes"]),
+    ("clinical", "meal_plans", "/api/v1/meal-plans", ["meal-plans"]),
+    ("clinical", "nutritionists", "/api/v1/nutritionists", ["nutritionists"]),
+    ("clinical", "patients", "/api/v1/patients", ["patients"]),
+    ("clinical", "nutrition_calculator", "/api/v1/nutrition-calculator", ["nutrition-calculator"]),
+    ("clinical", "weekly_planning", "/api/v1/weekly-planning", ["weekly-planning"]),
+    ("clinical", "equivalences", "/api/v1/equivalences", ["equivalences"]),
+    ("ai", "vision", "/api/v1/vision", ["ai-vision"]),  # AI Vision
+    ("ai", "nutritionist_chat", "/api/v1/nutritionist-chat", ["nutritionist-chat"]),  # AI Nutritionist Chat
+    ("scanner", "scanner", "/api/v1/scanner", ["nom051-scanner"]),  # NOM-051 Scanner
+    ("clinical", "laboratory", "/api/v1/laboratory", ["laboratory"]),  # Laboratory Data
+    ("core", "whatsapp", "/api/v1/whatsapp", ["whatsapp"]),
+    ("admin", "admin", "/api/v1", ["admin"]),
+    ("core", "notifications", "/api/v1/notifications", ["notifications"]),
+    ("clinical", "patient_progress", "/api/v1/patient-progress", ["patient-progress"]),  # Patient Progress & Analytics
+    ("ai", "rag", "/api/v1", ["rag"]),  # Retrieval Augmented Generation
+    ("core", "medicinal_plants", "/api/v1/medicinal-plants", ["medicinal-plants"]),  # Traditional Mexican Medicine
+    ("admin", "admin_medicinal_plants", "/api/v1", ["admin", "medicinal-plants"]),  # Seeding and management
+    ("core", "logs", "/api/v1", ["logs"]),  # Frontend Logging
+    ("core", "trophology", "/api/v1/trophology", ["trophology"]),  # Lezaeta's food combination rules
+    ("core", "fasting", "/api/v1/fasting", ["fasting"]),
+    ("core", "gamification", "/api/v1/gamification", ["gamification"]),
+    ("core", "digestion", "/api/v1/digestion", ["digestion"]),
+    ("core", "mindfulness", "/api/v1/mindfulness", ["mindfulness"]),
+]
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
@@ -43,15 +84,51 @@ async def lifespan(app: FastAPI):
 
     await init_db()
     log_success("Base de datos inicializada", business_context={"action": "database_init"})
+
+    # Background services only for the router groups mounted in this process
+    profiles = app.state.profiles
+    if "core" in profiles:
+        # Warm the WhatsApp sender -> patient index in the background
+        from services.whatsapp.inbound import get_phone_index
+        get_phone_index().ensure_loaded()
+
+    if "clinical" in profiles:
+        # Claim clinical files whose OCR is pending or was abandoned by a dead
+        # process; claims are atomic, so every clinical process can do this
+        from services.laboratory import get_ocr_pipeline
+        asyncio.create_task(get_ocr_pipeline().resume_pending())
     yield
     # Shutdown
     logger.info("Shutting down Nutrition Intelligence Platform...")
+    if "core" in profiles:
+        from services.whatsapp.outbound_queue import get_outbound_queue
+        from services.whatsapp.inbound import get_inbound_ingestor
+        await get_inbound_ingestor().stop()
+        await get_outbound_queue().stop()
+    from services.email_service import email_service
+    await email_service.shutdown()
+    if "clinical" in profiles:
+        await get_ocr_pipeline().stop()
+    from core.counters import flush_all_counters
+    await flush_all_counters()
+    if "scanner" in profiles:
+        from services.nom051.scan_buffer import get_scan_buffer
+        await get_scan_buffer().stop()
+    await close_db()
     log_success("Sistema cerrando", business_context={"action": "system_shutdown"})
 
-def create_application() -> FastAPI:
-    """Create and configure FastAPI application"""
+def create_application(profile: Optional[str] = None) -> FastAPI:
+    """
+    Create and configure FastAPI application
+
+    Args:
+        profile: router groups to mount (``core``, ``clinical``, ``ai``,
+            ``scanner``, ``admin``, comma-separated, or ``all``); defaults to
+            ``APP_PROFILE``
+    """
     settings = get_settings()
-    
+    profiles = resolve_profiles(profile if profile is not None else settings.app_profile)
+
     app = FastAPI(
         title="Nutrition Intelligence API",
         description="Plataforma integral de nutrición inteligente para profesionales y pacientes",
@@ -61,6 +138,7 @@ def create_application() -> FastAPI:
         openapi_url="/openapi.json",
         lifespan=lifespan
     )
+    app.state.profiles = profiles
 
     # Custom ReDoc endpoint with updated CDN and proper CSP compatibility
     @app.get("/redoc", include_in_schema=False)
@@ -93,15 +171,6 @@ def create_application() -> FastAPI:
         allowed_hosts=settings.allowed_hosts
     )
 
-    # Security headers middleware
-    app.add_middleware(SecurityHeadersMiddleware, environment=settings.environment)
-
-    # Rate limiting for documentation endpoints
-    app.add_middleware(RateLimitByIPMiddleware, requests_per_minute=60)
-
-    # Logging middleware (PRIMERO para capturar todo)
-    app.add_middleware(LoggingMiddleware)
-    
     # CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -109,36 +178,21 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
         allow_headers=["*"],
-        expose_headers=["X-Request-ID", "X-Process-Time"],
+        expose_headers=["X-Request-ID", "X-Process-Time", "X-DB-Queries", "X-DB-Time"],
         max_age=3600,  # Cache preflight requests for 1 hour
     )
-    
-    # Request tracking middleware
-    @app.middleware("http")
-    async def add_request_id(request: Request, call_next):
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        logger.info(
-            f"Request processed",
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "url": str(request.url),
-                "status_code": response.status_code,
-                "process_time": process_time
-            }
-        )
-        
-        return response
-    
+
+    # Request ID, timing, security headers, docs rate limit, per-request SQL
+    # query counts and request logging (PRIMERO para capturar todo)
+    app.add_middleware(
+        RequestInstrumentationMiddleware,
+        environment=settings.environment,
+        requests_per_minute=60,
+        query_budget=settings.db_query_budget,
+        query_budget_strict=settings.db_query_budget_strict,
+        repeated_query_threshold=settings.db_repeated_query_threshold,
+    )
+
     # Exception handlers
     app.add_exception_handler(StarletteHTTPException, http_exception_handler)
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -150,80 +204,37 @@ def create_application() -> FastAPI:
         return {
             "status": "healthy",
             "service": "nutrition-intelligence-api",
-            "version": "1.0.0"
+            "version": "1.0.0",
+            "profile": profile_label(profiles)
         }
 
-    # Include routers
-    app.include_router(auth_complete.router, prefix="/api/v1", tags=["authentication"])  # New complete auth system
-    # app.include_router(auth_simple.router, prefix="/api/v1/auth", tags=["auth"])  # Disabled - conflicts with auth_complete
-    app.include_router(auth_new.router, prefix="/api/v1/auth-hybrid", tags=["auth-hybrid"])
-    app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
-    app.include_router(foods.router, prefix="/api/v1/foods", tags=["foods"])
-    app.include_router(recipes.router, prefix="/api/v1/recipes", tags=["recipes"])
-    app.include_router(meal_plans.router, prefix="/api/v1/meal-plans", tags=["meal-plans"])
-    app.include_router(nutritionists.router, prefix="/api/v1/nutritionists", tags=["nutritionists"])
-    app.include_router(patients.router, prefix="/api/v1/patients", tags=["patients"])
-    app.include_router(nutrition_calculator.router, prefix="/api/v1/nutrition-calculator", tags=["nutrition-calculator"])
-    app.include_router(weekly_planning.router, prefix="/api/v1/weekly-planning", tags=["weekly-planning"])
-    
-    # Import and include equivalences router
-    from api.routers import equivalences
-    app.include_router(equivalences.router, prefix="/api/v1/equivalences", tags=["equivalences"])
-
-    # AI Vision router
-    app.include_router(vision.router, prefix="/api/v1/vision", tags=["ai-vision"])
-
-    # AI Nutritionist Chat router
-    app.include_router(nutritionist_chat.router, prefix="/api/v1/nutritionist-chat", tags=["nutritionist-chat"])
-
-    # NOM-051 Scanner router
-    app.include_router(scanner.router, prefix="/api/v1/scanner", tags=["nom051-scanner"])
-
-    # Laboratory Data router
-    app.include_router(laboratory.router, prefix="/api/v1/laboratory", tags=["laboratory"])
-
-    # WhatsApp router
-    app.include_router(whatsapp.router, prefix="/api/v1/whatsapp", tags=["whatsapp"])
-
-    # Admin router
-    app.include_router(admin.router, prefix="/api/v1", tags=["admin"])
-
-    # Notifications router
-    app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["notifications"])
-
-    # Patient Progress & Analytics router
-    app.include_router(patient_progress.router, prefix="/api/v1/patient-progress", tags=["patient-progress"])
-
-    # RAG (Retrieval Augmented Generation) router
-    app.include_router(rag.router, prefix="/api/v1", tags=["rag"])
-
-    # Medicinal Plants router - Traditional Mexican Medicine
-    app.include_router(medicinal_plants.router, prefix="/api/v1/medicinal-plants", tags=["medicinal-plants"])
-
-    # Admin Medicinal Plants router - Seeding and management
-    app.include_router(admin_medicinal_plants.router, prefix="/api/v1", tags=["admin", "medicinal-plants"])
-
-    # Frontend Logging router
-    app.include_router(logs.router, prefix="/api/v1", tags=["logs"])
-
-    # Trophology router - Lezaeta's food combination rules
-    app.include_router(trophology.router, prefix="/api/v1/trophology", tags=["trophology"])
-
-    # Fasting router
-    app.include_router(fasting.router, prefix="/api/v1/fasting", tags=["fasting"])
-
-    # Gamification router
-    app.include_router(gamification.router, prefix="/api/v1/gamification", tags=["gamification"])
-
-    # Digestion router
-    app.include_router(digestion.router, prefix="/api/v1/digestion", tags=["digestion"])
-
-    # Mindfulness router
-    app.include_router(mindfulness.router, prefix="/api/v1/mindfulness", tags=["mindfulness"])
+    # Shared by every profile: components of the mounted groups and providers.
+    # Admin only: it exposes pool sizes, provider state and mounted routers.
+    @app.get("/metrics", tags=["health"], dependencies=[Depends(require_admin)])
+    async def metrics():
+        from core.providers import provider_status
+        return {
+            "profile": profile_label(profiles),
+            "routers": mounted,
+            "providers": provider_status(),
+            "database": pool_metrics(),
+            "components": collect_metrics(profiles)
+        }
 
+    # Include routers
+    mounted = []
+    for group, module_name, prefix, tags in ROUTERS:
+        if group not in profiles:
+            continue
+        module = importlib.import_module(f"api.routers.{module_name}")
+        app.include_router(module.router, prefix=prefix, tags=tags)
+        mounted.append(module_name)
+
+    logger.info(f"Application profile '{profile_label(profiles)}': {len(mounted)} routers mounted")
     return app
 
 app = create_application()
+startup_profile.finish()
 
 if __name__ == "__main__":
     import uvicorn
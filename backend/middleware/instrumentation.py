@@ -0,0 +1,392 @@
+"""
+Request Instrumentation Middleware
+==================================
+
+Un solo middleware ASGI puro que, en una pasada por request:
+
+- asigna el request ID (``request.state.request_id`` y ``X-Request-ID``)
+- mide el tiempo de proceso (``X-Process-Time``)
+- agrega los headers de seguridad
+- limita por IP las rutas de documentación
+- cuenta las consultas SQL del request (``X-DB-Queries``, ``X-DB-Time``,
+  advertencia de N+1 y presupuesto de consultas; ver ``core.query_stats``)
+- registra el request en ``nutrition_logger`` (JSON + legacy)
+
+El log, la advertencia de N+1 y el presupuesto se evalúan al enviar el
+último fragmento del cuerpo, así que incluyen las consultas hechas mientras
+se genera un ``StreamingResponse`` (exportaciones NDJSON/CSV). Los headers
+``X-DB-*`` y el 500 del modo estricto solo pueden reflejar las consultas
+anteriores al inicio del cuerpo.
+
+Reemplaza a ``SecurityHeadersMiddleware`` y ``RateLimitByIPMiddleware``
+(``BaseHTTPMiddleware``), al ``LoggingMiddleware`` de ``core.logging`` y al
+``add_request_id`` de ``main.py``. Cada ``BaseHTTPMiddleware`` creaba una
+tarea y un stream de memoria por request, y había dos request IDs distintos.
+"""
+import json
+import logging
+import re
+import time
+import traceback
+import uuid
+from typing import Any, Dict, Iterable, Tuple
+from urllib.parse import parse_qsl
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.logging import LogLevel, nutrition_logger
+from core.query_stats import QueryStats, track_queries
+
+logger = logging.getLogger(__name__)
+
+DOCS_PATHS = ("/docs", "/redoc", "/openapi.json")
+SENSITIVE_PATH_PREFIXES = ("/api/v1/auth", "/api/v1/users/me", "/health")
+
+_BASE_SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    # Permissions Policy - restrict dangerous browser features
+    (b"permissions-policy", (
+        b"accelerometer=(), camera=(), geolocation=(), gyroscope=(), "
+        b"magnetometer=(), microphone=(), payment=(), usb=()"
+    )),
+]
+# HSTS - Only in production (Cloudflare/Traefik handle SSL)
+_HSTS_HEADER = (b"strict-transport-security", b"max-age=31536000; includeSubDomains")
+_NO_STORE_HEADERS = [
+    (b"cache-control", b"no-store, no-cache, must-revalidate, private"),
+    (b"pragma", b"no-cache"),
+]
+_DOCS_CACHE_HEADERS = [(b"cache-control", b"public, max-age=3600")]
+
+_RATE_LIMIT_BODY = b'{"detail": "Rate limit exceeded. Please try again later."}'
+
+_ENTITY_ID_PATTERNS = [
+    (name, re.compile(rf"/{segment}/(\d+)(?:/|$)"))
+    for name, segment in (
+        ("patient_id", "patients"), ("recipe_id", "recipes"), ("nutritionist_id", "nutritionists"),
+    )
+]
+_ENDPOINT_CATEGORIES = [
+    ("/auth/", "authentication"),
+    ("/equivalences/", "nutrition_equivalences"),
+    ("/patients/", "patient_management"),
+    ("/nutritionists/", "nutritionist_management"),
+    ("/recipes/", "recipe_management"),
+    ("/meal-plans/", "meal_planning"),
+    ("/weekly-plans", "meal_planning"),
+    ("/foods/", "food_management"),
+    ("/users/", "user_management"),
+    ("/health", "system"),
+    ("/docs", "system"),
+]
+_ERROR_CATEGORIES = {
+    400: "bad_request",
+    401: "authentication_error",
+    403: "authorization_error",
+    404: "not_found",
+    422: "validation_error",
+}
+
+
+def categorize_endpoint(path: str) -> str:
+    """Categorizar endpoint para métricas"""
+    for fragment, category in _ENDPOINT_CATEGORIES:
+        if fragment in path:
+            return category
+    return "other"
+
+
+def categorize_error(status_code: int) -> str:
+    """Categorizar tipo de error"""
+    if 500 <= status_code < 600:
+        return "server_error"
+    return _ERROR_CATEGORIES.get(status_code, "client_error")
+
+
+def business_context(path: str, method: str, status_code: int) -> Dict[str, Any]:
+    """Contexto de negocio del request (IDs de la URL, acción y categoría)"""
+    context: Dict[str, Any] = {}
+    for name, pattern in _ENTITY_ID_PATTERNS:
+        match = pattern.search(path)
+        if match:
+            context[name] = int(match.group(1))
+
+    if path.endswith("/nutritional-profile"):
+        context["action"] = "nutritional_profile_management"
+    elif "/equivalences/" in path:
+        context["action"] = "equivalences_management"
+    elif "/weekly-plans" in path:
+        context["action"] = "meal_planning"
+    elif "/auth/" in path:
+        context["action"] = "authentication"
+
+    context["http_method"] = method
+    context["endpoint_category"] = categorize_endpoint(path)
+    if status_code >= 400:
+        context["has_error"] = True
+        context["error_category"] = categorize_error(status_code)
+    return context
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Request ID, tiempos, headers de seguridad, rate limit y logging por request
+
+    Args:
+        app: Aplicación ASGI envuelta
+        environment: Entorno; HSTS solo se envía en ``production``
+        requests_per_minute: Límite por IP en ``rate_limited_paths``
+        rate_limited_paths: Rutas exactas con límite por IP
+        log_requests: Registrar cada request en ``nutrition_logger``
+        query_budget: Máximo de consultas SQL por request (0 = sin límite);
+            ``Depends(query_budget(n))`` lo ajusta por endpoint
+        query_budget_strict: Responder 500 si se excede el presupuesto antes
+            de empezar el cuerpo (desarrollo/pruebas); si no, o si se excede
+            durante un streaming, solo se registra una advertencia
+        repeated_query_threshold: Repeticiones de una misma sentencia a partir
+            de las cuales se advierte un posible N+1
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        environment: str = "production",
+        requests_per_minute: int = 60,
+        rate_limited_paths: Iterable[str] = DOCS_PATHS,
+        log_requests: bool = True,
+        query_budget: int = 0,
+        query_budget_strict: bool = False,
+        repeated_query_threshold: int = 5,
+    ):
+        self.app = app
+        self.environment = environment
+        self.requests_per_minute = requests_per_minute
+        self.rate_limited_paths = frozenset(rate_limited_paths)
+        self.log_requests = log_requests
+        self.query_budget = query_budget
+        self.query_budget_strict = query_budget_strict
+        self.repeated_query_threshold = repeated_query_threshold
+
+        security = list(_BASE_SECURITY_HEADERS)
+        if environment == "production":
+            security.append(_HSTS_HEADER)
+        # Headers fijos por tipo de ruta: (nombres a reemplazar, headers)
+        self._headers = {
+            kind: (frozenset(name for name, _ in headers), headers)
+            for kind, headers in (
+                ("default", security),
+                ("sensitive", security + _NO_STORE_HEADERS),
+                ("docs", security + _DOCS_CACHE_HEADERS),
+            )
+        }
+
+        self._request_counts: Dict[Tuple[str, int], int] = {}
+        self._current_minute = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        path = scope["path"]
+
+        if path in DOCS_PATHS:
+            replaced, extra_headers = self._headers["docs"]
+        elif path.startswith(SENSITIVE_PATH_PREFIXES):
+            replaced, extra_headers = self._headers["sensitive"]
+        else:
+            replaced, extra_headers = self._headers["default"]
+        request_headers = _request_headers(scope)
+        budget_error = None
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal budget_error, status_code
+            finished = False
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+                status_code = message["status"]
+                headers = [
+                    (name, value) for name, value in message.get("headers", ())
+                    if name.lower() not in replaced
+                ]
+                if self.query_budget_strict and stats.over_budget:
+                    budget_error = self._budget_error(stats)
+                    status_code = 500
+                    headers = [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(budget_error)).encode("latin-1")),
+                    ]
+                headers.extend(extra_headers)
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                headers.append((b"x-process-time", str(process_time).encode("latin-1")))
+                # Consultas hechas antes de empezar el cuerpo; las de un
+                # StreamingResponse solo aparecen en el log del request
+                headers.append((b"x-db-queries", str(stats.count).encode("latin-1")))
+                headers.append((b"x-db-time", f"{stats.total_ms:.2f}".encode("latin-1")))
+                message = {**message, "status": status_code, "headers": headers}
+            elif message["type"] == "http.response.body":
+                finished = not message.get("more_body", False)
+                if budget_error is not None:
+                    # Descartar el cuerpo original; enviar el error al final
+                    if not finished:
+                        return
+                    message = {"type": "http.response.body", "body": budget_error}
+            await send(message)
+            if finished:
+                # Con el cuerpo completo: incluye las consultas del streaming
+                self._check_queries(scope, stats, rejected=budget_error is not None)
+                if self.log_requests:
+                    process_time = time.perf_counter() - start_time
+                    self._log(scope, request_headers, request_id, status_code, process_time, stats)
+
+        with track_queries(budget=self.query_budget or None) as stats:
+            if path in self.rate_limited_paths and not self._allow(_client_ip(scope, request_headers)):
+                logger.warning(f"Rate limit exceeded for IP {_client_ip(scope, request_headers)} on {path}")
+                await send_wrapper({
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(_RATE_LIMIT_BODY)).encode("latin-1")),
+                        (b"retry-after", b"60"),
+                    ],
+                })
+                await send_wrapper({"type": "http.response.body", "body": _RATE_LIMIT_BODY})
+                return
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception as e:
+                if self.log_requests:
+                    nutrition_logger.log_error(
+                        message=f"Excepción no manejada en {scope['method']} {path}: {str(e)}",
+                        request_id=request_id,
+                        endpoint=path,
+                        method=scope["method"],
+                        user_id=scope["state"].get("current_user_id"),
+                        response_time_ms=int((time.perf_counter() - start_time) * 1000),
+                        status_code=500,
+                        metadata={
+                            "ip": _client_ip(scope, request_headers),
+                            "user_agent": request_headers.get(b"user-agent", ""),
+                            "error_type": type(e).__name__,
+                            "traceback": traceback.format_exc(),
+                        },
+                    )
+                raise
+
+    # ------------------------------------------------------------------
+    # Rate limit por IP (ventanas de un minuto, en memoria)
+    # ------------------------------------------------------------------
+
+    def _allow(self, client_ip: str) -> bool:
+        current_minute = int(time.time() // 60)
+        if current_minute != self._current_minute:
+            self._request_counts.clear()
+            self._current_minute = current_minute
+
+        key = (client_ip, current_minute)
+        count = self._request_counts.get(key, 0)
+        if count >= self.requests_per_minute:
+            return False
+        self._request_counts[key] = count + 1
+        return True
+
+    # ------------------------------------------------------------------
+    # Consultas SQL por request
+    # ------------------------------------------------------------------
+
+    def _check_queries(self, scope: Scope, stats: QueryStats, rejected: bool = False) -> None:
+        """Advertir N+1 y presupuesto excedido (al terminar la respuesta)"""
+        endpoint = f"{scope['method']} {scope['path']}"
+        repeated = stats.repeated(self.repeated_query_threshold)
+        if repeated:
+            shape, times = repeated[0]
+            logger.warning(f"Possible N+1 in {endpoint}: statement executed {times} times: {shape}")
+
+        if stats.over_budget:
+            note = "" if rejected or not self.query_budget_strict else " after the response had started"
+            logger.warning(f"{endpoint} executed {stats.count} queries (budget {stats.budget}){note}")
+
+    @staticmethod
+    def _budget_error(stats: QueryStats) -> bytes:
+        """Cuerpo del 500 en modo estricto"""
+        return json.dumps({
+            "detail": f"Query budget exceeded: {stats.count} queries (budget {stats.budget})",
+            "repeated_queries": [{"statement": shape, "count": n} for shape, n in stats.repeated()[:5]],
+        }).encode("utf-8")
+
+    # ------------------------------------------------------------------
+    # Logging
+    # ------------------------------------------------------------------
+
+    def _log(
+        self,
+        scope: Scope,
+        request_headers: Dict[bytes, str],
+        request_id: str,
+        status_code: int,
+        process_time: float,
+        stats: QueryStats,
+    ) -> None:
+        path = scope["path"]
+        method = scope["method"]
+        is_success = 200 <= status_code < 400
+        query_string = scope.get("query_string", b"")
+
+        try:
+            nutrition_logger.log_request(
+                status=LogLevel.SUCCESS if is_success else LogLevel.ERROR,
+                message=(
+                    f"{method} {path} - {status_code}" if is_success
+                    else f"Error en {method} {path} - Status {status_code}"
+                ),
+                request_id=request_id,
+                endpoint=path,
+                method=method,
+                user_id=scope["state"].get("current_user_id"),
+                response_time_ms=int(process_time * 1000),
+                status_code=status_code,
+                metadata={
+                    "ip": _client_ip(scope, request_headers),
+                    "user_agent": request_headers.get(b"user-agent", ""),
+                    "content_type": request_headers.get(b"content-type", ""),
+                    "query_params": (
+                        dict(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+                        if query_string else None
+                    ),
+                    **stats.as_log_fields(self.repeated_query_threshold),
+                },
+                business_context=business_context(path, method, status_code),
+            )
+        except Exception as e:
+            # El logging nunca debe romper la respuesta
+            logger.error(f"Request logging failed for {method} {path}: {e}")
+
+
+_LOGGED_HEADERS = (b"user-agent", b"content-type", b"x-forwarded-for")
+
+
+def _request_headers(scope: Scope) -> Dict[bytes, str]:
+    """Solo los headers del request que usa el middleware"""
+    found: Dict[bytes, str] = {}
+    for name, value in scope.get("headers", ()):
+        if name in _LOGGED_HEADERS:
+            found[name] = value.decode("latin-1")
+    return found
+
+
+def _client_ip(scope: Scope, request_headers: Dict[bytes, str]) -> str:
+    """IP del cliente (primer X-Forwarded-For si viene de un proxy)"""
+    forwarded = request_headers.get(b"x-forwarded-for", "").split(",")[0].strip()
+    if forwarded:
+        return forwarded
+    client = scope.get("client")
+    return client[0] if client else "unknown"
@@ -0,0 +1,35 @@
+-- Migración 011: Resumen de escaneos por usuario
+-- Descripción: Contadores acumulados por usuario para /scanner/stats y el
+--              contexto RAG, mantenidos por el buffer de escaneos al escribir
+--              cada lote (services/nom051/scan_rollup.py). Las filas faltantes
+--              se reconstruyen desde escaneos_historia y user_scan_history la
+--              primera vez que se necesitan.
+-- Fecha: 2026-10
+
+CREATE TABLE IF NOT EXISTS scan_user_rollups (
+    user_id INTEGER PRIMARY KEY REFERENCES auth_users(id) ON DELETE CASCADE,
+
+    -- escaneos_historia (escaneos de código de barras)
+    total_scans BIGINT NOT NULL DEFAULT 0,
+    found_count BIGINT NOT NULL DEFAULT 0,
+    response_time_sum_ms BIGINT NOT NULL DEFAULT 0,
+    response_time_count BIGINT NOT NULL DEFAULT 0,
+    distinct_barcodes_hll BYTEA,  -- HyperLogLog de codigo_barras
+
+    -- Escaneos que resolvieron a un producto (código de barras o etiqueta)
+    product_scans BIGINT NOT NULL DEFAULT 0,
+    health_score_sum BIGINT NOT NULL DEFAULT 0,
+    scans_with_seals BIGINT NOT NULL DEFAULT 0,
+    exceso_calorias BIGINT NOT NULL DEFAULT 0,
+    exceso_azucares BIGINT NOT NULL DEFAULT 0,
+    exceso_grasas_saturadas BIGINT NOT NULL DEFAULT 0,
+    exceso_grasas_trans BIGINT NOT NULL DEFAULT 0,
+    exceso_sodio BIGINT NOT NULL DEFAULT 0,
+    contiene_edulcorantes BIGINT NOT NULL DEFAULT 0,
+    contiene_cafeina BIGINT NOT NULL DEFAULT 0,
+
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE scan_user_rollups IS 'Estadísticas de escaneo acumuladas por usuario (mantenidas incrementalmente)';
+COMMENT ON COLUMN scan_user_rollups.distinct_barcodes_hll IS 'Registros HyperLogLog (p=11) de los códigos escaneados';
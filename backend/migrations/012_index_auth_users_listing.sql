@@ -0,0 +1,13 @@
+-- Migración 012: Índices para el listado de usuarios del panel de administración
+-- Descripción: /admin/users y /admin/users/export paginan por
+--              (created_at, id) descendente con filtros opcionales de rol y
+--              estado (api/routers/admin.py). Estos índices permiten que cada
+--              página sea un recorrido de índice acotado en lugar de ordenar
+--              toda la tabla.
+-- Fecha: 2026-10
+
+CREATE INDEX IF NOT EXISTS idx_auth_users_created_at_id
+    ON auth_users (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_auth_users_role_status_created_at_id
+    ON auth_users (primary_role, account_status, created_at DESC, id DESC);
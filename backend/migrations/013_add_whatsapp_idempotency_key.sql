@@ -0,0 +1,14 @@
+-- Migración 013: Clave de idempotencia en los mensajes de WhatsApp
+-- Descripción: Los endpoints /whatsapp/send/* reservan el encabezado
+--              Idempotency-Key insertando la fila del mensaje antes de
+--              enviarlo (api/routers/whatsapp.py). El índice único hace que
+--              la reserva sea atómica entre workers: una petición repetida
+--              devuelve el mensaje guardado en lugar de enviarlo otra vez.
+--              Los envíos fallidos liberan la clave (NULL).
+-- Fecha: 2026-10
+
+ALTER TABLE whatsapp_messages
+    ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(120);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_whatsapp_messages_idempotency_key
+    ON whatsapp_messages (idempotency_key);
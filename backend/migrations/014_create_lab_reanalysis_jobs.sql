@@ -0,0 +1,30 @@
+-- Migración 014: Estado de los trabajos de reanálisis de laboratorio
+-- Descripción: POST /laboratory/reanalyze registra aquí cada trabajo y lo
+--              actualiza en la misma transacción que cada página procesada
+--              (services/laboratory/reanalysis.py), de modo que cualquier
+--              worker responde GET /laboratory/reanalyze/{job_id} y un
+--              reinicio no pierde el estado. active_slot vale 1 solo para el
+--              trabajo activo; su índice único impide dos trabajos a la vez.
+-- Fecha: 2026-10
+
+CREATE TABLE IF NOT EXISTS lab_reanalysis_jobs (
+    id VARCHAR(12) PRIMARY KEY,
+    status VARCHAR(20) NOT NULL,  -- pending, running, completed, failed, interrupted
+
+    -- Filtros del trabajo
+    patient_id INTEGER,
+    nutritionist_id INTEGER,
+    study_date_from DATE,
+    batch_size INTEGER NOT NULL,
+
+    -- Avance
+    processed INTEGER NOT NULL DEFAULT 0,
+    batches INTEGER NOT NULL DEFAULT 0,
+    error VARCHAR(500),
+    created_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    elapsed_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    heartbeat_at TIMESTAMP,  -- se actualiza con cada página
+
+    active_slot INTEGER UNIQUE  -- 1 mientras está activo, NULL al terminar
+);
@@ -0,0 +1,17 @@
+-- Migración 015: Reclamo de trabajos de OCR entre procesos
+-- Descripción: Cada proceso con el perfil clinical reclama un archivo antes
+--              de procesarlo con un UPDATE condicional (FOR UPDATE SKIP
+--              LOCKED) que guarda su identificador en ocr_owner
+--              (services/laboratory/ocr_pipeline.py). El dueño renueva
+--              ocr_heartbeat_at; un archivo en processing con el heartbeat
+--              vencido lo puede reclamar otro proceso.
+-- Fecha: 2026-10
+
+ALTER TABLE clinical_files
+    ADD COLUMN IF NOT EXISTS ocr_owner VARCHAR(100),
+    ADD COLUMN IF NOT EXISTS ocr_heartbeat_at TIMESTAMP;
+
+-- Solo los archivos por reclamar: la búsqueda no recorre el historial completo
+CREATE INDEX IF NOT EXISTS idx_clinical_files_ocr_claimable
+    ON clinical_files (id)
+    WHERE ocr_status IN ('pending', 'processing');
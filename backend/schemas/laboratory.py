@@ -261,6 +261,9 @@ class ClinicalFileResponse(BaseModel):
     file_size_mb: Optional[float]
     ocr_processed: bool
     extracted_data: Optional[Dict[str, Any]]
+    ocr_status: str = "skipped"
+    ocr_pages_total: Optional[int] = None
+    ocr_pages_done: int = 0
     tags: Optional[List[str]]
     uploaded_at: datetime
     uploaded_by: str
@@ -270,6 +273,18 @@ class ClinicalFileResponse(BaseModel):
         from_attributes = True
 
 
+class ClinicalFileOcrStatus(BaseModel):
+    """Schema for polling the OCR progress of a clinical file"""
+    file_id: int
+    ocr_status: str  # pending, processing, completed, failed, skipped
+    ocr_pages_total: Optional[int]
+    ocr_pages_done: int
+    progress: float  # 0.0 - 1.0
+    ocr_processed: bool
+    ocr_error: Optional[str]
+    extracted_data: Optional[Dict[str, Any]]
+
+
 class LaboratoryDataListResponse(BaseModel):
     """Schema for paginated list of laboratory data"""
     total: int
@@ -285,3 +300,38 @@ class LabComparison(BaseModel):
     trend: Trend
     normal_range: str
     interpretation: str
+    percent_change: Optional[float] = None
+    slope_per_month: Optional[float] = None  # Least-squares slope, units per 30 days
+    out_of_range: bool = False  # Latest value outside the normal range
+    out_of_range_count: int = 0
+
+
+class PatientLabTrends(BaseModel):
+    """Schema for one patient's lab trends within a nutritionist panel"""
+    patient_id: int
+    studies: int
+    out_of_range_parameters: List[str]
+    comparisons: List[LabComparison]
+
+
+class LabReanalysisRequest(BaseModel):
+    """Schema for starting a bulk reanalysis of laboratory records"""
+    patient_id: Optional[int] = None
+    nutritionist_id: Optional[int] = None
+    study_date_from: Optional[date] = None
+    batch_size: int = Field(default=500, ge=1, le=5000)
+
+
+class LabReanalysisJobResponse(BaseModel):
+    """Schema for bulk reanalysis job status"""
+    job_id: str
+    status: str  # pending, running, completed, failed, interrupted
+    patient_id: Optional[int]
+    nutritionist_id: Optional[int]
+    study_date_from: Optional[date]
+    processed: int
+    batches: int
+    records_per_second: float
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
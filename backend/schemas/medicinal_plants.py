@@ -382,6 +382,10 @@ class PlantListResponse(BaseModel):
     page_size: int
     total_pages: int
 
+class PlantFacetedSearchResponse(PlantListResponse):
+    """Paginated plant list plus counts per facet value"""
+    facets: Dict[str, Dict[str, int]]
+
 # ===== AI Recommendation Schemas =====
 
 class PlantRecommendationRequest(BaseModel):
@@ -2,7 +2,7 @@
 WhatsApp API Schemas
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from domain.messaging.whatsapp import MessageType, MessageStatus
 
@@ -98,6 +98,36 @@ class SendCustomMessageRequest(BaseModel):
     nutritionist_id: int
 
 
+class BulkRecipient(BaseModel):
+    """Recipient of a bulk send"""
+    patient_id: Optional[int] = None
+    patient_name: str
+    patient_phone: str
+    variables: Dict[str, str] = Field(default_factory=dict)
+
+
+class SendBulkMessageRequest(BaseModel):
+    """
+    Bulk send (e.g. meal-plan reminders to all patients)
+
+    ``message_body`` may use ``{patient_name}`` and any key from each
+    recipient's ``variables``. ``campaign_key`` makes the request idempotent:
+    re-submitting it will not message the same phone twice.
+    """
+    message_type: MessageType
+    message_body: str = Field(..., max_length=1600)
+    recipients: List[BulkRecipient] = Field(..., min_length=1, max_length=50000)
+    nutritionist_id: int
+    campaign_key: Optional[str] = Field(default=None, max_length=100)
+
+
+class BulkMessageQueuedResponse(BaseModel):
+    """Response after queueing a bulk send"""
+    campaign_id: str
+    total_recipients: int
+    status: str
+
+
 # Template Schemas
 class WhatsAppTemplateBase(BaseModel):
     """Base template schema"""
@@ -0,0 +1,82 @@
+"""
+Benchmark Deployment Profiles
+=============================
+
+Para cada ``APP_PROFILE`` (core, clinical, ai, scanner, admin, all) importa
+``main`` en un proceso nuevo y mide:
+
+- tiempo de importación y RSS del worker al terminar ``create_application``
+- rutas y routers montados
+- throughput de ``/health`` en proceso (pila de middlewares + router del
+  perfil, sin red ni base de datos), para comparar perfiles aislados
+
+Uso:
+    python scripts/benchmark_app_profiles.py [--profiles core,scanner] [--number 2000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+
+_CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - started) * 1000
+from core.startup_profile import current_rss_bytes
+rss = current_rss_bytes()
+
+import httpx
+
+async def run(number):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        for _ in range(100):
+            await client.get("/health")
+        started = time.perf_counter()
+        for _ in range(number):
+            await client.get("/health")
+        return number / (time.perf_counter() - started)
+
+routers = sorted(m for m in sys.modules if m.startswith("api.routers."))
+sys.stdout.write("\\n@@RESULT@@" + json.dumps({
+    "import_ms": round(import_ms),
+    "rss_mb": round(rss / 1e6) if rss else None,
+    "routes": len(main.app.routes),
+    "routers": len(routers),
+    "health_rps": round(asyncio.run(run(%d))),
+}))
+"""
+
+
+def measure(profile: str, number: int) -> dict:
+    env = dict(os.environ, APP_PROFILE=profile, PYTHONPATH=str(backend_dir))
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD % number], cwd=backend_dir, env=env, capture_output=True, text=True
+    )
+    if "@@RESULT@@" not in result.stdout:
+        raise RuntimeError(f"profile '{profile}' failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.rsplit("@@RESULT@@", 1)[1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="core,clinical,ai,scanner,admin,all")
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'profile':10} {'import ms':>10} {'RSS MB':>8} {'routes':>7} {'routers':>8} {'/health req/s':>14}")
+    for profile in args.profiles.split(","):
+        r = measure(profile.strip(), args.number)
+        print(
+            f"{profile:10} {r['import_ms']:>10} {r['rss_mb']:>8} {r['routes']:>7} "
+            f"{r['routers']:>8} {r['health_rps']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark Offline Barcode Catalog
+=================================
+
+Tiempo de construcción, tamaño, apertura y latencia de búsqueda (acierto y
+fallo) del catálogo offline sobre productos sintéticos con el formato de la
+respuesta del escáner.
+
+Uso:
+    python scripts/benchmark_barcode_catalog.py [--products 200000] [--number 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from services.nom051.barcode_catalog import NUMBER_FIELDS, BarcodeCatalog, write_catalog  # noqa: E402
+from services.nom051.scan_rollup import SEALS  # noqa: E402
+
+
+def make_products(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    barcodes = rng.sample(range(7_500_000_000_000, 7_509_999_999_999), count)
+    for index, code in enumerate(barcodes):
+        product = {
+            "id": index + 1 if index % 4 == 0 else None,
+            "codigo_barras": str(code),
+            "nombre": f"Producto {index}",
+            "marca": rng.choice(["Marca A", "Marca B", "Marca C", None]),
+            "imagen_url": f"https://images.example.org/{code}.jpg",
+            "ingredientes": "agua, azúcar, sal, " * rng.randint(1, 8),
+            "categoria": rng.choice(["BEVERAGES", "CEREALS", "DAIRY", "OTROS"]),
+            "fuente": "open_food_facts",
+        }
+        product.update((name, round(rng.uniform(0, 500), 2)) for name in NUMBER_FIELDS)
+        product.update((seal, rng.random() < 0.3) for seal in SEALS)
+        yield product
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    products = list(make_products(args.products))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.bin")
+        started = time.perf_counter()
+        write_catalog(path, products)
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        catalog = BarcodeCatalog(path)
+        open_ms = (time.perf_counter() - started) * 1000
+
+        rng = random.Random(3)
+        hits = [p["codigo_barras"] for p in rng.sample(products, 1000)]
+        misses = [str(7_600_000_000_000 + i) for i in range(1000)]
+        assert catalog.get(hits[0])["nombre"] is not None and catalog.get(misses[0]) is None
+
+        hit_us = timeit.timeit(lambda: [catalog.get(code) for code in hits],
+                               number=max(1, args.number // 1000)) / max(1, args.number // 1000) * 1000
+        miss_us = timeit.timeit(lambda: [catalog.get(code) for code in misses],
+                                number=max(1, args.number // 1000)) / max(1, args.number // 1000) * 1000
+
+        print(f"catalog: {len(catalog)} products, {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"{'build':16} {build_s:10.2f} s")
+        print(f"{'open (mmap)':16} {open_ms:10.3f} ms")
+        print(f"{'lookup hit':16} {hit_us:10.2f} us")
+        print(f"{'lookup miss':16} {miss_us:10.2f} us")
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark Cohort Calculator
+===========================
+
+Compara el cálculo de planes nutricionales paciente por paciente
+(``KilocalorieCalculator.create_nutrition_plan``) con el cálculo vectorizado
+por cohorte (``CohortCalculator``), incluyendo la serialización NDJSON que usa
+``POST /api/v1/nutrition-calculator/cohort/nutrition-plans``.
+
+Uso:
+    python scripts/benchmark_cohort_calculator.py [--patients 20000]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from domain.nutritionists.cohort_calculator import CohortCalculator  # noqa: E402
+from domain.nutritionists.kilocalorie_calculator import (  # noqa: E402
+    ActivityLevel, Gender, KilocalorieCalculator, NutritionalGoal, PatientProfile
+)
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:12,.0f} patients/s"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    profiles = [
+        PatientProfile(
+            age=rng.randint(18, 90),
+            weight=round(rng.uniform(40, 160), 1),
+            height=round(rng.uniform(140, 205), 1),
+            gender=rng.choice(list(Gender)),
+            activity_level=rng.choice(list(ActivityLevel)),
+            goal=rng.choice(list(NutritionalGoal)),
+            is_pregnant=rng.random() < 0.05,
+        )
+        for _ in range(args.patients)
+    ]
+
+    scalar = KilocalorieCalculator()
+    started = time.perf_counter()
+    expected = [scalar.create_nutrition_plan(profile) for profile in profiles]
+    scalar_seconds = time.perf_counter() - started
+
+    cohort = CohortCalculator()
+    started = time.perf_counter()
+    plan = cohort.calculate_profiles(profiles)
+    compute_seconds = time.perf_counter() - started
+    rows = list(plan.rows())
+    rows_seconds = time.perf_counter() - started
+    payload = "\n".join(json.dumps(row, ensure_ascii=False) for row in rows)
+    ndjson_seconds = time.perf_counter() - started
+
+    for plan_dict, row in zip(expected, rows):
+        assert row["calculations"] == plan_dict["calculations"]
+        assert row["equivalents_prescription"] == plan_dict["equivalents_prescription"]
+        assert row["plan_summary"] == plan_dict["plan_summary"]
+
+    print(f"Nutrition plans for {args.patients} patients ({len(payload) / 1e6:.1f} MB NDJSON)")
+    print(f"  scalar create_nutrition_plan : {rate(args.patients, scalar_seconds)}")
+    print(f"  cohort arrays only           : {rate(args.patients, compute_seconds)}")
+    print(f"  cohort + row dicts           : {rate(args.patients, rows_seconds)}")
+    print(f"  cohort + NDJSON              : {rate(args.patients, ndjson_seconds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark Database Pool Settings
+================================
+
+Prueba estilo ``pgbench -S`` (y opcionalmente ``-N``) contra Postgres local con
+el engine asíncrono de la aplicación, comparando:
+
+- ``legacy``: la configuración anterior (``pool_pre_ping=True``,
+  ``pool_recycle=300``, pool por defecto 5+10, caché de sentencias por defecto)
+- ``tuned``: ``core.database.engine_options`` con los ``DB_POOL_*`` actuales
+
+Cada cliente abre una sesión por transacción (como un request) y ejecuta un
+SELECT por clave primaria sobre ``bench_db_pool_accounts``; con ``--mode
+update`` además actualiza el saldo. Se reportan TPS, latencias p50/p95/p99 y
+el estado del pool al final.
+
+Requiere ``DATABASE_URL`` apuntando a un Postgres desechable: crea y borra la
+tabla de prueba.
+
+Uso:
+    python scripts/benchmark_db_pool.py [--clients 32] [--seconds 15] [--rows 100000] [--mode select]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from core import database  # noqa: E402
+from core.config import get_settings  # noqa: E402
+
+TABLE = "bench_db_pool_accounts"
+
+SELECT = text(f"SELECT abalance FROM {TABLE} WHERE aid = :aid")
+UPDATE = text(f"UPDATE {TABLE} SET abalance = abalance + :delta WHERE aid = :aid")
+
+
+def legacy_options() -> dict:
+    return {"pool_pre_ping": True, "pool_recycle": 300}
+
+
+async def prepare(engine, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await conn.execute(text(
+            f"CREATE TABLE {TABLE} (aid integer PRIMARY KEY, abalance integer NOT NULL, filler char(84))"
+        ))
+        await conn.execute(text(
+            f"INSERT INTO {TABLE} SELECT g, 0, '' FROM generate_series(1, :rows) AS g"
+        ), {"rows": rows})
+        await conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+async def client(engine, rows: int, mode: str, deadline: float, latencies: list) -> None:
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        aid = rng.randint(1, rows)
+        started = time.perf_counter()
+        async with engine.connect() as conn:
+            await conn.execute(SELECT, {"aid": aid})
+            if mode == "update":
+                await conn.execute(UPDATE, {"aid": aid, "delta": rng.randint(-5000, 5000)})
+                await conn.commit()
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(name: str, url: str, options: dict, args) -> None:
+    engine = create_async_engine(url, **options)
+    database._track_pool(name, engine.sync_engine)
+    try:
+        # Warm-up: open the pool's connections before measuring
+        warmup = time.perf_counter() + 1.0
+        await asyncio.gather(*(client(engine, args.rows, "select", warmup, []) for _ in range(args.clients)))
+
+        latencies: list = []
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        await asyncio.gather(*(
+            client(engine, args.rows, args.mode, deadline, latencies) for _ in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+        ms = np.array(latencies) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        pool = database.pool_metrics()[name]
+        print(
+            f"{name:8} tps={len(latencies) / elapsed:9.0f}  p50={p50:6.2f} ms  p95={p95:6.2f} ms  "
+            f"p99={p99:6.2f} ms  connections={pool['connections_created']}  "
+            f"peak_checked_out={pool['peak_checked_out']}/{pool.get('capacity', '-')}"
+        )
+    finally:
+        await engine.dispose()
+
+
+async def main(args) -> None:
+    settings = get_settings()
+    url = database._async_database_url(settings.database_url)
+    if not url.startswith("postgresql+asyncpg://"):
+        raise SystemExit("DATABASE_URL must point to PostgreSQL")
+
+    setup = create_async_engine(url)
+    await prepare(setup, args.rows)
+    print(f"{args.rows} rows, {args.clients} clients, {args.seconds}s, mode={args.mode}")
+    try:
+        await run("legacy", url, legacy_options(), args)
+        await run("tuned", url, database.engine_options(url, settings), args)
+    finally:
+        if not args.keep:
+            async with setup.begin() as conn:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await setup.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--mode", choices=["select", "update"], default="select")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark table")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Benchmark Equivalents Solver
+============================
+
+Compara la distribución greedy por prioridades
+(``KilocalorieCalculator.distribute_to_equivalents``) con el solver de mínimo
+error (``EquivalentsSolver``): tiempo por plan (sin caché y con caché) y error
+medio absoluto (%) en calorías y macronutrientes.
+
+Con ``--exhaustive N`` también compara las primeras N soluciones contra la
+búsqueda exhaustiva en toda la malla de medios equivalentes (lento).
+
+Uso:
+    python scripts/benchmark_equivalents_solver.py [--plans 300] [--exhaustive 3]
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import numpy as np  # noqa: E402
+
+from domain.foods.equivalents_solver import EquivalentsSolver  # noqa: E402
+from domain.nutritionists.kilocalorie_calculator import KilocalorieCalculator, MacroDistribution  # noqa: E402
+
+
+def mean_abs_error(rows) -> str:
+    errors = np.abs(np.array(rows))
+    return "  ".join(f"{name} {value:5.1f}%" for name, value in zip(("kcal", "prot", "carb", "fat"), errors.mean(0)))
+
+
+def exhaustive_best(solver, groups, targets) -> float:
+    matrix = solver._matrix(groups)
+    low, high = solver.bounds(groups)
+    axes = [np.arange(lo, hi + 0.25, 0.5) for lo, hi in zip(low, high)]
+    rest = np.array(np.meshgrid(*axes[3:], indexing="ij")).reshape(len(axes) - 3, -1)
+    partial = matrix[:, 3:] @ rest
+    weights = solver.weights / targets ** 2
+    best = np.inf
+    for head in itertools.product(*axes[:3]):
+        totals = partial + (matrix[:, :3] @ np.array(head))[:, None]
+        best = min(best, float((((totals - targets[:, None]) ** 2) * weights[:, None]).sum(0).min()))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=300)
+    parser.add_argument("--exhaustive", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(8)
+    calculator = KilocalorieCalculator()
+    groups = calculator.EQUIVALENTS_PRIORITY
+    splits = [(15, 60, 25), (20, 50, 30), (25, 45, 30), (30, 40, 30), (20, 55, 25)]
+    plans = []
+    for _ in range(args.plans):
+        calories = float(rng.randrange(1200, 3200, 5))
+        distribution = MacroDistribution(*rng.choice(splits))
+        plans.append((calories, calculator.calculate_macros(calories, distribution)))
+
+    def errors(totals, calories, macros):
+        targets = (calories, macros["protein_grams"], macros["carbs_grams"], macros["fat_grams"])
+        return [(actual - target) / target * 100 for actual, target in zip(totals, targets)]
+
+    greedy_errors = []
+    started = time.perf_counter()
+    greedy_plans = [calculator.distribute_to_equivalents(calories, macros) for calories, macros in plans]
+    greedy_seconds = time.perf_counter() - started
+    for (calories, macros), prescriptions in zip(plans, greedy_plans):
+        totals = [sum(getattr(p, name) for p in prescriptions)
+                  for name in ("calories_contribution", "protein_grams", "carbs_grams", "fat_grams")]
+        greedy_errors.append(errors(totals, calories, macros))
+
+    solver = EquivalentsSolver()
+    solutions = []
+    started = time.perf_counter()
+    for calories, macros in plans:
+        solutions.append(solver.solve(groups, calories, macros["protein_grams"], macros["carbs_grams"], macros["fat_grams"]))
+    cold_seconds = time.perf_counter() - started
+    misses = solver.cache_info()["misses"]
+
+    started = time.perf_counter()
+    for calories, macros in plans:
+        solver.solve(groups, calories, macros["protein_grams"], macros["carbs_grams"], macros["fat_grams"])
+    warm_seconds = time.perf_counter() - started
+
+    solver_errors = [
+        errors((s.calories, s.protein_g, s.carbs_g, s.fat_g), calories, macros)
+        for s, (calories, macros) in zip(solutions, plans)
+    ]
+
+    print(f"{args.plans} plans, {len(groups)} SMAE groups ({misses} distinct quantized keys)")
+    print(f"  greedy priority  : {greedy_seconds / args.plans * 1e6:9.1f} us/plan   {mean_abs_error(greedy_errors)}")
+    print(f"  solver (cold)    : {cold_seconds / args.plans * 1e6:9.1f} us/plan   {mean_abs_error(solver_errors)}")
+    print(f"  solver (cached)  : {warm_seconds / args.plans * 1e6:9.1f} us/plan")
+
+    for calories, macros in plans[:args.exhaustive]:
+        targets = np.array([calories, macros["protein_grams"], macros["carbs_grams"], macros["fat_grams"]])
+        solution = solver.solve(groups, *targets)
+        amounts = np.array([amount for _, amount in solution.equivalents])
+        found = float((((solver._matrix(groups) @ amounts - targets) / targets) ** 2 * solver.weights).sum())
+        best = exhaustive_best(solver, groups, targets)
+        print(f"  exhaustive check {calories:6.0f} kcal: solver {found:.5f} vs optimum {best:.5f}")
+
+
+if __name__ == "__main__":
+    main()
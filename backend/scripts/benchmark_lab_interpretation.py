@@ -0,0 +1,125 @@
+"""
+Benchmark Lab Interpretation
+============================
+
+Mide registros por segundo del motor de reglas de laboratorio:
+
+- ``generate_ai_interpretation`` registro por registro (endpoint
+  ``/laboratory/{lab_id}/reanalyze``)
+- ``LabRuleEngine.interpret_matrix`` sobre un lote completo (reanálisis
+  masivo), incluyendo el cálculo vectorizado de valores derivados
+
+y el escaneo de texto clínico con el patrón multiparámetro precompilado
+frente a las dos búsquedas con ``re.search`` del análisis anterior (que solo
+cubrían glucosa y colesterol total).
+
+Uso:
+    python scripts/benchmark_lab_interpretation.py [--records 20000]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import numpy as np  # noqa: E402
+
+import domain  # noqa: F401,E402
+from domain.patients.lab_rules import get_lab_rule_engine, scan_lab_values  # noqa: E402
+from domain.patients.laboratory import LaboratoryData, LabTestType  # noqa: E402
+from services.laboratory.reanalysis import compute_derived_values  # noqa: E402
+
+RANGES = {
+    "fasting_glucose_mgdl": (70, 250), "hemoglobin_a1c_pct": (4.5, 10), "total_cholesterol_mgdl": (140, 300),
+    "ldl_cholesterol_mgdl": (60, 220), "hdl_cholesterol_mgdl": (25, 80), "triglycerides_mgdl": (60, 400),
+    "creatinine_mgdl": (0.5, 3), "uric_acid_mgdl": (3, 10), "alt_tgp_UI_l": (10, 120),
+    "tsh_uUI_ml": (0.5, 8), "hemoglobin_g_dl": (9, 17), "vitamin_d_ng_ml": (10, 60),
+    "fasting_insulin_uUI_ml": (3, 30),
+}
+
+DOCUMENT = """LABORATORIO CLÍNICO
+Paciente: Juan Pérez      Fecha: 15/01/2025
+Glucosa: 126 mg/dL            (70-99)
+Hemoglobina glucosilada 6.1 %
+Colesterol total: 210 mg/dL   Colesterol HDL 38 mg/dL   Colesterol LDL 140 mg/dL
+Triglicéridos 180 mg/dL   Creatinina 1.1 mg/dL   Ácido úrico 7.4 mg/dL
+ALT/TGP 45 UI/L   AST/TGO 30 UI/L   TSH 2.1   Hemoglobina 13.5 g/dL   Vitamina D 18 ng/mL
+""" * 3
+
+
+def legacy_scan(text: str) -> list:
+    """Búsqueda anterior: una expresión por parámetro, compilada en cada llamada"""
+    text_lower = text.lower()
+    values = []
+    match = re.search(r'glucosa[:\s]+(\d+\.?\d*)\s*mg/dl', text_lower)
+    if match:
+        values.append(float(match.group(1)))
+    match = re.search(r'colesterol\s+total[:\s]+(\d+\.?\d*)\s*mg/dl', text_lower)
+    if match:
+        values.append(float(match.group(1)))
+    return values
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:12,.0f} /s"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--documents", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    rows = [
+        {name: round(rng.uniform(*bounds), 2) if rng.random() < 0.8 else None for name, bounds in RANGES.items()}
+        for _ in range(args.records)
+    ]
+    labs = [
+        LaboratoryData(patient_id=1, study_date=date(2025, 1, 15), test_type=LabTestType.BLOOD_CHEMISTRY,
+                       laboratory_name="Bench", **row)
+        for row in rows
+    ]
+    engine = get_lab_rule_engine()
+
+    started = time.perf_counter()
+    for lab in labs:
+        lab.calculate_derived_values()
+        lab.generate_ai_interpretation()
+    per_record = time.perf_counter() - started
+
+    names = list(dict.fromkeys(("homa_ir", "atherogenic_index") + tuple(RANGES) + engine.parameters))
+    matrix = np.array([[row.get(name) for name in names] for row in rows], dtype=float).T
+    started = time.perf_counter()
+    columns = {name: matrix[i].copy() for i, name in enumerate(names)}
+    compute_derived_values(columns)
+    batch = engine.interpret_matrix(np.vstack([columns[name] for name in engine.parameters]))
+    batched = time.perf_counter() - started
+
+    assert batch == [lab.ai_interpretation for lab in labs], "batch and per-record interpretations differ"
+
+    started = time.perf_counter()
+    for _ in range(args.documents):
+        legacy_scan(DOCUMENT)
+    legacy_text = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(args.documents):
+        detected = scan_lab_values(DOCUMENT)
+    scanner_text = time.perf_counter() - started
+
+    print(f"Interpretation of {args.records} records ({len(engine.rules)} rules)")
+    print(f"  per record (generate_ai_interpretation) : {rate(args.records, per_record)}")
+    print(f"  batch (interpret_matrix + derived)      : {rate(args.records, batched)}")
+    print(f"Clinical text scan of {args.documents} documents ({len(DOCUMENT)} chars)")
+    print(f"  legacy re.search (2 parameters)         : {rate(args.documents, legacy_text)}")
+    print(f"  compiled scanner ({len(detected)} parameters found) : {rate(args.documents, scanner_text)}")
+
+
+if __name__ == "__main__":
+    main()
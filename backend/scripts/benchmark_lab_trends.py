@@ -0,0 +1,157 @@
+"""
+Benchmark Lab Trends
+====================
+
+Compara el cálculo anterior de tendencias de laboratorio (filas ORM completas
+de ``LaboratoryData`` y un ciclo con ``getattr`` por parámetro y paciente)
+contra la vista columnar de ``services.laboratory`` (una consulta de
+proyección para todo el panel y cálculo vectorizado con NumPy), sobre una
+base SQLite local con estudios sintéticos.
+
+También verifica que ambos métodos producen las mismas series y tendencias.
+
+Uso:
+    python scripts/benchmark_lab_trends.py [--patients 200] [--studies 12] [--repeat 10]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlmodel import Session, SQLModel, and_, select
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import domain  # noqa: F401,E402
+from domain.patients.laboratory import LabTestType, LaboratoryData, Trend  # noqa: E402
+from services.laboratory.lab_series import LabSeriesCache, load_series  # noqa: E402
+
+PARAMS = [
+    "fasting_glucose_mgdl", "hemoglobin_a1c_pct", "total_cholesterol_mgdl", "ldl_cholesterol_mgdl",
+    "hdl_cholesterol_mgdl", "triglycerides_mgdl", "creatinine_mgdl", "alt_tgp_UI_l",
+]
+LOWER_IS_BETTER = set(PARAMS) - {"hdl_cholesterol_mgdl"}
+BASE = {
+    "fasting_glucose_mgdl": 105, "hemoglobin_a1c_pct": 6.0, "total_cholesterol_mgdl": 210,
+    "ldl_cholesterol_mgdl": 120, "hdl_cholesterol_mgdl": 45, "triglycerides_mgdl": 160,
+    "creatinine_mgdl": 1.0, "alt_tgp_UI_l": 35,
+}
+
+
+def seed(session: Session, patients: int, studies: int) -> None:
+    rng = random.Random(11)
+    start = date.today() - timedelta(days=studies * 15)
+    for patient_id in range(1, patients + 1):
+        for i in range(studies):
+            values = {
+                param: round(base * rng.uniform(0.8, 1.2), 2)
+                for param, base in BASE.items()
+                if rng.random() < 0.85
+            }
+            session.add(LaboratoryData(
+                patient_id=patient_id,
+                study_date=start + timedelta(days=i * 15),
+                test_type=LabTestType.BLOOD_CHEMISTRY,
+                laboratory_name="Laboratorio sintético",
+                ai_interpretation={"out_of_range_values": [], "diet_adjustments": ["..."] * 5},
+                **values,
+            ))
+    session.commit()
+
+
+def legacy_trends(session: Session, patient_ids, date_from):
+    """Implementación anterior, una consulta ORM por paciente"""
+    result = {}
+    for patient_id in patient_ids:
+        records = session.exec(
+            select(LaboratoryData).where(and_(
+                LaboratoryData.patient_id == patient_id,
+                LaboratoryData.study_date >= date_from,
+            )).order_by(LaboratoryData.study_date, LaboratoryData.id)
+        ).all()
+        comparisons = []
+        for param in PARAMS:
+            values = []
+            for record in records:
+                value = getattr(record, param, None)
+                if value is not None:
+                    values.append({"date": record.study_date.isoformat(), "value": value})
+            if len(values) >= 2:
+                first, last = values[0]["value"], values[-1]["value"]
+                if last < first:
+                    trend = Trend.IMPROVING if param in LOWER_IS_BETTER else Trend.WORSENING
+                elif last > first:
+                    trend = Trend.WORSENING if param in LOWER_IS_BETTER else Trend.IMPROVING
+                else:
+                    trend = Trend.STABLE
+                comparisons.append((param, values, trend))
+        result[patient_id] = comparisons
+        session.expunge_all()
+    return result
+
+
+def columnar_trends(session: Session, patient_ids, date_from, cache: LabSeriesCache = None):
+    """Vista columnar: una consulta de proyección y cálculo vectorizado"""
+    trend_by_direction = {1: Trend.IMPROVING, -1: Trend.WORSENING, 0: Trend.STABLE}
+    panel = cache.get_many(session, patient_ids) if cache else load_series(session, patient_ids)
+    result = {}
+    for patient_id in patient_ids:
+        series = panel[patient_id].since(date_from)
+        summary = series.summarize(PARAMS)
+        result[patient_id] = [
+            (param, series.points(param), trend_by_direction[int(summary.direction[i])])
+            for i, param in enumerate(summary.parameters)
+            if summary.count[i] >= 2
+        ]
+    return result
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--studies", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine, tables=[LaboratoryData.__table__])
+    date_from = date.today() - timedelta(days=6 * 30)
+    patient_ids = list(range(1, args.patients + 1))
+
+    with Session(engine) as session:
+        seed(session, args.patients, args.studies)
+
+        legacy = legacy_trends(session, patient_ids, date_from)
+        columnar = columnar_trends(session, patient_ids, date_from)
+        assert legacy == columnar, "columnar trends differ from the legacy implementation"
+
+        cache = LabSeriesCache(max_patients=args.patients)
+        legacy_s = timed(lambda: legacy_trends(session, patient_ids, date_from), args.repeat)
+        columnar_s = timed(lambda: columnar_trends(session, patient_ids, date_from), args.repeat)
+        columnar_trends(session, patient_ids, date_from, cache)
+        cached_s = timed(lambda: columnar_trends(session, patient_ids, date_from, cache), args.repeat)
+
+    rows = args.patients * args.studies
+    print(f"Panel: {args.patients} patients x {args.studies} studies ({rows} rows), {len(PARAMS)} parameters")
+    print(f"  legacy ORM rows + getattr loops : {legacy_s * 1000:9.2f} ms")
+    print(f"  columnar projection + NumPy     : {columnar_s * 1000:9.2f} ms  ({legacy_s / columnar_s:5.1f}x)")
+    print(f"  columnar, cached series         : {cached_s * 1000:9.2f} ms  ({legacy_s / cached_s:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark Meal Builder Suggestions
+==================================
+
+Latencia por consulta de las sugerencias del constructor de comidas sobre un
+catálogo sintético: recorrido en Python de las filas del grupo (filtrar
+excluidos/alérgenos y ordenar por cercanía, lo que costaría hacerlo tras
+leer las filas de la base de datos) frente a ``EquivalenceSuggestionIndex``
+(bitsets + ``argpartition`` sobre arreglos del grupo).
+
+Uso:
+    python scripts/benchmark_meal_suggestions.py [--foods 20000] [--number 2000]
+"""
+import argparse
+import random
+import sys
+import time
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from domain.foods.equivalences import EquivalenceGroup  # noqa: E402
+from domain.foods.smae_table import SMAE_TABLE  # noqa: E402
+from services.foods.equivalence_index import EquivalenceSuggestionIndex, normalize_allergen  # noqa: E402
+
+ALLERGENS = ["gluten", "lactosa", "huevo", "cacahuate", "nuez", "soya", "mariscos", "pescado"]
+
+
+def make_catalog(foods: int, seed: int = 7):
+    rng = random.Random(seed)
+    groups = list(SMAE_TABLE.groups)
+    pairs = []
+    for food_id in range(1, foods + 1):
+        group = groups[food_id % len(groups)]
+        row = SMAE_TABLE.row(group)
+        noise = lambda value: max(0.0, value * rng.uniform(0.6, 1.4) + rng.uniform(-0.5, 0.5))  # noqa: E731
+        pairs.append((
+            SimpleNamespace(
+                id=food_id, equivalence_group=group, standard_portion=rng.choice([0.5, 1, 30, 100]),
+                standard_unit="g", calories_per_equivalent=noise(row.calories),
+                protein_per_equivalent=noise(row.protein), carbs_per_equivalent=noise(row.carbs),
+                fat_per_equivalent=noise(row.fat), notes=None,
+            ),
+            SimpleNamespace(
+                id=food_id, name=f"Alimento {food_id}",
+                allergens=rng.sample(ALLERGENS, rng.choice([0, 0, 0, 1, 2])),
+            ),
+        ))
+    return pairs
+
+
+def python_suggestions(pairs, group, target_equivalents, limit, exclude_foods, exclude_allergens):
+    """Filtro y orden fila por fila con la misma distancia del índice"""
+    standard = SMAE_TABLE.row(group)
+    target = [standard.calories * target_equivalents, standard.protein * target_equivalents,
+              standard.carbs * target_equivalents, standard.fat * target_equivalents]
+    weights = [factor / max(target[0], 10.0) for factor in (1.0, 4.0, 4.0, 9.0)]
+    excluded = set(exclude_foods)
+    blocked = {normalize_allergen(a) for a in exclude_allergens}
+    scored = []
+    for equivalence, food in pairs:
+        if equivalence.equivalence_group != group or food.id in excluded:
+            continue
+        if any(normalize_allergen(a) in blocked for a in food.allergens or []):
+            continue
+        values = (equivalence.calories_per_equivalent, equivalence.protein_per_equivalent,
+                  equivalence.carbs_per_equivalent, equivalence.fat_per_equivalent)
+        distance = sum(((v * target_equivalents - t) * w) ** 2 for v, t, w in zip(values, target, weights))
+        scored.append((distance, food.id))
+    scored.sort()
+    return [food_id for _, food_id in scored[:limit]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--foods", type=int, default=20000)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    pairs = make_catalog(args.foods)
+    index = EquivalenceSuggestionIndex()
+    started = time.perf_counter()
+    index.build(pairs)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    group = EquivalenceGroup.CEREALES
+    exclude_foods = list(range(1, 400, 3))
+    exclude_allergens = ["Gluten", "cacahuate"]
+    call = dict(group=group, target_equivalents=2.5, limit=20)
+
+    expected = python_suggestions(pairs, exclude_foods=exclude_foods, exclude_allergens=exclude_allergens, **call)
+    got = [s["food_id"] for s in index.suggestions(
+        exclude_food_ids=exclude_foods, exclude_allergens=exclude_allergens, **call)]
+    assert got == expected, (got, expected)
+
+    python_us = timeit.timeit(
+        lambda: python_suggestions(pairs, exclude_foods=exclude_foods, exclude_allergens=exclude_allergens, **call),
+        number=max(1, args.number // 50)) / max(1, args.number // 50) * 1e6
+    index_us = timeit.timeit(
+        lambda: index.suggestions(exclude_food_ids=exclude_foods, exclude_allergens=exclude_allergens, **call),
+        number=args.number) / args.number * 1e6
+
+    print(f"catalog: {args.foods} foods, {len(index._groups[group])} in {group.value}; build {build_ms:.1f} ms")
+    print(f"{'python scan + sort':24} {python_us:10.1f} us/query")
+    print(f"{'suggestion index':24} {index_us:10.1f} us/query ({python_us / index_us:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Benchmark Middleware Stack
+==========================
+
+Overhead por request de la pila de middlewares sobre un endpoint trivial:
+
+- ``legacy``: la pila anterior de ``create_application`` (``add_request_id``,
+  ``LoggingMiddleware`` ASGI, ``RateLimitByIPMiddleware`` y
+  ``SecurityHeadersMiddleware`` como ``BaseHTTPMiddleware``), reproducida aquí
+- ``instrumentation``: ``RequestInstrumentationMiddleware``
+
+El sink de ``nutrition_logger`` se reemplaza por uno vacío en ambos casos para
+medir solo el middleware (la escritura a disco es la misma).
+
+Uso:
+    python scripts/benchmark_middleware_stack.py [--number 5000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from core.logging import nutrition_logger  # noqa: E402
+from middleware.instrumentation import (  # noqa: E402
+    DOCS_PATHS, RequestInstrumentationMiddleware, business_context
+)
+
+
+async def ping(request: Request):
+    return JSONResponse({"ok": True})
+
+
+def endpoint_app():
+    return Starlette(routes=[Route("/api/v1/patients/1/ping", ping)])
+
+
+# ----------------------------------------------------------------------
+# Pila anterior (misma lógica, sin el sink de logging)
+# ----------------------------------------------------------------------
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Permissions-Policy"] = (
+            "accelerometer=(), camera=(), geolocation=(), gyroscope=(), "
+            "magnetometer=(), microphone=(), payment=(), usb=()"
+        )
+        path = request.url.path
+        if any(path.startswith(p) for p in ["/api/v1/auth", "/api/v1/users/me", "/health"]):
+            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, private"
+        return response
+
+
+class LegacyRateLimitByIP(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        # Solo se limitaban las rutas de documentación; el endpoint medido pasa directo
+        if request.url.path not in DOCS_PATHS:
+            return await call_next(request)
+        raise NotImplementedError
+
+
+class LegacyLogging:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        request_id = f"req_{uuid.uuid4().hex[:8]}"
+        request.state.request_id = request_id
+        start_time = time.time()
+        client_ip = request.client.host if request.client else "unknown"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                nutrition_logger.log_request(
+                    status="Success", message=f"{request.method} {request.url.path}",
+                    request_id=request_id, endpoint=request.url.path, method=request.method,
+                    response_time_ms=int((time.time() - start_time) * 1000),
+                    status_code=message["status"],
+                    metadata={"ip": client_ip, "user_agent": request.headers.get("user-agent", ""),
+                              "content_type": request.headers.get("content-type", ""),
+                              "query_params": dict(request.query_params) or None},
+                    business_context=business_context(request.url.path, request.method, message["status"]),
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class LegacyRequestId(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Process-Time"] = str(time.time() - start_time)
+        return response
+
+
+def legacy_stack():
+    app = endpoint_app()
+    for middleware in (LegacySecurityHeaders, LegacyRateLimitByIP, LegacyLogging, LegacyRequestId):
+        app = middleware(app)
+    return app
+
+
+# ----------------------------------------------------------------------
+# Medición
+# ----------------------------------------------------------------------
+
+SCOPE = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+    "scheme": "http", "path": "/api/v1/patients/1/ping", "raw_path": b"/api/v1/patients/1/ping",
+    "root_path": "", "query_string": b"", "server": ("test", 80), "client": ("10.0.0.1", 5000),
+    "headers": [(b"host", b"test"), (b"user-agent", b"bench"), (b"accept", b"*/*")],
+}
+
+
+async def request(app) -> None:
+    """Un request completo; ``receive`` se bloquea tras el cuerpo, como un servidor real"""
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    disconnected = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    await app(dict(SCOPE), receive, send)
+
+
+async def run(app, number: int) -> float:
+    for _ in range(200):
+        await request(app)
+    started = time.perf_counter()
+    for _ in range(number):
+        await request(app)
+    return (time.perf_counter() - started) / number * 1e6
+
+
+async def main(number: int) -> None:
+    nutrition_logger.log_request = lambda **kwargs: None
+
+    bare_us = await run(endpoint_app(), number)
+    legacy_us = await run(legacy_stack(), number)
+    single_us = await run(RequestInstrumentationMiddleware(endpoint_app(), environment="production"), number)
+
+    print(f"{'endpoint only':18} {bare_us:8.1f} us/request")
+    print(f"{'legacy stack':18} {legacy_us:8.1f} us/request (+{legacy_us - bare_us:.1f} us)")
+    print(f"{'instrumentation':18} {single_us:8.1f} us/request (+{single_us - bare_us:.1f} us)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.number))
@@ -0,0 +1,147 @@
+"""
+Benchmark OCR Pipeline
+======================
+
+Mide páginas por segundo de la extracción de texto de archivos clínicos:
+el procesamiento en línea anterior (todas las páginas en el proceso del
+servidor, una tras otra) contra ``OcrPipeline`` con pools de 1..N procesos,
+sobre PDFs generados localmente con PyMuPDF.
+
+Las escrituras de avance van a un almacén en memoria, así que la medición
+refleja solo extracción y reparto de páginas. También se reporta el mayor
+bloqueo del event loop observado por un latido de 5 ms: es lo que percibe
+el resto de las peticiones del worker mientras se procesa un archivo.
+
+Uso:
+    python scripts/benchmark_ocr_pipeline.py [--files 8] [--pages 20] [--workers 1,2,4]
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import fitz  # noqa: E402  PyMuPDF
+
+from services.laboratory.ocr_pipeline import OcrJob, OcrPipeline  # noqa: E402
+
+LINES = [
+    "LABORATORIO CLÍNICO - RESULTADOS",
+    "Glucosa: {glucose} mg/dL      Referencia 70-99 mg/dL",
+    "Colesterol total: {cholesterol} mg/dL",
+    "Triglicéridos: 150 mg/dL   HDL 45 mg/dL   LDL 120 mg/dL",
+    "Hemoglobina glucosilada 5.9 %",
+]
+
+
+def generate_pdf(path: Path, pages: int, seed: int) -> None:
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        y = 72
+        for repeat in range(12):
+            for line in LINES:
+                page.insert_text((72, y), line.format(glucose=90 + (seed + number) % 40, cholesterol=180 + repeat))
+                y += 11
+        page.insert_text((72, y + 20), f"Página {number + 1} de {pages}")
+    doc.save(str(path))
+    doc.close()
+
+
+class MemoryStore:
+    async def update(self, file_id, **values):
+        pass
+
+    async def claim(self, owner, stale_before, file_ids=None, limit=None):
+        return list(file_ids or [])
+
+    async def heartbeat(self, owner, file_ids):
+        pass
+
+
+def inline_extract(paths) -> None:
+    """Procesamiento anterior: todo el documento dentro del proceso del servidor"""
+    for path in paths:
+        text = ""
+        doc = fitz.open(path)
+        for page in doc:
+            text += page.get_text()
+        doc.close()
+
+
+async def heartbeat(lags, interval: float = 0.005) -> None:
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - expected)
+
+
+async def run_inline(paths):
+    lags = []
+    beat = asyncio.create_task(heartbeat(lags))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    for path in paths:
+        # Como el handler anterior: extracción dentro de la corrutina
+        inline_extract([path])
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    beat.cancel()
+    return elapsed, max(lags)
+
+
+async def run_pipeline(paths, workers: int, pages_per_task: int):
+    pipeline = OcrPipeline(store=MemoryStore(), max_workers=workers, pages_per_task=pages_per_task,
+                           max_concurrent_jobs=max(1, workers))
+    try:
+        # Calentar el pool (arranque de procesos) fuera de la medición
+        await pipeline.process(OcrJob(file_id=0, path=str(paths[0]), file_format="pdf"))
+        lags = []
+        beat = asyncio.create_task(heartbeat(lags))
+        await asyncio.sleep(0.02)
+        started = time.perf_counter()
+        for file_id, path in enumerate(paths, start=1):
+            pipeline.submit(OcrJob(file_id=file_id, path=str(path), file_format="pdf"))
+        await pipeline.join()
+        elapsed = time.perf_counter() - started
+        beat.cancel()
+        return elapsed, max(lags)
+    finally:
+        await pipeline.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--pages-per-task", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = Path(tmp) / f"lab_{i}.pdf"
+            generate_pdf(path, args.pages, seed=i)
+            paths.append(path)
+        total_pages = args.files * args.pages
+
+        inline_s, inline_lag = asyncio.run(run_inline(paths))
+
+        print(f"{args.files} PDFs x {args.pages} pages ({total_pages} pages)")
+        print(f"  inline (request handler)   : {total_pages / inline_s:9.1f} pages/s, "
+              f"max event loop stall {inline_lag * 1000:7.1f} ms")
+        for workers in [int(w) for w in args.workers.split(",")]:
+            elapsed, lag = asyncio.run(run_pipeline(paths, workers, args.pages_per_task))
+            label = f"pipeline, {workers} process(es)"
+            print(f"  {label:<27}: {total_pages / elapsed:9.1f} pages/s, "
+                  f"max event loop stall {lag * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark Plant Facet Index
+===========================
+
+Compara las consultas anteriores de los endpoints de plantas medicinales
+(un ``COUNT`` por categoría en ``/categories``; ``COUNT`` sobre subconsulta
+más página en ``/``) contra el índice facetado en memoria, sobre una base
+SQLite local con plantas sintéticas.
+
+Nota: el filtro por estado con ``json_contains`` no existe en SQLite ni en
+PostgreSQL, por lo que la comparación usa filtros por columnas.
+
+Uso:
+    python scripts/benchmark_plant_facets.py [--plants 2000] [--repeat 50]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import domain  # noqa: F401,E402
+import domain.patients.laboratory  # noqa: F401,E402
+from domain.medicinal_plants.models import (  # noqa: E402
+    EvidenceLevel, MedicinalPlant, PlantCategory, SafetyLevel,
+)
+from services.medicinal_plants.facet_index import PlantFacetIndex  # noqa: E402
+
+STATES = ["Puebla", "Oaxaca", "Chiapas", "Veracruz", "México", "Michoacán", "Jalisco", "Yucatán"]
+
+
+def synthetic_plants(count: int):
+    rng = random.Random(3)
+    for i in range(count):
+        yield MedicinalPlant(
+            scientific_name=f"Planta {i}",
+            popular_names=[f"hierba {i}", rng.choice(["té", "flor", "raíz"]) + f" {i % 50}"],
+            states_found=rng.sample(STATES, rng.randint(1, 4)),
+            primary_category=rng.choice(list(PlantCategory)),
+            evidence_level=rng.choice(list(EvidenceLevel)),
+            safety_level=rng.choice(list(SafetyLevel)),
+            traditional_uses=["digestión"],
+            preparation_methods=[{"type": "TEA"}],
+            where_to_find=["mercado"],
+            safe_in_pregnancy=rng.random() < 0.3,
+            safe_for_children=rng.random() < 0.5,
+            featured=rng.random() < 0.05,
+        )
+
+
+async def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def run(args):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(MedicinalPlant.metadata.create_all, tables=[MedicinalPlant.__table__])
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as session:
+        session.add_all(list(synthetic_plants(args.plants)))
+        await session.commit()
+
+    index = PlantFacetIndex()
+    async with Session() as session:
+        start = time.perf_counter()
+        await index.load(session)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        async def old_categories():
+            for cat in PlantCategory:
+                await session.execute(select(func.count()).where(and_(
+                    MedicinalPlant.primary_category == cat, MedicinalPlant.is_active == True
+                )))
+
+        async def old_list():
+            query = select(MedicinalPlant).where(and_(
+                MedicinalPlant.is_active == True,
+                MedicinalPlant.primary_category == PlantCategory.DIGESTIVE,
+                MedicinalPlant.safe_for_children == True,
+            ))
+            await session.execute(select(func.count()).select_from(query.subquery()))
+            (await session.execute(query.offset(0).limit(20))).scalars().all()
+
+        async def new_categories():
+            index.facet_counts("category")
+
+        async def new_search():
+            index.search(
+                filters={"category": PlantCategory.DIGESTIVE, "safe_for_children": True},
+                page_size=20,
+            )
+
+        results = [
+            ("categories (old, per-enum COUNT)", await timed(old_categories, args.repeat)),
+            ("categories (facet index)", await timed(new_categories, args.repeat)),
+            ("list page + total (old)", await timed(old_list, args.repeat)),
+            ("search + all facets (index)", await timed(new_search, args.repeat)),
+        ]
+
+    print(f"Plants: {args.plants}  index build (incl. query): {build_ms:.1f} ms")
+    for name, ms in results:
+        print(f"  {name:<36} {ms:8.3f} ms")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the medicinal plant facet index")
+    parser.add_argument("--plants", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,97 @@
+"""
+Benchmark Recipe Rating Stats
+=============================
+
+Compara el cálculo de estadísticas de rating recorriendo todas las filas
+(método anterior: cargar, promediar y ordenar dos veces en Python) contra el
+agregado mantenido ``RecipeRatingStats``, y mide el costo de actualizar el
+agregado por cada rating/voto.
+
+Uso:
+    python scripts/benchmark_recipe_rating_stats.py [--ratings 50000] [--reads 200]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import domain  # noqa: F401,E402
+import domain.patients.laboratory  # noqa: F401,E402
+from domain.recipes.models import RecipeRating, RecipeRatingStats  # noqa: E402
+
+
+def full_scan_stats(all_ratings):
+    """Método anterior de get_recipe_rating_stats"""
+    total = len(all_ratings)
+    average = sum(r.rating for r in all_ratings) / total
+    distribution = {"5": 0, "4": 0, "3": 0, "2": 0, "1": 0}
+    for rating in all_ratings:
+        distribution[str(rating.rating)] += 1
+    recent = sorted(all_ratings, key=lambda x: x.created_at, reverse=True)[:10]
+    helpful = [r for r in all_ratings if r.comment and len(r.comment.strip()) > 0]
+    helpful = sorted(helpful, key=lambda x: x.helpful_votes, reverse=True)[:5]
+    return average, distribution, recent, helpful
+
+
+def aggregate_stats(stats):
+    return stats.average, stats.distribution(), stats.recent_ratings, stats.helpful_ratings
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run(args):
+    rng = random.Random(42)
+    base = datetime(2025, 1, 1)
+    ratings = [
+        RecipeRating(
+            id=i, recipe_id=1, user_id=i, rating=rng.randint(1, 5),
+            comment="Muy buena" if rng.random() < 0.4 else None,
+            helpful_votes=0, created_at=base + timedelta(seconds=i),
+        )
+        for i in range(1, args.ratings + 1)
+    ]
+
+    stats = RecipeRatingStats(recipe_id=1)
+    start = time.perf_counter()
+    for rating in ratings:
+        stats.rating_added(rating)
+    add_us = (time.perf_counter() - start) / len(ratings) * 1e6
+
+    voted = rng.sample(ratings, min(5000, len(ratings)))
+    start = time.perf_counter()
+    for rating in voted:
+        rating.helpful_votes += 1
+        stats.helpful_vote_added(rating)
+    vote_us = (time.perf_counter() - start) / len(voted) * 1e6
+
+    scan_ms = timed(lambda: full_scan_stats(ratings), args.reads)
+    agg_ms = timed(lambda: aggregate_stats(stats), args.reads)
+
+    avg_scan = full_scan_stats(ratings)[0]
+    assert abs(avg_scan - stats.average) < 1e-9
+
+    print(f"Ratings:        {args.ratings}")
+    print(f"Full scan read: {scan_ms:.3f} ms (excluding loading {args.ratings} rows from the DB)")
+    print(f"Aggregate read: {agg_ms:.4f} ms  ({scan_ms / agg_ms:.0f}x faster)")
+    print(f"Update cost:    add={add_us:.1f} us/rating  helpful_vote={vote_us:.1f} us/vote")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recipe rating stats")
+    parser.add_argument("--ratings", type=int, default=50_000)
+    parser.add_argument("--reads", type=int, default=200)
+    run(parser.parse_args())
@@ -0,0 +1,102 @@
+"""
+Benchmark SMAE Table
+====================
+
+Microbenchmarks por llamada de la aritmética de equivalentes: búsquedas en
+``SMAE_GROUP_STANDARDS`` (dict de dicts, como antes) frente a la tabla
+inmutable ``SMAE_TABLE`` (filas NamedTuple + producto punto).
+
+Uso:
+    python scripts/benchmark_smae_table.py [--number 20000]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import numpy as np  # noqa: E402
+
+from domain.foods.equivalences import EquivalenceGroup, SMAE_GROUP_STANDARDS  # noqa: E402
+from domain.foods.smae_table import SMAE_TABLE  # noqa: E402
+from domain.nutritionists.kilocalorie_calculator import KilocalorieCalculator  # noqa: E402
+
+DAY = {
+    "cereales": 6.5, "leguminosas": 1.0, "aoa_bajo_grasa": 3.0, "aoa_moderada_grasa": 1.0,
+    "leche_descremada": 2.0, "verduras": 5.0, "frutas": 3.0, "grasas_sin_proteina": 4.0,
+    "azucares_sin_grasa": 1.0, "desconocido": 2.0,
+}
+
+
+def legacy_actual_calories(equivalents):
+    """EquivalenceDistributor.calculate_actual_calories / NutritionalProfile.calories_from_equivalents"""
+    total_calories = 0
+    for group_key, equiv_count in equivalents.items():
+        try:
+            group = EquivalenceGroup(group_key)
+            total_calories += equiv_count * SMAE_GROUP_STANDARDS[group]["calories"]
+        except ValueError:
+            continue
+    return round(total_calories, 2)
+
+
+def table_actual_calories(equivalents):
+    return round(SMAE_TABLE.calories_of(equivalents), 2)
+
+
+def legacy_daily_totals(equivalents):
+    """track_daily_equivalents: calorías y macros consumidos"""
+    total_calories = 0
+    macros = {"protein": 0, "carbs": 0, "fat": 0}
+    for group_key, consumed in equivalents.items():
+        if group_key in [g.value for g in EquivalenceGroup]:
+            standards = SMAE_GROUP_STANDARDS[EquivalenceGroup(group_key)]
+            total_calories += consumed * standards["calories"]
+            macros["protein"] += consumed * standards["protein"]
+            macros["carbs"] += consumed * standards["carbs"]
+            macros["fat"] += consumed * standards["fat"]
+    return total_calories, macros
+
+
+def table_daily_totals(equivalents):
+    return SMAE_TABLE.totals(equivalents)
+
+
+def legacy_group_matrix(groups):
+    return np.array([[SMAE_GROUP_STANDARDS[g][name] for g in groups]
+                     for name in ("calories", "protein", "carbs", "fat")], dtype=float)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    calculator = KilocalorieCalculator()
+    groups = calculator.EQUIVALENTS_PRIORITY
+    known = {k: v for k, v in DAY.items() if k in SMAE_TABLE}
+
+    assert legacy_actual_calories(DAY) == table_actual_calories(DAY)
+    legacy_kcal, legacy_macros = legacy_daily_totals(known)
+    totals = table_daily_totals(known)
+    assert abs(legacy_kcal - totals["calories"]) < 1e-9 and abs(legacy_macros["fat"] - totals["fat"]) < 1e-9
+    assert (legacy_group_matrix(groups) == SMAE_TABLE.matrix(groups)).all()
+
+    cases = [
+        ("actual calories (10 keys)", lambda: legacy_actual_calories(DAY), lambda: table_actual_calories(DAY)),
+        ("daily kcal + macros (9 groups)", lambda: legacy_daily_totals(known), lambda: table_daily_totals(known)),
+        ("solver group matrix (9 groups)", lambda: legacy_group_matrix(groups), lambda: SMAE_TABLE.matrix(groups)),
+    ]
+
+    print(f"{'case':34} {'dict lookups':>14} {'SMAE_TABLE':>12} {'speedup':>8}")
+    for name, legacy, table in cases:
+        table_us = timeit.timeit(table, number=args.number) / args.number * 1e6
+        legacy_us = timeit.timeit(legacy, number=args.number) / args.number * 1e6
+        print(f"{name:34} {legacy_us:11.2f} us {table_us:9.2f} us {legacy_us / table_us:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Build Offline Barcode Catalog
+=============================
+
+Genera el catálogo offline de códigos de barras que consulta el escáner antes
+de Redis, la base de datos y Open Food Facts. Las fuentes se combinan; ante
+códigos repetidos gana ``productos_nom051`` (conserva el id del producto).
+
+El archivo se reemplaza de forma atómica; los workers lo recargan solos.
+
+Uso:
+    python scripts/build_barcode_catalog.py --from-db
+    python scripts/build_barcode_catalog.py --off-dump en.openfoodfacts.org.products.csv.gz
+    python scripts/build_barcode_catalog.py --from-db --off-dump dump.csv.gz --country en:mexico
+"""
+import argparse
+import asyncio
+import itertools
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.config import get_settings  # noqa: E402
+from core.database import init_database  # noqa: E402
+import core.database as database  # noqa: E402
+from services.nom051.barcode_catalog import (  # noqa: E402
+    iter_database_products, iter_off_dump, write_catalog
+)
+
+
+async def load_database_products():
+    """Productos de productos_nom051 con código de barras"""
+    init_database()
+    products = []
+    async with database.async_engine.connect() as conn:
+        async for product in iter_database_products(conn):
+            products.append(product)
+    await database.async_engine.dispose()
+    return products
+
+
+def build(output: str, from_db: bool, off_dump: str, country: str):
+    start = time.perf_counter()
+    db_products = asyncio.run(load_database_products()) if from_db else []
+    if from_db:
+        print(f"🗄️  {len(db_products)} productos desde productos_nom051")
+
+    off_products = iter_off_dump(off_dump, country=country or None) if off_dump else []
+    count = write_catalog(output, itertools.chain(db_products, off_products))
+
+    size_mb = Path(output).stat().st_size / 1e6
+    print(f"✅ {count} productos en {time.perf_counter() - start:.1f}s ({size_mb:.1f} MB)")
+    print(f"📁 Catálogo guardado en: {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline barcode catalog")
+    parser.add_argument("--output", default=get_settings().barcode_catalog_path)
+    parser.add_argument("--from-db", action="store_true", help="Incluir productos_nom051")
+    parser.add_argument("--off-dump", help="Volcado CSV de Open Food Facts (.csv o .csv.gz)")
+    parser.add_argument("--country", default="en:mexico", help="Filtro de countries_tags ('' = todos)")
+    args = parser.parse_args()
+
+    if not args.from_db and not args.off_dump:
+        parser.error("indica --from-db y/o --off-dump")
+    build(args.output, args.from_db, args.off_dump, args.country)
@@ -0,0 +1,48 @@
+"""
+Build RAG Vector Index
+======================
+
+Construye el índice vectorial local para búsqueda semántica RAG a partir de
+alimentos SMAE, productos NOM-051 y plantas medicinales, y lo guarda en
+``RAG_INDEX_PATH`` (o en la ruta indicada).
+
+Uso:
+    python scripts/build_rag_index.py [--output data/rag_index]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.config import get_settings  # noqa: E402
+from core.database import init_database  # noqa: E402
+import core.database as database  # noqa: E402
+from services.rag.vector_index import VectorIndex, build_index_from_db  # noqa: E402
+
+
+async def build(output: str):
+    """Build and persist the index"""
+    init_database()
+
+    start = time.perf_counter()
+    async with database.AsyncSessionLocal() as session:
+        index = await build_index_from_db(session, VectorIndex())
+    index.save(output)
+
+    print(f"✅ {len(index)} documentos indexados en {time.perf_counter() - start:.1f}s")
+    print(f"📁 Índice guardado en: {output}")
+
+    await database.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the RAG vector index")
+    parser.add_argument("--output", default=get_settings().rag_index_path)
+    args = parser.parse_args()
+
+    asyncio.run(build(args.output))
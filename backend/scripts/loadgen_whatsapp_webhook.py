@@ -0,0 +1,120 @@
+"""
+Load Generator - WhatsApp Webhook
+=================================
+
+Envía ráfagas concurrentes de payloads tipo Twilio al webhook de WhatsApp y
+reporta throughput y latencias (p50/p95/p99) de la respuesta TwiML.
+
+Por defecto corre en proceso: monta solo el router de WhatsApp sobre una app
+FastAPI, precarga el índice de teléfonos con pacientes sintéticos y reemplaza
+el sink de la base de datos por un contador, de modo que mide el camino de
+aceptación del webhook. Con ``--url`` apunta a un servidor real.
+
+Uso:
+    python scripts/loadgen_whatsapp_webhook.py [--requests 20000] [--concurrency 200]
+    python scripts/loadgen_whatsapp_webhook.py --url http://localhost:8000/api/v1/whatsapp/webhook
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# Add backend directory to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+
+def make_payload(i: int, patients: int) -> dict:
+    """Payload de formulario como el que envía Twilio"""
+    known = random.random() < 0.8
+    number = random.randrange(patients) if known else patients + i
+    return {
+        "From": f"whatsapp:+521550{number:07d}",
+        "To": "whatsapp:+14155238886",
+        "Body": "Hola, tengo una duda sobre mi plan de alimentación",
+        "MessageSid": f"SM{i:032d}",
+        "NumMedia": "0",
+    }
+
+
+def build_in_process_app(patients: int):
+    from fastapi import FastAPI
+    from api.routers import whatsapp
+    from services.whatsapp import inbound
+
+    index = inbound.get_phone_index()
+    index.load_rows(
+        (i + 1, i + 1, f"+52 550 {i:07d}", f"Paciente{i}", "Prueba") for i in range(patients)
+    )
+
+    persisted = {"rows": 0}
+
+    async def sink(rows):
+        persisted["rows"] += len(rows)
+
+    inbound._inbound_ingestor = inbound.InboundWebhookIngestor(sink=sink, phone_index=index)
+
+    app = FastAPI()
+    app.include_router(whatsapp.router, prefix="/api/v1")
+    return app, persisted
+
+
+async def run(args):
+    persisted = None
+    if args.url:
+        url = args.url
+        client = httpx.AsyncClient(timeout=30)
+    else:
+        app, persisted = build_in_process_app(args.patients)
+        url = "http://loadgen/api/v1/whatsapp/webhook"
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), timeout=30)
+
+    latencies = []
+    errors = 0
+    counter = iter(range(args.requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, data=make_payload(i, args.patients))
+                if response.status_code != 200 or "<Response>" not in response.text:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    async with client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000  # noqa: E731
+    print(f"Requests:   {args.requests} in {elapsed:.2f}s -> {args.requests / elapsed:.1f} req/s "
+          f"({args.concurrency} concurrent, {errors} errors)")
+    print(f"Latency:    mean={statistics.mean(latencies) * 1000:.2f}ms p50={pct(0.50):.2f}ms "
+          f"p95={pct(0.95):.2f}ms p99={pct(0.99):.2f}ms")
+
+    if persisted is not None:
+        from services.whatsapp.inbound import get_inbound_ingestor
+        ingestor = get_inbound_ingestor()
+        await ingestor.stop()
+        metrics = ingestor.metrics()
+        print(f"Ingestion:  persisted={persisted['rows']} matched={metrics['matched']} "
+              f"batches={metrics['batches']} avg_batch={metrics['avg_batch_size']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the WhatsApp webhook")
+    parser.add_argument("--url", help="Webhook URL of a running server (default: in-process)")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=50_000)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""
+Profile Application Startup
+===========================
+
+Importa ``main`` en un proceso nuevo con ``STARTUP_PROFILE=1`` y muestra el
+tiempo de importación y el crecimiento del RSS por módulo
+(``core.startup_profile``), más el estado de los proveedores externos.
+
+Sale con código 1 si el arranque excede ``--budget-ms`` o si se importó al
+arrancar algún SDK que debe cargarse al primer uso (``HEAVY_MODULES``), para
+usarlo como verificación en CI.
+
+Uso:
+    python scripts/profile_startup.py [--top 30] [--budget-ms 3000] [--sort cumulative_ms]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+
+_CHILD = """
+import json, sys
+import main
+from core.providers import provider_status
+from core.startup_profile import last_report
+report = last_report()
+report["providers"] = provider_status()
+sys.stdout.write("\\n@@REPORT@@" + json.dumps(report))
+"""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "3000")))
+    parser.add_argument("--sort", choices=["self_ms", "cumulative_ms", "rss_delta_kb"], default="self_ms")
+    args = parser.parse_args()
+
+    env = dict(os.environ, STARTUP_PROFILE="1", STARTUP_PROFILE_TOP="100000")
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=backend_dir, env=env, capture_output=True, text=True
+    )
+    if "@@REPORT@@" not in result.stdout:
+        sys.stderr.write(result.stderr)
+        return 2
+    report = json.loads(result.stdout.rsplit("@@REPORT@@", 1)[1])
+
+    modules = sorted(report["modules"], key=lambda m: m[args.sort] or 0, reverse=True)[:args.top]
+    print(f"{'module':60} {'self ms':>9} {'cum ms':>9} {'RSS KB':>9}")
+    for module in modules:
+        rss = module["rss_delta_kb"] if module["rss_delta_kb"] is not None else "-"
+        print(f"{module['module'][:60]:60} {module['self_ms']:9.1f} {module['cumulative_ms']:9.1f} {rss:>9}")
+
+    print()
+    print(f"total import time: {report['total_ms']} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"modules imported:  {report['modules_imported']}")
+    print(f"RSS:               {report['rss_mb']} MB (+{report['rss_delta_mb']} MB during import)")
+    for name, provider in report["providers"].items():
+        state = "loaded" if provider["loaded"] else "lazy"
+        print(f"provider {name:12} configured={provider['configured']!s:5} {state}")
+
+    failed = False
+    if report["heavy_modules_loaded"]:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(report['heavy_modules_loaded'])}")
+        failed = True
+    if report["total_ms"] > args.budget_ms:
+        print(f"FAIL: startup import time exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,10 +6,14 @@ Servicios de inteligencia artificial para el sistema.
 
 Componentes:
 - gemini_service: Servicio de Google Gemini AI para chat y generación de texto
+- response_cache: Caché de respuestas de chat para consultas frecuentes
 """
 
 from .gemini_service import GeminiService
+from .response_cache import ChatResponseCache, get_chat_response_cache
 
 __all__ = [
     'GeminiService',
+    'ChatResponseCache',
+    'get_chat_response_cache',
 ]
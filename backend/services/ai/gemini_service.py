@@ -8,8 +8,6 @@ Proporciona funcionalidades de chat y generación de texto context-aware.
 
 import logging
 from typing import Optional, Dict, Any
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
 
 from core.config import get_settings
 
@@ -30,6 +28,9 @@ class GeminiService:
         self.default_model = settings.default_ai_model
 
         if self.api_key:
+            # SDK importado aquí: pesa ~0.8 s y solo lo necesitan las rutas de IA
+            import google.generativeai as genai
+
             genai.configure(api_key=self.api_key)
             logger.info(f"Gemini AI service initialized with model: {self.default_model}")
         else:
@@ -41,6 +42,8 @@ class GeminiService:
 
         Configuramos filtros de contenido para un contexto nutricional profesional.
         """
+        from google.generativeai.types import HarmCategory, HarmBlockThreshold
+
         return {
             HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
@@ -88,6 +91,8 @@ class GeminiService:
             }
 
         try:
+            import google.generativeai as genai
+
             # Inicializar modelo
             model = genai.GenerativeModel(
                 model_name=self.default_model,
@@ -0,0 +1,60 @@
+"""
+AI Providers
+============
+
+Clientes de Gemini y Claude compartidos por la visión por computadora y el
+chat del nutriólogo, registrados en ``core.providers`` y creados al primer
+uso (los SDKs no se importan al arrancar).
+"""
+import os
+
+from dotenv import load_dotenv
+
+from core.providers import get_provider, register_provider
+
+load_dotenv()
+
+GEMINI_MODEL_NAME = "gemini-1.5-pro-latest"  # Using gemini-1.5-pro for vision support
+
+_PLACEHOLDER_KEYS = {"", "your-google-gemini-api-key-here", "your-anthropic-api-key-here"}
+
+
+def _google_api_key() -> str:
+    return os.getenv("GOOGLE_API_KEY", "")
+
+
+def _anthropic_api_key() -> str:
+    return os.getenv("ANTHROPIC_API_KEY", "")
+
+
+def _create_gemini_model():
+    import google.generativeai as genai
+
+    genai.configure(api_key=_google_api_key())
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+
+def _create_anthropic_client():
+    from anthropic import Anthropic
+
+    return Anthropic(api_key=_anthropic_api_key())
+
+
+register_provider(
+    "gemini", _create_gemini_model,
+    configured=lambda: _google_api_key() not in _PLACEHOLDER_KEYS,
+)
+register_provider(
+    "anthropic", _create_anthropic_client,
+    configured=lambda: _anthropic_api_key() not in _PLACEHOLDER_KEYS,
+)
+
+
+def gemini_model():
+    """``GenerativeModel`` de Gemini, o ``None`` si no hay API key"""
+    return get_provider("gemini")
+
+
+def anthropic_client():
+    """Cliente de Anthropic, o ``None`` si no hay API key"""
+    return get_provider("anthropic")
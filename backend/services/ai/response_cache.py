@@ -0,0 +1,224 @@
+"""
+Chat Response Cache
+===================
+
+Caché de respuestas del chat nutricional para preguntas frecuentes.
+
+Las solicitudes anónimas y sin contexto (sin historial de conversación ni
+perfil del paciente) se indexan por una clave semántica: el mensaje
+normalizado (minúsculas, sin acentos, sin signos ni palabras vacías) más la
+versión del system prompt. Así "¿Cuántas calorías tiene un taco al pastor?"
+y "cuantas calorias tiene el taco al pastor" comparten la misma respuesta.
+
+Las palabras vacías son las del índice RAG menos las de negación y
+polaridad (``POLARITY_WORDS``): "pan sin gluten" y "pan con gluten" deben
+tener respuestas distintas.
+
+Niveles:
+- L1: LRU en proceso con TTL
+- L2: Redis compartido entre workers (opcional, vía ``core.cache``)
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from services.rag.vector_index import SPANISH_STOPWORDS, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Cambian el sentido de la pregunta: nunca se eliminan de la clave
+POLARITY_WORDS = frozenset({"no", "sin", "con", "mas", "menos", "muy"})
+
+CACHE_STOPWORDS = SPANISH_STOPWORDS - POLARITY_WORDS
+
+
+def normalize_chat_message(message: str) -> str:
+    """
+    Normalizar un mensaje para usarlo como clave de caché
+
+    Pliega mayúsculas y acentos, elimina signos de puntuación y palabras
+    vacías (``CACHE_STOPWORDS``, que conserva negaciones y modificadores),
+    y colapsa espacios.
+    """
+    tokens = tokenize(message, drop_stopwords=False)
+    return " ".join(token for token in tokens if token not in CACHE_STOPWORDS)
+
+
+def prompt_version(system_prompt: str) -> str:
+    """Versión corta (hash) de un system prompt"""
+    return hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class ChatResponseCache:
+    """
+    Caché LRU + TTL de respuestas de chat con nivel Redis opcional
+
+    Args:
+        max_entries: Máximo de respuestas en el LRU local
+        ttl_seconds: Tiempo de vida de cada respuesta
+        use_redis: Usar Redis como segundo nivel compartido
+        redis_retry_seconds: Pausa antes de reintentar Redis tras un fallo
+    """
+
+    KEY_PREFIX = "chat_response"
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: int = 86400,
+        use_redis: bool = True,
+        redis_retry_seconds: int = 60,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self.redis_retry_seconds = redis_retry_seconds
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_disabled_until = 0.0
+        self._stats = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "redis_errors": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Claves
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def is_cacheable(conversation_history=None, user_context=None) -> bool:
+        """Solo se cachean consultas sin historial ni contexto personalizado"""
+        return not conversation_history and not user_context
+
+    def make_key(self, message: str, system_prompt_version: str) -> Optional[str]:
+        """Clave de caché; ``None`` si el mensaje queda vacío al normalizar"""
+        normalized = normalize_chat_message(message)
+        if not normalized:
+            return None
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}:{system_prompt_version}:{digest}"
+
+    # ------------------------------------------------------------------
+    # Lectura / escritura
+    # ------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Buscar una respuesta en L1 y luego en Redis"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["local_hits"] += 1
+                    return value
+                del self._entries[key]
+
+        value = await self._redis_get(key)
+        if value is not None:
+            self._store_local(key, value)
+            self._stats["redis_hits"] += 1
+            return value
+
+        self._stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Guardar una respuesta en ambos niveles"""
+        self._store_local(key, value)
+        self._stats["stores"] += 1
+        await self._redis_set(key, value)
+
+    def record_bypass(self) -> None:
+        """Registrar una solicitud que no usó la caché (contexto personalizado)"""
+        self._stats["bypassed"] += 1
+
+    def clear(self) -> None:
+        """Vaciar el nivel local"""
+        with self._lock:
+            self._entries.clear()
+
+    def _store_local(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    # ------------------------------------------------------------------
+    # Nivel Redis
+    # ------------------------------------------------------------------
+
+    def _redis_available(self) -> bool:
+        return self.use_redis and time.monotonic() >= self._redis_disabled_until
+
+    def _redis_failed(self, error: Exception) -> None:
+        self._stats["redis_errors"] += 1
+        self._redis_disabled_until = time.monotonic() + self.redis_retry_seconds
+        logger.warning(f"Chat cache Redis tier unavailable, retrying in {self.redis_retry_seconds}s: {error}")
+
+    async def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self._redis_available():
+            return None
+        try:
+            from core.cache import get_cache
+            return await get_cache().get(key)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+    async def _redis_set(self, key: str, value: Dict[str, Any]) -> None:
+        if not self._redis_available():
+            return
+        try:
+            from core.cache import get_cache
+            await get_cache().set(key, value, expire=self.ttl_seconds)
+        except Exception as e:
+            self._redis_failed(e)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso de la caché"""
+        stats = dict(self._stats)
+        hits = stats["local_hits"] + stats["redis_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["entries"] = len(self._entries)
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["redis_enabled"] = self._redis_available()
+        return stats
+
+
+_chat_cache: Optional[ChatResponseCache] = None
+
+
+def get_chat_response_cache() -> ChatResponseCache:
+    """Obtener la instancia global de la caché de chat"""
+    global _chat_cache
+    if _chat_cache is None:
+        from core.config import get_settings
+
+        settings = get_settings()
+        _chat_cache = ChatResponseCache(
+            max_entries=settings.chat_cache_max_entries,
+            ttl_seconds=settings.chat_cache_ttl_seconds,
+            use_redis=settings.chat_cache_redis_enabled,
+        )
+    return _chat_cache
@@ -8,10 +8,10 @@ import os
 import json
 import base64
 from io import BytesIO
-from PIL import Image
 from dotenv import load_dotenv
-import google.generativeai as genai
-from anthropic import Anthropic
+
+from core.providers import provider_configured
+from services.ai.providers import anthropic_client, gemini_model
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,25 +19,17 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 # Configure AI models
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 AI_VISION_MODEL = os.getenv("AI_VISION_MODEL", "gemini")  # gemini | claude | hybrid
 CONFIDENCE_THRESHOLD = int(os.getenv("AI_VISION_CONFIDENCE_THRESHOLD", "75"))
 
-# Initialize Gemini
-if GOOGLE_API_KEY and GOOGLE_API_KEY != "your-google-gemini-api-key-here":
-    genai.configure(api_key=GOOGLE_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-1.5-pro-latest')  # Using gemini-1.5-pro for vision support
-else:
-    gemini_model = None
-    logger.warning("Google API key not configured. Gemini Vision disabled.")
+# Gemini and Claude clients are created on first use (services.ai.providers)
+
+
+def _open_image(image_bytes: bytes):
+    """Abrir una imagen con PIL (importado al primer uso)"""
+    from PIL import Image
 
-# Initialize Claude
-if ANTHROPIC_API_KEY and ANTHROPIC_API_KEY != "your-anthropic-api-key-here":
-    anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
-else:
-    anthropic_client = None
-    logger.warning("Anthropic API key not configured. Claude Vision disabled.")
+    return Image.open(BytesIO(image_bytes))
 
 
 # Prompt especializado para análisis de comida mexicana
@@ -239,8 +231,8 @@ class FoodVisionService:
     """Food recognition service using computer vision with hybrid AI approach"""
 
     def __init__(self):
-        self.gemini_available = gemini_model is not None
-        self.claude_available = anthropic_client is not None
+        self.gemini_available = provider_configured("gemini")
+        self.claude_available = provider_configured("anthropic")
         self.model_mode = AI_VISION_MODEL
 
         logger.info(f"FoodVisionService initialized - Mode: {self.model_mode}")
@@ -259,7 +251,7 @@ class FoodVisionService:
         """
         try:
             # Validate image
-            image = Image.open(BytesIO(image_bytes))
+            image = _open_image(image_bytes)
             if image.mode != 'RGB':
                 image = image.convert('RGB')
 
@@ -304,10 +296,10 @@ class FoodVisionService:
         """Analyze food image using Gemini Vision"""
         try:
             # Convert image bytes to PIL Image
-            image = Image.open(BytesIO(image_bytes))
+            image = _open_image(image_bytes)
 
             # Generate content with Gemini
-            response = gemini_model.generate_content([
+            response = gemini_model().generate_content([
                 MEXICAN_FOOD_ANALYSIS_PROMPT,
                 image
             ])
@@ -343,12 +335,12 @@ class FoodVisionService:
             base64_image = base64.b64encode(image_bytes).decode('utf-8')
 
             # Detect image format
-            image = Image.open(BytesIO(image_bytes))
+            image = _open_image(image_bytes)
             image_format = image.format.lower() if image.format else 'jpeg'
             media_type = f"image/{image_format}"
 
             # Generate content with Claude
-            message = anthropic_client.messages.create(
+            message = anthropic_client().messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=4096,
                 messages=[
@@ -513,7 +505,7 @@ class FoodVisionService:
         """
         try:
             # Validate image
-            image = Image.open(BytesIO(image_bytes))
+            image = _open_image(image_bytes)
             if image.mode != 'RGB':
                 image = image.convert('RGB')
 
@@ -557,10 +549,10 @@ class FoodVisionService:
         """Extract nutrition label using Gemini Vision"""
         try:
             # Convert image bytes to PIL Image
-            image = Image.open(BytesIO(image_bytes))
+            image = _open_image(image_bytes)
 
             # Generate content with Gemini
-            response = gemini_model.generate_content([
+            response = gemini_model().generate_content([
                 NUTRITION_LABEL_EXTRACTION_PROMPT,
                 image
             ])
@@ -596,12 +588,12 @@ class FoodVisionService:
             base64_image = base64.b64encode(image_bytes).decode('utf-8')
 
             # Detect image format
-            image = Image.open(BytesIO(image_bytes))
+            image = _open_image(image_bytes)
             image_format = image.format.lower() if image.format else 'jpeg'
             media_type = f"image/{image_format}"
 
             # Generate content with Claude
-            message = anthropic_client.messages.create(
+            message = anthropic_client().messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=2048,
                 messages=[
@@ -1,42 +1,54 @@
 """
 Email Service - Envío de correos electrónicos
 Usa Gmail SMTP para enviar correos de recuperación de contraseña
+
+Las conexiones SMTP se mantienen abiertas en un pool (STARTTLS y login una
+sola vez por conexión) y se reabren automáticamente si el servidor las
+cierra. Los endpoints encolan los correos con ``enqueue_*`` para no esperar
+al servidor SMTP; un worker en segundo plano los envía.
+
+Para desarrollo se puede apuntar a un servidor SMTP local de depuración:
+    python -m aiosmtpd -n -l localhost:1025
+    EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=false
 """
+import asyncio
 import os
+import queue
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from functools import lru_cache
+from html import escape
+from string import Template
+from typing import Any, Dict, Iterator, List, Optional
 from core.logging import log_info, log_error, log_success
 
 
-class EmailService:
-    """Servicio de envío de correos electrónicos"""
+# ============================================================================
+# PLANTILLAS
+# ============================================================================
 
-    def __init__(self):
-        self.smtp_host = os.getenv("EMAIL_HOST", "smtp.gmail.com")
-        self.smtp_port = int(os.getenv("EMAIL_PORT", "587"))
-        self.smtp_username = os.getenv("EMAIL_USERNAME", "")
-        self.smtp_password = os.getenv("EMAIL_PASSWORD", "")
-        self.from_email = os.getenv("EMAIL_FROM", self.smtp_username)
-        self.from_name = os.getenv("EMAIL_FROM_NAME", "Nutrition Intelligence")
-        self.app_url = os.getenv("APP_URL", "https://nutrition-intelligence.scram2k.com")
+_TEMPLATE_SOURCES: Dict[str, str] = {
+    "password_reset.txt": """
+Hola $user_name,
 
-    def _create_connection(self) -> smtplib.SMTP:
-        """Crea una conexión SMTP con Gmail"""
-        try:
-            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
-            log_success("Conexión SMTP establecida exitosamente")
-            return server
-        except Exception as e:
-            log_error(f"Error al conectar con SMTP: {str(e)}")
-            raise
+Hemos recibido una solicitud para restablecer la contraseña de tu cuenta en Nutrition Intelligence.
+
+Para restablecer tu contraseña, visita el siguiente enlace:
+$reset_url
+
+Este enlace expirará en 1 hora por razones de seguridad.
+
+Si no solicitaste restablecer tu contraseña, puedes ignorar este correo.
 
-    def _create_password_reset_html(self, reset_url: str, user_name: str) -> str:
-        """Crea el contenido HTML para el correo de recuperación de contraseña"""
-        return f"""
+Saludos,
+Nutrition Intelligence
+""",
+    "password_reset.html": """
 <!DOCTYPE html>
 <html lang="es">
 <head>
@@ -62,7 +74,7 @@ class EmailService:
                     <tr>
                         <td style="padding: 40px;">
                             <p style="margin: 0 0 20px 0; color: #333333; font-size: 16px; line-height: 1.6;">
-                                Hola <strong>{user_name}</strong>,
+                                Hola <strong>$user_name</strong>,
                             </p>
                             <p style="margin: 0 0 20px 0; color: #666666; font-size: 15px; line-height: 1.6;">
                                 Hemos recibido una solicitud para restablecer la contraseña de tu cuenta en <strong>Nutrition Intelligence</strong>.
@@ -75,7 +87,7 @@ class EmailService:
                             <table role="presentation" style="width: 100%; border-collapse: collapse;">
                                 <tr>
                                     <td align="center" style="padding: 0;">
-                                        <a href="{reset_url}" style="display: inline-block; padding: 16px 40px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: #ffffff; text-decoration: none; border-radius: 6px; font-size: 16px; font-weight: 600; box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);">
+                                        <a href="$reset_url" style="display: inline-block; padding: 16px 40px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: #ffffff; text-decoration: none; border-radius: 6px; font-size: 16px; font-weight: 600; box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);">
                                             Restablecer Contraseña
                                         </a>
                                     </td>
@@ -86,8 +98,8 @@ class EmailService:
                                 O copia y pega este enlace en tu navegador:
                             </p>
                             <p style="margin: 10px 0 0 0; word-break: break-all;">
-                                <a href="{reset_url}" style="color: #667eea; text-decoration: none; font-size: 13px;">
-                                    {reset_url}
+                                <a href="$reset_url" style="color: #667eea; text-decoration: none; font-size: 13px;">
+                                    $reset_url
                                 </a>
                             </p>
 
@@ -111,7 +123,7 @@ class EmailService:
                                 Este correo fue enviado por <strong>Nutrition Intelligence</strong>
                             </p>
                             <p style="margin: 0; color: #999999; font-size: 12px;">
-                                © {2024} Nutrition Intelligence. Todos los derechos reservados.
+                                © 2024 Nutrition Intelligence. Todos los derechos reservados.
                             </p>
                         </td>
                     </tr>
@@ -121,111 +133,20 @@ class EmailService:
     </table>
 </body>
 </html>
-"""
-
-    def send_password_reset_email(
-        self,
-        to_email: str,
-        user_name: str,
-        reset_token: str,
-        reset_url: Optional[str] = None
-    ) -> bool:
-        """
-        Envía un correo de recuperación de contraseña
-
-        Args:
-            to_email: Email del destinatario
-            user_name: Nombre del usuario
-            reset_token: Token de recuperación
-            reset_url: URL completa de recuperación (opcional)
-
-        Returns:
-            bool: True si se envió exitosamente, False en caso contrario
-        """
-        try:
-            # Construir URL de reset
-            if not reset_url:
-                reset_url = f"{self.app_url}/auth/reset-password?token={reset_token}"
-
-            log_info(f"Preparando email de recuperación para: {to_email}")
-
-            # Crear mensaje
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = '🔐 Recuperación de Contraseña - Nutrition Intelligence'
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-
-            # Contenido en texto plano (fallback)
-            text_content = f"""
-Hola {user_name},
-
-Hemos recibido una solicitud para restablecer la contraseña de tu cuenta en Nutrition Intelligence.
-
-Para restablecer tu contraseña, visita el siguiente enlace:
-{reset_url}
-
-Este enlace expirará en 1 hora por razones de seguridad.
-
-Si no solicitaste restablecer tu contraseña, puedes ignorar este correo.
-
-Saludos,
-Nutrition Intelligence
-"""
-
-            # Contenido HTML
-            html_content = self._create_password_reset_html(reset_url, user_name)
-
-            # Adjuntar ambas versiones
-            part1 = MIMEText(text_content, 'plain', 'utf-8')
-            part2 = MIMEText(html_content, 'html', 'utf-8')
-            msg.attach(part1)
-            msg.attach(part2)
-
-            # Enviar email
-            server = self._create_connection()
-            server.send_message(msg)
-            server.quit()
-
-            log_success(f"Email de recuperación enviado exitosamente a: {to_email}")
-            return True
-
-        except Exception as e:
-            log_error(f"Error al enviar email de recuperación a {to_email}: {str(e)}")
-            return False
-
-    def send_welcome_email(self, to_email: str, user_name: str) -> bool:
-        """
-        Envía un correo de bienvenida al nuevo usuario
-
-        Args:
-            to_email: Email del destinatario
-            user_name: Nombre del usuario
-
-        Returns:
-            bool: True si se envió exitosamente
-        """
-        try:
-            log_info(f"Preparando email de bienvenida para: {to_email}")
-
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = '🎉 Bienvenido a Nutrition Intelligence'
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-
-            text_content = f"""
-Hola {user_name},
+""",
+    "welcome.txt": """
+Hola $user_name,
 
 ¡Bienvenido a Nutrition Intelligence!
 
 Tu cuenta ha sido creada exitosamente. Ahora puedes acceder a todas nuestras funcionalidades.
 
-Para comenzar, visita: {self.app_url}
+Para comenzar, visita: $app_url
 
 Saludos,
 Nutrition Intelligence
-"""
-
-            html_content = f"""
+""",
+    "welcome.html": """
 <!DOCTYPE html>
 <html lang="es">
 <head>
@@ -245,7 +166,7 @@ Nutrition Intelligence
                     <tr>
                         <td style="padding: 40px;">
                             <p style="margin: 0 0 20px 0; color: #333333; font-size: 16px;">
-                                Hola <strong>{user_name}</strong>,
+                                Hola <strong>$user_name</strong>,
                             </p>
                             <p style="margin: 0 0 20px 0; color: #666666; font-size: 15px; line-height: 1.6;">
                                 ¡Bienvenido a <strong>Nutrition Intelligence</strong>! Tu cuenta ha sido creada exitosamente.
@@ -256,7 +177,7 @@ Nutrition Intelligence
                             <table role="presentation" style="width: 100%; border-collapse: collapse;">
                                 <tr>
                                     <td align="center">
-                                        <a href="{self.app_url}/dashboard" style="display: inline-block; padding: 16px 40px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: #ffffff; text-decoration: none; border-radius: 6px; font-size: 16px; font-weight: 600;">
+                                        <a href="$app_url/dashboard" style="display: inline-block; padding: 16px 40px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: #ffffff; text-decoration: none; border-radius: 6px; font-size: 16px; font-weight: 600;">
                                             Comenzar Ahora
                                         </a>
                                     </td>
@@ -277,24 +198,339 @@ Nutrition Intelligence
     </table>
 </body>
 </html>
-"""
+""",
+}
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Template:
+    """Plantilla compilada (se compila una sola vez por proceso)"""
+    return Template(_TEMPLATE_SOURCES[name])
+
+
+def render_template(name: str, **context: str) -> str:
+    """Renderiza una plantilla; en las HTML los valores se escapan"""
+    if name.endswith(".html"):
+        context = {key: escape(str(value)) for key, value in context.items()}
+    return get_template(name).substitute(context)
+
+
+# ============================================================================
+# POOL DE CONEXIONES SMTP
+# ============================================================================
+
+class SMTPConnectionPool:
+    """
+    Pool de conexiones SMTP persistentes
 
-            part1 = MIMEText(text_content, 'plain', 'utf-8')
-            part2 = MIMEText(html_content, 'html', 'utf-8')
-            msg.attach(part1)
-            msg.attach(part2)
+    Cada conexión hace STARTTLS y login una sola vez. Las conexiones que
+    llevan tiempo inactivas se verifican con NOOP antes de reutilizarse, y un
+    envío que falla por desconexión se reintenta una vez con una conexión
+    nueva.
+    """
 
-            server = self._create_connection()
-            server.send_message(msg)
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = True,
+        size: int = 2,
+        timeout: float = 30.0,
+        idle_check_seconds: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self.idle_check_seconds = idle_check_seconds
+
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._open = 0
+        self.stats = {"connections_opened": 0, "reconnects": 0, "messages_sent": 0}
+
+    def _connect(self) -> smtplib.SMTP:
+        try:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+            with self._lock:
+                self._open += 1
+                self.stats["connections_opened"] += 1
+            log_success("Conexión SMTP establecida exitosamente")
+            return server
+        except Exception as e:
+            log_error(f"Error al conectar con SMTP: {str(e)}")
+            raise
+
+    def _discard(self, server: smtplib.SMTP) -> None:
+        with self._lock:
+            self._open -= 1
+        try:
             server.quit()
+        except Exception:
+            server.close()
 
-            log_success(f"Email de bienvenida enviado a: {to_email}")
-            return True
+    def _is_alive(self, server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """Toma una conexión del pool (abriendo una nueva si hace falta)"""
+        self._slots.acquire()
+        server = None
+        try:
+            try:
+                server, last_used = self._idle.get_nowait()
+                if time.monotonic() - last_used > self.idle_check_seconds and not self._is_alive(server):
+                    self._discard(server)
+                    server = None
+            except queue.Empty:
+                pass
+            if server is None:
+                server = self._connect()
+            yield server
+        except Exception:
+            if server is not None:
+                self._discard(server)
+                server = None
+            raise
+        finally:
+            if server is not None:
+                self._idle.put((server, time.monotonic()))
+            self._slots.release()
+
+    def send(self, msg: MIMEMultipart) -> None:
+        """Envía un mensaje, reconectando una vez si la conexión se perdió"""
+        for attempt in range(2):
+            try:
+                with self.connection() as server:
+                    server.send_message(msg)
+                self.stats["messages_sent"] += 1
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+                if attempt:
+                    raise
+                self.stats["reconnects"] += 1
+                log_info(f"Conexión SMTP perdida, reconectando: {str(e)}")
+
+    def close(self) -> None:
+        """Cierra todas las conexiones inactivas"""
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(server)
+
+    @property
+    def open_connections(self) -> int:
+        return self._open
+
+
+# ============================================================================
+# SERVICIO
+# ============================================================================
+
+class EmailService:
+    """Servicio de envío de correos electrónicos"""
+
+    def __init__(self):
+        self.smtp_host = os.getenv("EMAIL_HOST", "smtp.gmail.com")
+        self.smtp_port = int(os.getenv("EMAIL_PORT", "587"))
+        self.smtp_username = os.getenv("EMAIL_USERNAME", "")
+        self.smtp_password = os.getenv("EMAIL_PASSWORD", "")
+        self.smtp_use_tls = os.getenv("EMAIL_USE_TLS", "true").lower() in ("1", "true", "yes")
+        self.from_email = os.getenv("EMAIL_FROM", self.smtp_username)
+        self.from_name = os.getenv("EMAIL_FROM_NAME", "Nutrition Intelligence")
+        self.app_url = os.getenv("APP_URL", "https://nutrition-intelligence.scram2k.com")
 
+        self.pool = SMTPConnectionPool(
+            host=self.smtp_host,
+            port=self.smtp_port,
+            username=self.smtp_username,
+            password=self.smtp_password,
+            use_tls=self.smtp_use_tls,
+            size=int(os.getenv("EMAIL_POOL_SIZE", "2")),
+            timeout=float(os.getenv("EMAIL_TIMEOUT", "30")),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp")
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.queue_stats = {"queued": 0, "sent": 0, "failed": 0}
+
+    # ------------------------------------------------------------------
+    # Construcción de mensajes
+    # ------------------------------------------------------------------
+
+    def _build_message(self, to_email: str, subject: str, text_content: str, html_content: str) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = to_email
+
+        # Adjuntar ambas versiones (texto plano como fallback)
+        msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+        msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+        return msg
+
+    def build_password_reset_email(
+        self,
+        to_email: str,
+        user_name: str,
+        reset_token: str,
+        reset_url: Optional[str] = None
+    ) -> MIMEMultipart:
+        """Construye el correo de recuperación de contraseña"""
+        if not reset_url:
+            reset_url = f"{self.app_url}/auth/reset-password?token={reset_token}"
+        context = {"user_name": user_name, "reset_url": reset_url}
+        return self._build_message(
+            to_email,
+            '🔐 Recuperación de Contraseña - Nutrition Intelligence',
+            render_template("password_reset.txt", **context),
+            render_template("password_reset.html", **context),
+        )
+
+    def build_welcome_email(self, to_email: str, user_name: str) -> MIMEMultipart:
+        """Construye el correo de bienvenida"""
+        context = {"user_name": user_name, "app_url": self.app_url}
+        return self._build_message(
+            to_email,
+            '🎉 Bienvenido a Nutrition Intelligence',
+            render_template("welcome.txt", **context),
+            render_template("welcome.html", **context),
+        )
+
+    # ------------------------------------------------------------------
+    # Envío síncrono
+    # ------------------------------------------------------------------
+
+    def send(self, msg: MIMEMultipart) -> bool:
+        """
+        Envía un mensaje usando el pool de conexiones
+
+        Returns:
+            bool: True si se envió exitosamente, False en caso contrario
+        """
+        try:
+            self.pool.send(msg)
+            log_success(f"Email '{msg['Subject']}' enviado a: {msg['To']}")
+            return True
         except Exception as e:
-            log_error(f"Error al enviar email de bienvenida a {to_email}: {str(e)}")
+            log_error(f"Error al enviar email '{msg['Subject']}' a {msg['To']}: {str(e)}")
             return False
 
+    def send_password_reset_email(
+        self,
+        to_email: str,
+        user_name: str,
+        reset_token: str,
+        reset_url: Optional[str] = None
+    ) -> bool:
+        """
+        Envía un correo de recuperación de contraseña
+
+        Args:
+            to_email: Email del destinatario
+            user_name: Nombre del usuario
+            reset_token: Token de recuperación
+            reset_url: URL completa de recuperación (opcional)
+
+        Returns:
+            bool: True si se envió exitosamente, False en caso contrario
+        """
+        log_info(f"Preparando email de recuperación para: {to_email}")
+        return self.send(self.build_password_reset_email(to_email, user_name, reset_token, reset_url))
+
+    def send_welcome_email(self, to_email: str, user_name: str) -> bool:
+        """
+        Envía un correo de bienvenida al nuevo usuario
+
+        Args:
+            to_email: Email del destinatario
+            user_name: Nombre del usuario
+
+        Returns:
+            bool: True si se envió exitosamente
+        """
+        log_info(f"Preparando email de bienvenida para: {to_email}")
+        return self.send(self.build_welcome_email(to_email, user_name))
+
+    # ------------------------------------------------------------------
+    # Envío en segundo plano
+    # ------------------------------------------------------------------
+
+    def _start_workers(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.pool.size)]
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            msg = await self._queue.get()
+            try:
+                sent = await loop.run_in_executor(self._executor, self.send, msg)
+                self.queue_stats["sent" if sent else "failed"] += 1
+            finally:
+                self._queue.task_done()
+
+    async def enqueue(self, msg: MIMEMultipart) -> None:
+        """Encola un mensaje para enviarlo en segundo plano"""
+        self._start_workers()
+        self.queue_stats["queued"] += 1
+        await self._queue.put(msg)
+
+    async def enqueue_password_reset_email(
+        self,
+        to_email: str,
+        user_name: str,
+        reset_token: str,
+        reset_url: Optional[str] = None
+    ) -> None:
+        """Encola el correo de recuperación de contraseña"""
+        await self.enqueue(self.build_password_reset_email(to_email, user_name, reset_token, reset_url))
+
+    async def enqueue_welcome_email(self, to_email: str, user_name: str) -> None:
+        """Encola el correo de bienvenida"""
+        await self.enqueue(self.build_welcome_email(to_email, user_name))
+
+    async def flush(self) -> None:
+        """Espera a que se envíen todos los correos encolados"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def shutdown(self) -> None:
+        """Envía lo pendiente, detiene los workers y cierra las conexiones"""
+        await self.flush()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del pool y de la cola"""
+        return {
+            **self.queue_stats,
+            **self.pool.stats,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "open_connections": self.pool.open_connections,
+        }
+
 
 # Instancia global del servicio
 email_service = EmailService()
@@ -0,0 +1,6 @@
+"""
+Foods services
+"""
+from .equivalence_index import EquivalenceSuggestionIndex, get_equivalence_index
+
+__all__ = ["EquivalenceSuggestionIndex", "get_equivalence_index"]
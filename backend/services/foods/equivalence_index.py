@@ -0,0 +1,369 @@
+"""
+Equivalence Suggestion Index
+============================
+
+Candidatos precalculados por grupo de equivalencia para el constructor de
+comidas y las alternativas por grupo.
+
+Por cada grupo se guardan arreglos compactos (food_id, porción estándar y
+aporte por equivalente de kcal, proteínas, carbohidratos y grasas) de los
+alimentos aprobados con equivalencia activa. Una consulta:
+
+1. arma la máscara de candidatos permitidos con bitsets (``int`` de Python)
+   por alérgeno normalizado y por food_id excluido,
+2. calcula en NumPy la distancia entre el aporte de ``target_equivalents``
+   de cada alimento y los macros objetivo (por defecto, el estándar SMAE del
+   grupo), con cada diferencia expresada en kcal y relativa a las calorías
+   objetivo,
+3. devuelve los ``k`` mejores con ``argpartition``.
+
+Así el constructor de comidas, que consulta en cada movimiento del slider,
+no toca la base de datos. El índice se reconstruye (una consulta) tras
+escrituras confirmadas de ``Food`` o ``FoodEquivalence``
+(``core.invalidation``). Las alergias/intolerancias de cada paciente se
+cachean igual, invalidadas por escrituras de ``MedicalHistory``.
+"""
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from core.invalidation import on_committed_writes
+from domain.foods.equivalences import EquivalenceGroup, FoodEquivalence
+from domain.foods.models import Food, FoodStatus
+from domain.foods.smae_table import NUTRIENTS, SMAE_TABLE
+from domain.patients.models import MedicalHistory
+from services.rag.vector_index import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# kcal por unidad de cada fila de NUTRIENTS: las diferencias en gramos se
+# comparan como energía, relativa a las calorías objetivo
+_ENERGY = np.array([1.0, 4.0, 4.0, 9.0])
+# Calorías objetivo mínimas al normalizar (grupos de aporte ~0, p. ej. libres)
+_MIN_CALORIES = 10.0
+
+
+def normalize_allergen(value: str) -> str:
+    return " ".join(normalize_text(value).split())
+
+
+@dataclass
+class GroupCandidates:
+    """Candidatos de un grupo en arreglos paralelos (posición = candidato)"""
+    food_ids: np.ndarray
+    portions: np.ndarray
+    nutrients: np.ndarray                  # (4, candidatos) por equivalente
+    rows: List[Dict[str, Any]]             # datos para la respuesta
+    allergens: Dict[str, int] = field(default_factory=dict)     # alérgeno -> bitset
+    positions: Dict[int, int] = field(default_factory=dict)     # food_id -> bitset
+
+    def __len__(self) -> int:
+        return len(self.food_ids)
+
+
+def _mask_to_bool(mask: int, size: int) -> np.ndarray:
+    """Bitset de Python -> arreglo booleano de ``size`` posiciones"""
+    raw = np.frombuffer(mask.to_bytes((size + 7) // 8 or 1, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[:size].astype(bool)
+
+
+class EquivalenceSuggestionIndex:
+    """
+    Índice de sugerencias por grupo de equivalencia
+
+    Args:
+        max_age: Segundos antes de recargar aunque no haya escrituras locales
+        allergy_ttl: Segundos que se conservan las alergias de un paciente
+    """
+
+    def __init__(self, max_age: float = 300.0, allergy_ttl: float = 300.0):
+        self.max_age = max_age
+        self.allergy_ttl = allergy_ttl
+        self._lock = threading.Lock()
+        self._groups: Dict[EquivalenceGroup, GroupCandidates] = {}
+        self._loaded_at: Optional[float] = None
+        self._stale = True
+        self._generation = 0
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._allergies: Dict[int, Tuple[float, Tuple[str, ...]]] = {}
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def __len__(self) -> int:
+        return sum(len(candidates) for candidates in self._groups.values())
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    def build(self, pairs: Iterable[Tuple[Any, Any]]) -> int:
+        """Reconstruir a partir de pares ``(FoodEquivalence, Food)``"""
+        by_group: Dict[EquivalenceGroup, List[Tuple[Any, Any]]] = {}
+        for equivalence, food in pairs:
+            by_group.setdefault(EquivalenceGroup(equivalence.equivalence_group), []).append((equivalence, food))
+
+        groups: Dict[EquivalenceGroup, GroupCandidates] = {}
+        for group, items in by_group.items():
+            items.sort(key=lambda item: (item[1].name.lower(), item[1].id, item[0].id))
+            candidates = GroupCandidates(
+                food_ids=np.array([food.id for _, food in items], dtype=np.int64),
+                portions=np.array([eq.standard_portion for eq, _ in items], dtype=float),
+                nutrients=np.array([
+                    [eq.calories_per_equivalent for eq, _ in items],
+                    [eq.protein_per_equivalent or 0.0 for eq, _ in items],
+                    [eq.carbs_per_equivalent or 0.0 for eq, _ in items],
+                    [eq.fat_per_equivalent or 0.0 for eq, _ in items],
+                ], dtype=float).reshape(4, len(items)),
+                rows=[
+                    {
+                        "food_id": food.id,
+                        "food_name": food.name,
+                        "standard_portion": eq.standard_portion,
+                        "standard_unit": eq.standard_unit,
+                        "calories_per_equivalent": eq.calories_per_equivalent,
+                        "protein_per_equivalent": eq.protein_per_equivalent,
+                        "carbs_per_equivalent": eq.carbs_per_equivalent,
+                        "fat_per_equivalent": eq.fat_per_equivalent,
+                        "notes": eq.notes,
+                    }
+                    for eq, food in items
+                ],
+            )
+            for position, (_, food) in enumerate(items):
+                bit = 1 << position
+                candidates.positions[food.id] = candidates.positions.get(food.id, 0) | bit
+                for allergen in food.allergens or []:
+                    key = normalize_allergen(allergen)
+                    if key:
+                        candidates.allergens[key] = candidates.allergens.get(key, 0) | bit
+            groups[group] = candidates
+
+        with self._lock:
+            self._groups = groups
+            self._loaded_at = time.monotonic()
+            self._stale = False
+        return sum(len(c) for c in groups.values())
+
+    async def load(self, session) -> int:
+        """Cargar todas las equivalencias activas de alimentos aprobados con una consulta"""
+        started = time.perf_counter()
+        generation = self._generation
+        result = await session.execute(
+            select(FoodEquivalence, Food)
+            .join(Food, FoodEquivalence.food_id == Food.id)
+            .where(FoodEquivalence.is_active == True)
+            .where(Food.status == FoodStatus.APPROVED)
+        )
+        count = self.build(result.all())
+        if self._generation != generation:
+            # A write committed while loading: keep the index marked stale
+            self._stale = True
+        logger.info(f"Equivalence suggestion index built: {count} candidates in {time.perf_counter() - started:.3f}s")
+        return count
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._stale = True
+
+    @property
+    def needs_refresh(self) -> bool:
+        return (
+            self._stale
+            or self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self.max_age
+        )
+
+    async def ensure_fresh(self, session) -> None:
+        """Recargar si hace falta (una sola recarga para peticiones concurrentes)"""
+        if not self.needs_refresh:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self.needs_refresh:
+                await self.load(session)
+
+    # ------------------------------------------------------------------
+    # Alergias del paciente
+    # ------------------------------------------------------------------
+
+    async def patient_allergens(self, session, patient_id: int) -> Tuple[str, ...]:
+        """Alergias e intolerancias normalizadas del paciente (cacheadas)"""
+        cached = self._allergies.get(patient_id)
+        if cached is not None and time.monotonic() - cached[0] < self.allergy_ttl:
+            return cached[1]
+
+        result = await session.execute(
+            select(MedicalHistory.allergies, MedicalHistory.intolerances)
+            .where(MedicalHistory.patient_id == patient_id)
+        )
+        row = result.first()
+        values = [] if row is None else list(row[0] or []) + list(row[1] or [])
+        allergens = tuple(sorted({normalize_allergen(v) for v in values if v and normalize_allergen(v)}))
+        self._allergies[patient_id] = (time.monotonic(), allergens)
+        return allergens
+
+    def invalidate_patients(self, patient_ids: Iterable[int]) -> None:
+        for patient_id in patient_ids:
+            self._allergies.pop(patient_id, None)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _allowed(
+        self,
+        candidates: GroupCandidates,
+        exclude_food_ids: Sequence[int],
+        exclude_allergens: Sequence[str]
+    ) -> np.ndarray:
+        blocked = 0
+        for food_id in exclude_food_ids:
+            blocked |= candidates.positions.get(food_id, 0)
+        for allergen in exclude_allergens:
+            key = normalize_allergen(allergen)
+            for name, bits in candidates.allergens.items():
+                # "nuez" también excluye "nuez de la india"
+                if name == key or name.startswith(key + " "):
+                    blocked |= bits
+        allowed = ((1 << len(candidates)) - 1) & ~blocked
+        return _mask_to_bool(allowed, len(candidates))
+
+    def rank(
+        self,
+        group: EquivalenceGroup,
+        target_equivalents: float = 1.0,
+        limit: int = 20,
+        exclude_food_ids: Sequence[int] = (),
+        exclude_allergens: Sequence[str] = (),
+        target_macros: Optional[Dict[str, Optional[float]]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Top ``limit`` candidatos como ``(posición, distancia)``, del más cercano
+        a los macros objetivo al más lejano
+
+        ``target_macros`` (``calories``, ``protein``, ``carbs``, ``fat``) se
+        compara con el aporte de ``target_equivalents``; los macros omitidos
+        usan el estándar SMAE del grupo por ``target_equivalents``.
+        """
+        candidates = self._groups.get(group)
+        if candidates is None or not len(candidates):
+            return []
+
+        standard = SMAE_TABLE.nutrients[:, SMAE_TABLE.index[group]] if group in SMAE_TABLE else np.zeros(4)
+        target = standard * target_equivalents
+        if target_macros:
+            target = np.array([
+                target_macros[name] if target_macros.get(name) is not None else target[i]
+                for i, name in enumerate(NUTRIENTS)
+            ])
+
+        allowed = self._allowed(candidates, exclude_food_ids, exclude_allergens)
+        if not allowed.any():
+            return []
+
+        weights = (_ENERGY / max(target[0], _MIN_CALORIES))[:, None]
+        distance = (((candidates.nutrients * target_equivalents - target[:, None]) * weights) ** 2).sum(axis=0)
+        distance = np.where(allowed, distance, np.inf)
+
+        count = min(limit, int(allowed.sum()))
+        if count < len(distance):
+            top = np.argpartition(distance, count - 1)[:count]
+        else:
+            top = np.arange(len(distance))
+        # Desempate estable por nombre (orden de construcción)
+        top = top[np.lexsort((top, distance[top]))][:count]
+        return [(int(position), float(distance[position])) for position in top]
+
+    def suggestions(
+        self,
+        group: EquivalenceGroup,
+        target_equivalents: float,
+        limit: int = 20,
+        exclude_food_ids: Sequence[int] = (),
+        exclude_allergens: Sequence[str] = (),
+        target_macros: Optional[Dict[str, Optional[float]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Sugerencias del constructor de comidas (porción y aporte para ``target_equivalents``)"""
+        started = time.perf_counter()
+        with self._lock:
+            candidates = self._groups.get(group)
+            ranked = self.rank(group, target_equivalents, limit, exclude_food_ids, exclude_allergens, target_macros)
+            suggestions = []
+            for position, _ in ranked:
+                row = candidates.rows[position]
+                suggestions.append({
+                    "food_id": row["food_id"],
+                    "food_name": row["food_name"],
+                    "portion_needed": round(target_equivalents * row["standard_portion"], 2),
+                    "unit": row["standard_unit"],
+                    "calories": round(target_equivalents * row["calories_per_equivalent"], 1),
+                    "protein": round(target_equivalents * row["protein_per_equivalent"], 1),
+                    "carbs": round(target_equivalents * row["carbs_per_equivalent"], 1),
+                    "fat": round(target_equivalents * row["fat_per_equivalent"], 1)
+                })
+        self._record(started)
+        return suggestions
+
+    def alternatives(
+        self,
+        group: EquivalenceGroup,
+        limit: int = 50,
+        exclude_food_ids: Sequence[int] = (),
+        exclude_allergens: Sequence[str] = ()
+    ) -> List[Dict[str, Any]]:
+        """Alimentos del grupo ordenados por cercanía de su equivalente al estándar SMAE"""
+        started = time.perf_counter()
+        with self._lock:
+            candidates = self._groups.get(group)
+            ranked = self.rank(group, 1.0, limit, exclude_food_ids, exclude_allergens)
+            alternatives = [dict(candidates.rows[position]) for position, _ in ranked]
+        self._record(started)
+        return alternatives
+
+    def _record(self, started: float) -> None:
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "candidates": len(self),
+            "groups": {group.value: len(c) for group, c in self._groups.items()},
+            "loaded_seconds_ago": (
+                round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None
+            ),
+            "stale": self._stale,
+            "queries": self.queries,
+            "avg_query_ms": round(self.query_seconds / self.queries * 1000, 4) if self.queries else 0.0,
+            "cached_patients": len(self._allergies),
+        }
+
+
+_equivalence_index = EquivalenceSuggestionIndex()
+
+
+def get_equivalence_index() -> EquivalenceSuggestionIndex:
+    """Obtener el índice de sugerencias del proceso"""
+    return _equivalence_index
+
+
+# ----------------------------------------------------------------------
+# Invalidación en escrituras de Food, FoodEquivalence y MedicalHistory
+# ----------------------------------------------------------------------
+
+def _history_patient_ids(target, event_name: str) -> List[int]:
+    return [target.patient_id]
+
+
+on_committed_writes((Food, FoodEquivalence), lambda _: _equivalence_index.invalidate())
+on_committed_writes(
+    (MedicalHistory,),
+    _equivalence_index.invalidate_patients,
+    collect=_history_patient_ids,
+)
@@ -0,0 +1,22 @@
+"""
+Laboratory services
+"""
+from .lab_series import LabSeries, LabSeriesCache, TrendSummary, get_lab_series_cache
+from .clinical_text import analyze_clinical_text
+from .ocr_pipeline import OcrJob, OcrPipeline, get_ocr_pipeline
+from .reanalysis import LabReanalysisJob, LabReanalysisRunner, ReanalysisJobConflict, get_reanalysis_runner
+
+__all__ = [
+    "LabSeries",
+    "LabSeriesCache",
+    "TrendSummary",
+    "get_lab_series_cache",
+    "analyze_clinical_text",
+    "OcrJob",
+    "OcrPipeline",
+    "get_ocr_pipeline",
+    "LabReanalysisJob",
+    "LabReanalysisRunner",
+    "ReanalysisJobConflict",
+    "get_reanalysis_runner",
+]
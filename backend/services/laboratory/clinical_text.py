@@ -0,0 +1,59 @@
+"""
+Clinical Text Analysis
+======================
+
+Detección del tipo de documento y de valores clínicos en el texto extraído
+(OCR o texto embebido) de los archivos clínicos.
+
+Ambos análisis usan patrones compilados una sola vez al importar el módulo:
+los valores se buscan con el escáner multipatrón de
+``domain.patients.lab_rules``, que cubre todos los parámetros de la tabla,
+y el tipo de documento con una sola expresión de palabras clave.
+"""
+import re
+from typing import Tuple
+
+from domain.patients.lab_rules import scan_lab_values
+
+# (tipo de documento, palabras clave, keyword reportada). Si coinciden varios
+# grupos gana el último, como en la detección original.
+DOCUMENT_TYPES: Tuple[Tuple[str, Tuple[str, ...], str], ...] = (
+    ("laboratory", ("glucosa", "hemoglobina", "colesterol", "triglicéridos"), "resultados de laboratorio"),
+    ("radiology", ("ultrasonido", "ecografía", "radiografía"), "estudio de imagen"),
+    ("prescription", ("receta", "medicamento", "tratamiento"), "receta médica"),
+)
+
+_DOCUMENT_TYPE_SCANNER = re.compile("|".join(
+    f"(?P<{document_type}>{'|'.join(re.escape(word) for word in words)})"
+    for document_type, words, _ in DOCUMENT_TYPES
+))
+
+
+def analyze_clinical_text(text: str) -> dict:
+    """
+    Analyze extracted text for clinical data
+    Uses keyword matching plus the lab parameter scanner - can be enhanced with NLP/AI
+    """
+    analysis = {
+        "detected_values": [],
+        "keywords_found": [],
+        "document_type": "unknown"
+    }
+
+    text_lower = text.lower()
+
+    # Detect document type
+    matched = set()
+    for match in _DOCUMENT_TYPE_SCANNER.finditer(text_lower):
+        matched.add(match.lastgroup)
+        if len(matched) == len(DOCUMENT_TYPES):
+            break
+    for document_type, _, keyword in DOCUMENT_TYPES:
+        if document_type in matched:
+            analysis["document_type"] = document_type
+            analysis["keywords_found"].append(keyword)
+
+    # Extract numeric values for every parameter in the rule table
+    analysis["detected_values"] = scan_lab_values(text)
+
+    return analysis
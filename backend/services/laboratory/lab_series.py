@@ -0,0 +1,402 @@
+"""
+Lab Time Series
+===============
+
+Vista columnar de los resultados de laboratorio de un paciente.
+
+Cada estudio es una columna y cada parámetro (glucosa, HbA1c, colesterol...)
+una fila de una matriz ``float64`` con ``NaN`` donde el estudio no reporta
+el valor. La matriz se construye con una consulta de proyección estrecha
+(solo id, fecha y columnas numéricas; sin la interpretación JSON ni los
+metadatos del estudio), de modo que tendencias, cambios porcentuales,
+pendientes y banderas fuera de rango se calculan para todos los parámetros
+a la vez con operaciones de NumPy.
+
+Las series se guardan en una caché LRU por paciente; la entrada de un
+paciente se descarta al confirmar una escritura de sus ``LaboratoryData``
+(``core.invalidation``) o al cumplir ``max_age``.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import inspect, select
+
+from core.invalidation import on_committed_writes
+from domain.patients.laboratory import LaboratoryData
+
+logger = logging.getLogger(__name__)
+
+# Parámetros numéricos de LaboratoryData, en orden de fila de la matriz
+PARAMETERS: Tuple[str, ...] = (
+    "fasting_glucose_mgdl", "postprandial_glucose_mgdl", "hemoglobin_a1c_pct",
+    "fasting_insulin_uUI_ml", "homa_ir",
+    "total_cholesterol_mgdl", "ldl_cholesterol_mgdl", "hdl_cholesterol_mgdl",
+    "triglycerides_mgdl", "atherogenic_index",
+    "creatinine_mgdl", "urea_mgdl", "uric_acid_mgdl", "gfr_ml_min",
+    "alt_tgp_UI_l", "ast_tgo_UI_l", "total_bilirubin_mgdl", "alkaline_phosphatase_UI_l", "albumin_g_dl",
+    "tsh_uUI_ml", "t3_ng_dl", "free_t4_ng_dl",
+    "sodium_mEq_l", "potassium_mEq_l", "calcium_mg_dl", "magnesium_mg_dl",
+    "hemoglobin_g_dl", "hematocrit_pct", "white_blood_cells_mm3", "platelets_mm3",
+    "vitamin_d_ng_ml", "vitamin_b12_pg_ml", "folic_acid_ng_ml", "serum_iron_mcg_dl", "ferritin_ng_ml",
+    "c_reactive_protein_mg_dl",
+)
+PARAMETER_INDEX: Dict[str, int] = {name: i for i, name in enumerate(PARAMETERS)}
+
+LOWER_IS_BETTER = frozenset({
+    "fasting_glucose_mgdl", "postprandial_glucose_mgdl", "hemoglobin_a1c_pct",
+    "total_cholesterol_mgdl", "ldl_cholesterol_mgdl", "triglycerides_mgdl",
+    "creatinine_mgdl", "uric_acid_mgdl", "alt_tgp_UI_l", "ast_tgo_UI_l",
+})
+
+# Rango normal: (mínimo, máximo, máximo excluido). ``None`` = sin límite.
+# "<200 mg/dL" excluye el 200; "70-99 mg/dL" incluye ambos extremos.
+REFERENCE_RANGES: Dict[str, Tuple[Optional[float], Optional[float], bool]] = {
+    "fasting_glucose_mgdl": (70, 99, False),
+    "hemoglobin_a1c_pct": (None, 5.7, True),
+    "total_cholesterol_mgdl": (None, 200, True),
+    "ldl_cholesterol_mgdl": (None, 100, True),
+    "hdl_cholesterol_mgdl": (40, None, False),
+    "triglycerides_mgdl": (None, 150, True),
+    "creatinine_mgdl": (0.6, 1.2, False),
+    "alt_tgp_UI_l": (7, 40, False),
+    "hemoglobin_g_dl": (12, 18, False),
+    "vitamin_d_ng_ml": (30, 100, False),
+}
+
+_DIRECTION = np.array([-1.0 if p in LOWER_IS_BETTER else 1.0 for p in PARAMETERS])
+_LOW = np.array([(REFERENCE_RANGES.get(p, (None,))[0] or -np.inf) for p in PARAMETERS], dtype=float)
+_HIGH = np.array([
+    REFERENCE_RANGES[p][1] if p in REFERENCE_RANGES and REFERENCE_RANGES[p][1] is not None else np.inf
+    for p in PARAMETERS
+], dtype=float)
+_HIGH_EXCLUSIVE = np.array([REFERENCE_RANGES.get(p, (None, None, False))[2] for p in PARAMETERS])
+
+DAYS_PER_MONTH = 30
+
+_PROJECTION = [LaboratoryData.patient_id, LaboratoryData.id, LaboratoryData.study_date] + [
+    getattr(LaboratoryData, name) for name in PARAMETERS
+]
+
+
+def out_of_range(values: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Banderas fuera de rango para una matriz ``(parámetros, estudios)``
+
+    Args:
+        values: Matriz de valores (``NaN`` = sin dato, nunca fuera de rango)
+        rows: Índices de parámetro de cada fila; por defecto todos en orden
+    """
+    if rows is None:
+        rows = np.arange(len(PARAMETERS))
+    low = _LOW[rows][:, None]
+    high = _HIGH[rows][:, None]
+    exclusive = _HIGH_EXCLUSIVE[rows][:, None]
+    with np.errstate(invalid="ignore"):
+        above = np.where(exclusive, values >= high, values > high)
+        return (values < low) | above
+
+
+@dataclass
+class TrendSummary:
+    """Resumen por parámetro calculado por :meth:`LabSeries.summarize`"""
+
+    parameters: List[str]
+    count: np.ndarray
+    first: np.ndarray
+    last: np.ndarray
+    direction: np.ndarray          # +1 mejora, -1 empeora, 0 estable
+    percent_change: np.ndarray
+    slope_per_month: np.ndarray
+    last_out_of_range: np.ndarray
+    out_of_range_count: np.ndarray
+
+
+class LabSeries:
+    """
+    Series de laboratorio de un paciente en formato columnar
+
+    Args:
+        patient_id: Paciente
+        ids: Ids de ``LaboratoryData`` ordenados por fecha de estudio
+        dates: Fechas de estudio (``datetime64[D]``)
+        values: Matriz ``(len(PARAMETERS), len(ids))`` con ``NaN`` por faltantes
+    """
+
+    def __init__(self, patient_id: int, ids: np.ndarray, dates: np.ndarray, values: np.ndarray):
+        self.patient_id = patient_id
+        self.ids = ids
+        self.dates = dates
+        self.values = values
+        self._iso_dates: Optional[List[str]] = None
+
+    @classmethod
+    def from_rows(cls, patient_id: int, rows: Sequence[Sequence]) -> "LabSeries":
+        """Construir desde filas ``(id, study_date, *PARAMETERS)``"""
+        rows = sorted(rows, key=lambda row: (row[1], row[0]))
+        if not rows:
+            return cls.empty(patient_id)
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        dates = np.array([row[1] for row in rows], dtype="datetime64[D]")
+        # None -> NaN al convertir a float
+        values = np.array([row[2:] for row in rows], dtype=float).T
+        return cls(patient_id, ids, dates, np.ascontiguousarray(values))
+
+    @classmethod
+    def empty(cls, patient_id: int) -> "LabSeries":
+        return cls(
+            patient_id,
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype="datetime64[D]"),
+            np.empty((len(PARAMETERS), 0)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def iso_dates(self) -> List[str]:
+        if self._iso_dates is None:
+            self._iso_dates = [str(d) for d in self.dates]
+        return self._iso_dates
+
+    def since(self, date_from: date) -> "LabSeries":
+        """Vista de los estudios con fecha ``>= date_from`` (sin copiar)"""
+        start = int(np.searchsorted(self.dates, np.datetime64(date_from, "D"), side="left"))
+        if start == 0:
+            return self
+        return LabSeries(self.patient_id, self.ids[start:], self.dates[start:], self.values[:, start:])
+
+    def column(self, parameter: str) -> np.ndarray:
+        return self.values[PARAMETER_INDEX[parameter]]
+
+    def points(self, parameter: str) -> List[Dict[str, object]]:
+        """Puntos ``{date, value}`` con valor de un parámetro"""
+        column = self.column(parameter)
+        iso_dates = self.iso_dates
+        present = np.flatnonzero(~np.isnan(column))
+        return [{"date": iso_dates[i], "value": v} for i, v in zip(present.tolist(), column[present].tolist())]
+
+    def summarize(self, parameters: Optional[Iterable[str]] = None) -> TrendSummary:
+        """
+        Tendencia de cada parámetro entre su primer y su último valor
+
+        La pendiente es la regresión lineal de mínimos cuadrados sobre los
+        estudios con valor, expresada en unidades por mes (30 días).
+        """
+        names = [p for p in (parameters or PARAMETERS) if p in PARAMETER_INDEX]
+        rows = np.array([PARAMETER_INDEX[p] for p in names], dtype=np.intp)
+        values = self.values[rows]
+        n_params, n_studies = values.shape
+
+        if not n_studies:
+            # Sin estudios: una columna vacía da los mismos resultados neutros
+            values = np.full((n_params, 1), np.nan)
+            n_studies = 1
+        present = ~np.isnan(values)
+        count = present.sum(axis=1)
+        has_data = count > 0
+        first_idx = np.argmax(present, axis=1)
+        last_idx = n_studies - 1 - np.argmax(present[:, ::-1], axis=1)
+        arange = np.arange(n_params)
+        first = np.where(has_data, values[arange, first_idx], np.nan)
+        last = np.where(has_data, values[arange, last_idx], np.nan)
+
+        change = last - first
+        direction = (np.sign(np.nan_to_num(change)) * _DIRECTION[rows]).astype(np.int8)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.where((first != 0) & has_data, change / first * 100, 0.0)
+
+        # Mínimos cuadrados con máscara: x = días desde el primer estudio
+        if len(self.dates):
+            x = (self.dates - self.dates[0]).astype(np.float64) / DAYS_PER_MONTH
+        else:
+            x = np.zeros(1)
+        xw = np.where(present, x, 0.0)
+        yw = np.where(present, values, 0.0)
+        sx, sy = xw.sum(axis=1), yw.sum(axis=1)
+        sxx, sxy = (xw * xw).sum(axis=1), (xw * yw).sum(axis=1)
+        denominator = count * sxx - sx * sx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(denominator > 0, (count * sxy - sx * sy) / denominator, 0.0)
+
+        flags = out_of_range(values, rows)
+        last_flag = flags[arange, last_idx] & has_data
+
+        return TrendSummary(
+            parameters=names,
+            count=count,
+            first=first,
+            last=last,
+            direction=direction,
+            percent_change=percent,
+            slope_per_month=slope,
+            last_out_of_range=last_flag,
+            out_of_range_count=flags.sum(axis=1),
+        )
+
+    def compare(self, lab_id: int, parameters: Iterable[str]) -> List[Tuple[str, float, float, int, float]]:
+        """
+        Comparar un estudio con el estudio inmediato anterior
+
+        Devuelve ``(parámetro, actual, anterior, dirección, cambio %)`` para
+        los parámetros presentes en ambos estudios.
+        """
+        positions = np.flatnonzero(self.ids == lab_id)
+        if not len(positions):
+            return []
+        position = int(positions[0])
+        # Último estudio con fecha estrictamente anterior
+        previous = int(np.searchsorted(self.dates, self.dates[position], side="left")) - 1
+        if previous < 0:
+            return []
+
+        names = [p for p in parameters if p in PARAMETER_INDEX]
+        rows = np.array([PARAMETER_INDEX[p] for p in names], dtype=np.intp)
+        current = self.values[rows, position]
+        before = self.values[rows, previous]
+        both = ~np.isnan(current) & ~np.isnan(before)
+        change = current - before
+        direction = (np.sign(np.nan_to_num(change)) * _DIRECTION[rows]).astype(np.int8)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.where(before != 0, change / before * 100, 0.0)
+
+        return [
+            (names[i], float(current[i]), float(before[i]), int(direction[i]), float(percent[i]))
+            for i in np.flatnonzero(both).tolist()
+        ]
+
+
+class LabSeriesCache:
+    """
+    Caché LRU de :class:`LabSeries` por paciente
+
+    Args:
+        max_patients: Pacientes retenidos en memoria
+        max_age: Segundos antes de recargar una serie aunque no haya habido
+            escrituras locales
+    """
+
+    def __init__(self, max_patients: int = 2048, max_age: float = 300.0):
+        self.max_patients = max_patients
+        self.max_age = max_age
+        self._entries: "OrderedDict[int, Tuple[float, LabSeries]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "queries": 0}
+
+    def _get(self, patient_id: int) -> Optional[LabSeries]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(patient_id)
+            if entry is None:
+                return None
+            loaded_at, series = entry
+            if now - loaded_at > self.max_age:
+                del self._entries[patient_id]
+                return None
+            self._entries.move_to_end(patient_id)
+            return series
+
+    def _put(self, series: LabSeries) -> None:
+        with self._lock:
+            self._entries[series.patient_id] = (time.monotonic(), series)
+            self._entries.move_to_end(series.patient_id)
+            while len(self._entries) > self.max_patients:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, patient_ids: List[int]) -> Tuple[Dict[int, LabSeries], List[int]]:
+        found: Dict[int, LabSeries] = {}
+        missing: List[int] = []
+        for patient_id in patient_ids:
+            series = self._get(patient_id)
+            if series is None:
+                missing.append(patient_id)
+            else:
+                found[patient_id] = series
+        self._stats["hits"] += len(found)
+        self._stats["misses"] += len(missing)
+        return found, missing
+
+    def _store(self, found: Dict[int, LabSeries], loaded: Dict[int, LabSeries]) -> None:
+        for series in loaded.values():
+            self._put(series)
+            found[series.patient_id] = series
+
+    def get_many(self, session, patient_ids: Iterable[int]) -> Dict[int, LabSeries]:
+        """Series de varios pacientes; los faltantes se cargan en una sola consulta"""
+        patient_ids = list(dict.fromkeys(patient_ids))
+        found, missing = self._lookup(patient_ids)
+        if missing:
+            self._store(found, load_series(session, missing))
+        return {patient_id: found[patient_id] for patient_id in patient_ids}
+
+    def get(self, session, patient_id: int) -> LabSeries:
+        return self.get_many(session, [patient_id])[patient_id]
+
+    async def get_many_async(self, session, patient_ids: Iterable[int]) -> Dict[int, LabSeries]:
+        """:meth:`get_many` con un ``AsyncSession``; sin consulta si todo está en caché"""
+        patient_ids = list(dict.fromkeys(patient_ids))
+        found, missing = self._lookup(patient_ids)
+        if missing:
+            self._store(found, await session.run_sync(load_series, missing))
+        return {patient_id: found[patient_id] for patient_id in patient_ids}
+
+    async def get_async(self, session, patient_id: int) -> LabSeries:
+        return (await self.get_many_async(session, [patient_id]))[patient_id]
+
+    def invalidate(self, patient_ids: Iterable[int]) -> None:
+        with self._lock:
+            for patient_id in patient_ids:
+                if self._entries.pop(patient_id, None) is not None:
+                    self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["patients"] = len(self._entries)
+        return stats
+
+
+def load_series(session, patient_ids: Sequence[int]) -> Dict[int, LabSeries]:
+    """Cargar las series de ``patient_ids`` con una consulta de proyección"""
+    rows = session.execute(
+        select(*_PROJECTION).where(LaboratoryData.patient_id.in_(list(patient_ids)))
+    ).all()
+    _lab_series_cache._stats["queries"] += 1
+
+    grouped: Dict[int, List[Tuple]] = {patient_id: [] for patient_id in patient_ids}
+    for row in rows:
+        grouped[row[0]].append(row[1:])
+    return {patient_id: LabSeries.from_rows(patient_id, group) for patient_id, group in grouped.items()}
+
+
+_lab_series_cache = LabSeriesCache()
+
+
+def get_lab_series_cache() -> LabSeriesCache:
+    """Obtener la caché de series de laboratorio del proceso"""
+    return _lab_series_cache
+
+
+# ----------------------------------------------------------------------
+# Invalidación en escrituras de LaboratoryData
+# ----------------------------------------------------------------------
+
+def _lab_patient_ids(target, event_name: str) -> Set[int]:
+    patient_ids: Set[int] = {target.patient_id}
+    # Un cambio de paciente invalida también la serie del paciente anterior
+    patient_ids.update(inspect(target).attrs.patient_id.history.deleted or ())
+    return patient_ids
+
+
+on_committed_writes((LaboratoryData,), _lab_series_cache.invalidate, collect=_lab_patient_ids)
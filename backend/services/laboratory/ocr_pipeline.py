@@ -0,0 +1,475 @@
+"""
+Clinical File OCR Pipeline
+==========================
+
+Procesamiento de OCR de archivos clínicos fuera del ciclo de la petición.
+
+La carga guarda el archivo en disco y responde de inmediato con
+``ocr_status=pending``; el pipeline toma el trabajo de una cola en memoria,
+reparte las páginas del PDF en bloques entre procesos de un
+``ProcessPoolExecutor`` (PyMuPDF y Tesseract usan CPU y mantienen el GIL) y
+escribe el avance en ``clinical_files`` conforme se completan los bloques,
+en orden de página: ``ocr_pages_done`` y un ``extracted_data`` parcial.
+
+Al terminar se analiza el texto completo con ``analyze_clinical_text`` y se
+guarda el mismo ``extracted_data`` que producía el OCR en línea, más el
+número de páginas.
+
+Cada archivo se reclama de forma atómica antes de procesarlo: un UPDATE
+condicional (``FOR UPDATE SKIP LOCKED`` en PostgreSQL) lo pasa a
+``processing`` con ``ocr_owner`` = este pipeline. El dueño renueva
+``ocr_heartbeat_at`` periódicamente; un archivo ``processing`` cuyo
+heartbeat se detuvo (su proceso murió) puede reclamarlo otro proceso.
+:meth:`OcrPipeline.resume_pending` reclama al iniciar, y luego en cada
+heartbeat, los archivos pendientes o abandonados, así que varios procesos
+con el perfil ``clinical`` no procesan el mismo archivo dos veces.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, or_, select, update
+
+from domain.patients.laboratory import ClinicalFile, OcrStatus
+from services.laboratory.clinical_text import analyze_clinical_text
+
+logger = logging.getLogger(__name__)
+
+RAW_TEXT_LIMIT = 5000
+IMAGE_FORMATS = {"jpg", "jpeg", "png"}
+
+
+# ----------------------------------------------------------------------
+# Funciones de los procesos de trabajo (deben poder serializarse)
+# ----------------------------------------------------------------------
+
+def count_pdf_pages(path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    """Texto embebido de las páginas ``[start, stop)``"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        return [doc[number].get_text() for number in range(start, min(stop, doc.page_count))]
+
+
+def extract_image_text(path: str) -> str:
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(path) as image:
+        try:
+            return pytesseract.image_to_string(image, lang="spa")
+        except pytesseract.TesseractNotFoundError as e:
+            # Mismo trato que un paquete faltante: el archivo queda "skipped"
+            raise ImportError(str(e)) from e
+
+
+def build_extracted_data(text: str, pages: int) -> Optional[Dict[str, Any]]:
+    """``extracted_data`` final; ``None`` si el documento no tiene texto"""
+    if not text.strip():
+        return None
+    return {
+        "raw_text": text[:RAW_TEXT_LIMIT],
+        "text_length": len(text),
+        "pages": pages,
+        "analysis": analyze_clinical_text(text),
+        "processing_date": datetime.utcnow().isoformat(),
+    }
+
+
+# ----------------------------------------------------------------------
+# Persistencia del avance
+# ----------------------------------------------------------------------
+
+class ClinicalFileStore:
+    """Escrituras del pipeline sobre ``clinical_files`` con el engine asíncrono"""
+
+    @property
+    def engine(self):
+        import core.database as database
+
+        if database.async_engine is None:
+            database.init_database()
+        return database.async_engine
+
+    async def update(self, file_id: int, owner: Optional[str] = None, **values: Any) -> None:
+        """
+        Actualizar un archivo
+
+        Con ``owner`` no se escribe si otro pipeline ya lo reclamó (p. ej.
+        porque el heartbeat de ``owner`` caducó).
+        """
+        table = ClinicalFile.__table__
+        statement = update(table).where(table.c.id == file_id).values(**values)
+        if owner is not None:
+            statement = statement.where(or_(table.c.ocr_owner == owner, table.c.ocr_owner.is_(None)))
+        async with self.engine.begin() as conn:
+            await conn.execute(statement)
+
+    async def claim(
+        self,
+        owner: str,
+        stale_before: datetime,
+        file_ids: Optional[Iterable[int]] = None,
+        limit: Optional[int] = None,
+    ) -> List["OcrJob"]:
+        """
+        Reclamar archivos pendientes o abandonados para ``owner``
+
+        Un archivo es reclamable si está ``pending``, o ``processing`` con
+        un heartbeat anterior a ``stale_before`` (o sin heartbeat) o ya a
+        nombre de ``owner``. Devuelve los trabajos reclamados.
+        """
+        table = ClinicalFile.__table__
+        claimable = or_(
+            table.c.ocr_status == OcrStatus.PENDING.value,
+            and_(
+                table.c.ocr_status == OcrStatus.PROCESSING.value,
+                or_(
+                    table.c.ocr_owner == owner,
+                    table.c.ocr_heartbeat_at.is_(None),
+                    table.c.ocr_heartbeat_at < stale_before,
+                ),
+            ),
+        )
+        candidates = select(table.c.id).where(claimable).order_by(table.c.id).with_for_update(skip_locked=True)
+        if file_ids is not None:
+            candidates = candidates.where(table.c.id.in_(list(file_ids)))
+        if limit is not None:
+            candidates = candidates.limit(limit)
+
+        async with self.engine.begin() as conn:
+            rows = await conn.execute(
+                update(table)
+                .where(table.c.id.in_(candidates), claimable)
+                .values(
+                    ocr_status=OcrStatus.PROCESSING.value,
+                    ocr_owner=owner,
+                    ocr_heartbeat_at=datetime.utcnow(),
+                )
+                .returning(table.c.id, table.c.file_url, table.c.file_format)
+            )
+            return sorted(
+                (OcrJob(file_id=row[0], path=row[1], file_format=row[2]) for row in rows),
+                key=lambda job: job.file_id,
+            )
+
+    async def heartbeat(self, owner: str, file_ids: Iterable[int]) -> None:
+        """Renovar ``ocr_heartbeat_at`` de los archivos que ``owner`` tiene en curso"""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return
+        table = ClinicalFile.__table__
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(table)
+                .where(table.c.id.in_(file_ids), table.c.ocr_owner == owner)
+                .values(ocr_heartbeat_at=datetime.utcnow())
+            )
+
+
+@dataclass
+class OcrJob:
+    file_id: int
+    path: str
+    file_format: str  # 'pdf', 'jpg', 'jpeg', 'png'
+
+
+class OcrPipeline:
+    """
+    Cola de trabajos de OCR con un pool de procesos para las páginas
+
+    Args:
+        store: Destino de las escrituras (``update``/``claim``/``heartbeat``)
+        max_workers: Procesos del pool; 0 usa el pool de hilos del loop
+        pages_per_task: Páginas por tarea enviada al pool
+        max_concurrent_jobs: Archivos procesados a la vez
+        max_pending: Trabajos en cola antes de rechazar nuevos
+        heartbeat_interval: Segundos entre renovaciones del heartbeat (y
+            búsquedas de archivos pendientes o abandonados)
+        stale_after: Segundos sin heartbeat tras los que otro proceso puede
+            reclamar un archivo en ``processing``
+    """
+
+    def __init__(
+        self,
+        store: Optional[ClinicalFileStore] = None,
+        max_workers: int = 2,
+        pages_per_task: int = 4,
+        max_concurrent_jobs: int = 2,
+        max_pending: int = 1000,
+        heartbeat_interval: float = 60.0,
+        stale_after: float = 300.0,
+    ):
+        self.store = store or ClinicalFileStore()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.max_workers = max_workers
+        self.pages_per_task = max(1, pages_per_task)
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.max_pending = max_pending
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._executor: Optional[Executor] = None
+        self._queued_ids: set = set()
+        self._stats = {
+            "jobs_submitted": 0,
+            "jobs_completed": 0,
+            "jobs_failed": 0,
+            "jobs_skipped": 0,
+            "jobs_rejected": 0,
+            "jobs_claimed_elsewhere": 0,
+            "pages_processed": 0,
+            "processing_seconds": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Iniciar los consumidores de la cola (idempotente)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent_jobs)]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"OCR pipeline started ({self.max_workers} processes, {self.max_concurrent_jobs} concurrent jobs)")
+
+    async def stop(self) -> None:
+        """
+        Detener los consumidores y el pool
+
+        Los trabajos sin terminar conservan su estado en la base de datos;
+        cuando su heartbeat caduca, :meth:`resume_pending` los reclama (en
+        este u otro proceso).
+        """
+        tasks = self._tasks + ([self._heartbeat_task] if self._heartbeat_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._heartbeat_task = None
+        self._queue = None
+        self._queued_ids.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        logger.info("OCR pipeline stopped")
+
+    async def join(self) -> None:
+        """Esperar a que la cola quede vacía"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.max_workers <= 0:
+            return None
+        if self._executor is None:
+            # spawn: no heredar hilos ni locks del proceso del servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    # ------------------------------------------------------------------
+    # Trabajos
+    # ------------------------------------------------------------------
+
+    def submit(self, job: OcrJob) -> bool:
+        """Encolar un archivo; ``False`` si la cola está llena"""
+        self.start()
+        if job.file_id in self._queued_ids:
+            return True
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._stats["jobs_rejected"] += 1
+            logger.warning(f"OCR queue full, clinical file {job.file_id} stays pending")
+            return False
+        self._queued_ids.add(job.file_id)
+        self._stats["jobs_submitted"] += 1
+        return True
+
+    def _stale_before(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.stale_after)
+
+    async def resume_pending(self) -> int:
+        """Reclamar y encolar los archivos pendientes o abandonados en la base de datos"""
+        self.start()
+        free = self.max_pending - self._queue.qsize()
+        if free <= 0:
+            return 0
+        try:
+            jobs = await self.store.claim(self.owner, self._stale_before(), limit=free)
+        except Exception as e:
+            logger.error(f"Could not claim pending OCR jobs: {e}")
+            return 0
+        resumed = sum(1 for job in jobs if self.submit(job))
+        if resumed:
+            logger.info(f"Resumed {resumed} pending OCR jobs")
+        return resumed
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.store.heartbeat(self.owner, list(self._queued_ids))
+            except Exception as e:
+                logger.error(f"Could not renew OCR job heartbeats: {e}")
+            await self.resume_pending()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                # Las cargas encolan sin reclamar; otro proceso pudo tomarlo
+                if await self.store.claim(self.owner, self._stale_before(), file_ids=[job.file_id]):
+                    await self.process(job)
+                else:
+                    self._stats["jobs_claimed_elsewhere"] += 1
+            except Exception as e:
+                logger.error(f"OCR job for clinical file {job.file_id} crashed: {e}")
+            finally:
+                self._queued_ids.discard(job.file_id)
+                self._queue.task_done()
+
+    async def process(self, job: OcrJob) -> None:
+        """Procesar un archivo escribiendo el avance por bloques de páginas"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        started = time.perf_counter()
+        file_format = job.file_format.lower().lstrip(".")
+        futures: List[asyncio.Future] = []
+
+        try:
+            if file_format == "pdf":
+                total = await loop.run_in_executor(executor, count_pdf_pages, job.path)
+            elif file_format in IMAGE_FORMATS:
+                total = 1
+            else:
+                await self.store.update(job.file_id, owner=self.owner, ocr_status=OcrStatus.SKIPPED.value)
+                self._stats["jobs_skipped"] += 1
+                return
+
+            await self.store.update(
+                job.file_id,
+                owner=self.owner,
+                ocr_status=OcrStatus.PROCESSING.value,
+                ocr_pages_total=total,
+                ocr_pages_done=0,
+                ocr_error=None,
+            )
+
+            if file_format == "pdf":
+                futures = [
+                    loop.run_in_executor(executor, extract_pdf_pages, job.path, start, start + self.pages_per_task)
+                    for start in range(0, total, self.pages_per_task)
+                ]
+            else:
+                futures = [loop.run_in_executor(executor, extract_image_text, job.path)]
+
+            texts: List[str] = []
+            text_length = 0
+            for future in futures:
+                # Los bloques corren en paralelo; el avance se escribe en orden
+                result = await future
+                chunk = result if isinstance(result, list) else [result]
+                texts.extend(chunk)
+                text_length += sum(len(page) for page in chunk)
+                if len(texts) < total:
+                    await self.store.update(
+                        job.file_id,
+                        owner=self.owner,
+                        ocr_pages_done=len(texts),
+                        extracted_data={
+                            "raw_text": "".join(texts)[:RAW_TEXT_LIMIT],
+                            "text_length": text_length,
+                            "pages": total,
+                            "partial": True,
+                        },
+                    )
+
+            extracted_data = build_extracted_data("".join(texts), total)
+            await self.store.update(
+                job.file_id,
+                owner=self.owner,
+                ocr_status=OcrStatus.COMPLETED.value,
+                ocr_pages_done=total,
+                ocr_processed=extracted_data is not None,
+                extracted_data=extracted_data,
+            )
+            self._stats["jobs_completed"] += 1
+            self._stats["pages_processed"] += total
+
+        except ImportError as e:
+            logger.warning(f"OCR engine not installed, skipping clinical file {job.file_id}: {e}")
+            self._stats["jobs_skipped"] += 1
+            await self.store.update(
+                job.file_id, owner=self.owner, ocr_status=OcrStatus.SKIPPED.value, ocr_error=str(e)[:500]
+            )
+
+        except Exception as e:
+            logger.error(f"OCR failed for clinical file {job.file_id}: {e}")
+            self._stats["jobs_failed"] += 1
+            await self.store.update(
+                job.file_id, owner=self.owner, ocr_status=OcrStatus.FAILED.value, ocr_error=str(e)[:500]
+            )
+
+        finally:
+            for future in futures:
+                future.cancel()
+            self._stats["processing_seconds"] += time.perf_counter() - started
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        seconds = stats.pop("processing_seconds")
+        stats["processing_seconds"] = round(seconds, 3)
+        stats["pages_per_second"] = round(stats["pages_processed"] / seconds, 2) if seconds else 0.0
+        stats["queued"] = self._queue.qsize() if self._queue is not None else 0
+        stats["process_workers"] = self.max_workers
+        return stats
+
+
+_ocr_pipeline: Optional[OcrPipeline] = None
+
+
+def get_ocr_pipeline() -> OcrPipeline:
+    """Obtener el pipeline de OCR del proceso"""
+    global _ocr_pipeline
+    if _ocr_pipeline is None:
+        from core.config import get_settings
+
+        settings = get_settings()
+        _ocr_pipeline = OcrPipeline(
+            max_workers=settings.ocr_process_workers,
+            pages_per_task=settings.ocr_pages_per_task,
+            max_concurrent_jobs=settings.ocr_max_concurrent_jobs,
+        )
+    return _ocr_pipeline
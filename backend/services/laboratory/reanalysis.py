@@ -0,0 +1,348 @@
+"""
+Lab Reanalysis Jobs
+===================
+
+Reanálisis masivo de resultados de laboratorio.
+
+Cuando cambian los rangos de referencia o las reglas de interpretación hay
+que regenerar ``ai_interpretation`` (y los valores derivados HOMA-IR e
+índice aterogénico) de todo el historial de una clínica. En lugar de un
+``POST /laboratory/{lab_id}/reanalyze`` por estudio, un trabajo recorre
+``laboratory_data`` por páginas de id (keyset), evalúa cada página completa
+con el motor de reglas compilado y escribe los resultados con un UPDATE
+``executemany`` por página.
+
+El estado de cada trabajo vive en ``lab_reanalysis_jobs`` (no en memoria),
+así cualquier worker responde la consulta de progreso y un reinicio no lo
+pierde. Solo hay un trabajo activo a la vez: ``active_slot`` es único y vale
+1 mientras el trabajo corre; un trabajo cuyo ``heartbeat_at`` no avanza en
+``stale_after`` se marca como interrumpido y libera el lugar.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy import (
+    Column, Date, DateTime, Float, Integer, MetaData, String, Table, bindparam, insert, select, update
+)
+from sqlalchemy.exc import IntegrityError
+
+from domain.patients.lab_rules import LabRuleEngine, get_lab_rule_engine
+from domain.patients.laboratory import LaboratoryData
+from domain.patients.models import Patient
+
+logger = logging.getLogger(__name__)
+
+_DERIVED_INPUTS = (
+    "fasting_glucose_mgdl", "fasting_insulin_uUI_ml", "total_cholesterol_mgdl", "hdl_cholesterol_mgdl",
+    "homa_ir", "atherogenic_index",
+)
+
+
+def compute_derived_values(columns: Dict[str, np.ndarray]) -> None:
+    """Versión vectorizada de ``LaboratoryData.calculate_derived_values``"""
+    glucose = columns["fasting_glucose_mgdl"]
+    insulin = columns["fasting_insulin_uUI_ml"]
+    total = columns["total_cholesterol_mgdl"]
+    hdl = columns["hdl_cholesterol_mgdl"]
+
+    def reported(values: np.ndarray) -> np.ndarray:
+        return ~np.isnan(values) & (values != 0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        has_homa = reported(glucose) & reported(insulin)
+        columns["homa_ir"] = np.where(has_homa, glucose * insulin / 405, columns["homa_ir"])
+        has_index = reported(total) & reported(hdl) & (hdl > 0)
+        columns["atherogenic_index"] = np.where(has_index, total / hdl, columns["atherogenic_index"])
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+_metadata = MetaData()
+
+reanalysis_jobs_table = Table(
+    "lab_reanalysis_jobs", _metadata,
+    Column("id", String(12), primary_key=True),
+    Column("status", String(20), nullable=False),
+    Column("patient_id", Integer),
+    Column("nutritionist_id", Integer),
+    Column("study_date_from", Date),
+    Column("batch_size", Integer, nullable=False),
+    Column("processed", Integer, nullable=False, default=0),
+    Column("batches", Integer, nullable=False, default=0),
+    Column("error", String(500)),
+    Column("created_at", DateTime, nullable=False),
+    Column("finished_at", DateTime),
+    Column("elapsed_seconds", Float, nullable=False, default=0.0),
+    Column("heartbeat_at", DateTime),
+    # 1 mientras el trabajo está activo, NULL al terminar (índice único)
+    Column("active_slot", Integer, unique=True),
+)
+
+_ACTIVE_STATUSES = ("pending", "running")
+
+
+class ReanalysisJobConflict(Exception):
+    """Ya hay otro trabajo de reanálisis activo"""
+
+    def __init__(self, active: "LabReanalysisJob"):
+        super().__init__(f"Reanalysis job {active.id} is already {active.status}")
+        self.active = active
+
+
+@dataclass
+class LabReanalysisJob:
+    """Estado de un reanálisis masivo"""
+
+    patient_id: Optional[int] = None
+    nutritionist_id: Optional[int] = None
+    study_date_from: Optional[date] = None
+    batch_size: int = 500
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = "pending"  # pending, running, completed, failed, interrupted
+    processed: int = 0
+    batches: int = 0
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    elapsed_seconds: float = 0.0
+
+    @property
+    def filters(self) -> tuple:
+        return (self.patient_id, self.nutritionist_id, self.study_date_from)
+
+    def to_row(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @classmethod
+    def from_row(cls, row) -> "LabReanalysisJob":
+        return cls(**{f.name: row[f.name] for f in fields(cls)})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "patient_id": self.patient_id,
+            "nutritionist_id": self.nutritionist_id,
+            "study_date_from": self.study_date_from,
+            "processed": self.processed,
+            "batches": self.batches,
+            "records_per_second": round(self.processed / self.elapsed_seconds, 1) if self.elapsed_seconds else 0.0,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class LabReanalysisRunner:
+    """
+    Ejecuta trabajos de reanálisis en segundo plano
+
+    Args:
+        engine: Engine asíncrono; por defecto ``core.database.async_engine``
+        rule_engine: Motor de reglas compilado
+        stale_after: Sin avance del heartbeat por este tiempo, un trabajo
+            activo se considera interrumpido (p. ej. su worker se reinició)
+    """
+
+    def __init__(
+        self,
+        engine=None,
+        rule_engine: Optional[LabRuleEngine] = None,
+        stale_after: timedelta = timedelta(minutes=5),
+    ):
+        self._engine = engine
+        self.rule_engine = rule_engine or get_lab_rule_engine()
+        self.stale_after = stale_after
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+        self._columns = list(dict.fromkeys(_DERIVED_INPUTS + self.rule_engine.parameters))
+        table = LaboratoryData.__table__
+        self._projection = [table.c.id, table.c.patient_id] + [table.c[name] for name in self._columns]
+        self._update = (
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(
+                homa_ir=bindparam("homa_ir"),
+                atherogenic_index=bindparam("atherogenic_index"),
+                ai_interpretation=bindparam("ai_interpretation", type_=table.c.ai_interpretation.type),
+                updated_at=bindparam("updated_at"),
+            )
+        )
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            import core.database as database
+
+            if database.async_engine is None:
+                database.init_database()
+            return database.async_engine
+        return self._engine
+
+    # ------------------------------------------------------------------
+    # Trabajos
+    # ------------------------------------------------------------------
+
+    async def submit(self, job: LabReanalysisJob) -> LabReanalysisJob:
+        """
+        Registrar e iniciar un trabajo en segundo plano
+
+        Si ya hay un trabajo activo con los mismos filtros se devuelve ese;
+        con otros filtros se lanza ``ReanalysisJobConflict``.
+        """
+        table = reanalysis_jobs_table
+        for _ in range(2):
+            await self._expire_stale()
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.execute(insert(table).values(
+                        **job.to_row(), heartbeat_at=datetime.utcnow(), active_slot=1
+                    ))
+            except IntegrityError:
+                active = await self._active()
+                if active is None:
+                    continue  # terminó entre el INSERT y la consulta
+                if active.filters == job.filters:
+                    return active
+                raise ReanalysisJobConflict(active)
+            self._tasks[job.id] = asyncio.create_task(self.run(job))
+            return job
+        raise ReanalysisJobConflict(await self._active() or job)
+
+    async def get(self, job_id: str) -> Optional[LabReanalysisJob]:
+        await self._expire_stale()
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(
+                select(reanalysis_jobs_table).where(reanalysis_jobs_table.c.id == job_id)
+            )).mappings().first()
+        return LabReanalysisJob.from_row(row) if row else None
+
+    async def _active(self) -> Optional[LabReanalysisJob]:
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(
+                select(reanalysis_jobs_table).where(reanalysis_jobs_table.c.active_slot == 1)
+            )).mappings().first()
+        return LabReanalysisJob.from_row(row) if row else None
+
+    async def _expire_stale(self) -> None:
+        """Marcar como interrumpido el trabajo activo cuyo heartbeat se detuvo"""
+        table = reanalysis_jobs_table
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(table)
+                .where(table.c.active_slot == 1, table.c.heartbeat_at < datetime.utcnow() - self.stale_after)
+                .values(status="interrupted", active_slot=None, finished_at=datetime.utcnow(),
+                        error="No progress reported; the worker running it stopped")
+            )
+
+    async def _save_progress(self, conn, job: LabReanalysisJob, **values) -> None:
+        table = reanalysis_jobs_table
+        await conn.execute(update(table).where(table.c.id == job.id).values(
+            status=job.status, processed=job.processed, batches=job.batches, error=job.error,
+            elapsed_seconds=job.elapsed_seconds, finished_at=job.finished_at,
+            heartbeat_at=datetime.utcnow(), **values
+        ))
+
+    async def wait(self, job_id: str) -> None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def _page_query(self, job: LabReanalysisJob, after_id: int):
+        table = LaboratoryData.__table__
+        query = select(*self._projection).where(table.c.id > after_id)
+        if job.patient_id is not None:
+            query = query.where(table.c.patient_id == job.patient_id)
+        if job.nutritionist_id is not None:
+            query = query.where(table.c.patient_id.in_(
+                select(Patient.__table__.c.id).where(Patient.__table__.c.active_nutritionist_id == job.nutritionist_id)
+            ))
+        if job.study_date_from is not None:
+            query = query.where(table.c.study_date >= job.study_date_from)
+        return query.order_by(table.c.id).limit(job.batch_size)
+
+    async def run(self, job: LabReanalysisJob) -> LabReanalysisJob:
+        """Procesar todas las páginas del trabajo"""
+        from services.laboratory.lab_series import get_lab_series_cache
+
+        job.status = "running"
+        started = time.perf_counter()
+        after_id = 0
+        try:
+            while True:
+                async with self.engine.begin() as conn:
+                    rows = (await conn.execute(self._page_query(job, after_id))).all()
+                    if not rows:
+                        break
+                    params, patient_ids = self.reanalyze_rows(rows)
+                    await conn.execute(self._update, params)
+                    job.processed += len(rows)
+                    job.batches += 1
+                    job.elapsed_seconds = time.perf_counter() - started
+                    # El avance se confirma junto con la página
+                    await self._save_progress(conn, job)
+
+                get_lab_series_cache().invalidate(patient_ids)
+                after_id = rows[-1][0]
+                # Ceder el loop entre páginas
+                await asyncio.sleep(0)
+
+            job.status = "completed"
+            logger.info(f"Lab reanalysis {job.id}: {job.processed} records in {job.batches} batches")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)[:500]
+            logger.error(f"Lab reanalysis {job.id} failed after {job.processed} records: {e}")
+        finally:
+            job.elapsed_seconds = time.perf_counter() - started
+            job.finished_at = datetime.utcnow()
+            self._tasks.pop(job.id, None)
+            try:
+                async with self.engine.begin() as conn:
+                    await self._save_progress(conn, job, active_slot=None)
+            except Exception as e:
+                logger.error(f"Could not record the end of lab reanalysis {job.id}: {e}")
+        return job
+
+    def reanalyze_rows(self, rows) -> tuple:
+        """Parámetros del UPDATE para una página de filas ``(id, patient_id, *columnas)``"""
+        matrix = np.array([row[2:] for row in rows], dtype=float).T
+        columns = {name: matrix[i] for i, name in enumerate(self._columns)}
+        compute_derived_values(columns)
+
+        values = np.vstack([columns[name] for name in self.rule_engine.parameters])
+        interpretations = self.rule_engine.interpret_matrix(values)
+
+        now = datetime.utcnow()
+        homa = columns["homa_ir"]
+        index = columns["atherogenic_index"]
+        params = [
+            {
+                "row_id": row[0],
+                "homa_ir": _optional(homa[i]),
+                "atherogenic_index": _optional(index[i]),
+                "ai_interpretation": interpretations[i],
+                "updated_at": now,
+            }
+            for i, row in enumerate(rows)
+        ]
+        return params, {row[1] for row in rows}
+
+
+_runner: Optional[LabReanalysisRunner] = None
+
+
+def get_reanalysis_runner() -> LabReanalysisRunner:
+    """Obtener el ejecutor de reanálisis del proceso"""
+    global _runner
+    if _runner is None:
+        _runner = LabReanalysisRunner()
+    return _runner
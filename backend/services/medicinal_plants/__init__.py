@@ -0,0 +1,6 @@
+"""
+Medicinal plants services
+"""
+from .facet_index import PlantFacetIndex, get_plant_facet_index
+
+__all__ = ["PlantFacetIndex", "get_plant_facet_index"]
@@ -0,0 +1,262 @@
+"""
+Plant Facet Index
+=================
+
+Índice invertido en memoria para la búsqueda facetada de plantas medicinales.
+
+Cada valor de faceta (categoría, nivel de evidencia, nivel de seguridad,
+estado, seguridad en embarazo/niños, destacada, validada) y cada término de
+los nombres científico y populares guarda un bitset (``int`` de Python) con
+las posiciones de las plantas que lo tienen. Un filtro es un AND de bitsets
+y los conteos de todas las facetas salen de ``(máscara & bitset).bit_count()``
+en una sola pasada, sin consultas ``COUNT`` por valor ni ``json_contains``.
+
+El índice se reconstruye (una consulta) cuando se confirma una escritura
+de ``MedicinalPlant`` (ver ``core.invalidation``).
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+
+from core.invalidation import on_committed_writes
+from domain.medicinal_plants.models import MedicinalPlant
+from services.rag.vector_index import normalize_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Facetas -> atributo de MedicinalPlant
+FACET_FIELDS: Dict[str, str] = {
+    "category": "primary_category",
+    "evidence_level": "evidence_level",
+    "safety_level": "safety_level",
+    "state": "states_found",
+    "safe_in_pregnancy": "safe_in_pregnancy",
+    "safe_for_children": "safe_for_children",
+    "featured": "featured",
+    "validated": "validated_by_expert",
+}
+
+SUMMARY_FIELDS = (
+    "id", "scientific_name", "popular_names", "primary_category", "evidence_level",
+    "safety_level", "main_image_url", "traditional_uses",
+)
+
+
+def _facet_key(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(getattr(value, "value", value))
+
+
+def _iter_bits(mask: int) -> Iterable[int]:
+    """Posiciones de los bits encendidos en orden ascendente"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class PlantFacetIndex:
+    """
+    Índice facetado de plantas activas
+
+    Args:
+        max_age: Segundos antes de recargar desde la base de datos aunque no
+            haya habido escrituras locales
+    """
+
+    def __init__(self, max_age: float = 300.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._docs: List[Dict[str, Any]] = []
+        self._all = 0
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._state_labels: Dict[str, str] = {}
+        self._terms: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._stale = True
+        self._generation = 0
+        self._load_lock: Optional[asyncio.Lock] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    def build(self, plants: Iterable[Any]) -> int:
+        """Reconstruir el índice a partir de plantas (ORM o equivalentes)"""
+        docs: List[Dict[str, Any]] = []
+        postings: Dict[str, Dict[str, int]] = {facet: {} for facet in FACET_FIELDS}
+        state_labels: Dict[str, str] = {}
+        terms: Dict[str, int] = {}
+
+        ordered = sorted(plants, key=lambda p: (not p.featured, p.scientific_name.lower(), p.id))
+        for position, plant in enumerate(ordered):
+            bit = 1 << position
+            docs.append({field: getattr(plant, field) for field in SUMMARY_FIELDS})
+
+            for facet, field in FACET_FIELDS.items():
+                values = getattr(plant, field)
+                if facet == "state":
+                    keys = set()
+                    for state in values or []:
+                        key = normalize_text(state).strip()
+                        state_labels.setdefault(key, state)
+                        keys.add(key)
+                else:
+                    keys = {_facet_key(values)}
+                for key in keys:
+                    postings[facet][key] = postings[facet].get(key, 0) | bit
+
+            names = " ".join([plant.scientific_name] + list(plant.popular_names or []))
+            for term in set(tokenize(names, drop_stopwords=False)):
+                terms[term] = terms.get(term, 0) | bit
+
+        with self._lock:
+            self._docs = docs
+            self._all = (1 << len(docs)) - 1
+            self._postings = postings
+            self._state_labels = state_labels
+            self._terms = terms
+            self._loaded_at = time.monotonic()
+            self._stale = False
+        return len(docs)
+
+    async def load(self, session) -> int:
+        """Cargar las plantas activas con una sola consulta"""
+        started = time.perf_counter()
+        generation = self._generation
+        result = await session.execute(select(MedicinalPlant).where(MedicinalPlant.is_active == True))
+        count = self.build(result.scalars().all())
+        if self._generation != generation:
+            # A write committed while loading: keep the index marked stale
+            self._stale = True
+        logger.info(f"Plant facet index built: {count} plants in {time.perf_counter() - started:.3f}s")
+        return count
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._stale = True
+
+    @property
+    def needs_refresh(self) -> bool:
+        return (
+            self._stale
+            or self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self.max_age
+        )
+
+    async def ensure_fresh(self, session) -> None:
+        """Recargar si hace falta (una sola recarga para peticiones concurrentes)"""
+        if not self.needs_refresh:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self.needs_refresh:
+                await self.load(session)
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _text_mask(self, search: str) -> int:
+        """AND de términos; cada término coincide como subcadena de un nombre"""
+        mask = self._all
+        for term in tokenize(search, drop_stopwords=False):
+            term_mask = 0
+            for vocab_term, bits in self._terms.items():
+                if term in vocab_term:
+                    term_mask |= bits
+            mask &= term_mask
+            if not mask:
+                break
+        return mask
+
+    def _filter_mask(self, facet: str, value: Any) -> int:
+        key = normalize_text(value).strip() if facet == "state" else _facet_key(value)
+        return self._postings.get(facet, {}).get(key, 0)
+
+    def search(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 20,
+        with_facets: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Filtrar, paginar y contar facetas
+
+        Los conteos de cada faceta aplican todos los filtros salvo el de la
+        propia faceta, de modo que muestran cuántos resultados habría al
+        cambiar ese filtro.
+
+        Returns:
+            ``{"plants": [...], "total": int, "facets": {faceta: {valor: n}}}``
+        """
+        filters = {facet: value for facet, value in (filters or {}).items() if value is not None}
+        unknown = set(filters) - set(FACET_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown plant facets: {sorted(unknown)}")
+
+        with self._lock:
+            base = self._text_mask(search) if search and search.strip() else self._all
+            facet_masks = {facet: self._filter_mask(facet, value) for facet, value in filters.items()}
+
+            mask = base
+            for facet_mask in facet_masks.values():
+                mask &= facet_mask
+
+            total = mask.bit_count()
+            offset = (page - 1) * page_size
+            plants: List[Dict[str, Any]] = []
+            for index, position in enumerate(_iter_bits(mask)):
+                if index < offset:
+                    continue
+                if len(plants) >= page_size:
+                    break
+                plants.append(self._docs[position])
+
+            facets: Dict[str, Dict[str, int]] = {}
+            if with_facets:
+                for facet, postings in self._postings.items():
+                    others = base
+                    for other, facet_mask in facet_masks.items():
+                        if other != facet:
+                            others &= facet_mask
+                    counts = {}
+                    for key, bits in postings.items():
+                        count = (others & bits).bit_count()
+                        if count:
+                            label = self._state_labels.get(key, key) if facet == "state" else key
+                            counts[label] = count
+                    facets[facet] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+        return {"plants": plants, "total": total, "facets": facets}
+
+    def facet_counts(self, facet: str) -> Dict[str, int]:
+        """Conteo de todas las plantas activas por valor de una faceta"""
+        with self._lock:
+            return {key: bits.bit_count() for key, bits in self._postings.get(facet, {}).items()}
+
+
+_plant_facet_index = PlantFacetIndex()
+
+
+def get_plant_facet_index() -> PlantFacetIndex:
+    """Obtener el índice facetado del proceso"""
+    return _plant_facet_index
+
+
+# ----------------------------------------------------------------------
+# Invalidación en escrituras de MedicinalPlant
+# ----------------------------------------------------------------------
+
+on_committed_writes((MedicinalPlant,), lambda _: _plant_facet_index.invalidate())
@@ -0,0 +1,304 @@
+"""
+Offline Barcode Catalog
+=======================
+
+Catálogo de productos en disco para resolver códigos de barras sin base de
+datos ni red (arranque en frío, despliegues sin acceso a Open Food Facts).
+
+Formato (little-endian, secciones alineadas a 8 bytes)::
+
+    header    magic, versión, n, offsets de cada sección
+    keys      uint64[n]          código numérico (GTIN), ordenado
+    ids       int64[n]           id en productos_nom051 (0 = sin id)
+    numbers   int32[n, 10]       porción y nutrientes en centésimas (NUMBER_FIELDS)
+    flags     uint8[n]           bit i = SEALS[i]
+    offsets   uint32[n * 7 + 1]  inicio de cada texto (STRING_FIELDS) en blob
+    blob      UTF-8
+
+El archivo se abre con ``mmap``: la búsqueda es un ``searchsorted`` sobre
+``keys`` y solo se leen las páginas del registro encontrado. Todos los
+workers comparten las mismas páginas vía la caché del sistema operativo.
+
+Se genera con ``scripts/build_barcode_catalog.py`` desde un volcado CSV de
+Open Food Facts o desde ``productos_nom051``; la escritura es atómica
+(archivo temporal + ``os.replace``) y los workers detectan el archivo nuevo.
+"""
+import csv
+import gzip
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from .calculator import NOM051Seals, nom051_calculator
+from .scan_rollup import SEALS
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NIBCAT01"
+VERSION = 1
+
+NUMBER_FIELDS = (
+    "porcion_gramos", "calorias", "proteinas", "carbohidratos", "azucares",
+    "grasas_totales", "grasas_saturadas", "grasas_trans", "fibra", "sodio",
+)
+STRING_FIELDS = ("codigo_barras", "nombre", "marca", "imagen_url", "ingredientes", "categoria", "fuente")
+
+_MAX_NUMBER = np.iinfo(np.int32).max
+
+# magic, version, count, keys, ids, numbers, flags, offsets, blob, blob_size
+_HEADER = struct.Struct("<8sII7Q")
+
+
+def barcode_key(barcode: str) -> Optional[int]:
+    """Clave numérica de un código (EAN-8/13, UPC-A, GTIN-14); ``None`` si no aplica"""
+    if not barcode.isdigit() or not 8 <= len(barcode) <= 14:
+        return None
+    return int(barcode)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+# ----------------------------------------------------------------------
+# Escritura
+# ----------------------------------------------------------------------
+
+def write_catalog(path: str, products: Iterable[Dict[str, Any]]) -> int:
+    """
+    Escribir un catálogo con ``products`` (diccionarios con el formato de la
+    respuesta del escáner); ante códigos repetidos gana el primero
+
+    Devuelve el número de productos escritos.
+    """
+    records: Dict[int, Dict[str, Any]] = {}
+    for product in products:
+        key = barcode_key(str(product.get("codigo_barras") or ""))
+        if key is not None and key not in records:
+            records[key] = product
+
+    keys = np.array(sorted(records), dtype=np.uint64)
+    count = len(keys)
+    ids = np.zeros(count, dtype=np.int64)
+    numbers = np.zeros((count, len(NUMBER_FIELDS)), dtype=np.int32)
+    flags = np.zeros(count, dtype=np.uint8)
+    offsets = np.zeros(count * len(STRING_FIELDS) + 1, dtype=np.uint32)
+    blob = bytearray()
+
+    for row, key in enumerate(keys.tolist()):
+        product = records[key]
+        ids[row] = product.get("id") or 0
+        # Centésimas: exacto para DECIMAL(10,2) de productos_nom051
+        numbers[row] = [min(round(float(product.get(name) or 0) * 100), _MAX_NUMBER) for name in NUMBER_FIELDS]
+        flags[row] = sum(1 << bit for bit, seal in enumerate(SEALS) if product.get(seal))
+        for column, name in enumerate(STRING_FIELDS):
+            offsets[row * len(STRING_FIELDS) + column] = len(blob)
+            blob += (product.get(name) or "").encode("utf-8")
+    offsets[-1] = len(blob)
+    if len(blob) > np.iinfo(np.uint32).max:
+        raise ValueError("String blob exceeds 4 GiB")
+
+    sections = [keys, ids, numbers, flags, offsets]
+    positions = []
+    position = _align(_HEADER.size)
+    for array in sections:
+        positions.append(position)
+        position = _align(position + array.nbytes)
+    blob_position = position
+
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, VERSION, count, *positions, blob_position, len(blob)))
+        for array, start in zip(sections, positions):
+            handle.write(b"\0" * (start - handle.tell()))
+            handle.write(array.tobytes())
+        handle.write(b"\0" * (blob_position - handle.tell()))
+        handle.write(bytes(blob))
+    os.replace(tmp_path, path)
+    return count
+
+
+def _number(value: Optional[str], multiplier: float = 1.0) -> Optional[float]:
+    try:
+        return float(value) * multiplier if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def iter_off_dump(path: str, country: Optional[str] = "en:mexico") -> Iterator[Dict[str, Any]]:
+    """
+    Productos de un volcado CSV de Open Food Facts (``.csv`` o ``.csv.gz``,
+    separado por tabuladores), filtrados por ``countries_tags``
+    """
+    from services.openfoodfacts.client import ProductInfo, ProductNutrition
+    from .product_cache import render_off_product
+
+    csv.field_size_limit(1 << 30)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as handle:
+        for row in csv.DictReader(handle, delimiter="\t", quoting=csv.QUOTE_NONE):
+            code = (row.get("code") or "").strip()
+            if barcode_key(code) is None or not row.get("product_name"):
+                continue
+            if country and country not in (row.get("countries_tags") or "").split(","):
+                continue
+            nutrition = ProductNutrition(
+                calories=_number(row.get("energy-kcal_100g")),
+                proteins=_number(row.get("proteins_100g")),
+                carbohydrates=_number(row.get("carbohydrates_100g")),
+                sugars=_number(row.get("sugars_100g")),
+                fat=_number(row.get("fat_100g")),
+                saturated_fat=_number(row.get("saturated-fat_100g")),
+                trans_fat=_number(row.get("trans-fat_100g")),
+                fiber=_number(row.get("fiber_100g")),
+                sodium=_number(row.get("sodium_100g"), multiplier=1000),  # g -> mg
+            )
+            yield render_off_product(code, ProductInfo(
+                barcode=code,
+                product_name=row["product_name"],
+                brands=row.get("brands") or None,
+                categories=row.get("categories") or None,
+                image_url=row.get("image_url") or None,
+                ingredients_text=row.get("ingredients_text") or None,
+                nutrition=nutrition,
+            ))
+
+
+async def iter_database_products(conn, batch_size: int = 5000):
+    """Productos de ``productos_nom051`` con código de barras, ya renderizados"""
+    from sqlalchemy import text
+    from .product_cache import PRODUCT_BY_BARCODE_SQL, render_product
+
+    columns = str(PRODUCT_BY_BARCODE_SQL).split("FROM")[0]
+    result = await conn.stream(text(
+        f"{columns} FROM productos_nom051 WHERE codigo_barras IS NOT NULL ORDER BY id"
+    ))
+    async for partition in result.mappings().partitions(batch_size):
+        for row in partition:
+            yield render_product(row)
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+
+class BarcodeCatalog:
+    """Catálogo mapeado en memoria (solo lectura)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            stat = os.fstat(handle.fileno())
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        magic, version, count, keys, ids, numbers, flags, offsets, blob, blob_size = \
+            _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a barcode catalog (version {VERSION})")
+
+        self.count = count
+        self.keys = np.frombuffer(self._mmap, dtype=np.uint64, count=count, offset=keys)
+        self.ids = np.frombuffer(self._mmap, dtype=np.int64, count=count, offset=ids)
+        self.numbers = np.frombuffer(
+            self._mmap, dtype=np.int32, count=count * len(NUMBER_FIELDS), offset=numbers
+        ).reshape(count, len(NUMBER_FIELDS))
+        self.flags = np.frombuffer(self._mmap, dtype=np.uint8, count=count, offset=flags)
+        self.offsets = np.frombuffer(
+            self._mmap, dtype=np.uint32, count=count * len(STRING_FIELDS) + 1, offset=offsets
+        )
+        self._blob_start = blob
+        if len(self._mmap) < blob + blob_size:
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, barcode: str) -> bool:
+        return self.position(barcode) is not None
+
+    def position(self, barcode: str) -> Optional[int]:
+        key = barcode_key(barcode)
+        if key is None or not self.count:
+            return None
+        key = np.uint64(key)
+        row = int(self.keys.searchsorted(key))
+        if row < self.count and self.keys[row] == key:
+            return row
+        return None
+
+    def get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Producto con el formato de la respuesta del escáner, o ``None``"""
+        row = self.position(barcode)
+        if row is None:
+            return None
+
+        width = len(STRING_FIELDS)
+        bounds = self.offsets[row * width:(row + 1) * width + 1].tolist()
+        base = bounds[0]
+        raw = self._mmap[self._blob_start + base:self._blob_start + bounds[-1]]
+        strings = [raw[start - base:end - base].decode("utf-8") or None for start, end in zip(bounds, bounds[1:])]
+        flags = int(self.flags[row])
+        seals = {seal: bool(flags >> bit & 1) for bit, seal in enumerate(SEALS)}
+        health_score, health_level, health_color = nom051_calculator.get_health_score(NOM051Seals(**seals))
+
+        # Mismo orden de claves que render_product
+        product: Dict[str, Any] = {"id": int(self.ids[row]) or None}
+        product.update(zip(STRING_FIELDS[:3], strings))
+        product.update(zip(NUMBER_FIELDS, (self.numbers[row] / 100).tolist()))
+        product.update(seals)
+        product.update(zip(STRING_FIELDS[3:], strings[3:]))
+        product["health_score"] = health_score
+        product["health_level"] = health_level
+        product["health_color"] = health_color
+        return product
+
+    def close(self) -> None:
+        """Liberar el mapeo (las vistas numpy deben soltarse antes)"""
+        self.keys = self.ids = self.numbers = self.flags = self.offsets = None
+        self._mmap.close()
+
+
+_catalog: Optional[BarcodeCatalog] = None
+_checked_at = 0.0
+_CHECK_SECONDS = 30.0
+
+
+def get_barcode_catalog() -> Optional[BarcodeCatalog]:
+    """
+    Catálogo configurado en ``BARCODE_CATALOG_PATH``, o ``None`` si no existe
+
+    Cada ``_CHECK_SECONDS`` se revisa si el archivo fue reemplazado.
+    """
+    global _catalog, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < _CHECK_SECONDS:
+        return _catalog
+    _checked_at = now
+
+    from core.config import get_settings
+
+    path = get_settings().barcode_catalog_path
+    try:
+        stat = os.stat(path) if path else None
+    except OSError:
+        stat = None
+    if stat is None:
+        _catalog = None
+        return None
+
+    if _catalog is None or _catalog.path != path or \
+            _catalog.signature != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+        try:
+            _catalog = BarcodeCatalog(path)
+            logger.info(f"Barcode catalog loaded: {len(_catalog)} products from {path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not open barcode catalog {path}: {e}")
+            _catalog = None
+    return _catalog
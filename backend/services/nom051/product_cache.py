@@ -0,0 +1,414 @@
+"""
+Barcode Product Cache
+=====================
+
+Búsqueda de productos de ``productos_nom051`` por código de barras para el
+escáner, con las respuestas ya renderizadas (sellos NOM-051 y health score
+incluidos) en caché.
+
+Niveles:
+- L1: LRU en proceso con TTL corto (respuesta completa, sin recalcular)
+- Catálogo offline: archivo mapeado en memoria (``barcode_catalog``), si existe
+- L2: Redis compartido entre workers (opcional, vía ``core.cache``)
+- Base de datos: una consulta por código en una ``AsyncSession``
+
+Las escrituras del escáner (``_save_to_local_db``, ``_create_global_product``)
+invalidan el código en ambos niveles y lo excluyen del catálogo offline en
+este proceso. Los demás workers conservan su L1 como máximo
+``local_ttl_seconds``.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Set
+
+from sqlalchemy import text
+
+from .calculator import NOM051Seals, nom051_calculator
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_BY_BARCODE_SQL = text("""
+    SELECT
+        id,
+        codigo_barras,
+        nombre,
+        marca,
+        porcion_gramos,
+        calorias,
+        proteinas,
+        carbohidratos,
+        azucares,
+        grasas_totales,
+        grasas_saturadas,
+        grasas_trans,
+        fibra,
+        sodio,
+        exceso_calorias,
+        exceso_azucares,
+        exceso_grasas_saturadas,
+        exceso_grasas_trans,
+        exceso_sodio,
+        contiene_edulcorantes,
+        contiene_cafeina,
+        imagen_url,
+        ingredientes,
+        categoria,
+        fuente
+    FROM productos_nom051
+    WHERE codigo_barras = :barcode
+    LIMIT 1
+""")
+
+_SEAL_FIELDS = (
+    "exceso_calorias", "exceso_azucares", "exceso_grasas_saturadas",
+    "exceso_grasas_trans", "exceso_sodio", "contiene_edulcorantes", "contiene_cafeina",
+)
+_NUTRIENT_FIELDS = (
+    "calorias", "proteinas", "carbohidratos", "azucares", "grasas_totales",
+    "grasas_saturadas", "grasas_trans", "fibra", "sodio",
+)
+
+
+def render_product(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """Fila de ``productos_nom051`` -> respuesta del escáner con sellos y health score"""
+    seals = NOM051Seals(**{name: bool(row[name]) for name in _SEAL_FIELDS})
+    health_score, health_level, health_color = nom051_calculator.get_health_score(seals)
+
+    product = {
+        "id": row["id"],
+        "codigo_barras": row["codigo_barras"],
+        "nombre": row["nombre"],
+        "marca": row["marca"],
+        "porcion_gramos": float(row["porcion_gramos"]) if row["porcion_gramos"] else 100.0,
+    }
+    for name in _NUTRIENT_FIELDS:
+        product[name] = float(row[name]) if row[name] else 0
+    for name in _SEAL_FIELDS:
+        product[name] = row[name]
+    product.update({
+        "imagen_url": row["imagen_url"],
+        "ingredientes": row["ingredientes"],
+        "categoria": row["categoria"],
+        "fuente": row["fuente"],
+        "health_score": health_score,
+        "health_level": health_level,
+        "health_color": health_color,
+    })
+    return product
+
+
+def _is_liquid_product(categories: str) -> bool:
+    """Determine if product is liquid based on categories"""
+    liquid_keywords = ['bebida', 'drink', 'juice', 'agua', 'water', 'refresco', 'soda']
+    categories_lower = categories.lower()
+    return any(keyword in categories_lower for keyword in liquid_keywords)
+
+
+def _contains_caffeine(ingredients: str) -> bool:
+    """Check if product contains caffeine"""
+    caffeine_keywords = ['cafeína', 'caffeine', 'café', 'coffee', 'té', 'tea', 'guaraná', 'guarana']
+    ingredients_lower = ingredients.lower()
+    return any(keyword in ingredients_lower for keyword in caffeine_keywords)
+
+
+def _map_category(categories: str) -> str:
+    """Map Open Food Facts categories to SMAE categories"""
+    categories_lower = categories.lower()
+
+    if any(word in categories_lower for word in ['bebida', 'drink', 'juice', 'agua', 'refresco']):
+        return 'BEVERAGES'
+    elif any(word in categories_lower for word in ['snack', 'galleta', 'cookie', 'chip']):
+        return 'CEREALS'
+    elif any(word in categories_lower for word in ['dairy', 'leche', 'yogur', 'queso']):
+        return 'DAIRY'
+    elif any(word in categories_lower for word in ['carne', 'meat', 'pollo', 'chicken']):
+        return 'ANIMAL_PRODUCTS'
+    elif any(word in categories_lower for word in ['fruta', 'fruit']):
+        return 'FRUITS'
+    elif any(word in categories_lower for word in ['verdura', 'vegetable']):
+        return 'VEGETABLES'
+    else:
+        return 'OTROS'
+
+
+def render_off_product(barcode: str, off_product) -> Dict[str, Any]:
+    """``ProductInfo`` de Open Food Facts -> respuesta del escáner con sellos y health score"""
+    nutrition = off_product.nutrition
+
+    seals = nom051_calculator.calculate_seals(
+        calorias=nutrition.calories or 0,
+        azucares=nutrition.sugars or 0,
+        grasas_saturadas=nutrition.saturated_fat or 0,
+        grasas_trans=nutrition.trans_fat or 0,
+        sodio=nutrition.sodium or 0,
+        is_liquid=_is_liquid_product(off_product.categories or ""),
+        contiene_edulcorantes=False,  # TODO: detect from ingredients
+        contiene_cafeina=_contains_caffeine(off_product.ingredients_text or "")
+    )
+    health_score, health_level, health_color = nom051_calculator.get_health_score(seals)
+
+    return {
+        "codigo_barras": barcode,
+        "nombre": off_product.product_name,
+        "marca": off_product.brands,
+        "porcion_gramos": 100.0,  # OFF normalizes to 100g
+        "calorias": nutrition.calories or 0,
+        "proteinas": nutrition.proteins or 0,
+        "carbohidratos": nutrition.carbohydrates or 0,
+        "azucares": nutrition.sugars or 0,
+        "grasas_totales": nutrition.fat or 0,
+        "grasas_saturadas": nutrition.saturated_fat or 0,
+        "grasas_trans": nutrition.trans_fat or 0,
+        "fibra": nutrition.fiber or 0,
+        "sodio": nutrition.sodium or 0,
+        **seals.to_dict(),
+        "imagen_url": off_product.image_url,
+        "ingredientes": off_product.ingredients_text,
+        "categoria": _map_category(off_product.categories or ""),
+        "fuente": "open_food_facts",
+        "health_score": health_score,
+        "health_level": health_level,
+        "health_color": health_color
+    }
+
+
+class ProductCache:
+    """
+    Caché de dos niveles de productos por código de barras
+
+    Args:
+        max_entries: Máximo de productos en el LRU local
+        local_ttl_seconds: Vida de un producto en el LRU local
+        redis_ttl_seconds: Vida de un producto en Redis
+        use_redis: Usar Redis como segundo nivel compartido
+        redis_retry_seconds: Pausa antes de reintentar Redis tras un fallo
+    """
+
+    KEY_PREFIX = "scanner_product"
+
+    def __init__(
+        self,
+        max_entries: int = 20000,
+        local_ttl_seconds: int = 300,
+        redis_ttl_seconds: int = 86400,
+        use_redis: bool = True,
+        redis_retry_seconds: int = 60,
+    ):
+        self.max_entries = max_entries
+        self.local_ttl_seconds = local_ttl_seconds
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.use_redis = use_redis
+        self.redis_retry_seconds = redis_retry_seconds
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._barcodes: Dict[int, str] = {}  # product id -> código en L1
+        self._snapshot_bypass: Set[str] = set()  # códigos reescritos después del catálogo
+        self._lock = threading.Lock()
+        self._redis_disabled_until = 0.0
+        self._stats = {
+            "local_hits": 0,
+            "snapshot_hits": 0,
+            "redis_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "evictions": 0,
+            "db_errors": 0,
+            "redis_errors": 0,
+        }
+
+    def key(self, barcode: str) -> str:
+        return f"{self.KEY_PREFIX}:{barcode}"
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def get_local(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Producto del LRU local, o ``None`` (no cuenta como fallo)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(barcode)
+            if entry is None:
+                return None
+            expires_at, product = entry
+            if expires_at <= now:
+                del self._entries[barcode]
+                self._barcodes.pop(product.get("id"), None)
+                return None
+            self._entries.move_to_end(barcode)
+            self._stats["local_hits"] += 1
+            return product
+
+    async def lookup(self, barcode: str, db) -> Optional[Dict[str, Any]]:
+        """
+        Buscar un producto: L1, catálogo offline, Redis y la base de datos
+
+        Los productos del catálogo se copian al L1; los encontrados en la
+        base de datos se guardan en L1 y Redis. Los códigos inexistentes no se cachean: el siguiente paso del
+        escáner (Open Food Facts) los guarda y los invalida.
+        """
+        product = self.get_local(barcode)
+        if product is not None:
+            return product
+
+        product = self._snapshot_get(barcode)
+        if product is not None:
+            self._store_local(barcode, product)
+            self._stats["snapshot_hits"] += 1
+            return product
+
+        product = await self._redis_get(barcode)
+        if product is not None:
+            self._store_local(barcode, product)
+            self._stats["redis_hits"] += 1
+            return product
+
+        try:
+            result = await db.execute(PRODUCT_BY_BARCODE_SQL, {"barcode": barcode})
+            row = result.mappings().first()
+        except Exception as e:
+            self._stats["db_errors"] += 1
+            logger.error(f"Error searching product {barcode} in local DB: {e}")
+            return None
+
+        if row is None:
+            self._stats["misses"] += 1
+            return None
+
+        product = render_product(row)
+        self._stats["db_hits"] += 1
+        self._store_local(barcode, product)
+        await self._redis_set(barcode, product)
+        return product
+
+    # ------------------------------------------------------------------
+    # Invalidación
+    # ------------------------------------------------------------------
+
+    async def invalidate(self, barcode: Optional[str]) -> None:
+        """Descartar un código en ambos niveles (tras escribir el producto)"""
+        if not barcode:
+            return
+        with self._lock:
+            entry = self._entries.pop(barcode, None)
+            if entry is not None:
+                self._barcodes.pop(entry[1].get("id"), None)
+            self._snapshot_bypass.add(barcode)
+        self._stats["invalidations"] += 1
+        if self._redis_available():
+            try:
+                from core.cache import get_cache
+                await get_cache().delete(self.key(barcode))
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def invalidate_product(self, product_id: Optional[int], barcode: Optional[str] = None) -> None:
+        """Descartar un producto por id (productos de IA sin código propio incluidos)"""
+        with self._lock:
+            cached_barcode = self._barcodes.get(product_id)
+        for code in {barcode, cached_barcode} - {None}:
+            await self.invalidate(code)
+
+    def clear(self) -> None:
+        """Vaciar el nivel local"""
+        with self._lock:
+            self._entries.clear()
+            self._barcodes.clear()
+
+    def _store_local(self, barcode: str, product: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[barcode] = (time.monotonic() + self.local_ttl_seconds, product)
+            self._entries.move_to_end(barcode)
+            if product.get("id") is not None:
+                self._barcodes[product["id"]] = barcode
+            while len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._barcodes.pop(evicted.get("id"), None)
+                self._stats["evictions"] += 1
+
+    # ------------------------------------------------------------------
+    # Catálogo offline
+    # ------------------------------------------------------------------
+
+    def _snapshot_get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        if barcode in self._snapshot_bypass:
+            return None
+        from .barcode_catalog import get_barcode_catalog
+
+        catalog = get_barcode_catalog()
+        return catalog.get(barcode) if catalog is not None else None
+
+    # ------------------------------------------------------------------
+    # Nivel Redis
+    # ------------------------------------------------------------------
+
+    def _redis_available(self) -> bool:
+        return self.use_redis and time.monotonic() >= self._redis_disabled_until
+
+    def _redis_failed(self, error: Exception) -> None:
+        self._stats["redis_errors"] += 1
+        self._redis_disabled_until = time.monotonic() + self.redis_retry_seconds
+        logger.warning(f"Product cache Redis tier unavailable, retrying in {self.redis_retry_seconds}s: {error}")
+
+    async def _redis_get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        if not self._redis_available():
+            return None
+        try:
+            from core.cache import get_cache
+            return await get_cache().get(self.key(barcode))
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+    async def _redis_set(self, barcode: str, product: Dict[str, Any]) -> None:
+        if not self._redis_available():
+            return
+        try:
+            from core.cache import get_cache
+            await get_cache().set(self.key(barcode), product, expire=self.redis_ttl_seconds)
+        except Exception as e:
+            self._redis_failed(e)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso de la caché"""
+        stats = dict(self._stats)
+        cached = stats["local_hits"] + stats["snapshot_hits"] + stats["redis_hits"]
+        lookups = cached + stats["db_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["local_hit_rate"] = round(stats["local_hits"] / lookups, 4) if lookups else 0.0
+        stats["hit_rate"] = round(cached / lookups, 4) if lookups else 0.0
+        stats["entries"] = len(self._entries)
+        stats["max_entries"] = self.max_entries
+        stats["redis_enabled"] = self._redis_available()
+        from .barcode_catalog import get_barcode_catalog
+
+        catalog = get_barcode_catalog()
+        stats["snapshot_products"] = len(catalog) if catalog is not None else 0
+        return stats
+
+
+_product_cache: Optional[ProductCache] = None
+
+
+def get_product_cache() -> ProductCache:
+    """Obtener la instancia global de la caché de productos"""
+    global _product_cache
+    if _product_cache is None:
+        from core.config import get_settings
+
+        settings = get_settings()
+        _product_cache = ProductCache(
+            max_entries=settings.product_cache_max_entries,
+            local_ttl_seconds=settings.product_cache_local_ttl_seconds,
+            redis_ttl_seconds=settings.product_cache_redis_ttl_seconds,
+            use_redis=settings.product_cache_redis_enabled,
+        )
+    return _product_cache
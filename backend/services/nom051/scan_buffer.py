@@ -0,0 +1,309 @@
+"""
+Scan Event Buffer
+=================
+
+Registro diferido de escaneos del escáner NOM-051.
+
+Cada escaneo generaba hasta dos escrituras antes de responder: la fila de
+analítica en ``escaneos_historia`` y, para productos globales, la fila del
+historial personal en ``user_scan_history`` más el ``scan_count + 1`` del
+producto (función ``register_product_scan``). Ahora el endpoint solo encola
+el evento; una tarea en segundo plano los escribe en lote cada
+``flush_interval`` segundos o al juntar ``batch_size`` eventos:
+
+- INSERT de varias filas por tabla (``executemany`` de SQLAlchemy, que en
+  PostgreSQL se envía como ``VALUES (...), (...)``)
+- un UPDATE de ``scan_count`` por producto con el total acumulado del lote
+- el resumen por usuario de ``scan_user_rollups`` (ver ``scan_rollup``)
+
+El apagado de la aplicación (lifespan en ``main.py``) escribe lo pendiente.
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, Integer, MetaData, String, Table, bindparam, insert, update
+)
+
+from .scan_rollup import apply_scan_events, insert_ignore
+
+logger = logging.getLogger(__name__)
+
+# Tablas creadas por las migraciones 004/005 (solo las columnas que se escriben)
+_metadata = MetaData()
+
+scan_history_table = Table(
+    "escaneos_historia", _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("usuario_id", Integer),
+    Column("producto_id", Integer),
+    Column("codigo_barras", String(20), nullable=False),
+    Column("encontrado", Boolean, nullable=False),
+    Column("fuente", String(50)),
+    Column("tiempo_respuesta_ms", Integer),
+    Column("fecha_escaneo", DateTime),
+)
+
+user_scan_history_table = Table(
+    "user_scan_history", _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("product_id", Integer, nullable=False),
+    Column("scan_type", String(20), nullable=False),
+    Column("scanned_at", DateTime(timezone=True)),
+    Column("device_info", JSON),
+    Column("location_context", String(100)),
+)
+
+products_table = Table(
+    "productos_nom051", _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("scan_count", Integer),
+)
+
+def _rows(table: Table, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Solo las columnas de ``table`` (los eventos llevan además los sellos)"""
+    columns = [column.name for column in table.columns if column.name != "id"]
+    return [{name: event.get(name) for name in columns} for event in events]
+
+
+_SCAN_COUNT_UPDATE = (
+    update(products_table)
+    .where(products_table.c.id == bindparam("product_id"))
+    .values(scan_count=products_table.c.scan_count + bindparam("amount"))
+)
+
+
+class ScanEventBuffer:
+    """
+    Cola de escaneos con escritura por lotes
+
+    Args:
+        batch_size: Eventos pendientes que disparan un flush inmediato
+        flush_interval: Segundos máximos que un evento espera en la cola
+        max_pending: Límite de eventos en memoria si la base de datos falla
+            (se descartan los más antiguos)
+    """
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 0.5, max_pending: int = 50000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._history: Deque[Dict[str, Any]] = deque()
+        self._user_scans: Deque[Dict[str, Any]] = deque()
+        self._scan_counts: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stats = {
+            "events": 0, "flushes": 0, "rows_flushed": 0,
+            "flush_errors": 0, "dropped": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._history) + len(self._user_scans)
+
+    # ------------------------------------------------------------------
+    # Encolado (ruta crítica del escaneo)
+    # ------------------------------------------------------------------
+
+    def record_scan(
+        self,
+        user_id: Optional[int],
+        barcode: str,
+        product_id: Optional[int],
+        found: bool,
+        source: Optional[str],
+        response_time_ms: int,
+        seals: Optional[Dict[str, bool]] = None
+    ) -> None:
+        """Encolar una fila de ``escaneos_historia`` (``seals`` del producto, para el resumen por usuario)"""
+        self._history.append({
+            "usuario_id": user_id,
+            "producto_id": product_id,
+            "codigo_barras": barcode,
+            "encontrado": found,
+            "fuente": source,
+            "tiempo_respuesta_ms": response_time_ms,
+            "fecha_escaneo": datetime.utcnow(),
+            "seals": seals,
+        })
+        self._added()
+
+    def register_user_scan(
+        self,
+        user_id: int,
+        product_id: int,
+        scan_type: str,
+        device_info: Optional[Dict[str, Any]] = None,
+        location_context: Optional[str] = None,
+        seals: Optional[Dict[str, bool]] = None
+    ) -> None:
+        """Encolar una fila de ``user_scan_history`` y el ``scan_count + 1`` del producto"""
+        self._user_scans.append({
+            "user_id": user_id,
+            "product_id": product_id,
+            "scan_type": scan_type,
+            "scanned_at": datetime.now(timezone.utc),
+            "device_info": device_info,
+            "location_context": location_context,
+            "seals": seals,
+        })
+        self._scan_counts[product_id] = self._scan_counts.get(product_id, 0) + 1
+        self._added()
+
+    def _added(self) -> None:
+        self._stats["events"] += 1
+        self._trim()
+        self.start()
+        if self._wakeup is not None and len(self) >= self.batch_size:
+            self._wakeup.set()
+
+    def _trim(self) -> None:
+        while len(self) > self.max_pending:
+            # Descartar lo más antiguo; los contadores se conservan
+            queue = self._history if len(self._history) >= len(self._user_scans) else self._user_scans
+            queue.popleft()
+            self._stats["dropped"] += 1
+
+    # ------------------------------------------------------------------
+    # Escritura a la base de datos
+    # ------------------------------------------------------------------
+
+    async def flush(self) -> int:
+        """Escribir todos los eventos pendientes; devuelve las filas insertadas"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            history, self._history = list(self._history), deque()
+            user_scans, self._user_scans = list(self._user_scans), deque()
+            scan_counts, self._scan_counts = self._scan_counts, {}
+            if not history and not user_scans and not scan_counts:
+                return 0
+
+            try:
+                await self._execute(history, user_scans, scan_counts)
+            except Exception as e:
+                self._stats["flush_errors"] += 1
+                self._requeue(history, user_scans, scan_counts)
+                logger.error(f"Failed to flush {len(history) + len(user_scans)} scan events: {e}")
+                return 0
+            except BaseException:
+                # Cancelado a mitad de la escritura: la transacción no se confirma
+                self._requeue(history, user_scans, scan_counts)
+                raise
+
+            rows = len(history) + len(user_scans)
+            self._stats["flushes"] += 1
+            self._stats["rows_flushed"] += rows
+            return rows
+
+    def _requeue(
+        self,
+        history: List[Dict[str, Any]],
+        user_scans: List[Dict[str, Any]],
+        scan_counts: Dict[int, int]
+    ) -> None:
+        """Devolver un lote no escrito a la cola para el siguiente intento"""
+        self._history.extendleft(reversed(history))
+        self._user_scans.extendleft(reversed(user_scans))
+        for product_id, amount in scan_counts.items():
+            self._scan_counts[product_id] = self._scan_counts.get(product_id, 0) + amount
+        self._trim()
+
+    async def _execute(
+        self,
+        history: List[Dict[str, Any]],
+        user_scans: List[Dict[str, Any]],
+        scan_counts: Dict[int, int]
+    ) -> None:
+        import core.database as database
+
+        if database.async_engine is None:
+            database.init_database()
+        async with database.async_engine.begin() as conn:
+            async def insert_batch() -> None:
+                if history:
+                    await conn.execute(insert(scan_history_table), _rows(scan_history_table, history))
+                if user_scans:
+                    await conn.execute(
+                        insert_ignore(user_scan_history_table, conn.dialect.name),
+                        _rows(user_scan_history_table, user_scans)
+                    )
+
+            await apply_scan_events(conn, history, user_scans, before_insert=insert_batch)
+            if scan_counts:
+                # Orden por id: workers concurrentes bloquean filas en el mismo orden
+                await conn.execute(_SCAN_COUNT_UPDATE, [
+                    {"product_id": product_id, "amount": amount}
+                    for product_id, amount in sorted(scan_counts.items())
+                ])
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Iniciar la tarea de flush periódico (idempotente)"""
+        if self._task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def stop(self) -> None:
+        """
+        Detener el flush periódico y escribir lo pendiente
+
+        La tarea no se cancela: se le avisa y se espera a que termine el
+        flush en curso, para no perder el lote que está escribiendo.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._wakeup = None
+            self._stopping = False
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        stats["pending"] = len(self)
+        stats["pending_products"] = len(self._scan_counts)
+        return stats
+
+
+_scan_buffer: Optional[ScanEventBuffer] = None
+
+
+def get_scan_buffer() -> ScanEventBuffer:
+    """Obtener la cola global de escaneos"""
+    global _scan_buffer
+    if _scan_buffer is None:
+        from core.config import get_settings
+
+        settings = get_settings()
+        _scan_buffer = ScanEventBuffer(
+            batch_size=settings.scan_buffer_batch_size,
+            flush_interval=settings.scan_buffer_flush_ms / 1000,
+            max_pending=settings.scan_buffer_max_pending,
+        )
+    return _scan_buffer
@@ -14,12 +14,17 @@ Componentes:
 - food_search: Búsqueda de alimentos SMAE
 - user_context: Recupera historial y datos del usuario
 - patient_context: Recupera datos de pacientes (nutriólogos)
+- vector_index: Índice vectorial local para búsqueda semántica
 """
 
 from .context_builder import RAGContextBuilder
 from .search_service import RAGSearchService
+from .vector_index import HashingEmbedder, VectorIndex, get_vector_index
 
 __all__ = [
     'RAGContextBuilder',
     'RAGSearchService',
+    'HashingEmbedder',
+    'VectorIndex',
+    'get_vector_index',
 ]
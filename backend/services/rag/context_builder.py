@@ -6,10 +6,12 @@ Construye contexto para el prompt de IA.
 Recopila información relevante del usuario para respuestas personalizadas.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from services.nom051.scan_rollup import get_user_scan_rollup, rag_scan_statistics
+
 from .search_service import RAGSearchService
 
 
@@ -67,7 +69,7 @@ class RAGContextBuilder:
             ]
 
             context["scan_history"] = scan_history
-            context["scan_statistics"] = self._calculate_scan_statistics(scan_history)
+            context["scan_statistics"] = await self._get_scan_statistics(user_id)
 
         # Alimentos favoritos
         if include_favorites:
@@ -99,6 +101,7 @@ class RAGContextBuilder:
             search_products=True,
             search_foods=True,
             limit_per_source=10,
+            search_semantic=True,
         )
 
         return {
@@ -207,80 +210,27 @@ class RAGContextBuilder:
         return {
             "patient": patient_data,
             "scan_history": scan_history,
-            "scan_statistics": self._calculate_scan_statistics(scan_history),
+            "scan_statistics": await self._get_scan_statistics(patient_id),
             "favorite_foods": favorite_foods,
             "meal_plans": meal_plans,
             "timestamp": datetime.utcnow().isoformat(),
         }
 
-    def _calculate_scan_statistics(
-        self,
-        scan_history: List[Dict[str, Any]],
-    ) -> Dict[str, Any]:
+    async def _get_scan_statistics(self, user_id: int) -> Dict[str, Any]:
         """
-        Calcular estadísticas del historial de escaneos
+        Estadísticas de escaneo del usuario
+
+        Se leen del resumen por usuario (``scan_user_rollups``), que cubre
+        todo su historial en vez de los últimos 100 escaneos.
 
         Args:
-            scan_history: Lista de escaneos
+            user_id: ID del usuario
 
         Returns:
             Diccionario con estadísticas
         """
-        if not scan_history:
-            return {
-                "total_scans": 0,
-                "avg_health_score": 0,
-                "products_with_seals": 0,
-                "most_common_seals": [],
-            }
-
-        total_scans = len(scan_history)
-        total_health_score = 0
-        products_with_seals = 0
-        seal_counts = {
-            "exceso_calorias": 0,
-            "exceso_azucares": 0,
-            "exceso_grasas_saturadas": 0,
-            "exceso_sodio": 0,
-        }
-
-        for scan in scan_history:
-            # Health score
-            if scan.get("health_score"):
-                total_health_score += scan["health_score"]
-
-            # Contar sellos
-            has_seals = False
-            for seal in seal_counts.keys():
-                if scan.get(seal):
-                    seal_counts[seal] += 1
-                    has_seals = True
-
-            if has_seals:
-                products_with_seals += 1
-
-        avg_health_score = total_health_score / total_scans if total_scans > 0 else 0
-
-        # Sellos más comunes
-        most_common_seals = sorted(
-            seal_counts.items(),
-            key=lambda x: x[1],
-            reverse=True,
-        )[:3]
-
-        return {
-            "total_scans": total_scans,
-            "avg_health_score": round(avg_health_score, 2),
-            "products_with_seals": products_with_seals,
-            "products_with_seals_percent": round(
-                (products_with_seals / total_scans * 100) if total_scans > 0 else 0,
-                2
-            ),
-            "most_common_seals": [
-                {"seal": seal, "count": count}
-                for seal, count in most_common_seals
-            ],
-        }
+        rollup = await get_user_scan_rollup(user_id)
+        return rag_scan_statistics(rollup)
 
     def format_context_for_prompt(
         self,
@@ -358,3 +308,39 @@ class RAGContextBuilder:
             lines.append("")
 
         return "\n".join(lines)
+
+    def format_search_results_for_prompt(
+        self,
+        results: Dict[str, Any],
+        max_items: int = 8,
+    ) -> str:
+        """
+        Formatear resultados semánticos para incluir en el prompt de IA
+
+        Args:
+            results: Resultados de ``search_combined``
+            max_items: Máximo de documentos a incluir
+
+        Returns:
+            String formateado para el prompt (vacío si no hay resultados)
+        """
+        semantic = results.get("semantic") or []
+        if not semantic:
+            return ""
+
+        labels = {"food": "Alimento SMAE", "product": "Producto", "plant": "Planta medicinal"}
+        lines = ["\n=== INFORMACIÓN RELEVANTE A LA CONSULTA ==="]
+        for i, doc in enumerate(semantic[:max_items]):
+            name = doc.get("nombre") or doc.get("scientific_name") or doc["doc_id"]
+            details = []
+            if doc["kind"] == "food":
+                details.append(f"grupo {doc.get('grupo_smae')}, {doc.get('calorias')} kcal")
+            elif doc["kind"] == "product" and doc.get("marca"):
+                details.append(doc["marca"])
+            elif doc["kind"] == "plant" and doc.get("popular_names"):
+                details.append(", ".join(doc["popular_names"][:3]))
+            suffix = f" ({'; '.join(details)})" if details else ""
+            lines.append(f"{i+1}. [{labels.get(doc['kind'], doc['kind'])}] {name}{suffix}")
+        lines.append("")
+
+        return "\n".join(lines)
@@ -13,6 +13,7 @@ from sqlalchemy.orm import selectinload
 
 from domain.foods.nom051_models import ProductoNOM051, FoodSMAE
 from domain.auth.models import AuthUser
+from .vector_index import VectorIndex, get_vector_index
 
 
 class RAGSearchService:
@@ -26,8 +27,9 @@ class RAGSearchService:
     - Datos de pacientes (para nutriólogos)
     """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, vector_index: Optional[VectorIndex] = None):
         self.session = session
+        self.vector_index = vector_index or get_vector_index()
 
     async def search_products(
         self,
@@ -133,6 +135,44 @@ class RAGSearchService:
 
         return [self._food_to_dict(f) for f in foods]
 
+    async def semantic_search(
+        self,
+        query: str,
+        user_id: Optional[int] = None,
+        limit: int = 10,
+        kinds: Optional[List[str]] = None,
+        alpha: float = 0.75,
+    ) -> List[Dict[str, Any]]:
+        """
+        Búsqueda semántica (vectorial + léxica) en el índice local
+
+        Cubre alimentos SMAE, productos NOM-051 y plantas medicinales.
+        Respeta la visibilidad de productos privados igual que
+        ``search_products``.
+
+        Args:
+            query: Texto de búsqueda
+            user_id: ID del usuario (para productos privados)
+            limit: Número máximo de resultados
+            kinds: Tipos de documento (food, product, plant)
+            alpha: Peso de la similitud vectorial en la puntuación híbrida
+
+        Returns:
+            Lista de documentos con ``score``
+        """
+        def visible(doc) -> bool:
+            if doc.kind != "product" or doc.payload.get("is_global", True):
+                return True
+            return user_id is not None and doc.payload.get("created_by_user_id") == user_id
+
+        return self.vector_index.search(
+            query,
+            k=limit,
+            kinds=kinds,
+            alpha=alpha,
+            candidate_filter=visible,
+        )
+
     async def get_user_scan_history(
         self,
         user_id: int,
@@ -228,6 +268,7 @@ class RAGSearchService:
         search_products: bool = True,
         search_foods: bool = True,
         limit_per_source: int = 5,
+        search_semantic: bool = False,
     ) -> Dict[str, List[Dict[str, Any]]]:
         """
         Búsqueda combinada en productos y alimentos
@@ -238,6 +279,7 @@ class RAGSearchService:
             search_products: Buscar en productos
             search_foods: Buscar en alimentos
             limit_per_source: Límite por fuente de datos
+            search_semantic: Incluir resultados del índice vectorial
 
         Returns:
             Diccionario con resultados de ambas fuentes
@@ -247,6 +289,13 @@ class RAGSearchService:
             "foods": [],
         }
 
+        if search_semantic:
+            results["semantic"] = await self.semantic_search(
+                query=query,
+                user_id=user_id,
+                limit=limit_per_source * 2,
+            )
+
         if search_products:
             results["products"] = await self.search_products(
                 query=query,
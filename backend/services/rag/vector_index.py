@@ -0,0 +1,603 @@
+"""
+RAG Vector Index
+================
+
+Índice vectorial local (IVF sobre NumPy) para búsqueda semántica en RAG.
+
+Indexa alimentos SMAE, productos NOM-051 y plantas medicinales con una
+función de embeddings local e intercambiable. El índice se persiste en disco
+como arreglos ``.npy`` que se abren con ``mmap_mode="r"``, de modo que varios
+workers comparten las mismas páginas vía el page cache del sistema operativo.
+
+Características:
+- IVF (inverted file) con k-means como cuantizador grueso
+- Inserciones incrementales (sin reentrenar) y reentrenamiento opcional
+- Puntuación híbrida: similitud coseno + coincidencia léxica
+- Funciona 100% offline
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Una función de embeddings recibe una lista de textos y regresa una matriz
+# (n, dim) float32. Cualquier modelo local (p. ej. sentence-transformers) puede
+# envolverse con esta firma.
+EmbeddingFunction = Callable[[Sequence[str]], np.ndarray]
+
+_TOKEN_RE = re.compile(r"[a-z0-9ñ]+")
+
+# Palabras vacías frecuentes en consultas en español
+SPANISH_STOPWORDS = frozenset({
+    "a", "al", "algo", "con", "de", "del", "el", "en", "es", "la", "las", "lo",
+    "los", "me", "mi", "para", "por", "que", "se", "sin", "su", "un", "una",
+    "unos", "unas", "y", "o", "como", "cual", "cuales", "cuanto", "cuantos",
+    "cuanta", "cuantas", "tiene", "tienen", "hay", "mas", "muy",
+})
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas y sin acentos (conserva la ñ)."""
+    text = (text or "").lower().replace("ñ", "\x00")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.replace("\x00", "ñ")
+
+
+def tokenize(text: str, drop_stopwords: bool = True) -> List[str]:
+    """Tokenizar texto normalizado, opcionalmente sin palabras vacías."""
+    tokens = _TOKEN_RE.findall(normalize_text(text))
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in SPANISH_STOPWORDS]
+    return tokens
+
+
+class HashingEmbedder:
+    """
+    Embeddings locales por hashing de palabras y trigramas de caracteres
+
+    No requiere modelo ni red. Los trigramas hacen que variantes morfológicas
+    ("azúcar", "azucares", "azucarado") queden cerca en el espacio vectorial.
+    Se usa ``crc32`` en lugar de ``hash()`` para que los vectores sean
+    estables entre procesos.
+    """
+
+    name = "hashing-v1"
+
+    def __init__(self, dim: int = 256, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+    def _features(self, text: str) -> Iterable[str]:
+        for token in tokenize(text):
+            yield "w:" + token
+            padded = f"<{token}>"
+            for i in range(max(1, len(padded) - self.ngram + 1)):
+                yield padded[i:i + self.ngram]
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                weight = 2.0 if feature.startswith("w:") else 1.0
+                matrix[row, h % self.dim] += sign * weight
+        return _l2_normalize(matrix)
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+@dataclass
+class IndexedDocument:
+    """Documento indexable para RAG"""
+    doc_id: str  # "<kind>:<id>", p. ej. "food:12"
+    kind: str  # food | product | plant
+    text: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+# ============================================================================
+# Constructores de documentos por modelo
+# ============================================================================
+
+def food_document(food) -> IndexedDocument:
+    """Documento a partir de un ``FoodSMAE``"""
+    parts = [food.nombre, food.nombre_comun, food.grupo_smae, food.subgrupo,
+             food.descripcion, food.preparacion]
+    return IndexedDocument(
+        doc_id=f"food:{food.id}",
+        kind="food",
+        text=" ".join(p for p in parts if p),
+        payload={
+            "id": food.id,
+            "nombre": food.nombre,
+            "grupo_smae": food.grupo_smae,
+            "calorias": food.calorias,
+            "proteinas": food.proteinas,
+            "carbohidratos": food.carbohidratos,
+            "grasas": food.grasas,
+        },
+    )
+
+
+def product_document(product) -> IndexedDocument:
+    """Documento a partir de un ``ProductoNOM051``"""
+    seals = [
+        label for flag, label in (
+            (product.exceso_calorias, "exceso calorias"),
+            (product.exceso_azucares, "exceso azucares"),
+            (product.exceso_grasas_saturadas, "exceso grasas saturadas"),
+            (product.exceso_grasas_trans, "exceso grasas trans"),
+            (product.exceso_sodio, "exceso sodio"),
+        ) if flag
+    ]
+    if not seals:
+        seals.append("sin sellos")
+    parts = [product.nombre, product.marca, product.categoria, product.ingredientes, *seals]
+    return IndexedDocument(
+        doc_id=f"product:{product.id}",
+        kind="product",
+        text=" ".join(p for p in parts if p),
+        payload={
+            "id": product.id,
+            "codigo_barras": product.codigo_barras,
+            "nombre": product.nombre,
+            "marca": product.marca,
+            "is_global": product.is_global,
+            "created_by_user_id": product.created_by_user_id,
+        },
+    )
+
+
+def plant_document(plant) -> IndexedDocument:
+    """Documento a partir de una ``MedicinalPlant``"""
+    parts: List[str] = [plant.scientific_name, plant.botanical_family or ""]
+    parts.extend(plant.popular_names or [])
+    parts.extend(plant.traditional_uses or [])
+    parts.extend(plant.proven_effects or [])
+    parts.extend(plant.pharmacological_actions or [])
+    category = plant.primary_category
+    parts.append(category.value if hasattr(category, "value") else str(category))
+    return IndexedDocument(
+        doc_id=f"plant:{plant.id}",
+        kind="plant",
+        text=" ".join(p for p in parts if p),
+        payload={
+            "id": plant.id,
+            "scientific_name": plant.scientific_name,
+            "popular_names": plant.popular_names,
+        },
+    )
+
+
+# ============================================================================
+# Índice IVF
+# ============================================================================
+
+class VectorIndex:
+    """
+    Índice vectorial IVF con persistencia en archivos mapeados en memoria
+
+    Los vectores se guardan normalizados (L2), por lo que el producto punto es
+    la similitud coseno. Mientras el índice tenga menos de ``min_train_size``
+    documentos la búsqueda es exacta (fuerza bruta); a partir de ahí se
+    entrena el cuantizador y se consultan solo ``n_probe`` listas.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    CENTROIDS_FILE = "centroids.npy"
+    ASSIGNMENTS_FILE = "assignments.npy"
+    META_FILE = "meta.json"
+
+    def __init__(
+        self,
+        embedder: Optional[EmbeddingFunction] = None,
+        n_lists: int = 64,
+        n_probe: int = 8,
+        min_train_size: int = 2048,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+
+        self._base: Optional[np.ndarray] = None  # posiblemente np.memmap
+        self._tail: List[np.ndarray] = []
+        self._matrix_cache: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: List[int] = []
+        self._lists: Dict[int, np.ndarray] = {}
+        self._pending: Dict[int, List[int]] = {}
+
+        self._docs: List[IndexedDocument] = []
+        self._positions: Dict[str, int] = {}
+        self._deleted: set = set()
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Propiedades
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._docs) - len(self._deleted)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _matrix(self) -> np.ndarray:
+        if self._matrix_cache is not None:
+            return self._matrix_cache
+        blocks = ([self._base] if self._base is not None else []) + self._tail
+        if not blocks:
+            dim = getattr(self.embedder, "dim", 0)
+            return np.zeros((0, dim), dtype=np.float32)
+        if len(blocks) == 1:
+            self._matrix_cache = blocks[0]
+        else:
+            self._matrix_cache = np.vstack(blocks)
+            self._base, self._tail = self._matrix_cache, []
+        return self._matrix_cache
+
+    # ------------------------------------------------------------------
+    # Inserción
+    # ------------------------------------------------------------------
+
+    def add(self, documents: Sequence[IndexedDocument]) -> int:
+        """
+        Agregar (o reemplazar) documentos de forma incremental
+
+        Los documentos nuevos se asignan a la lista más cercana sin
+        reentrenar el cuantizador. Si el índice supera ``min_train_size`` y
+        aún no está entrenado, se entrena automáticamente.
+
+        Returns:
+            Número de documentos insertados
+        """
+        if not documents:
+            return 0
+        vectors = _l2_normalize(np.asarray(self.embedder([d.text for d in documents]), dtype=np.float32))
+
+        with self._lock:
+            start = len(self._docs)
+            for offset, doc in enumerate(documents):
+                previous = self._positions.get(doc.doc_id)
+                if previous is not None:
+                    self._deleted.add(previous)
+                self._positions[doc.doc_id] = start + offset
+                self._docs.append(doc)
+
+            self._tail.append(vectors)
+            self._matrix_cache = None
+
+            if self.is_trained:
+                labels = self._assign(vectors)
+                for offset, label in enumerate(labels.tolist()):
+                    self._assignments.append(label)
+                    self._pending.setdefault(label, []).append(start + offset)
+            elif len(self) >= self.min_train_size:
+                self.train()
+
+        return len(documents)
+
+    def remove(self, doc_id: str) -> bool:
+        """Marcar un documento como eliminado"""
+        with self._lock:
+            position = self._positions.pop(doc_id, None)
+            if position is None:
+                return False
+            self._deleted.add(position)
+            return True
+
+    # ------------------------------------------------------------------
+    # Entrenamiento (k-means)
+    # ------------------------------------------------------------------
+
+    def train(self, iterations: int = 10, sample_size: int = 50_000, seed: int = 42) -> None:
+        """Entrenar el cuantizador grueso con k-means esférico"""
+        with self._lock:
+            matrix = self._matrix()
+            n = matrix.shape[0]
+            if n == 0:
+                return
+            n_lists = max(1, min(self.n_lists, n // 8 or 1))
+            rng = np.random.default_rng(seed)
+            sample_idx = rng.choice(n, size=min(n, sample_size), replace=False)
+            sample = np.asarray(matrix[np.sort(sample_idx)])
+
+            centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                empty = ~sums.any(axis=1)
+                sums[empty] = centroids[empty]
+                centroids = _l2_normalize(sums)
+
+            self._centroids = centroids
+            self._rebuild_lists(self._assign(matrix))
+            logger.info("RAG vector index trained: %d docs, %d lists", n, n_lists)
+
+    def _assign(self, vectors: np.ndarray, batch: int = 8192) -> np.ndarray:
+        labels = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], batch):
+            chunk = np.asarray(vectors[start:start + batch])
+            labels[start:start + batch] = np.argmax(chunk @ self._centroids.T, axis=1)
+        return labels
+
+    def _rebuild_lists(self, assignments: np.ndarray) -> None:
+        self._assignments = assignments.tolist()
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(self._centroids.shape[0] + 1))
+        self._lists = {
+            label: order[bounds[label]:bounds[label + 1]]
+            for label in range(self._centroids.shape[0])
+        }
+        self._pending = {}
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _candidates(self, query: np.ndarray, n_probe: int) -> Optional[np.ndarray]:
+        if not self.is_trained:
+            return None
+        probes = np.argsort(-(self._centroids @ query))[:n_probe]
+        parts = [self._lists.get(int(p), np.empty(0, dtype=np.int64)) for p in probes]
+        parts.extend(np.asarray(self._pending.get(int(p), []), dtype=np.int64) for p in probes)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        kinds: Optional[Iterable[str]] = None,
+        alpha: float = 0.75,
+        n_probe: Optional[int] = None,
+        candidate_filter: Optional[Callable[[IndexedDocument], bool]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Búsqueda híbrida (vectorial + léxica)
+
+        Args:
+            query: Texto de búsqueda
+            k: Número de resultados
+            kinds: Restringir a tipos de documento (food, product, plant)
+            alpha: Peso de la similitud vectorial (1.0 = solo vectorial)
+            n_probe: Listas IVF a consultar (por defecto ``self.n_probe``)
+            candidate_filter: Filtro adicional por documento (p. ej. privacidad)
+
+        Returns:
+            Lista de resultados ordenados por ``score`` descendente
+        """
+        if len(self) == 0:
+            return []
+        kinds = set(kinds) if kinds else None
+        query_vec = _l2_normalize(np.asarray(self.embedder([query]), dtype=np.float32))[0]
+        query_tokens = set(tokenize(query))
+
+        with self._lock:
+            matrix = self._matrix()
+            candidates = self._candidates(query_vec, n_probe or self.n_probe)
+            if candidates is None:
+                scores = matrix @ query_vec
+                candidates = np.arange(matrix.shape[0])
+            else:
+                scores = np.asarray(matrix[candidates]) @ query_vec
+
+            # Pre-seleccionar por similitud vectorial antes del re-ranking léxico
+            pool = min(len(candidates), max(k * 8, 64))
+            if pool < len(candidates):
+                top = np.argpartition(-scores, pool - 1)[:pool]
+            else:
+                top = np.arange(len(candidates))
+
+            results = []
+            for i in top.tolist():
+                position = int(candidates[i])
+                if position in self._deleted:
+                    continue
+                doc = self._docs[position]
+                if kinds and doc.kind not in kinds:
+                    continue
+                if candidate_filter and not candidate_filter(doc):
+                    continue
+                vector_score = float(scores[i])
+                lexical_score = _lexical_score(query_tokens, doc.text) if alpha < 1.0 else 0.0
+                results.append({
+                    "doc_id": doc.doc_id,
+                    "kind": doc.kind,
+                    "score": alpha * vector_score + (1.0 - alpha) * lexical_score,
+                    "vector_score": vector_score,
+                    "lexical_score": lexical_score,
+                    **doc.payload,
+                })
+
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:k]
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Guardar el índice (compactando documentos eliminados)"""
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            keep = [i for i in range(len(self._docs)) if i not in self._deleted]
+            matrix = np.asarray(self._matrix())[keep] if keep else self._matrix()[:0]
+            docs = [self._docs[i] for i in keep]
+
+            _atomic_save(directory / self.VECTORS_FILE, matrix)
+            if self.is_trained:
+                _atomic_save(directory / self.CENTROIDS_FILE, self._centroids)
+                assignments = np.asarray(self._assignments, dtype=np.int32)[keep]
+                _atomic_save(directory / self.ASSIGNMENTS_FILE, assignments)
+            meta = {
+                "embedder": getattr(self.embedder, "name", type(self.embedder).__name__),
+                "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+                "n_lists": self.n_lists,
+                "n_probe": self.n_probe,
+                "documents": [
+                    {"doc_id": d.doc_id, "kind": d.kind, "text": d.text, "payload": d.payload}
+                    for d in docs
+                ],
+            }
+            tmp = directory / (self.META_FILE + ".tmp")
+            tmp.write_text(json.dumps(meta, ensure_ascii=False, default=str), encoding="utf-8")
+            os.replace(tmp, directory / self.META_FILE)
+
+    @classmethod
+    def load(cls, path: str, embedder: Optional[EmbeddingFunction] = None, **kwargs) -> "VectorIndex":
+        """Cargar un índice guardado; los vectores quedan mapeados en memoria"""
+        directory = Path(path)
+        meta = json.loads((directory / cls.META_FILE).read_text(encoding="utf-8"))
+        index = cls(
+            embedder=embedder,
+            n_lists=kwargs.pop("n_lists", meta.get("n_lists", 64)),
+            n_probe=kwargs.pop("n_probe", meta.get("n_probe", 8)),
+            **kwargs,
+        )
+        expected = getattr(index.embedder, "name", type(index.embedder).__name__)
+        if meta.get("embedder") != expected:
+            raise ValueError(
+                f"Index built with embedder '{meta.get('embedder')}', got '{expected}'"
+            )
+
+        index._base = np.load(directory / cls.VECTORS_FILE, mmap_mode="r")
+        index._docs = [IndexedDocument(**d) for d in meta["documents"]]
+        index._positions = {d.doc_id: i for i, d in enumerate(index._docs)}
+
+        centroids_path = directory / cls.CENTROIDS_FILE
+        if centroids_path.exists():
+            index._centroids = np.load(centroids_path)
+            index._rebuild_lists(np.load(directory / cls.ASSIGNMENTS_FILE))
+        return index
+
+
+def _atomic_save(path: Path, array: np.ndarray) -> None:
+    tmp = path.with_suffix(".tmp.npy")
+    np.save(tmp, np.ascontiguousarray(array))
+    os.replace(tmp, path)
+
+
+def _lexical_score(query_tokens: set, text: str) -> float:
+    """Fracción de tokens de la consulta presentes (o como prefijo) en el documento"""
+    if not query_tokens:
+        return 0.0
+    doc_tokens = set(tokenize(text))
+    hits = 0
+    for token in query_tokens:
+        if token in doc_tokens or any(t.startswith(token[:5]) for t in doc_tokens if len(token) >= 5):
+            hits += 1
+    return hits / len(query_tokens)
+
+
+# ============================================================================
+# Construcción desde la base de datos y singleton
+# ============================================================================
+
+async def build_index_from_db(session, index: Optional[VectorIndex] = None) -> VectorIndex:
+    """
+    Construir (o completar) el índice con alimentos, productos y plantas
+
+    Args:
+        session: AsyncSession
+        index: Índice existente al que agregar documentos (opcional)
+    """
+    from sqlalchemy import select
+    from domain.foods.nom051_models import FoodSMAE, ProductoNOM051
+    from domain.medicinal_plants.models import MedicinalPlant
+
+    index = index or VectorIndex()
+    sources = (
+        (select(FoodSMAE), food_document),
+        (select(ProductoNOM051), product_document),
+        (select(MedicinalPlant).where(MedicinalPlant.is_active == True), plant_document),
+    )
+    for stmt, to_document in sources:
+        result = await session.stream_scalars(stmt.execution_options(yield_per=1000))
+        batch: List[IndexedDocument] = []
+        async for row in result:
+            batch.append(to_document(row))
+            if len(batch) >= 1000:
+                index.add(batch)
+                batch = []
+        index.add(batch)
+
+    if not index.is_trained and len(index) >= index.n_lists * 8:
+        index.train()
+    return index
+
+
+_vector_index: Optional[VectorIndex] = None
+_signature: Optional[tuple] = None
+_checked_at = 0.0
+_CHECK_SECONDS = 30.0
+
+
+def _index_signature(path: str) -> Optional[tuple]:
+    """Firma del ``meta.json`` (se reemplaza al final de ``save``), o ``None``"""
+    try:
+        stat = os.stat(Path(path) / VectorIndex.META_FILE)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def get_vector_index() -> VectorIndex:
+    """
+    Obtener el índice global (cargado desde disco si existe)
+
+    Cada ``_CHECK_SECONDS`` se revisa si el índice en ``RAG_INDEX_PATH`` fue
+    reemplazado (p. ej. reconstruido por otro worker) y se recarga.
+    """
+    global _vector_index, _signature, _checked_at
+    now = time.monotonic()
+    if _vector_index is not None and now - _checked_at < _CHECK_SECONDS:
+        return _vector_index
+    _checked_at = now
+
+    from core.config import get_settings
+
+    path = get_settings().rag_index_path
+    signature = _index_signature(path)
+    if signature is not None and signature != _signature:
+        try:
+            _vector_index = VectorIndex.load(path)
+            _signature = signature
+            logger.info("RAG vector index loaded from %s (%d docs)", path, len(_vector_index))
+        except Exception as e:
+            logger.warning(f"Could not load RAG vector index from {path}: {e}")
+    if _vector_index is None:
+        _vector_index = VectorIndex()
+    return _vector_index
+
+
+def set_vector_index(index: VectorIndex) -> None:
+    """Reemplazar el índice global (p. ej. tras reconstruirlo y guardarlo)"""
+    global _vector_index, _signature, _checked_at
+    from core.config import get_settings
+
+    _vector_index = index
+    _signature = _index_signature(get_settings().rag_index_path)
+    _checked_at = time.monotonic()
@@ -37,29 +37,38 @@ class TrophologyService:
         issues = []
         suggestions = []
         
+        # Rules and names for every pair in two queries (instead of up to three per pair)
+        ids = set(category_ids)
+        result = await self.session.execute(
+            select(FoodCompatibility).where(
+                FoodCompatibility.category1_id.in_(ids),
+                FoodCompatibility.category2_id.in_(ids)
+            )
+        )
+        rules = {(rule.category1_id, rule.category2_id): rule for rule in result.scalars()}
+        names = {}
+        if rules:
+            result = await self.session.execute(
+                select(FoodCategory.id, FoodCategory.name).where(FoodCategory.id.in_(ids))
+            )
+            names = dict(result.all())
+
         # Check all pairs
         for i in range(len(category_ids)):
             for j in range(i + 1, len(category_ids)):
                 id1 = category_ids[i]
                 id2 = category_ids[j]
-                
-                # Query compatibility rule
-                stmt = select(FoodCompatibility).where(
-                    FoodCompatibility.category1_id == id1,
-                    FoodCompatibility.category2_id == id2
-                )
-                result = await self.session.execute(stmt)
-                rule = result.scalar_one_or_none()
-                
+
+                rule = rules.get((id1, id2))
+
                 if rule:
-                    # Get category names for better messages
-                    cat1 = await self.session.get(FoodCategory, id1)
-                    cat2 = await self.session.get(FoodCategory, id2)
-                    
+                    name1 = names[id1]
+                    name2 = names[id2]
+
                     if not rule.compatible:
                         issue = FoodCombinationIssue(
-                            category1=cat1.name,
-                            category2=cat2.name,
+                            category1=name1,
+                            category2=name2,
                             reason=rule.reason or "Combinación no recomendada",
                             severity=rule.severity or CompatibilitySeverity.MEDIUM,
                             page_reference=rule.page_reference,
@@ -68,7 +77,7 @@ class TrophologyService:
                         issues.append(issue)
                     elif rule.note:
                         # It's compatible but has a note (e.g. "eat acidic first")
-                        suggestions.append(f"{cat1.name} + {cat2.name}: {rule.note}")
+                        suggestions.append(f"{name1} + {name2}: {rule.note}")
 
         # General suggestions based on Lezaeta's rules
         if len(category_ids) > 3:
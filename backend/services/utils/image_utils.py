@@ -1,10 +1,11 @@
 """
 Image utilities for product scanning and deduplication
+
+PIL and imagehash are imported inside the functions that need them, so
+importing this module (e.g. from the scanner router) stays cheap.
 """
 import hashlib
 from io import BytesIO
-from PIL import Image
-import imagehash
 from typing import Tuple, Optional
 
 
@@ -42,6 +43,9 @@ def calculate_perceptual_hash(image_bytes: bytes) -> str:
     Returns:
         Hexadecimal perceptual hash string
     """
+    from PIL import Image
+    import imagehash
+
     try:
         image = Image.open(BytesIO(image_bytes))
         # Convert to RGB if needed
@@ -65,6 +69,9 @@ def calculate_average_hash(image_bytes: bytes) -> str:
     Returns:
         Hexadecimal average hash string
     """
+    from PIL import Image
+    import imagehash
+
     try:
         image = Image.open(BytesIO(image_bytes))
         if image.mode != 'RGB':
@@ -89,6 +96,8 @@ def images_are_similar(hash1: str, hash2: str, threshold: int = 5) -> bool:
     Returns:
         True if images are similar, False otherwise
     """
+    import imagehash
+
     try:
         h1 = imagehash.hex_to_hash(hash1)
         h2 = imagehash.hex_to_hash(hash2)
@@ -109,6 +118,8 @@ def normalize_image_for_comparison(image_bytes: bytes, size: Tuple[int, int] = (
     Returns:
         Normalized image bytes
     """
+    from PIL import Image
+
     try:
         image = Image.open(BytesIO(image_bytes))
 
@@ -137,6 +148,8 @@ def extract_image_metadata(image_bytes: bytes) -> dict:
     Returns:
         Dictionary with image metadata
     """
+    from PIL import Image
+
     try:
         image = Image.open(BytesIO(image_bytes))
 
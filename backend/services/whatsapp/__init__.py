@@ -2,9 +2,19 @@
 WhatsApp service module
 """
 from .twilio_service import whatsapp_service, send_message, send_appointment_reminder
+from .outbound_queue import OutboundMessage, WhatsAppOutboundQueue, get_outbound_queue
+from .inbound import InboundWebhookIngestor, PhoneIndex, get_inbound_ingestor, get_phone_index, normalize_phone
 
 __all__ = [
     "whatsapp_service",
     "send_message",
     "send_appointment_reminder",
+    "OutboundMessage",
+    "WhatsAppOutboundQueue",
+    "get_outbound_queue",
+    "InboundWebhookIngestor",
+    "PhoneIndex",
+    "get_inbound_ingestor",
+    "get_phone_index",
+    "normalize_phone",
 ]
@@ -0,0 +1,464 @@
+"""
+WhatsApp inbound webhook ingestion
+
+Twilio expects the webhook to answer quickly; anything slow on that path
+(patient lookup, one INSERT per message) turns into timeouts and retries
+under bursty traffic. This module keeps the request path in memory:
+
+- ``PhoneIndex``: normalized phone -> patient, loaded once and kept current
+  by SQLAlchemy events on ``User``/``Patient`` commits
+- ``InboundWebhookIngestor``: the webhook hands over the raw payload and
+  returns; a background task resolves patients and inserts messages in
+  batches, skipping ``MessageSid`` values already stored (Twilio retries)
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.invalidation import on_committed_writes
+from domain.messaging.whatsapp import MessageType, MessageStatus
+from domain.patients.models import Patient
+from domain.users.models import User
+
+logger = logging.getLogger(__name__)
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+def normalize_phone(phone: Optional[str], default_country_code: str = "52") -> str:
+    """
+    Normalize a phone number to ``<country code><national number>`` digits
+
+    Handles the ``whatsapp:`` prefix, formatting characters, local 10-digit
+    numbers and the legacy Mexican mobile ``+521`` prefix, so that
+    ``whatsapp:+5215512345678``, ``+52 55 1234 5678`` and ``55-1234-5678``
+    all map to ``525512345678``.
+    """
+    if not phone:
+        return ""
+    digits = _NON_DIGITS.sub("", phone.replace("whatsapp:", ""))
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if len(digits) == 10:
+        digits = default_country_code + digits
+    if len(digits) == 13 and digits.startswith("521"):
+        digits = "52" + digits[3:]
+    return digits
+
+
+@dataclass(frozen=True)
+class PhoneMatch:
+    """Patient resolved from a sender phone"""
+    patient_id: int
+    user_id: int
+    first_name: str
+    full_name: str
+
+
+class PhoneIndex:
+    """
+    In-memory map of normalized phone -> patient
+
+    Phones live on ``users`` and patients reference users, so the index keeps
+    both sides (``user -> phone/name`` and ``user -> patient``) and resolves a
+    phone through them. Writes are applied when the owning session commits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._user_by_phone: Dict[str, int] = {}
+        self._users: Dict[int, Tuple[str, str, str]] = {}  # user_id -> (phone, first, last)
+        self._patient_by_user: Dict[int, int] = {}
+        self._loaded = False
+        self._loading: Optional[asyncio.Task] = None
+        self._next_load_attempt = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._patient_by_user)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def lookup(self, phone: str) -> Optional[PhoneMatch]:
+        key = normalize_phone(phone)
+        if not key:
+            return None
+        with self._lock:
+            user_id = self._user_by_phone.get(key)
+            if user_id is None:
+                return None
+            patient_id = self._patient_by_user.get(user_id)
+            if patient_id is None:
+                return None
+            _, first_name, last_name = self._users[user_id]
+        return PhoneMatch(
+            patient_id=patient_id,
+            user_id=user_id,
+            first_name=first_name,
+            full_name=f"{first_name} {last_name}".strip(),
+        )
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def upsert_user(self, user_id: int, phone: Optional[str], first_name: str = "", last_name: str = "") -> None:
+        key = normalize_phone(phone)
+        with self._lock:
+            previous = self._users.pop(user_id, None)
+            if previous and self._user_by_phone.get(previous[0]) == user_id:
+                del self._user_by_phone[previous[0]]
+            if key:
+                self._users[user_id] = (key, first_name or "", last_name or "")
+                self._user_by_phone[key] = user_id
+
+    def remove_user(self, user_id: int) -> None:
+        self.upsert_user(user_id, None)
+        with self._lock:
+            self._patient_by_user.pop(user_id, None)
+
+    def upsert_patient(self, patient_id: int, user_id: int) -> None:
+        with self._lock:
+            for uid, pid in list(self._patient_by_user.items()):
+                if pid == patient_id and uid != user_id:
+                    del self._patient_by_user[uid]
+            self._patient_by_user[user_id] = patient_id
+
+    def remove_patient(self, patient_id: int) -> None:
+        with self._lock:
+            for uid, pid in list(self._patient_by_user.items()):
+                if pid == patient_id:
+                    del self._patient_by_user[uid]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._user_by_phone.clear()
+            self._users.clear()
+            self._patient_by_user.clear()
+            self._loaded = False
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def load_rows(self, rows) -> int:
+        """Replace the index from ``(patient_id, user_id, phone, first, last)`` rows"""
+        self.clear()
+        for patient_id, user_id, phone, first_name, last_name in rows:
+            self.upsert_user(user_id, phone, first_name, last_name)
+            self.upsert_patient(patient_id, user_id)
+        self._loaded = True
+        return len(self)
+
+    async def load(self) -> int:
+        """Load every patient with a phone in a single query"""
+        from sqlalchemy import select
+        import core.database as database
+
+        if database.AsyncSessionLocal is None:
+            database.init_database()
+
+        started = time.perf_counter()
+        async with database.AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Patient.id, User.id, User.phone, User.first_name, User.last_name)
+                .join(User, Patient.user_id == User.id)
+                .where(User.phone.is_not(None))
+            )
+            count = self.load_rows(result.all())
+        logger.info(f"WhatsApp phone index loaded: {count} patients in {time.perf_counter() - started:.2f}s")
+        return count
+
+    def ensure_loaded(self, retry_seconds: float = 30.0) -> None:
+        """Start loading in the background if it has not happened yet"""
+        if self._loaded or (self._loading is not None and not self._loading.done()):
+            return
+        if time.monotonic() < self._next_load_attempt:
+            return
+        self._next_load_attempt = time.monotonic() + retry_seconds
+        self._loading = asyncio.create_task(self._load_safely())
+
+    async def _load_safely(self) -> None:
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Failed to load WhatsApp phone index: {e}")
+
+
+_phone_index = PhoneIndex()
+
+
+def get_phone_index() -> PhoneIndex:
+    """Get the process-wide phone index"""
+    return _phone_index
+
+
+# ----------------------------------------------------------------------
+# Keep the index current from ORM writes
+# ----------------------------------------------------------------------
+
+def _apply(change: Tuple) -> None:
+    kind, values = change
+    if kind == "user":
+        _phone_index.upsert_user(*values)
+    elif kind == "user_deleted":
+        _phone_index.remove_user(*values)
+    elif kind == "patient":
+        _phone_index.upsert_patient(*values)
+    elif kind == "patient_deleted":
+        _phone_index.remove_patient(*values)
+
+
+def _apply_changes(changes: List[Tuple]) -> None:
+    for change in changes:
+        try:
+            _apply(change)
+        except Exception as e:
+            logger.warning(f"Could not update WhatsApp phone index: {e}")
+
+
+def _phone_change(target, event_name: str) -> List[Tuple]:
+    deleted = event_name == "after_delete"
+    if isinstance(target, User):
+        if deleted:
+            return [("user_deleted", (target.id,))]
+        return [("user", (target.id, target.phone, target.first_name, target.last_name))]
+    if deleted:
+        return [("patient_deleted", (target.id,))]
+    return [("patient", (target.id, target.user_id))]
+
+
+_listeners_registered = False
+
+
+def register_phone_index_listeners() -> None:
+    """Hook the phone index to ``User``/``Patient`` commits (idempotent)"""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    # One registration for both models keeps the changes in write order
+    on_committed_writes((User, Patient), _apply_changes, collect=_phone_change)
+    _listeners_registered = True
+
+
+register_phone_index_listeners()
+
+
+# ----------------------------------------------------------------------
+# Ingestion queue
+# ----------------------------------------------------------------------
+
+InboundSink = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class InboundWebhookIngestor:
+    """
+    Background ingestion of Twilio webhook payloads
+
+    Args:
+        sink: Coroutine that persists a batch of message rows
+        phone_index: Index used to resolve senders to patients
+        batch_size: Rows buffered before calling ``sink``
+        flush_interval: Max seconds a row waits in the buffer
+        max_pending: Queue bound; when full, ``submit`` waits for room
+    """
+
+    def __init__(
+        self,
+        sink: InboundSink,
+        phone_index: Optional[PhoneIndex] = None,
+        batch_size: int = 200,
+        flush_interval: float = 0.25,
+        max_pending: int = 10_000,
+    ):
+        self.sink = sink
+        self.phone_index = phone_index or get_phone_index()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._metrics = {
+            "received": 0,
+            "matched": 0,
+            "persisted": 0,
+            "batches": 0,
+            "failed": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start the writer task on the running event loop (idempotent)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._writer())
+        self.phone_index.ensure_loaded()
+        logger.info("WhatsApp inbound ingestor started")
+
+    async def stop(self) -> None:
+        """Write everything still queued, then stop"""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        logger.info("WhatsApp inbound ingestor stopped")
+
+    async def join(self) -> None:
+        """Wait until every submitted payload has been persisted"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    # ------------------------------------------------------------------
+    # Submit
+    # ------------------------------------------------------------------
+
+    async def submit(self, payload: Dict[str, Any]) -> Optional[PhoneMatch]:
+        """
+        Queue a raw webhook payload for persistence
+
+        Returns the patient matched from the in-memory index (if any) so the
+        caller can personalize its reply without touching the database.
+        """
+        self.start()
+        match = self.phone_index.lookup(payload.get("From", ""))
+        self.phone_index.ensure_loaded()
+        self._metrics["received"] += 1
+        if match:
+            self._metrics["matched"] += 1
+        await self._queue.put((payload, match, datetime.utcnow()))
+        return match
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def to_row(payload: Dict[str, Any], match: Optional[PhoneMatch], received_at: datetime) -> Dict[str, Any]:
+        """Build a ``whatsapp_messages`` row from a webhook payload"""
+        sender_phone = (payload.get("From") or "").replace("whatsapp:", "")
+        return {
+            "patient_id": match.patient_id if match else None,
+            "recipient_phone": sender_phone[:20],
+            "recipient_name": match.full_name if match else "Unknown",
+            "message_type": MessageType.CUSTOM,
+            "message_body": (payload.get("Body") or "")[:1600],
+            "twilio_sid": payload.get("MessageSid") or None,
+            "status": MessageStatus.DELIVERED,
+            "delivered_at": received_at,
+            "created_at": received_at,
+            "created_by_id": 1,  # System user
+        }
+
+    async def _writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+
+    async def _write(self, batch: List[Tuple]) -> None:
+        rows = [self.to_row(*item) for item in batch]
+        try:
+            await self.sink(rows)
+            self._metrics["persisted"] += len(rows)
+            self._metrics["batches"] += 1
+        except Exception as e:
+            self._metrics["failed"] += len(rows)
+            logger.error(f"Failed to persist {len(rows)} inbound WhatsApp messages: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def metrics(self) -> Dict[str, Any]:
+        metrics = dict(self._metrics)
+        metrics["pending"] = self._queue.qsize() if self._queue is not None else 0
+        metrics["phone_index_loaded"] = self.phone_index.loaded
+        metrics["phone_index_size"] = len(self.phone_index)
+        metrics["avg_batch_size"] = (
+            round(metrics["persisted"] / metrics["batches"], 1) if metrics["batches"] else 0.0
+        )
+        return metrics
+
+
+async def persist_inbound(rows: List[Dict[str, Any]]) -> None:
+    """
+    Default sink: one multi-row INSERT per batch, skipping ``MessageSid``
+    values that are already stored or repeated within the batch.
+    """
+    from sqlalchemy import insert, select
+    import core.database as database
+    from domain.messaging.whatsapp import WhatsAppMessage
+
+    if database.AsyncSessionLocal is None:
+        database.init_database()
+
+    sids = [row["twilio_sid"] for row in rows if row["twilio_sid"]]
+    async with database.AsyncSessionLocal() as session:
+        seen = set()
+        if sids:
+            result = await session.execute(
+                select(WhatsAppMessage.twilio_sid).where(WhatsAppMessage.twilio_sid.in_(sids))
+            )
+            seen = set(result.scalars().all())
+
+        fresh = []
+        for row in rows:
+            sid = row["twilio_sid"]
+            if sid and sid in seen:
+                continue
+            if sid:
+                seen.add(sid)
+            fresh.append(row)
+
+        if fresh:
+            await session.execute(insert(WhatsAppMessage), fresh)
+            await session.commit()
+
+
+_inbound_ingestor: Optional[InboundWebhookIngestor] = None
+
+
+def get_inbound_ingestor() -> InboundWebhookIngestor:
+    """Get the process-wide inbound ingestor"""
+    global _inbound_ingestor
+    if _inbound_ingestor is None:
+        from core.config import get_settings
+
+        settings = get_settings()
+        _inbound_ingestor = InboundWebhookIngestor(
+            sink=persist_inbound,
+            batch_size=settings.whatsapp_inbound_batch_size,
+            flush_interval=settings.whatsapp_inbound_flush_ms / 1000,
+            max_pending=settings.whatsapp_inbound_max_pending,
+        )
+    return _inbound_ingestor
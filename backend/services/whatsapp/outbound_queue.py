@@ -0,0 +1,473 @@
+"""
+WhatsApp outbound message queue
+
+In-process async queue in front of ``WhatsAppService`` that provides:
+- Global and per-recipient rate limiting (token buckets) sized for Twilio
+- Exponential backoff with jitter for retryable provider errors
+- Idempotency: a message key is sent at most once per process (concurrent
+  sends of the same key share one delivery), and results are persisted at
+  most once per ``twilio_sid``
+- Bulk campaign sends with batched result persistence and throughput metrics
+"""
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from domain.messaging.whatsapp import MessageType
+
+logger = logging.getLogger(__name__)
+
+# Twilio error statuses worth retrying (throttling and transient server errors)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket rate limiter"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> float:
+        """Wait for and take one token; returns the time spent waiting"""
+        waited = 0.0
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                self.tokens -= 1
+                return waited
+            waited += wait
+            await asyncio.sleep(wait)
+
+
+@dataclass
+class OutboundMessage:
+    """Message waiting to be delivered"""
+    to_phone: str
+    body: str
+    message_type: MessageType = MessageType.CUSTOM
+    media_url: Optional[str] = None
+    patient_id: Optional[int] = None
+    recipient_name: Optional[str] = None
+    created_by_id: int = 1
+    idempotency_key: str = field(default_factory=lambda: uuid.uuid4().hex)
+    campaign_id: Optional[str] = None
+    summary: Optional[str] = None  # What gets stored as message_body
+    attempts: int = 0
+
+
+@dataclass
+class CampaignProgress:
+    """In-memory progress of a bulk send"""
+    campaign_id: str
+    total: int
+    sent: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    completed_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        done = self.sent + self.failed
+        elapsed = (self.completed_at or time.monotonic()) - self.started_at
+        return {
+            "campaign_id": self.campaign_id,
+            "status": "completed" if done >= self.total else "sending",
+            "total_recipients": self.total,
+            "messages_sent": self.sent,
+            "messages_failed": self.failed,
+            "pending": self.total - done,
+            "elapsed_seconds": round(elapsed, 3),
+            "messages_per_second": round(done / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+ResultSink = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class WhatsAppOutboundQueue:
+    """
+    Rate-limited, retrying outbound queue for WhatsApp messages
+
+    Args:
+        send_func: Coroutine ``(to_phone, body, media_url) -> result dict``
+            with the same shape as ``WhatsAppService.send_message``
+        result_sink: Coroutine that persists a batch of results
+        global_rate: Messages per second across all recipients
+        per_number_rate: Messages per second to a single recipient
+        per_number_burst: Burst allowed to a single recipient
+        workers: Concurrent delivery workers
+        max_attempts: Attempts per message before giving up
+        base_backoff: First retry delay in seconds (doubles each attempt)
+        batch_size: Results buffered before calling ``result_sink``
+        flush_interval: Max seconds a result waits in the buffer
+        campaign_ttl: Seconds a completed campaign's progress stays queryable
+        max_campaigns: Completed campaigns kept at most, oldest evicted first
+    """
+
+    def __init__(
+        self,
+        send_func: Callable[..., Awaitable[Dict[str, Any]]],
+        result_sink: Optional[ResultSink] = None,
+        global_rate: float = 80.0,
+        per_number_rate: float = 1.0,
+        per_number_burst: float = 3.0,
+        workers: int = 16,
+        max_attempts: int = 5,
+        base_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        campaign_ttl: float = 3600.0,
+        max_campaigns: int = 1000,
+    ):
+        self.send_func = send_func
+        self.result_sink = result_sink
+        self.global_bucket = TokenBucket(global_rate, burst=global_rate)
+        self.per_number_rate = per_number_rate
+        self.per_number_burst = per_number_burst
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.campaign_ttl = campaign_ttl
+        self.max_campaigns = max_campaigns
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._number_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._sent_keys: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_lock: Optional[asyncio.Lock] = None
+        self._campaigns: "OrderedDict[str, CampaignProgress]" = OrderedDict()
+        self._recent: Deque[float] = deque(maxlen=10_000)
+        self._metrics = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "duplicates_skipped": 0,
+            "throttle_wait_seconds": 0.0,
+            "persisted": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start workers on the running event loop (idempotent)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._buffer_lock = asyncio.Lock()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"WhatsApp outbound queue started with {self.workers} workers")
+
+    async def stop(self, drain: bool = True) -> None:
+        """Stop workers, optionally waiting for queued messages first"""
+        if not self.running:
+            return
+        if drain:
+            await self._queue.join()
+        for task in self._tasks + [self._flush_task]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, self._flush_task, return_exceptions=True)
+        self._tasks, self._flush_task = [], None
+        await self.flush()
+        logger.info("WhatsApp outbound queue stopped")
+
+    async def join(self) -> None:
+        """Wait until every queued message has been processed and persisted"""
+        if self._queue is not None:
+            await self._queue.join()
+        await self.flush()
+
+    # ------------------------------------------------------------------
+    # Enqueue / send
+    # ------------------------------------------------------------------
+
+    async def enqueue(self, message: OutboundMessage) -> None:
+        """Queue a message for background delivery"""
+        self.start()
+        self._metrics["enqueued"] += 1
+        await self._queue.put(message)
+
+    async def enqueue_campaign(self, messages: List[OutboundMessage]) -> CampaignProgress:
+        """Queue a bulk send and return its progress tracker"""
+        campaign_id = uuid.uuid4().hex[:12]
+        progress = CampaignProgress(campaign_id=campaign_id, total=len(messages))
+        self._prune_campaigns()
+        self._campaigns[campaign_id] = progress
+        for message in messages:
+            message.campaign_id = campaign_id
+            await self.enqueue(message)
+        return progress
+
+    def campaign_progress(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        self._prune_campaigns()
+        progress = self._campaigns.get(campaign_id)
+        return progress.as_dict() if progress else None
+
+    def _prune_campaigns(self) -> None:
+        """Evict completed campaigns past ``campaign_ttl``, then the oldest beyond ``max_campaigns``"""
+        now = time.monotonic()
+        completed = [cid for cid, c in self._campaigns.items() if c.completed_at is not None]
+        for campaign_id in completed:
+            if now - self._campaigns[campaign_id].completed_at > self.campaign_ttl:
+                del self._campaigns[campaign_id]
+        completed = [cid for cid in completed if cid in self._campaigns]
+        for campaign_id in completed[:max(0, len(completed) - self.max_campaigns)]:
+            del self._campaigns[campaign_id]
+
+    async def send_now(self, message: OutboundMessage) -> Dict[str, Any]:
+        """
+        Deliver a message in the caller's task, honouring rate limits,
+        retries and idempotency. Used by the ``/whatsapp/send/*`` endpoints,
+        which need the Twilio SID in their response.
+        """
+        return await self._deliver(message)
+
+    async def _deliver(self, message: OutboundMessage) -> Dict[str, Any]:
+        key = message.idempotency_key
+        previous = self._sent_keys.get(key)
+        if previous is not None:
+            self._metrics["duplicates_skipped"] += 1
+            return previous
+
+        # The key is taken before sending: a duplicate that arrives while the
+        # first delivery is still retrying waits for it instead of resending.
+        # The delivery is shielded so a cancelled caller does not abort it.
+        task = self._inflight.get(key)
+        if task is not None:
+            self._metrics["duplicates_skipped"] += 1
+        else:
+            task = asyncio.ensure_future(self._send_with_retries(message))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _send_with_retries(self, message: OutboundMessage) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        while message.attempts < self.max_attempts:
+            message.attempts += 1
+            waited = await self.global_bucket.acquire()
+            waited += await self._number_bucket(message.to_phone).acquire()
+            self._metrics["throttle_wait_seconds"] += waited
+
+            try:
+                result = await self.send_func(message.to_phone, message.body, message.media_url)
+            except Exception as e:
+                result = {"success": False, "twilio_sid": None, "status": "failed",
+                          "to": message.to_phone, "sent_at": None, "error": str(e),
+                          "retryable": True}
+
+            if result.get("success") or not self._is_retryable(result):
+                break
+            if message.attempts < self.max_attempts:
+                self._metrics["retries"] += 1
+                await asyncio.sleep(self._backoff(message.attempts))
+
+        result = dict(result)
+        result.pop("retryable", None)
+        result.pop("error_status", None)
+        result["attempts"] = message.attempts
+        self._record(message, result)
+        return result
+
+    def _number_bucket(self, phone: str) -> TokenBucket:
+        bucket = self._number_buckets.get(phone)
+        if bucket is None:
+            bucket = TokenBucket(self.per_number_rate, burst=self.per_number_burst)
+            self._number_buckets[phone] = bucket
+            if len(self._number_buckets) > 50_000:
+                self._number_buckets.popitem(last=False)
+        else:
+            self._number_buckets.move_to_end(phone)
+        return bucket
+
+    @staticmethod
+    def _is_retryable(result: Dict[str, Any]) -> bool:
+        if "retryable" in result:
+            return bool(result["retryable"])
+        # No HTTP status means the request never reached Twilio (network error)
+        status = result.get("error_status")
+        return status is None or status in RETRYABLE_STATUSES
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _record(self, message: OutboundMessage, result: Dict[str, Any]) -> None:
+        if result.get("success"):
+            self._metrics["sent"] += 1
+            self._sent_keys[message.idempotency_key] = result
+            if len(self._sent_keys) > 100_000:
+                self._sent_keys.popitem(last=False)
+        else:
+            self._metrics["failed"] += 1
+        self._recent.append(time.monotonic())
+
+        progress = self._campaigns.get(message.campaign_id) if message.campaign_id else None
+        if progress:
+            if result.get("success"):
+                progress.sent += 1
+            else:
+                progress.failed += 1
+            if progress.sent + progress.failed >= progress.total:
+                progress.completed_at = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Workers and batched persistence
+    # ------------------------------------------------------------------
+
+    async def _worker(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                result = await self._deliver(message)
+                await self._buffer_result(message, result)
+            except Exception as e:
+                logger.error(f"WhatsApp outbound worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _buffer_result(self, message: OutboundMessage, result: Dict[str, Any]) -> None:
+        if self.result_sink is None:
+            return
+        self._buffer.append({"message": message, "result": result})
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Persist buffered results in one batch"""
+        if not self._buffer or self.result_sink is None:
+            return
+        async with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            try:
+                await self.result_sink(batch)
+                self._metrics["persisted"] += len(batch)
+            except Exception as e:
+                logger.error(f"Error persisting {len(batch)} WhatsApp results: {e}")
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, outcome counters and recent throughput"""
+        now = time.monotonic()
+        last_minute = sum(1 for t in self._recent if now - t <= 60)
+        metrics = dict(self._metrics)
+        metrics["throttle_wait_seconds"] = round(metrics["throttle_wait_seconds"], 3)
+        metrics.update({
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "buffered_results": len(self._buffer),
+            "messages_per_second_1m": round(last_minute / 60, 2),
+            "active_campaigns": sum(1 for c in self._campaigns.values() if c.completed_at is None),
+        })
+        return metrics
+
+
+async def persist_results(batch: List[Dict[str, Any]]) -> None:
+    """
+    Default result sink: insert ``WhatsAppMessage`` rows in one transaction,
+    skipping any ``twilio_sid`` that is already stored.
+    """
+    from sqlalchemy import select
+    import core.database as database
+    from domain.messaging.whatsapp import WhatsAppMessage, MessageStatus
+
+    if database.AsyncSessionLocal is None:
+        database.init_database()
+
+    sids = [item["result"].get("twilio_sid") for item in batch if item["result"].get("twilio_sid")]
+    async with database.AsyncSessionLocal() as session:
+        existing = set()
+        if sids:
+            rows = await session.execute(
+                select(WhatsAppMessage.twilio_sid).where(WhatsAppMessage.twilio_sid.in_(sids))
+            )
+            existing = set(rows.scalars().all())
+
+        for item in batch:
+            message, result = item["message"], item["result"]
+            sid = result.get("twilio_sid")
+            if sid and sid in existing:
+                continue
+            if sid:
+                existing.add(sid)
+            success = result.get("success", False)
+            error = result.get("error")
+            session.add(WhatsAppMessage(
+                patient_id=message.patient_id,
+                recipient_phone=message.to_phone,
+                recipient_name=message.recipient_name,
+                message_type=message.message_type,
+                message_body=(message.summary or message.body)[:1600],
+                twilio_sid=sid,
+                status=MessageStatus.SENT if success else MessageStatus.FAILED,
+                error_message=error[:500] if error else None,
+                sent_at=datetime.utcnow() if success else None,
+                created_by_id=message.created_by_id,
+            ))
+        await session.commit()
+
+
+_outbound_queue: Optional[WhatsAppOutboundQueue] = None
+
+
+def get_outbound_queue() -> WhatsAppOutboundQueue:
+    """Get the process-wide outbound queue bound to ``whatsapp_service``"""
+    global _outbound_queue
+    if _outbound_queue is None:
+        from core.config import get_settings
+        from .twilio_service import whatsapp_service
+
+        settings = get_settings()
+        _outbound_queue = WhatsAppOutboundQueue(
+            send_func=whatsapp_service.send_message,
+            result_sink=persist_results,
+            global_rate=settings.whatsapp_global_rate_per_second,
+            per_number_rate=settings.whatsapp_per_number_rate_per_second,
+            workers=settings.whatsapp_queue_workers,
+            max_attempts=settings.whatsapp_max_attempts,
+        )
+    return _outbound_queue
@@ -1,12 +1,17 @@
 """
 WhatsApp service using Twilio API
 """
+import asyncio
+import functools
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any
 from datetime import datetime
 from dotenv import load_dotenv
 
+from core.providers import get_provider, provider_configured, register_provider
+
 # Load environment variables
 load_dotenv()
 
@@ -17,28 +22,161 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
 TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")  # Twilio Sandbox default
 
-# Initialize Twilio client
-twilio_client = None
-if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_ACCOUNT_SID != "your-twilio-account-sid":
-    try:
-        from twilio.rest import Client
-        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        logger.info("Twilio WhatsApp client initialized successfully")
-    except ImportError:
-        logger.warning("Twilio library not installed. WhatsApp functionality disabled.")
-    except Exception as e:
-        logger.error(f"Error initializing Twilio client: {e}")
-else:
-    logger.warning("Twilio credentials not configured. WhatsApp functionality disabled.")
+# Twilio client, created on first send (core.providers)
+def _create_twilio_client():
+    from twilio.rest import Client
+
+    return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+
+register_provider(
+    "twilio", _create_twilio_client,
+    configured=lambda: bool(
+        TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_ACCOUNT_SID != "your-twilio-account-sid"
+    ),
+)
+
+
+# Dedicated pool for blocking Twilio HTTP calls, so bulk sends are not capped
+# by the (CPU-sized) default executor
+_twilio_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TWILIO_HTTP_THREADS", "32")),
+    thread_name_prefix="twilio"
+)
+
+
+async def _run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_twilio_executor, functools.partial(func, *args, **kwargs))
+
+
+# Message bodies (also used by the API to send through the outbound queue)
+
+def appointment_reminder_body(
+    patient_name: str,
+    appointment_date: str,
+    appointment_time: str,
+    nutritionist_name: str
+) -> str:
+    """Appointment reminder text"""
+    return f"""
+🗓️ *Recordatorio de Cita - Nutrition Intelligence*
+
+Hola {patient_name},
+
+Te recordamos tu próxima cita con {nutritionist_name}:
+
+📅 Fecha: {appointment_date}
+🕐 Hora: {appointment_time}
+
+Por favor confirma tu asistencia respondiendo a este mensaje.
+
+Si necesitas reprogramar, contáctanos con anticipación.
+
+¡Te esperamos! 💚
+    """.strip()
+
+
+def meal_plan_notification_body(
+    patient_name: str,
+    nutritionist_name: str
+) -> str:
+    """Meal plan ready text"""
+    return f"""
+📋 *Plan de Alimentación Listo*
+
+Hola {patient_name},
+
+¡Tu nuevo plan de alimentación ya está disponible! 🎉
+
+{nutritionist_name} ha preparado un plan personalizado para ti.
+
+Ingresa a tu cuenta en Nutrition Intelligence para revisarlo:
+👉 https://nutrition-intelligence.app
+
+Si tienes dudas, no dudes en contactarnos.
+
+¡Éxito en tu camino hacia una mejor salud! 💪
+    """.strip()
+
+
+def lab_results_notification_body(
+    patient_name: str,
+    lab_type: str
+) -> str:
+    """Lab results available text"""
+    return f"""
+🔬 *Resultados de Laboratorio Disponibles*
+
+Hola {patient_name},
+
+Tus resultados de {lab_type} ya están disponibles en tu expediente.
+
+Ingresa a tu cuenta para revisarlos:
+👉 https://nutrition-intelligence.app
+
+Tu nutriólogo revisará los resultados y te contactará si es necesario.
+
+Cuida tu salud 💚
+    """.strip()
+
+
+def motivational_message_body(
+    patient_name: str,
+    message_text: str
+) -> str:
+    """Motivational message text"""
+    return f"""
+💪 *Mensaje Motivacional*
+
+Hola {patient_name},
+
+{message_text}
+
+¡Sigue adelante! Estamos contigo en cada paso.
+
+Tu equipo de Nutrition Intelligence 💚
+    """.strip()
+
+
+def follow_up_message_body(
+    patient_name: str,
+    days_since_last_visit: int,
+    nutritionist_name: str
+) -> str:
+    """Follow-up message text"""
+    return f"""
+👋 *Seguimiento - Nutrition Intelligence*
+
+Hola {patient_name},
+
+Han pasado {days_since_last_visit} días desde tu última consulta.
+
+¿Cómo vas con tu plan de alimentación? ¿Tienes alguna duda?
+
+{nutritionist_name} está disponible para apoyarte.
+
+Agenda tu próxima cita o contáctanos por WhatsApp.
+
+¡Estamos aquí para ayudarte! 💚
+    """.strip()
 
 
 class WhatsAppService:
     """Service for sending WhatsApp messages via Twilio"""
 
-    def __init__(self):
-        self.client = twilio_client
-        self.from_number = TWILIO_WHATSAPP_NUMBER
-        self.is_available = twilio_client is not None
+    def __init__(self, client=None, from_number: Optional[str] = None):
+        self._client = client
+        self.from_number = from_number or TWILIO_WHATSAPP_NUMBER
+
+    @property
+    def client(self):
+        """Cliente de Twilio (el global se crea en el primer envío)"""
+        return self._client if self._client is not None else get_provider("twilio")
+
+    @property
+    def is_available(self) -> bool:
+        return self._client is not None or provider_configured("twilio")
 
     async def send_message(
         self,
@@ -76,8 +214,8 @@ class WhatsAppService:
             if media_url:
                 message_params["media_url"] = [media_url]
 
-            # Send message via Twilio
-            message = self.client.messages.create(**message_params)
+            # Send message via Twilio (blocking HTTP call, run off the event loop)
+            message = await _run_blocking(self.client.messages.create, **message_params)
 
             logger.info(f"WhatsApp message sent successfully. SID: {message.sid}")
 
@@ -98,7 +236,9 @@ class WhatsAppService:
                 "status": "failed",
                 "to": to_phone,
                 "sent_at": None,
-                "error": str(e)
+                "error": str(e),
+                # HTTP status from TwilioRestException; None for network errors
+                "error_status": getattr(e, "status", None)
             }
 
     async def send_appointment_reminder(
@@ -110,24 +250,10 @@ class WhatsAppService:
         nutritionist_name: str
     ) -> Dict[str, Any]:
         """Send appointment reminder"""
-        message = f"""
-🗓️ *Recordatorio de Cita - Nutrition Intelligence*
-
-Hola {patient_name},
-
-Te recordamos tu próxima cita con {nutritionist_name}:
-
-📅 Fecha: {appointment_date}
-🕐 Hora: {appointment_time}
-
-Por favor confirma tu asistencia respondiendo a este mensaje.
-
-Si necesitas reprogramar, contáctanos con anticipación.
-
-¡Te esperamos! 💚
-        """.strip()
-
-        return await self.send_message(patient_phone, message)
+        return await self.send_message(
+            patient_phone,
+            appointment_reminder_body(patient_name, appointment_date, appointment_time, nutritionist_name)
+        )
 
     async def send_meal_plan_notification(
         self,
@@ -136,24 +262,10 @@ Si necesitas reprogramar, contáctanos con anticipación.
         nutritionist_name: str
     ) -> Dict[str, Any]:
         """Notify patient that meal plan is ready"""
-        message = f"""
-📋 *Plan de Alimentación Listo*
-
-Hola {patient_name},
-
-¡Tu nuevo plan de alimentación ya está disponible! 🎉
-
-{nutritionist_name} ha preparado un plan personalizado para ti.
-
-Ingresa a tu cuenta en Nutrition Intelligence para revisarlo:
-👉 https://nutrition-intelligence.app
-
-Si tienes dudas, no dudes en contactarnos.
-
-¡Éxito en tu camino hacia una mejor salud! 💪
-        """.strip()
-
-        return await self.send_message(patient_phone, message)
+        return await self.send_message(
+            patient_phone,
+            meal_plan_notification_body(patient_name, nutritionist_name)
+        )
 
     async def send_lab_results_notification(
         self,
@@ -162,22 +274,10 @@ Si tienes dudas, no dudes en contactarnos.
         lab_type: str
     ) -> Dict[str, Any]:
         """Notify patient about new lab results"""
-        message = f"""
-🔬 *Resultados de Laboratorio Disponibles*
-
-Hola {patient_name},
-
-Tus resultados de {lab_type} ya están disponibles en tu expediente.
-
-Ingresa a tu cuenta para revisarlos:
-👉 https://nutrition-intelligence.app
-
-Tu nutriólogo revisará los resultados y te contactará si es necesario.
-
-Cuida tu salud 💚
-        """.strip()
-
-        return await self.send_message(patient_phone, message)
+        return await self.send_message(
+            patient_phone,
+            lab_results_notification_body(patient_name, lab_type)
+        )
 
     async def send_motivational_message(
         self,
@@ -186,19 +286,10 @@ Cuida tu salud 💚
         message_text: str
     ) -> Dict[str, Any]:
         """Send custom motivational message"""
-        message = f"""
-💪 *Mensaje Motivacional*
-
-Hola {patient_name},
-
-{message_text}
-
-¡Sigue adelante! Estamos contigo en cada paso.
-
-Tu equipo de Nutrition Intelligence 💚
-        """.strip()
-
-        return await self.send_message(patient_phone, message)
+        return await self.send_message(
+            patient_phone,
+            motivational_message_body(patient_name, message_text)
+        )
 
     async def send_follow_up_message(
         self,
@@ -208,23 +299,10 @@ Tu equipo de Nutrition Intelligence 💚
         nutritionist_name: str
     ) -> Dict[str, Any]:
         """Send follow-up message"""
-        message = f"""
-👋 *Seguimiento - Nutrition Intelligence*
-
-Hola {patient_name},
-
-Han pasado {days_since_last_visit} días desde tu última consulta.
-
-¿Cómo vas con tu plan de alimentación? ¿Tienes alguna duda?
-
-{nutritionist_name} está disponible para apoyarte.
-
-Agenda tu próxima cita o contáctanos por WhatsApp.
-
-¡Estamos aquí para ayudarte! 💚
-        """.strip()
-
-        return await self.send_message(patient_phone, message)
+        return await self.send_message(
+            patient_phone,
+            follow_up_message_body(patient_name, days_since_last_visit, nutritionist_name)
+        )
 
     def _get_mock_response(self, to_phone: str, message_body: str) -> Dict[str, Any]:
         """Generate mock response when Twilio is not available"""
@@ -244,7 +322,7 @@ Agenda tu próxima cita o contáctanos por WhatsApp.
             return None
 
         try:
-            message = self.client.messages(twilio_sid).fetch()
+            message = await _run_blocking(self.client.messages(twilio_sid).fetch)
             return {
                 "sid": message.sid,
                 "status": message.status,
@@ -0,0 +1,128 @@
+"""
+Unit Tests for the Admin User Listing (self-join, keyset pages, streaming export)
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlmodel import SQLModel
+
+import domain  # noqa: F401
+import domain.patients.laboratory  # noqa: F401
+from api.routers import admin
+from core import database
+from core.config import get_settings
+from core.query_stats import track_queries
+from core.security import UserRole, require_admin
+from domain.auth.models import AccountStatus, AuthUser
+from domain.auth.models import UserRole as AccountRole
+
+
+@pytest.fixture
+async def app(monkeypatch, tmp_path):
+    for name in ("engine", "async_engine", "async_read_engine", "AsyncSessionLocal", "AsyncReadSessionLocal"):
+        monkeypatch.setattr(database, name, None)
+    monkeypatch.setattr(database, "_pools", {})
+    monkeypatch.setattr(database, "get_settings", lambda: get_settings().model_copy(update={
+        "database_url": f"sqlite+aiosqlite:///{tmp_path / 'admin.db'}", "database_read_url": None,
+    }))
+    monkeypatch.setattr(admin, "EXPORT_BATCH_SIZE", 4)
+    database.init_database()
+
+    async with database.async_engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=[AuthUser.__table__]))
+
+    created = datetime(2026, 1, 1)
+    async with database.AsyncSessionLocal() as session:
+        session.add(AuthUser(
+            id=1, email="nutri@x.mx", username="nutri", password_hash="x", first_name="Ana",
+            last_name="López", primary_role=AccountRole.NUTRITIONIST,
+            account_status=AccountStatus.ACTIVE, created_at=created
+        ))
+        for i in range(2, 12):
+            session.add(AuthUser(
+                id=i, email=f"p{i}@x.mx", username=f"p{i}", password_hash="x", first_name="Paciente",
+                last_name=str(i), primary_role=AccountRole.PATIENT,
+                account_status=AccountStatus.ACTIVE if i % 2 else AccountStatus.SUSPENDED,
+                nutritionist_id=1 if i < 6 else None,
+                # Two users share each timestamp so the cursor needs the id tie-breaker
+                created_at=created + timedelta(days=i // 2)
+            ))
+        await session.commit()
+
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/v1")
+    app.dependency_overrides[require_admin] = lambda: UserRole.ADMIN
+    yield app
+    await database.close_db()
+
+
+def client(app):
+    return httpx.AsyncClient(app=app, base_url="http://test")
+
+
+async def test_pages_cover_all_users_once_in_one_query_each(app):
+    ids = []
+    cursor = None
+    async with client(app) as http:
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            with track_queries() as stats:
+                body = (await http.get("/api/v1/admin/users", params=params)).json()
+            assert stats.count == 1
+            ids += [user["id"] for user in body["users"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+    assert ids == [11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+
+async def test_nutritionist_name_from_join(app):
+    async with client(app) as http:
+        users = (await http.get("/api/v1/admin/users")).json()["users"]
+
+    by_id = {user["id"]: user for user in users}
+    assert by_id[3]["nutriologo"] == "Ana López"
+    assert "nutriologo" not in by_id[7]
+    assert by_id[1]["rol"] == "nutritionist"
+
+
+async def test_filters_by_role_and_status(app):
+    async with client(app) as http:
+        body = (await http.get("/api/v1/admin/users", params={"role": "patient", "status": "suspended"})).json()
+
+    assert [user["id"] for user in body["users"]] == [10, 8, 6, 4, 2]
+    assert body["next_cursor"] is None
+
+
+async def test_invalid_cursor(app):
+    async with client(app) as http:
+        response = await http.get("/api/v1/admin/users", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+async def test_ndjson_export_streams_every_batch(app):
+    async with client(app) as http:
+        response = await http.get("/api/v1/admin/users/export", params={"role": "patient"})
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == list(range(11, 1, -1))
+    assert rows[-1]["nutriologo"] == "Ana López"
+
+
+async def test_csv_export(app):
+    async with client(app) as http:
+        response = await http.get("/api/v1/admin/users/export", params={"format": "csv", "status": "active"})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["id"]) for row in rows] == [11, 9, 7, 5, 3, 1]
+    assert rows[-2]["nutriologo"] == "Ana López"
+    assert rows[0]["nutriologo"] == ""
@@ -0,0 +1,116 @@
+"""
+Unit Tests for the Offline Barcode Catalog
+"""
+import gzip
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from services.nom051 import barcode_catalog
+from services.nom051.barcode_catalog import (
+    BarcodeCatalog, barcode_key, iter_database_products, iter_off_dump, write_catalog
+)
+from services.nom051.product_cache import ProductCache
+from tests.unit.test_product_cache import PRODUCTS_DDL
+
+
+async def _database_products(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'products.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(text(PRODUCTS_DDL))
+        await conn.execute(text("""
+            INSERT INTO productos_nom051 (codigo_barras, nombre, marca, porcion_gramos, calorias,
+                azucares, sodio, exceso_azucares, exceso_sodio, fuente, ingredientes, categoria)
+            VALUES
+                ('7501055300075', 'Refresco', 'Marca', 355, 42, 10.6, 12.25, 1, 0, 'open_food_facts',
+                 'agua, azúcar', 'BEVERAGES'),
+                ('75010553', 'Galletas', NULL, NULL, 480.5, 30, 350, 1, 1, 'manual', NULL, 'CEREALS'),
+                ('ABC', 'Sin código numérico', NULL, NULL, 0, 0, 0, 0, 0, 'manual', NULL, NULL)
+        """))
+    async with engine.connect() as conn:
+        products = [product async for product in iter_database_products(conn)]
+    await engine.dispose()
+    return products
+
+
+@pytest.mark.asyncio
+async def test_catalog_roundtrip_matches_database_render(tmp_path):
+    products = await _database_products(tmp_path)
+    path = str(tmp_path / "catalog.bin")
+
+    assert write_catalog(path, products) == 2
+    catalog = BarcodeCatalog(path)
+    assert len(catalog) == 2
+
+    for product in products[:2]:
+        assert catalog.get(product["codigo_barras"]) == product
+    assert list(catalog.get("7501055300075")) == list(products[0])
+    assert catalog.get("7501055300076") is None
+    assert catalog.get("ABC") is None
+    assert "75010553" in catalog
+    catalog.close()
+
+
+def test_barcode_key():
+    assert barcode_key("75010553") == 75010553
+    assert barcode_key("00012345678905") == 12345678905
+    assert barcode_key("1234567") is None
+    assert barcode_key("75O1055300075") is None
+
+
+def test_first_duplicate_wins(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    write_catalog(path, [
+        {"id": 7, "codigo_barras": "7501055300075", "nombre": "Base de datos", "fuente": "manual"},
+        {"codigo_barras": "7501055300075", "nombre": "Open Food Facts", "fuente": "open_food_facts"},
+    ])
+    product = BarcodeCatalog(path).get("7501055300075")
+    assert (product["id"], product["nombre"]) == (7, "Base de datos")
+
+
+def test_off_dump_parsing(tmp_path):
+    header = ["code", "product_name", "brands", "categories", "countries_tags", "image_url",
+              "ingredients_text", "energy-kcal_100g", "proteins_100g", "carbohydrates_100g",
+              "sugars_100g", "fat_100g", "saturated-fat_100g", "trans-fat_100g", "fiber_100g", "sodium_100g"]
+    rows = [
+        ["7501055300075", "Refresco", "Marca", "Bebidas", "en:mexico", "", "agua, cafeína",
+         "42", "0", "10.6", "10.6", "0", "0", "", "", "0.012"],
+        ["3017620422003", "Crema", "Otra", "Spreads", "en:france", "", "", "539", "", "", "", "", "", "", "", ""],
+        ["12", "Código corto", "", "", "en:mexico", "", "", "", "", "", "", "", "", "", "", ""],
+    ]
+    dump = tmp_path / "dump.csv.gz"
+    with gzip.open(dump, "wt", encoding="utf-8") as handle:
+        for row in [header] + rows:
+            handle.write("\t".join(row) + "\n")
+
+    products = list(iter_off_dump(str(dump)))
+    assert [p["codigo_barras"] for p in products] == ["7501055300075"]
+    refresco = products[0]
+    assert refresco["sodio"] == pytest.approx(12.0)
+    assert refresco["categoria"] == "BEVERAGES"
+    assert refresco["contiene_cafeina"] and refresco["exceso_azucares"]
+    assert refresco["imagen_url"] is None
+
+    assert len(list(iter_off_dump(str(dump), country=None))) == 2
+
+
+@pytest.mark.asyncio
+async def test_product_cache_consults_catalog_before_database(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.bin")
+    write_catalog(path, [{"id": 3, "codigo_barras": "7501055300075", "nombre": "Refresco", "fuente": "manual"}])
+    catalog = BarcodeCatalog(path)
+    monkeypatch.setattr(barcode_catalog, "get_barcode_catalog", lambda: catalog)
+
+    class NoDatabase:
+        async def execute(self, *args, **kwargs):
+            raise AssertionError("database should not be queried")
+
+    cache = ProductCache(max_entries=10, use_redis=False)
+    assert (await cache.lookup("7501055300075", NoDatabase()))["nombre"] == "Refresco"
+    assert cache.stats()["snapshot_hits"] == 1
+    assert cache.stats()["snapshot_products"] == 1
+
+    # Tras reescribir el producto, el catálogo deja de ser válido para ese código
+    await cache.invalidate("7501055300075")
+    assert cache._snapshot_get("7501055300075") is None
@@ -0,0 +1,69 @@
+"""
+Unit Tests for the Chat Response Cache
+"""
+import pytest
+
+from services.ai.response_cache import ChatResponseCache, normalize_chat_message
+
+
+@pytest.fixture
+def cache():
+    return ChatResponseCache(max_entries=2, ttl_seconds=60, use_redis=False)
+
+
+@pytest.mark.unit
+class TestChatResponseCache:
+    """Unit tests for ChatResponseCache"""
+
+    def test_equivalent_questions_share_key(self, cache):
+        a = cache.make_key("¿Cuántas calorías tiene un taco al pastor?", "v1")
+        b = cache.make_key("cuantas CALORIAS tiene el taco, al pastor", "v1")
+        assert a == b
+        assert normalize_chat_message("¿Cuántas calorías tiene un taco al pastor?") == "calorias taco pastor"
+
+    def test_polarity_words_are_part_of_key(self, cache):
+        for first, second in [
+            ("¿Puedo comer pan sin gluten?", "¿Puedo comer pan con gluten?"),
+            ("café sin azúcar", "café con azúcar"),
+            ("¿Es muy dulce?", "¿Es dulce?"),
+            ("más fibra", "fibra"),
+            ("menos sal", "sal"),
+            ("¿Puedo comer huevo? no", "¿Puedo comer huevo?"),
+        ]:
+            assert cache.make_key(first, "v1") != cache.make_key(second, "v1")
+
+    def test_prompt_version_changes_key(self, cache):
+        assert cache.make_key("taco al pastor", "v1") != cache.make_key("taco al pastor", "v2")
+
+    def test_empty_message_is_not_cacheable(self, cache):
+        assert cache.make_key("¿¿??", "v1") is None
+
+    def test_personalized_requests_are_not_cacheable(self):
+        assert ChatResponseCache.is_cacheable([], None)
+        assert not ChatResponseCache.is_cacheable([{"role": "user", "content": "hola"}], None)
+        assert not ChatResponseCache.is_cacheable([], {"has_patient_profile": True})
+
+    async def test_hit_miss_and_lru_eviction(self, cache):
+        assert await cache.get("a") is None
+        await cache.set("a", {"response": "A"})
+        await cache.set("b", {"response": "B"})
+        assert await cache.get("a") == {"response": "A"}
+
+        await cache.set("c", {"response": "C"})  # evicts "b" (least recently used)
+        assert await cache.get("b") is None
+        assert await cache.get("a") is not None
+
+        stats = cache.stats()
+        assert stats["local_hits"] == 2
+        assert stats["misses"] == 2
+        assert stats["evictions"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    async def test_entries_expire(self, cache, monkeypatch):
+        await cache.set("a", {"response": "A"})
+        real_monotonic = __import__("time").monotonic
+        monkeypatch.setattr(
+            "services.ai.response_cache.time.monotonic", lambda: real_monotonic() + 120
+        )
+        assert await cache.get("a") is None
+        assert cache.stats()["entries"] == 0
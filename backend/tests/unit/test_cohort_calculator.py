@@ -0,0 +1,69 @@
+"""
+Unit Tests for the Vectorized Cohort Nutrition Calculator
+"""
+import random
+
+import numpy as np
+import pytest
+
+from domain.nutritionists.cohort_calculator import CohortCalculator, round_like_python
+from domain.nutritionists.kilocalorie_calculator import (
+    ActivityLevel, Gender, KilocalorieCalculator, MacroDistribution, NutritionalGoal, PatientProfile
+)
+
+
+def random_profiles(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        PatientProfile(
+            age=rng.randint(18, 90),
+            weight=round(rng.uniform(40, 160), rng.choice([0, 1, 2])),
+            height=round(rng.uniform(140, 205), rng.choice([0, 1])),
+            gender=rng.choice(list(Gender)),
+            activity_level=rng.choice(list(ActivityLevel)),
+            goal=rng.choice(list(NutritionalGoal)),
+            is_pregnant=rng.random() < 0.1,
+            is_lactating=rng.random() < 0.1,
+        )
+        for _ in range(count)
+    ]
+
+
+class TestCohortCalculator:
+    """The cohort path must reproduce the scalar calculator exactly"""
+
+    def test_matches_scalar_nutrition_plans(self):
+        profiles = random_profiles(500)
+        distribution = MacroDistribution(protein_percentage=20, carbs_percentage=50, fat_percentage=30)
+        scalar = KilocalorieCalculator()
+
+        rows = list(CohortCalculator().calculate_profiles(profiles, distribution).rows())
+
+        assert len(rows) == len(profiles)
+        for profile, row in zip(profiles, rows):
+            plan = scalar.create_nutrition_plan(profile, distribution)
+            assert row == {
+                "calculations": plan["calculations"],
+                "equivalents_prescription": plan["equivalents_prescription"],
+                "plan_summary": plan["plan_summary"],
+            }
+
+    def test_accepts_enum_values_and_checks_lengths(self):
+        plan = CohortCalculator().calculate(
+            age=[30], weight=[70.0], height=[170.0], gender=["masculino"],
+            activity_level=["moderado"], goal=["mantener"]
+        )
+        assert plan.bmr.tolist() == [1617.5]
+        assert plan.tdee.tolist() == [2507.0]
+
+        with pytest.raises(ValueError, match="weight"):
+            CohortCalculator().calculate(
+                age=[30, 40], weight=[70.0], height=[170.0, 160.0], gender=["masculino"] * 2,
+                activity_level=["moderado"] * 2, goal=["mantener"] * 2
+            )
+
+
+def test_round_like_python_handles_ties():
+    values = np.array([0.25, 0.35, 2.675, 1.05, -0.15, 1648.45, 12.3449999])
+    assert round_like_python(values, 1).tolist() == [round(v, 1) for v in values.tolist()]
+    assert round_like_python(np.array([0.5, 1.5, 2.5]), 0).tolist() == [0.0, 2.0, 2.0]
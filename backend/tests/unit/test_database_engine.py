@@ -0,0 +1,92 @@
+"""
+Unit Tests for the Database Engine Layer (pool options, metrics, read routing)
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from core import database
+from core.config import get_settings
+
+
+@pytest.fixture
+def settings():
+    return get_settings().model_copy(update={
+        "db_pool_size": 7,
+        "db_max_overflow": 3,
+        "db_pool_timeout": 2.5,
+        "db_pool_recycle": 900,
+        "db_pool_pre_ping": False,
+        "db_statement_cache_size": 256,
+        "db_command_timeout": 15.0,
+    })
+
+
+def test_asyncpg_engine_options(settings):
+    options = database.engine_options("postgresql+asyncpg://u:p@db/app", settings)
+
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert options["pool_timeout"] == 2.5
+    assert options["pool_recycle"] == 900
+    assert options["pool_pre_ping"] is False
+    assert options["connect_args"]["prepared_statement_cache_size"] == 256
+    assert options["connect_args"]["command_timeout"] == 15.0
+    assert "statement_cache_size" not in options["connect_args"]
+
+
+def test_statement_cache_disabled_for_pgbouncer(settings):
+    settings = settings.model_copy(update={"db_statement_cache_size": 0})
+    connect_args = database.engine_options("postgresql+asyncpg://u:p@db/app", settings)["connect_args"]
+
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert connect_args["statement_cache_size"] == 0
+
+
+def test_sync_postgres_engine_has_pool_but_no_asyncpg_args(settings):
+    options = database.engine_options("postgresql://u:p@db/app", settings)
+
+    assert options["pool_size"] == 7
+    assert "connect_args" not in options
+
+
+def test_sqlite_keeps_default_pool(settings):
+    options = database.engine_options("sqlite+aiosqlite:///:memory:", settings)
+
+    assert set(options) == {"echo", "pool_pre_ping"}
+
+
+def test_pool_metrics_track_checkouts(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "_pools", {})
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}", pool_size=2, max_overflow=0)
+    database._track_pool("sync", engine)
+
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("select 1"))
+        second.execute(text("select 1"))
+        busy = database.pool_metrics()["sync"]
+
+    idle = database.pool_metrics()["sync"]
+    assert busy["checked_out"] == 2
+    assert idle["checked_out"] == 0
+    assert idle["checkouts"] == 2
+    assert idle["peak_checked_out"] == 2
+    assert idle["connections_created"] == 2
+    engine.dispose()
+
+
+async def test_read_session_falls_back_to_primary(monkeypatch):
+    monkeypatch.setattr(database, "AsyncSessionLocal", None)
+    monkeypatch.setattr(database, "AsyncReadSessionLocal", None)
+    monkeypatch.setattr(database, "_pools", {})
+    monkeypatch.setattr(database, "get_settings", lambda: get_settings().model_copy(update={
+        "database_url": "sqlite+aiosqlite:///:memory:", "database_read_url": None,
+    }))
+
+    database.init_database()
+    try:
+        assert database.async_read_engine is database.async_engine
+        async for session in database.get_read_session():
+            assert (await session.exec(text("select 1"))).one() == (1,)
+        assert set(database._pools) == {"sync", "async"}
+    finally:
+        await database.close_db()
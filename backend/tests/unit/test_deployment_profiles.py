@@ -0,0 +1,67 @@
+"""
+Unit Tests for Deployment Profiles (router groups per process)
+"""
+import httpx
+import pytest
+
+from core import deployment
+from core.deployment import PROFILE_GROUPS, profile_label, resolve_profiles
+from core.security import UserRole, require_admin
+
+
+def test_resolve_profiles_defaults_to_every_group():
+    assert resolve_profiles(None) == frozenset(PROFILE_GROUPS)
+    assert resolve_profiles("all") == frozenset(PROFILE_GROUPS)
+    assert resolve_profiles("") == frozenset(PROFILE_GROUPS)
+
+
+def test_resolve_profiles_accepts_comma_separated_groups():
+    assert resolve_profiles(" Core, admin ") == frozenset({"core", "admin"})
+    assert resolve_profiles(["scanner"]) == frozenset({"scanner"})
+
+
+def test_resolve_profiles_rejects_unknown_group():
+    with pytest.raises(ValueError, match="vision"):
+        resolve_profiles("core,vision")
+
+
+def test_profile_label():
+    assert profile_label(PROFILE_GROUPS) == "all"
+    assert profile_label({"admin", "core"}) == "core,admin"
+
+
+class _Component:
+    def stats(self):
+        return {"hits": 3}
+
+
+def test_collect_metrics_only_reads_active_groups(monkeypatch):
+    monkeypatch.setitem(deployment.METRIC_SOURCES, "scanner", {"cache": f"{__name__}:_Component"})
+    monkeypatch.setitem(deployment.METRIC_SOURCES, "ai", {"broken": f"{__name__}:missing"})
+
+    assert deployment.collect_metrics({"scanner"}) == {"cache": {"hits": 3}}
+    assert "error" in deployment.collect_metrics({"ai"})["broken"]
+
+
+async def test_create_application_mounts_only_profile_routers(monkeypatch):
+    import main
+
+    monkeypatch.setitem(deployment.METRIC_SOURCES, "scanner", {"cache": f"{__name__}:_Component"})
+    app = main.create_application("scanner")
+    app.dependency_overrides[require_admin] = lambda: UserRole.ADMIN
+    paths = {route.path for route in app.routes}
+
+    assert any(path.startswith("/api/v1/scanner/") for path in paths)
+    assert not any(path.startswith(("/api/v1/foods", "/api/v1/vision", "/api/v1/patients")) for path in paths)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        health = (await client.get("/health")).json()
+        metrics = (await client.get("/metrics")).json()
+        app.dependency_overrides.clear()
+        anonymous = await client.get("/metrics")
+
+    assert health["profile"] == "scanner"
+    assert metrics["routers"] == ["scanner"]
+    assert metrics["components"] == {"cache": {"hits": 3}}
+    assert anonymous.status_code in (401, 403)
@@ -0,0 +1,125 @@
+"""
+Unit Tests for the Email Service
+
+Runs against a minimal local SMTP debugging server (no TLS, no auth), so no
+network access or external SMTP account is needed.
+"""
+import socketserver
+import threading
+from email import message_from_bytes
+
+import pytest
+
+from services.email_service import EmailService, render_template
+
+
+class DebugSMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for ``smtplib`` and records every message"""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost debug SMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                    data += data_line
+                server.messages.append(message_from_bytes(data))
+                self.reply("250 Queued")
+                if server.drop_after_each:
+                    return
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class DebugSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), DebugSMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.drop_after_each = False
+
+
+@pytest.fixture
+def smtp_server():
+    server = DebugSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(smtp_server, monkeypatch):
+    monkeypatch.setenv("EMAIL_HOST", "127.0.0.1")
+    monkeypatch.setenv("EMAIL_PORT", str(smtp_server.server_address[1]))
+    monkeypatch.setenv("EMAIL_USE_TLS", "false")
+    monkeypatch.setenv("EMAIL_USERNAME", "")
+    monkeypatch.setenv("EMAIL_FROM", "no-reply@example.com")
+    monkeypatch.setenv("EMAIL_POOL_SIZE", "1")
+    service = EmailService()
+    yield service
+    service.pool.close()
+
+
+@pytest.mark.unit
+class TestEmailService:
+    """Unit tests for EmailService"""
+
+    def test_reuses_one_connection(self, service, smtp_server):
+        for i in range(5):
+            assert service.send_welcome_email(f"user{i}@example.com", "Ana") is True
+
+        assert len(smtp_server.messages) == 5
+        assert smtp_server.connections == 1
+        assert smtp_server.messages[0]["To"] == "user0@example.com"
+
+    def test_reconnects_when_server_drops_connection(self, service, smtp_server):
+        smtp_server.drop_after_each = True
+        for i in range(3):
+            assert service.send_password_reset_email(f"user{i}@example.com", "Ana", "tok") is True
+
+        assert len(smtp_server.messages) == 3
+        assert service.pool.stats["reconnects"] == 2
+
+    def test_unreachable_server_returns_false(self, monkeypatch):
+        monkeypatch.setenv("EMAIL_HOST", "127.0.0.1")
+        monkeypatch.setenv("EMAIL_PORT", "1")
+        monkeypatch.setenv("EMAIL_USE_TLS", "false")
+        assert EmailService().send_welcome_email("user@example.com", "Ana") is False
+
+    async def test_background_queue(self, service, smtp_server):
+        for i in range(4):
+            await service.enqueue_welcome_email(f"user{i}@example.com", "Ana")
+        await service.shutdown()
+
+        assert len(smtp_server.messages) == 4
+        assert service.stats()["sent"] == 4
+
+    def test_html_template_escapes_values(self):
+        html = render_template("welcome.html", user_name="<b>Ana</b>", app_url="https://app")
+        assert "&lt;b&gt;Ana&lt;/b&gt;" in html
+        assert "https://app/dashboard" in html
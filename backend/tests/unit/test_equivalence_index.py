@@ -0,0 +1,88 @@
+"""
+Unit Tests for the Equivalence Suggestion Index
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from domain.foods.equivalences import EquivalenceGroup
+from services.foods.equivalence_index import EquivalenceSuggestionIndex
+
+
+def make_pair(food_id, name, group, calories, protein, carbs, fat, portion=1.0, allergens=None):
+    equivalence = SimpleNamespace(
+        id=food_id,
+        equivalence_group=group,
+        standard_portion=portion,
+        standard_unit="pieza",
+        calories_per_equivalent=calories,
+        protein_per_equivalent=protein,
+        carbs_per_equivalent=carbs,
+        fat_per_equivalent=fat,
+        notes=None,
+    )
+    food = SimpleNamespace(id=food_id, name=name, allergens=allergens)
+    return equivalence, food
+
+
+@pytest.fixture
+def index():
+    index = EquivalenceSuggestionIndex()
+    frutas = EquivalenceGroup.FRUTAS  # estándar: 60 kcal, 0 g proteína, 15 g carbohidratos, 0 g grasa
+    index.build([
+        make_pair(1, "Manzana", frutas, 60, 0.0, 15.0, 0.0, portion=1),
+        make_pair(2, "Plátano", frutas, 70, 0.5, 17.0, 0.2, portion=0.5),
+        make_pair(3, "Mango", frutas, 90, 1.0, 22.0, 0.5, portion=0.5),
+        make_pair(4, "Kiwi", frutas, 62, 0.8, 14.0, 0.3, portion=1.5, allergens=["Kiwi"]),
+        make_pair(5, "Fresas con nuez", frutas, 80, 1.5, 13.0, 3.0, portion=1, allergens=["Nuez de la India"]),
+        make_pair(6, "Pan", EquivalenceGroup.CEREALES, 70, 2.0, 15.0, 0.0, allergens=["gluten"]),
+    ])
+    return index
+
+
+@pytest.mark.unit
+class TestEquivalenceSuggestionIndex:
+    """Unit tests for EquivalenceSuggestionIndex"""
+
+    def test_ranks_by_closeness_to_standard(self, index):
+        suggestions = index.suggestions(EquivalenceGroup.FRUTAS, 2.0, limit=3)
+        assert [s["food_id"] for s in suggestions] == [1, 4, 2]
+        assert suggestions[0]["portion_needed"] == 2
+        assert suggestions[0]["calories"] == 120
+
+    def test_explicit_macro_targets(self, index):
+        suggestions = index.suggestions(
+            EquivalenceGroup.FRUTAS, 1.0, limit=2, target_macros={"calories": 90, "carbs": 22}
+        )
+        assert suggestions[0]["food_id"] == 3
+
+    def test_exclusion_and_allergen_bitsets(self, index):
+        ranked = index.suggestions(
+            EquivalenceGroup.FRUTAS, 1.0, exclude_food_ids=[1, 99], exclude_allergens=["kiwi", "NUEZ"]
+        )
+        assert sorted(s["food_id"] for s in ranked) == [2, 3]
+
+        # Todos excluidos o grupo sin candidatos
+        assert index.suggestions(EquivalenceGroup.CEREALES, 1.0, exclude_allergens=["Gluten"]) == []
+        assert index.suggestions(EquivalenceGroup.VERDURAS, 1.0) == []
+
+    def test_alternatives_keep_response_shape(self, index):
+        alternatives = index.alternatives(EquivalenceGroup.FRUTAS, limit=10)
+        assert len(alternatives) == 5
+        assert alternatives[0] == {
+            "food_id": 1,
+            "food_name": "Manzana",
+            "standard_portion": 1,
+            "standard_unit": "pieza",
+            "calories_per_equivalent": 60,
+            "protein_per_equivalent": 0.0,
+            "carbs_per_equivalent": 15.0,
+            "fat_per_equivalent": 0.0,
+            "notes": None,
+        }
+
+    def test_invalidate(self, index):
+        assert not index.needs_refresh
+        index.invalidate()
+        assert index.needs_refresh
+        assert index.stats()["groups"] == {"frutas": 5, "cereales": 1}
@@ -0,0 +1,89 @@
+"""
+Unit Tests for the SMAE Equivalents Solver
+"""
+import itertools
+
+import numpy as np
+
+from domain.foods.equivalences import EquivalenceGroup, SMAE_GROUP_STANDARDS
+from domain.foods.equivalents_solver import EquivalentsSolver
+from domain.nutritionists.kilocalorie_calculator import (
+    ActivityLevel, Gender, KilocalorieCalculator, NutritionalGoal, PatientProfile
+)
+from domain.patients.nutrition_calculator import EquivalenceDistributor
+from domain.patients.nutrition_calculator import NutritionalGoal as PatientGoal
+
+
+def objective(solver, groups, amounts, targets):
+    matrix = solver._matrix(groups)
+    return float((((matrix @ np.array(amounts) - targets) / targets) ** 2 * solver.weights).sum())
+
+
+class TestEquivalentsSolver:
+    """Test the relaxed QP + integer local search solver"""
+
+    def test_matches_exhaustive_search(self):
+        groups = (EquivalenceGroup.CEREALES, EquivalenceGroup.AOA_BAJO_GRASA,
+                  EquivalenceGroup.GRASAS_SIN_PROTEINA, EquivalenceGroup.FRUTAS)
+        solver = EquivalentsSolver(regularization=0.0, calorie_quantum=1e-3, split_quantum=1e-4)
+        low, high = solver.bounds(groups)
+        grid = list(itertools.product(*(np.arange(lo, hi + 0.25, 0.5) for lo, hi in zip(low, high))))
+
+        for calories, protein, carbs, fat in [(1200, 60, 150, 40), (1500, 80, 180, 45), (900, 50, 110, 30)]:
+            targets = np.array([calories, protein, carbs, fat], dtype=float)
+            solution = solver.solve(groups, calories, protein, carbs, fat)
+            best = min(objective(solver, groups, amounts, targets) for amounts in grid)
+            found = objective(solver, groups, [a for _, a in solution.equivalents], targets)
+            assert found <= best + 1e-9
+
+    def test_respects_bounds_steps_and_conditions(self):
+        groups = KilocalorieCalculator.EQUIVALENTS_PRIORITY
+        solution = EquivalentsSolver().solve(groups, 2000, 75, 300, 55, conditions=["has_diabetes"])
+
+        for group, amount in solution.equivalents:
+            standard = SMAE_GROUP_STANDARDS[group]
+            assert standard["min_daily"] <= amount <= standard["max_daily"]
+            assert amount * 2 == int(amount * 2)
+        assert dict(solution.equivalents)[EquivalenceGroup.AZUCARES_SIN_GRASA] == 0
+
+    def test_memoizes_on_quantized_key(self):
+        groups = KilocalorieCalculator.EQUIVALENTS_PRIORITY
+        solver = EquivalentsSolver()
+
+        first = solver.solve(groups, 2001, 75.0, 300.0, 55.6)
+        second = solver.solve(groups, 1999, 75.1, 300.1, 55.5)
+        solver.solve(groups, 2001, 75.0, 300.0, 55.6, conditions=["is_pregnant"])
+
+        assert first.equivalents == second.equivalents
+        assert second.target_calories == 1999
+        assert solver.cache_info()["hits"] == 1
+        assert solver.cache_info()["misses"] == 2
+
+
+class TestCalculatorIntegration:
+    """The optimized paths must beat the greedy heuristics on macro error"""
+
+    def test_optimized_plan_is_more_accurate(self):
+        calculator = KilocalorieCalculator()
+        profile = PatientProfile(
+            age=35, weight=72, height=165, gender=Gender.FEMENINO,
+            activity_level=ActivityLevel.MODERADO, goal=NutritionalGoal.MANTENER
+        )
+        greedy = calculator.create_nutrition_plan(profile)
+        optimized = calculator.create_nutrition_plan(profile, optimize_equivalents=True)
+
+        assert optimized["distribution_method"] == "optimized"
+        assert optimized["calculations"] == greedy["calculations"]
+        greedy_error = abs(greedy["plan_summary"]["calories_accuracy"] - 100)
+        optimized_error = abs(optimized["plan_summary"]["calories_accuracy"] - 100)
+        assert optimized_error < greedy_error
+
+    def test_distributor_optimal_uses_goal_pattern_groups(self):
+        distributor = EquivalenceDistributor(1800, PatientGoal.WEIGHT_LOSS)
+        greedy = distributor.distribute_to_equivalents()
+        optimal = distributor.distribute_optimal()
+
+        assert set(optimal) <= set(g.value for g in distributor.DISTRIBUTION_PATTERNS[PatientGoal.WEIGHT_LOSS])
+        assert abs(distributor.calculate_actual_calories(optimal) - 1800) <= abs(
+            distributor.calculate_actual_calories(greedy) - 1800
+        )
@@ -0,0 +1,49 @@
+"""
+Unit Tests for Commit-Time Cache Invalidation
+"""
+from sqlalchemy import Column, Integer, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from core.invalidation import on_committed_writes
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer)
+
+
+calls = []
+on_committed_writes((Item,), calls.append, collect=lambda target, event_name: [(event_name, target.owner_id)])
+
+
+def test_callback_runs_once_per_commit_with_values_in_order():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    calls.clear()
+
+    with Session(engine) as session:
+        item = Item(id=1, owner_id=7)
+        session.add_all([item, Item(id=2, owner_id=8)])
+        session.flush()
+        assert calls == []
+        session.delete(item)
+        session.commit()
+
+    assert calls == [[("after_insert", 7), ("after_insert", 8), ("after_delete", 7)]]
+
+
+def test_rollback_discards_pending_values():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    calls.clear()
+
+    with Session(engine) as session:
+        session.add(Item(id=1, owner_id=7))
+        session.flush()
+        session.rollback()
+        session.commit()
+
+    assert calls == []
@@ -0,0 +1,162 @@
+"""
+Unit Tests for the Laboratory Interpretation Rule Engine
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import domain  # noqa: F401
+from domain.patients.lab_rules import LabRule, LabRuleEngine, get_lab_rule_engine, scan_lab_values
+from domain.patients.laboratory import LaboratoryData, LabTestType, Severity
+from services.laboratory.clinical_text import analyze_clinical_text
+from services.laboratory.reanalysis import (
+    LabReanalysisJob, LabReanalysisRunner, ReanalysisJobConflict, reanalysis_jobs_table
+)
+
+
+def make_lab(**values):
+    return LaboratoryData(
+        patient_id=values.pop("patient_id", 1),
+        study_date=date(2025, 1, 15),
+        test_type=LabTestType.BLOOD_CHEMISTRY,
+        laboratory_name="Test Lab",
+        **values
+    )
+
+
+class TestLabRuleEngine:
+    """Test the compiled rule table"""
+
+    def test_batch_matches_single_record_interpretation(self):
+        engine = get_lab_rule_engine()
+        labs = [
+            make_lab(fasting_glucose_mgdl=130, alt_tgp_UI_l=90),
+            make_lab(fasting_glucose_mgdl=95, hemoglobin_g_dl=11.0),
+            make_lab(alt_tgp_UI_l=40, vitamin_d_ng_ml=15),
+        ]
+
+        batch = engine.interpret(labs)
+
+        assert batch == [lab.generate_ai_interpretation() for lab in labs]
+        assert [v["severity"] for v in batch[0]["out_of_range_values"]] == [
+            Severity.SEVERE.value, Severity.MODERATE.value
+        ]
+        # ALT of exactly 40 is within range; vitamin D 15 is deficient
+        assert [v["parameter"] for v in batch[2]["out_of_range_values"]] == ["Vitamina D"]
+
+    def test_zero_values_are_treated_as_not_reported(self):
+        interpretation = make_lab(hemoglobin_g_dl=0.0, vitamin_d_ng_ml=0.0).generate_ai_interpretation()
+        assert interpretation["out_of_range_values"] == []
+
+    def test_overlapping_bands_rejected(self):
+        rules = [
+            LabRule("creatinine_mgdl", "Creatinina", "", Severity.MILD, "a", low=1.2, high=2.0),
+            LabRule("creatinine_mgdl", "Creatinina", "", Severity.SEVERE, "b", low=1.5),
+        ]
+        with pytest.raises(ValueError):
+            LabRuleEngine(rules)
+
+
+class TestClinicalTextScanner:
+    """Test the precompiled multi-parameter scanner"""
+
+    def test_scans_every_parameter_once(self):
+        text = (
+            "Glucosa: 126 mg/dL\nColesterol  total 210\nColesterol HDL: 38\n"
+            "Hemoglobina glucosilada 6,1 %\nHemoglobina 13.2\nGlucosa 99\n"
+            "TRIGLICERIDOS (mg/dL): 180"
+        )
+        values = {v["parameter"]: v["value"] for v in scan_lab_values(text)}
+
+        assert values == {
+            "Glucosa": 126.0,
+            "Hemoglobina A1c": 6.1,
+            "Colesterol Total": 210.0,
+            "Colesterol HDL": 38.0,
+            "Triglicéridos": 180.0,
+            "Hemoglobina": 13.2,
+        }
+
+    def test_sampling_time_is_not_taken_as_value(self):
+        def value(text):
+            return [v["value"] for v in scan_lab_values(text)]
+
+        assert value("Glucosa postprandial 2h: 180") == [180.0]
+        assert value("Glucosa postprandial (2 hrs) = 175 mg/dL") == [175.0]
+        assert value("Glucosa 30 min 150") == [150.0]
+        assert value("Glucosa postprandial 2h") == []
+
+    def test_document_type_last_match_wins(self):
+        analysis = analyze_clinical_text("Resultados: glucosa 90. Receta: metformina")
+        assert analysis["document_type"] == "prescription"
+        assert analysis["keywords_found"] == ["resultados de laboratorio", "receta médica"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_reanalysis_updates_records(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'labs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync: LaboratoryData.__table__.create(sync))
+        await conn.run_sync(reanalysis_jobs_table.create)
+        for i in range(7):
+            await conn.execute(LaboratoryData.__table__.insert().values(
+                patient_id=1 + i % 2,
+                study_date=date(2025, 1, 1 + i),
+                test_type=LabTestType.BLOOD_CHEMISTRY.name,
+                laboratory_name="Test Lab",
+                fasting_glucose_mgdl=100 + 10 * i,
+                fasting_insulin_uUI_ml=10.0,
+                created_at=date(2025, 1, 1),
+            ))
+
+    runner = LabReanalysisRunner(engine=engine)
+    job = await runner.submit(LabReanalysisJob(patient_id=1, batch_size=2))
+    await runner.wait(job.id)
+
+    # Otro worker (otro runner) ve el estado guardado en la tabla
+    stored = await LabReanalysisRunner(engine=engine).get(job.id)
+    assert stored.status == "completed"
+    assert (stored.processed, stored.batches) == (4, 2)
+    assert stored.finished_at is not None
+
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
+            LaboratoryData.__table__.select().order_by(LaboratoryData.__table__.c.id)
+        )).mappings().all()
+    await engine.dispose()
+
+    for row in rows:
+        if row["patient_id"] == 1:
+            expected = make_lab(fasting_glucose_mgdl=row["fasting_glucose_mgdl"]).generate_ai_interpretation()
+            assert row["ai_interpretation"] == expected
+            assert row["homa_ir"] == pytest.approx(row["fasting_glucose_mgdl"] * 10 / 405)
+        else:
+            assert row["ai_interpretation"] is None
+            assert row["homa_ir"] is None
+
+
+@pytest.mark.asyncio
+async def test_one_active_reanalysis_job_at_a_time(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(reanalysis_jobs_table.create)
+        # Trabajo activo de otro worker
+        await conn.execute(reanalysis_jobs_table.insert().values(
+            id="running1", status="running", patient_id=1, batch_size=500, processed=10, batches=1,
+            created_at=datetime.utcnow(), elapsed_seconds=1.0, heartbeat_at=datetime.utcnow(), active_slot=1,
+        ))
+
+    runner = LabReanalysisRunner(engine=engine)
+    same = await runner.submit(LabReanalysisJob(patient_id=1))
+    assert (same.id, same.processed) == ("running1", 10)
+    with pytest.raises(ReanalysisJobConflict):
+        await runner.submit(LabReanalysisJob(patient_id=2))
+
+    # Sin heartbeat reciente el trabajo se da por interrumpido y libera el lugar
+    runner.stale_after = timedelta(0)
+    assert (await runner.get("running1")).status == "interrupted"
+    job = await runner.submit(LabReanalysisJob(patient_id=2))
+    assert job.id != "running1"
+    await runner.wait(job.id)
+    await engine.dispose()
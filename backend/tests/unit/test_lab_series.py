@@ -0,0 +1,132 @@
+"""
+Unit Tests for the Columnar Lab Time Series
+"""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from services.laboratory.lab_series import PARAMETERS, LabSeries, LabSeriesCache
+
+
+def make_row(lab_id, study_date, **values):
+    return (lab_id, study_date) + tuple(values.get(name) for name in PARAMETERS)
+
+
+@pytest.fixture
+def series():
+    return LabSeries.from_rows(7, [
+        make_row(3, date(2024, 3, 1), fasting_glucose_mgdl=110, hdl_cholesterol_mgdl=38),
+        make_row(1, date(2024, 1, 1), fasting_glucose_mgdl=130, hdl_cholesterol_mgdl=35,
+                 total_cholesterol_mgdl=200),
+        make_row(2, date(2024, 1, 31), fasting_glucose_mgdl=120),
+    ])
+
+
+class TestLabSeries:
+    """Test vectorized trend computation"""
+
+    def test_rows_sorted_by_study_date(self, series):
+        assert series.ids.tolist() == [1, 2, 3]
+        assert series.points("fasting_glucose_mgdl") == [
+            {"date": "2024-01-01", "value": 130.0},
+            {"date": "2024-01-31", "value": 120.0},
+            {"date": "2024-03-01", "value": 110.0},
+        ]
+        assert series.points("hdl_cholesterol_mgdl")[-1] == {"date": "2024-03-01", "value": 38.0}
+
+    def test_summarize_matches_scalar_definitions(self, series):
+        summary = series.summarize(["fasting_glucose_mgdl", "hdl_cholesterol_mgdl", "total_cholesterol_mgdl"])
+
+        assert summary.count.tolist() == [3, 2, 1]
+        assert summary.first[:2].tolist() == [130.0, 35.0]
+        assert summary.last[:2].tolist() == [110.0, 38.0]
+        # Lower glucose is better; higher HDL is better
+        assert summary.direction[:2].tolist() == [1, 1]
+        assert summary.percent_change[0] == pytest.approx((110 - 130) / 130 * 100)
+
+        x = np.array([0, 30, 60]) / 30
+        expected_slope = np.polyfit(x, [130, 120, 110], 1)[0]
+        assert summary.slope_per_month[0] == pytest.approx(expected_slope)
+
+    def test_out_of_range_flags(self, series):
+        summary = series.summarize(["fasting_glucose_mgdl", "hdl_cholesterol_mgdl", "total_cholesterol_mgdl"])
+
+        # Glucose 110 > 99, HDL 38 < 40, total cholesterol "<200" excludes 200
+        assert summary.last_out_of_range.tolist() == [True, True, True]
+        assert summary.out_of_range_count.tolist() == [3, 2, 1]
+
+    def test_since_window_and_unknown_parameters(self, series):
+        window = series.since(date(2024, 1, 15))
+        assert window.ids.tolist() == [2, 3]
+
+        summary = window.summarize(["fasting_glucose_mgdl", "not_a_parameter"])
+        assert summary.parameters == ["fasting_glucose_mgdl"]
+        assert summary.first.tolist() == [120.0]
+
+    def test_compare_with_previous_study(self, series):
+        changes = series.compare(3, ["fasting_glucose_mgdl", "hdl_cholesterol_mgdl"])
+
+        # HDL is missing in study 2, so only glucose is compared
+        assert len(changes) == 1
+        param, current, previous, direction, percent = changes[0]
+        assert (param, current, previous, direction) == ("fasting_glucose_mgdl", 110.0, 120.0, 1)
+        assert percent == pytest.approx(-8.3333, abs=1e-4)
+        assert series.compare(1, ["fasting_glucose_mgdl"]) == []
+
+    def test_empty_series(self):
+        summary = LabSeries.empty(1).summarize(["fasting_glucose_mgdl"])
+        assert summary.count.tolist() == [0]
+        assert summary.last_out_of_range.tolist() == [False]
+
+
+class TestLabSeriesCache:
+    """Test per-patient caching and invalidation"""
+
+    def test_get_many_loads_only_missing(self, monkeypatch, series):
+        import services.laboratory.lab_series as lab_series
+
+        loaded = []
+
+        def fake_load(session, patient_ids):
+            loaded.append(list(patient_ids))
+            return {pid: LabSeries.empty(pid) for pid in patient_ids}
+
+        monkeypatch.setattr(lab_series, "load_series", fake_load)
+        cache = LabSeriesCache()
+        cache._put(series)
+
+        result = cache.get_many(None, [7, 8, 9])
+        assert list(result) == [7, 8, 9]
+        assert result[7] is series
+        assert loaded == [[8, 9]]
+
+        cache.invalidate([7])
+        cache.get_many(None, [7, 8])
+        assert loaded[-1] == [7]
+        assert cache.stats()["invalidations"] == 1
+
+    async def test_get_many_async_runs_loader_in_session(self, monkeypatch, series):
+        import services.laboratory.lab_series as lab_series
+
+        monkeypatch.setattr(
+            lab_series, "load_series", lambda session, ids: {pid: LabSeries.empty(pid) for pid in ids}
+        )
+
+        class FakeAsyncSession:
+            calls = 0
+
+            async def run_sync(self, fn, *args):
+                FakeAsyncSession.calls += 1
+                return fn("sync-session", *args)
+
+        cache = LabSeriesCache()
+        cache._put(series)
+        session = FakeAsyncSession()
+
+        assert await cache.get_async(session, 7) is series
+        assert FakeAsyncSession.calls == 0
+
+        result = await cache.get_many_async(session, [8, 7])
+        assert list(result) == [8, 7]
+        assert FakeAsyncSession.calls == 1
@@ -0,0 +1,170 @@
+"""
+Unit Tests for the Clinical File OCR Pipeline
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+fitz = pytest.importorskip("fitz")
+
+import core.database as database  # noqa: E402
+import domain  # noqa: E402, F401
+import domain.patients.laboratory  # noqa: E402, F401
+from domain.patients.laboratory import ClinicalFile  # noqa: E402
+from services.laboratory.ocr_pipeline import ClinicalFileStore, OcrJob, OcrPipeline  # noqa: E402
+
+
+class MemoryStore:
+    """Records every update instead of writing to clinical_files"""
+
+    def __init__(self, pending=None, claimed_elsewhere=()):
+        self.updates = []
+        self.rows = {}
+        self.pending = pending or []
+        self.claimed_elsewhere = set(claimed_elsewhere)
+
+    async def update(self, file_id, owner=None, **values):
+        self.updates.append((file_id, values))
+        self.rows.setdefault(file_id, {}).update(values)
+
+    async def claim(self, owner, stale_before, file_ids=None, limit=None):
+        if file_ids is None:
+            return list(self.pending)[:limit]
+        return [file_id for file_id in file_ids if file_id not in self.claimed_elsewhere]
+
+    async def heartbeat(self, owner, file_ids):
+        pass
+
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for number, text in enumerate(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), text or f"Hoja {number + 1}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_pdf_progress_written_incrementally(tmp_path):
+    pages = ["Resultados de laboratorio"] + [""] * 5 + ["Glucosa: 126 mg/dL"]
+    path = make_pdf(tmp_path / "lab.pdf", pages)
+    store = MemoryStore()
+    pipeline = OcrPipeline(store=store, max_workers=0, pages_per_task=2)
+
+    await pipeline.process(OcrJob(file_id=5, path=path, file_format="pdf"))
+
+    statuses = [values.get("ocr_status") for _, values in store.updates if "ocr_status" in values]
+    assert statuses == ["processing", "completed"]
+    progress = [values["ocr_pages_done"] for _, values in store.updates if "ocr_pages_done" in values]
+    assert progress == [0, 2, 4, 6, 7]
+
+    row = store.rows[5]
+    assert row["ocr_processed"] is True
+    assert row["ocr_pages_total"] == 7
+    assert row["extracted_data"]["pages"] == 7
+    assert "partial" not in row["extracted_data"]
+    assert row["extracted_data"]["analysis"]["detected_values"] == [
+        {"parameter": "Glucosa", "value": 126.0, "unit": "mg/dL"}
+    ]
+    assert pipeline.metrics()["pages_processed"] == 7
+
+
+@pytest.mark.asyncio
+async def test_pdf_pages_processed_in_process_pool(tmp_path):
+    path = make_pdf(tmp_path / "lab.pdf", ["Colesterol total: 240 mg/dL", "Firma"])
+    store = MemoryStore()
+    pipeline = OcrPipeline(store=store, max_workers=1, pages_per_task=1)
+    try:
+        await pipeline.process(OcrJob(file_id=1, path=path, file_format="pdf"))
+    finally:
+        await pipeline.stop()
+
+    assert store.rows[1]["ocr_status"] == "completed"
+    assert store.rows[1]["extracted_data"]["analysis"]["detected_values"][0]["parameter"] == "Colesterol Total"
+
+
+@pytest.mark.asyncio
+async def test_unreadable_file_marked_failed(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    store = MemoryStore()
+    pipeline = OcrPipeline(store=store, max_workers=0)
+
+    await pipeline.process(OcrJob(file_id=2, path=str(path), file_format="pdf"))
+
+    assert store.rows[2]["ocr_status"] == "failed"
+    assert store.rows[2]["ocr_error"]
+    assert pipeline.metrics()["jobs_failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_pending_queues_jobs_once(tmp_path):
+    path = make_pdf(tmp_path / "lab.pdf", ["Triglicéridos 180"])
+    job = OcrJob(file_id=9, path=path, file_format="pdf")
+    store = MemoryStore(pending=[job, job])
+    pipeline = OcrPipeline(store=store, max_workers=0)
+    try:
+        assert await pipeline.resume_pending() == 2
+        await pipeline.join()
+    finally:
+        await pipeline.stop()
+
+    assert store.rows[9]["ocr_status"] == "completed"
+    assert pipeline.metrics()["jobs_submitted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_uploaded_job_claimed_by_another_process_is_skipped(tmp_path):
+    path = make_pdf(tmp_path / "lab.pdf", ["Glucosa 99"])
+    store = MemoryStore(claimed_elsewhere={4})
+    pipeline = OcrPipeline(store=store, max_workers=0)
+    try:
+        pipeline.submit(OcrJob(file_id=4, path=path, file_format="pdf"))
+        await pipeline.join()
+    finally:
+        await pipeline.stop()
+
+    assert store.updates == []
+    assert pipeline.metrics()["jobs_claimed_elsewhere"] == 1
+
+
+@pytest.mark.asyncio
+async def test_claim_takes_pending_and_abandoned_files_once(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'files.db'}")
+    monkeypatch.setattr(database, "async_engine", engine)
+    now = datetime.utcnow()
+    rows = [
+        (1, "pending", None, None),
+        (2, "processing", "otro", now),  # en curso en otro proceso
+        (3, "processing", "otro", now - timedelta(minutes=10)),  # abandonado
+        (4, "processing", None, None),  # anterior a los heartbeats
+        (5, "completed", "otro", now),
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(ClinicalFile.__table__.create)
+        for file_id, ocr_status, owner, heartbeat_at in rows:
+            await conn.execute(ClinicalFile.__table__.insert().values(
+                id=file_id, patient_id=1, file_type="laboratory", file_name=f"{file_id}.pdf",
+                file_url=f"/tmp/{file_id}.pdf", file_format="pdf", ocr_status=ocr_status,
+                ocr_owner=owner, ocr_heartbeat_at=heartbeat_at, uploaded_by="nutritionist", uploaded_by_id=1,
+            ))
+
+    store = ClinicalFileStore()
+    stale_before = now - timedelta(minutes=5)
+    claimed = await store.claim("a", stale_before)
+    assert [job.file_id for job in claimed] == [1, 3, 4]
+    assert await store.claim("b", stale_before) == []
+    # El dueño puede volver a reclamar lo suyo (el worker reclama al desencolar)
+    assert [job.file_id for job in await store.claim("a", stale_before, file_ids=[1])] == [1]
+
+    # Sin el archivo a su nombre, las escrituras de "a" no pisan las de "otro"
+    await store.update(2, owner="a", ocr_status="failed")
+    async with engine.connect() as conn:
+        status = (await conn.execute(
+            ClinicalFile.__table__.select().where(ClinicalFile.__table__.c.id == 2)
+        )).mappings().one()["ocr_status"]
+    assert status == "processing"
+    await engine.dispose()
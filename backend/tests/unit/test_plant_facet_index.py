@@ -0,0 +1,90 @@
+"""
+Unit Tests for the Medicinal Plant Facet Index
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from domain.medicinal_plants.models import EvidenceLevel, PlantCategory, SafetyLevel
+from services.medicinal_plants.facet_index import PlantFacetIndex
+
+
+def make_plant(plant_id, name, popular, category, evidence, safety, states,
+               pregnancy=False, children=False, featured=False):
+    return SimpleNamespace(
+        id=plant_id,
+        scientific_name=name,
+        popular_names=popular,
+        primary_category=category,
+        evidence_level=evidence,
+        safety_level=safety,
+        states_found=states,
+        safe_in_pregnancy=pregnancy,
+        safe_for_children=children,
+        featured=featured,
+        validated_by_expert=False,
+        main_image_url=None,
+        traditional_uses=["té"],
+    )
+
+
+@pytest.fixture
+def index():
+    index = PlantFacetIndex()
+    index.build([
+        make_plant(1, "Matricaria chamomilla", ["Manzanilla"], PlantCategory.DIGESTIVE,
+                   EvidenceLevel.HIGH, SafetyLevel.VERY_SAFE, ["Puebla", "Oaxaca"],
+                   pregnancy=True, children=True, featured=True),
+        make_plant(2, "Mentha spicata", ["Hierbabuena"], PlantCategory.DIGESTIVE,
+                   EvidenceLevel.MODERATE, SafetyLevel.SAFE, ["Puebla"], children=True),
+        make_plant(3, "Tilia mexicana", ["Tila", "Flor de tila"], PlantCategory.CALMING,
+                   EvidenceLevel.MODERATE, SafetyLevel.SAFE, ["México", "Oaxaca"]),
+        make_plant(4, "Ruta graveolens", ["Ruda"], PlantCategory.GYNECOLOGICAL,
+                   EvidenceLevel.LOW, SafetyLevel.RESTRICTED, ["Michoacán"]),
+    ])
+    return index
+
+
+@pytest.mark.unit
+class TestPlantFacetIndex:
+    """Unit tests for PlantFacetIndex"""
+
+    def test_filters_and_total(self, index):
+        result = index.search(filters={"category": PlantCategory.DIGESTIVE, "safe_for_children": True})
+        assert result["total"] == 2
+        assert [p["id"] for p in result["plants"]] == [1, 2]  # featured first
+
+    def test_state_filter_is_accent_insensitive(self, index):
+        assert index.search(filters={"state": "mexico"})["total"] == 1
+        assert index.search(filters={"state": "Oaxaca"})["total"] == 2
+
+    def test_text_search_on_popular_and_scientific_names(self, index):
+        assert [p["id"] for p in index.search(search="tila")["plants"]] == [3]
+        assert [p["id"] for p in index.search(search="mentha")["plants"]] == [2]
+        assert index.search(search="manzan")["total"] == 1
+        assert index.search(search="inexistente")["total"] == 0
+
+    def test_facet_counts_exclude_own_filter(self, index):
+        result = index.search(filters={"category": PlantCategory.DIGESTIVE})
+        facets = result["facets"]
+
+        # Category counts ignore the category filter itself
+        assert facets["category"] == {"DIGESTIVE": 2, "CALMING": 1, "GYNECOLOGICAL": 1}
+        # Other facets are narrowed by it
+        assert facets["evidence_level"] == {"HIGH": 1, "MODERATE": 1}
+        assert facets["state"] == {"Puebla": 2, "Oaxaca": 1}
+        assert facets["safe_in_pregnancy"] == {"false": 1, "true": 1}
+
+    def test_pagination(self, index):
+        page = index.search(page=2, page_size=3)
+        assert page["total"] == 4
+        assert len(page["plants"]) == 1
+
+    def test_unknown_facet(self, index):
+        with pytest.raises(ValueError):
+            index.search(filters={"color": "verde"})
+
+    def test_invalidate(self, index):
+        assert not index.needs_refresh
+        index.invalidate()
+        assert index.needs_refresh
@@ -0,0 +1,91 @@
+"""
+Unit Tests for the Barcode Product Cache
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from services.nom051.product_cache import ProductCache
+
+PRODUCTS_DDL = """
+    CREATE TABLE productos_nom051 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo_barras VARCHAR(20) UNIQUE,
+        nombre VARCHAR(255) NOT NULL,
+        marca VARCHAR(255),
+        porcion_gramos DECIMAL(10,2), calorias DECIMAL(10,2), proteinas DECIMAL(10,2),
+        carbohidratos DECIMAL(10,2), azucares DECIMAL(10,2), grasas_totales DECIMAL(10,2),
+        grasas_saturadas DECIMAL(10,2), grasas_trans DECIMAL(10,2), fibra DECIMAL(10,2),
+        sodio DECIMAL(10,2),
+        exceso_calorias BOOLEAN DEFAULT 0, exceso_azucares BOOLEAN DEFAULT 0,
+        exceso_grasas_saturadas BOOLEAN DEFAULT 0, exceso_grasas_trans BOOLEAN DEFAULT 0,
+        exceso_sodio BOOLEAN DEFAULT 0, contiene_edulcorantes BOOLEAN DEFAULT 0,
+        contiene_cafeina BOOLEAN DEFAULT 0,
+        fuente VARCHAR(50) NOT NULL,
+        fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        usuario_id INTEGER,
+        validado BOOLEAN DEFAULT 0,
+        imagen_url TEXT, ingredientes TEXT, categoria VARCHAR(100)
+    )
+"""
+
+
+@pytest.fixture
+async def session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'products.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(text(PRODUCTS_DDL))
+        await conn.execute(text("""
+            INSERT INTO productos_nom051 (codigo_barras, nombre, marca, porcion_gramos, calorias,
+                azucares, sodio, exceso_azucares, exceso_sodio, fuente)
+            VALUES ('7501055300075', 'Refresco', 'Marca', NULL, 42, 10.6, 0, 1, 0, 'open_food_facts')
+        """))
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_lookup_renders_and_caches(session):
+    cache = ProductCache(max_entries=10, use_redis=False)
+
+    product = await cache.lookup("7501055300075", session)
+    assert product["nombre"] == "Refresco"
+    assert product["porcion_gramos"] == 100.0
+    assert product["calorias"] == 42.0
+    assert product["exceso_azucares"] and not product["exceso_sodio"]
+    assert "health_score" in product and "health_color" in product
+
+    assert await cache.lookup("7501055300075", session) is product
+    assert await cache.lookup("0000000000000", session) is None
+
+    stats = cache.stats()
+    assert (stats["db_hits"], stats["local_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+
+
+@pytest.mark.asyncio
+async def test_invalidate_by_barcode_and_product_id(session):
+    cache = ProductCache(max_entries=10, use_redis=False)
+    product = await cache.lookup("7501055300075", session)
+
+    await session.execute(text("UPDATE productos_nom051 SET nombre = 'Refresco light'"))
+    await session.commit()
+    assert cache.get_local("7501055300075")["nombre"] == "Refresco"
+
+    await cache.invalidate_product(product["id"])
+    assert cache.get_local("7501055300075") is None
+    assert (await cache.lookup("7501055300075", session))["nombre"] == "Refresco light"
+
+    await cache.invalidate("7501055300075")
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    cache = ProductCache(max_entries=2, use_redis=False)
+    for i, barcode in enumerate(["a", "b", "c"]):
+        cache._store_local(barcode, {"id": i})
+    assert cache.get_local("a") is None
+    assert cache.get_local("c") == {"id": 2}
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,81 @@
+"""
+Unit Tests for the Provider Registry and Lazy Startup Imports
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from core import providers
+from core.startup_profile import HEAVY_MODULES
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(providers, "_providers", {})
+    return providers
+
+
+def test_client_is_created_on_first_use_only(registry):
+    calls = []
+    registry.register_provider("svc", lambda: calls.append(1) or object())
+
+    assert calls == []
+    assert registry.provider_status()["svc"]["loaded"] is False
+
+    first = registry.get_provider("svc")
+    assert registry.get_provider("svc") is first
+    assert calls == [1]
+    assert registry.provider_status()["svc"]["loaded"] is True
+
+
+def test_unconfigured_provider_never_calls_factory(registry):
+    def factory():
+        raise AssertionError("factory should not run")
+
+    registry.register_provider("svc", factory, configured=lambda: False)
+
+    assert registry.provider_configured("svc") is False
+    assert registry.get_provider("svc") is None
+    assert registry.provider_configured("missing") is False
+    assert registry.get_provider("missing") is None
+
+
+def test_factory_failure_returns_none_and_records_error(registry):
+    def factory():
+        raise ImportError("No module named 'sdk'")
+
+    registry.register_provider("svc", factory)
+
+    assert registry.get_provider("svc") is None
+    status = registry.provider_status()["svc"]
+    assert status["error"] == "No module named 'sdk'"
+    assert status["configured"] is False
+
+
+def test_reset_provider_recreates_client(registry):
+    registry.register_provider("svc", object)
+    first = registry.get_provider("svc")
+
+    registry.reset_provider("svc")
+
+    assert registry.provider_status()["svc"]["loaded"] is False
+    assert registry.get_provider("svc") is not first
+
+
+def test_importing_main_does_not_load_provider_sdks(tmp_path):
+    code = (
+        "import sys, main\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR), STARTUP_PROFILE="")
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().splitlines()[-1:] in ([], [""])
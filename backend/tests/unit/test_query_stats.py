@@ -0,0 +1,176 @@
+"""
+Unit Tests for Request Query Statistics and Query Budgets
+"""
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.logging import nutrition_logger
+from core.query_stats import current_query_stats, instrument_engine, query_budget, statement_shape, track_queries
+from middleware.instrumentation import RequestInstrumentationMiddleware
+
+
+def test_statement_shape_collapses_parameters():
+    assert statement_shape("SELECT *\n  FROM t WHERE id IN ($1, $2, $3) AND x = $4") == \
+        "SELECT * FROM t WHERE id IN (?) AND x = ?"
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?)") == statement_shape("SELECT * FROM t WHERE id IN (?)")
+    assert statement_shape("SELECT * FROM t WHERE id = %(id_1)s") == "SELECT * FROM t WHERE id = %(id_1)s"
+
+
+def test_track_queries_counts_only_inside_scope():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    instrument_engine(engine)  # idempotente
+
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        with track_queries() as stats:
+            for value in range(6):
+                conn.execute(text("select :v"), {"v": value})
+            conn.execute(text("select 2"))
+        conn.execute(text("select 3"))
+
+    assert current_query_stats() is None
+    assert stats.count == 7
+    assert stats.total_ms > 0
+    assert stats.repeated(5) == [("select ?", 6)]
+    fields = stats.as_log_fields(5)
+    assert fields["db_queries"] == 7
+    assert fields["db_repeated_queries"] == [{"statement": "select ?", "count": 6}]
+
+
+@pytest.fixture
+async def db_app():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine.sync_engine)
+
+    app = FastAPI()
+
+    async def run_queries(n: int):
+        async with engine.connect() as conn:
+            for value in range(n):
+                await conn.execute(text("select :v"), {"v": value})
+        return {"ok": True}
+
+    @app.get("/items")
+    async def items(n: int = 1):
+        return await run_queries(n)
+
+    @app.get("/budgeted", dependencies=[Depends(query_budget(2))])
+    async def budgeted(n: int = 1):
+        return await run_queries(n)
+
+    @app.get("/stream")
+    async def stream(n: int = 1):
+        async def lines():
+            async with engine.connect() as conn:
+                for value in range(n):
+                    await conn.execute(text("select :v"), {"v": value})
+                    yield f"{value}\n".encode()
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    yield app
+    await engine.dispose()
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    calls = []
+    monkeypatch.setattr(nutrition_logger, "log_request", lambda **kwargs: calls.append(kwargs))
+    return calls
+
+
+def client(app, **options):
+    wrapped = RequestInstrumentationMiddleware(app, environment="development", **options)
+    return httpx.AsyncClient(app=wrapped, base_url="http://test")
+
+
+async def test_db_headers_and_log_fields(db_app, logged):
+    async with client(db_app, repeated_query_threshold=3) as http:
+        response = await http.get("/items?n=4")
+
+    assert response.status_code == 200
+    assert response.headers["x-db-queries"] == "4"
+    assert float(response.headers["x-db-time"]) >= 0
+    [entry] = logged
+    assert entry["metadata"]["db_queries"] == 4
+    assert entry["metadata"]["db_repeated_queries"][0]["count"] == 4
+
+
+async def test_budget_only_warns_when_not_strict(db_app, logged):
+    async with client(db_app, query_budget=2) as http:
+        response = await http.get("/items?n=3")
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+
+
+async def test_strict_budget_fails_request(db_app, logged):
+    async with client(db_app, query_budget=2, query_budget_strict=True) as http:
+        within = await http.get("/items?n=2")
+        over = await http.get("/items?n=3")
+
+    assert within.status_code == 200
+    assert over.status_code == 500
+    assert over.headers["x-db-queries"] == "3"
+    assert "Query budget exceeded" in over.json()["detail"]
+    assert over.json()["repeated_queries"] == [{"statement": "select ?", "count": 3}]
+    assert logged[-1]["status_code"] == 500
+
+
+async def test_endpoint_budget_overrides_global(db_app, logged):
+    async with client(db_app, query_budget=100, query_budget_strict=True) as http:
+        response = await http.get("/budgeted?n=3")
+
+    assert response.status_code == 500
+    assert "budget 2" in response.json()["detail"]
+
+
+async def test_streamed_queries_are_logged_and_budgeted(db_app, logged, caplog):
+    async with client(db_app, query_budget=2, query_budget_strict=True) as http:
+        response = await http.get("/stream?n=4")
+
+    # Headers go out before the body, so they cannot include streamed queries
+    assert response.status_code == 200
+    assert response.headers["x-db-queries"] == "0"
+    assert response.text == "0\n1\n2\n3\n"
+    [entry] = logged
+    assert entry["metadata"]["db_queries"] == 4
+    assert any("4 queries (budget 2) after the response had started" in r.message for r in caplog.records)
+
+
+async def test_trophology_validation_queries_do_not_grow_with_pairs():
+    import domain  # noqa: F401
+    import domain.patients.laboratory  # noqa: F401
+    from domain.trophology.models import FoodCategory, FoodCompatibility
+    from services.trophology_service import TrophologyService
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(
+            c, tables=[FoodCategory.__table__, FoodCompatibility.__table__]
+        ))
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add_all([FoodCategory(id=i, name=f"cat{i}") for i in range(1, 6)])
+        session.add_all([
+            FoodCompatibility(category1_id=1, category2_id=2, compatible=False, reason="fermenta"),
+            FoodCompatibility(category1_id=2, category2_id=3, compatible=True, note="primero 2"),
+            FoodCompatibility(category1_id=4, category2_id=1, compatible=False),
+        ])
+        await session.commit()
+
+        with track_queries() as stats:
+            result = await TrophologyService(session).validate_combination([1, 2, 3, 4, 5])
+
+    await engine.dispose()
+    assert stats.count == 2
+    assert [(issue.category1, issue.category2) for issue in result["issues"]] == [("cat1", "cat2")]
+    assert result["suggestions"][0] == "cat2 + cat3: primero 2"
+    assert result["valid"] is False
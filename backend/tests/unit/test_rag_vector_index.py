@@ -0,0 +1,123 @@
+"""
+Unit Tests for the RAG Vector Index
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core import config
+from services.rag import vector_index
+from services.rag.vector_index import (
+    HashingEmbedder,
+    IndexedDocument,
+    VectorIndex,
+    get_vector_index,
+    normalize_text,
+    set_vector_index,
+)
+
+
+def _docs():
+    return [
+        IndexedDocument("food:1", "food", "Tortilla de maíz Cereales", {"id": 1}),
+        IndexedDocument("product:2", "product", "Galletas Marías sin azúcar light", {"id": 2}),
+        IndexedDocument("product:3", "product", "Refresco de cola exceso azucares exceso calorias", {"id": 3}),
+        IndexedDocument("plant:4", "plant", "Manzanilla Matricaria chamomilla digestivo cólicos", {"id": 4}),
+        IndexedDocument("food:5", "food", "Frijoles negros de la olla Leguminosas", {"id": 5}),
+    ]
+
+
+@pytest.mark.unit
+class TestVectorIndex:
+    """Unit tests for VectorIndex"""
+
+    def test_normalize_text_folds_accents_and_keeps_enie(self):
+        assert normalize_text("Azúcar Piñón") == "azucar piñon"
+
+    def test_embedder_is_deterministic_and_normalized(self):
+        embedder = HashingEmbedder(dim=64)
+        a = embedder(["snack bajo en azúcar"])
+        b = embedder(["snack bajo en azúcar"])
+        assert np.array_equal(a, b)
+        assert np.isclose(np.linalg.norm(a[0]), 1.0)
+
+    def test_hybrid_search_ranks_relevant_document_first(self):
+        index = VectorIndex()
+        index.add(_docs())
+
+        results = index.search("galleta sin azucar", k=3)
+        assert results[0]["doc_id"] == "product:2"
+
+        plants = index.search("té para cólicos", k=3, kinds=["plant"])
+        assert [r["doc_id"] for r in plants] == ["plant:4"]
+
+    def test_replacing_document_keeps_single_entry(self):
+        index = VectorIndex()
+        index.add(_docs())
+        index.add([IndexedDocument("food:1", "food", "Tortilla de harina", {"id": 1})])
+
+        assert len(index) == 5
+        ids = [r["doc_id"] for r in index.search("tortilla", k=5)]
+        assert ids.count("food:1") == 1
+
+    def test_incremental_insert_after_training(self):
+        index = VectorIndex(n_lists=4, n_probe=4, min_train_size=16)
+        index.add([
+            IndexedDocument(f"food:{i}", "food", f"alimento generico numero {i}")
+            for i in range(40)
+        ])
+        assert index.is_trained
+
+        index.add([IndexedDocument("plant:99", "plant", "Nopal hipoglucemiante diabetes")])
+        assert index.search("nopal diabetes", k=1)[0]["doc_id"] == "plant:99"
+
+    def test_save_and_load_uses_memory_map(self, tmp_path):
+        index = VectorIndex(n_lists=2, min_train_size=4)
+        index.add(_docs())
+        index.remove("food:5")
+        index.save(str(tmp_path))
+
+        loaded = VectorIndex.load(str(tmp_path))
+        assert isinstance(loaded._base, np.memmap)
+        assert len(loaded) == 4
+        assert loaded.search("manzanilla", k=1)[0]["doc_id"] == "plant:4"
+
+        loaded.add([IndexedDocument("food:6", "food", "Aguacate Grasas con proteína")])
+        assert loaded.search("aguacate", k=1)[0]["doc_id"] == "food:6"
+
+    def test_load_rejects_different_embedder(self, tmp_path):
+        index = VectorIndex()
+        index.add(_docs())
+        index.save(str(tmp_path))
+
+        class OtherEmbedder(HashingEmbedder):
+            name = "other"
+
+        with pytest.raises(ValueError):
+            VectorIndex.load(str(tmp_path), embedder=OtherEmbedder())
+
+
+def test_global_index_reloads_when_another_worker_saves(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "get_settings", lambda: SimpleNamespace(rag_index_path=str(tmp_path)))
+    monkeypatch.setattr(vector_index, "_vector_index", None)
+    monkeypatch.setattr(vector_index, "_signature", None)
+    monkeypatch.setattr(vector_index, "_CHECK_SECONDS", 0.0)
+
+    assert len(get_vector_index()) == 0
+
+    # Otro worker reconstruye y guarda el índice
+    rebuilt = VectorIndex()
+    rebuilt.add(_docs())
+    rebuilt.save(str(tmp_path))
+
+    current = get_vector_index()
+    assert len(current) == 5
+    assert get_vector_index() is current
+
+    # El worker que reconstruye no recarga su propio guardado
+    own = VectorIndex()
+    own.add(_docs()[:2])
+    own.save(str(tmp_path))
+    set_vector_index(own)
+    assert get_vector_index() is own
@@ -0,0 +1,130 @@
+"""
+Unit Tests for the Recipe Rating Aggregate
+
+Checks that incremental updates match a full recomputation over the ratings.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import domain  # noqa: F401  (configure mappers)
+import domain.patients.laboratory  # noqa: F401
+from domain.recipes.models import RecipeRating, RecipeRatingStats
+
+
+def make_rating(rating_id, stars, comment=None, votes=0, minutes=0):
+    return RecipeRating(
+        id=rating_id,
+        recipe_id=1,
+        user_id=rating_id,
+        rating=stars,
+        comment=comment,
+        helpful_votes=votes,
+        created_at=datetime(2025, 1, 1) + timedelta(minutes=minutes),
+    )
+
+
+def expected_helpful(ratings):
+    commented = [r for r in ratings if r.comment and r.comment.strip()]
+    return sorted(commented, key=lambda r: r.helpful_votes, reverse=True)[:RecipeRatingStats.HELPFUL_SIZE]
+
+
+@pytest.mark.unit
+class TestRecipeRatingStats:
+    """Unit tests for RecipeRatingStats"""
+
+    def test_add_and_distribution(self):
+        stats = RecipeRatingStats(recipe_id=1)
+        for i, stars in enumerate([5, 4, 4, 1], start=1):
+            stats.rating_added(make_rating(i, stars, minutes=i))
+
+        assert stats.rating_count == 4
+        assert stats.average == pytest.approx(3.5)
+        assert stats.distribution() == {"5": 1, "4": 2, "3": 0, "2": 0, "1": 1}
+        assert [r["id"] for r in stats.recent_ratings] == [4, 3, 2, 1]
+
+    def test_recent_list_is_bounded(self):
+        stats = RecipeRatingStats(recipe_id=1)
+        for i in range(1, 26):
+            stats.rating_added(make_rating(i, 3, minutes=i))
+
+        assert len(stats.recent_ratings) == RecipeRatingStats.RECENT_SIZE
+        assert stats.recent_ratings[0]["id"] == 25
+
+    def test_change_moves_histogram_bucket(self):
+        stats = RecipeRatingStats(recipe_id=1)
+        rating = make_rating(1, 2)
+        stats.rating_added(rating)
+        rating.rating = 5
+        stats.rating_changed(rating, old_rating=2)
+
+        assert stats.distribution()["2"] == 0
+        assert stats.distribution()["5"] == 1
+        assert stats.recent_ratings[0]["rating"] == 5
+
+    def test_helpful_votes_match_full_recomputation(self):
+        rng = random.Random(7)
+        stats = RecipeRatingStats(recipe_id=1)
+        ratings = []
+        for i in range(1, 60):
+            rating = make_rating(i, rng.randint(1, 5), comment=f"c{i}" if i % 3 else None, minutes=i)
+            ratings.append(rating)
+            stats.rating_added(rating)
+
+        for _ in range(300):
+            rating = rng.choice(ratings)
+            rating.helpful_votes += 1
+            stats.helpful_vote_added(rating)
+
+        votes = [entry["helpful_votes"] for entry in stats.helpful_ratings]
+        assert votes == [r.helpful_votes for r in expected_helpful(ratings)]
+        assert all(entry["comment"] for entry in stats.helpful_ratings)
+
+    def test_remove_reports_refill(self):
+        stats = RecipeRatingStats(recipe_id=1)
+        ratings = [make_rating(i, 4, comment="ok", minutes=i) for i in range(1, 13)]
+        for rating in ratings:
+            stats.rating_added(rating)
+
+        # Newest rating: listed in recent (full), not among the helpful ones
+        refill = stats.rating_removed(ratings[-1])
+        assert refill == {"recent_ratings": True, "helpful_ratings": False}
+        assert stats.rating_count == 11
+        assert stats.rating_sum == 44
+
+        # Oldest rating: already out of the recent list, first helpful comment
+        refill = stats.rating_removed(ratings[0])
+        assert refill == {"recent_ratings": False, "helpful_ratings": True}
+
+
+@pytest.mark.asyncio
+async def test_first_rating_race_keeps_stored_aggregate(tmp_path):
+    """A concurrent first rating upserts instead of failing on the primary key"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlmodel import SQLModel
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from api.routers.recipes import _upsert_rating_stats
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=[RecipeRatingStats.__table__]))
+
+    # Both requests built an empty aggregate; the other one committed first
+    async with AsyncSession(engine, expire_on_commit=False) as winner:
+        stats = RecipeRatingStats(recipe_id=1)
+        stats.rating_added(make_rating(1, 5))
+        await _upsert_rating_stats(winner, stats)
+        await winner.commit()
+
+    async with AsyncSession(engine, expire_on_commit=False) as loser:
+        stats = await _upsert_rating_stats(loser, RecipeRatingStats(recipe_id=1))
+        stats.rating_added(make_rating(2, 3))
+        await loser.commit()
+
+    async with AsyncSession(engine) as session:
+        stored = await session.get(RecipeRatingStats, 1)
+        assert stored.rating_count == 2
+        assert stored.distribution() == {"5": 1, "4": 0, "3": 1, "2": 0, "1": 0}
+    await engine.dispose()
@@ -0,0 +1,120 @@
+"""
+Unit Tests for the Request Instrumentation Middleware
+"""
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from core.logging import nutrition_logger
+from middleware.instrumentation import RequestInstrumentationMiddleware, business_context
+
+
+async def echo_request_id(request: Request):
+    return JSONResponse(
+        {"request_id": request.state.request_id},
+        headers={"Cache-Control": "max-age=60", "X-Frame-Options": "SAMEORIGIN"},
+    )
+
+
+async def docs(request: Request):
+    return PlainTextResponse("docs")
+
+
+async def boom(request: Request):
+    raise RuntimeError("boom")
+
+
+def make_app(**options):
+    app = Starlette(routes=[
+        Route("/api/v1/patients/42/notes", echo_request_id),
+        Route("/api/v1/auth/me", echo_request_id),
+        Route("/docs", docs),
+        Route("/boom", boom),
+    ])
+    return RequestInstrumentationMiddleware(app, **options)
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    calls = []
+    monkeypatch.setattr(nutrition_logger, "log_request", lambda **kwargs: calls.append(kwargs))
+    monkeypatch.setattr(nutrition_logger, "log_error", lambda **kwargs: calls.append(kwargs))
+    return calls
+
+
+def client(app):
+    return httpx.AsyncClient(app=app, base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_single_request_id_headers_and_log(logged):
+    async with client(make_app(environment="development")) as http:
+        response = await http.get("/api/v1/patients/42/notes?page=2")
+
+    request_id = response.json()["request_id"]
+    assert response.headers["x-request-id"] == request_id
+    assert float(response.headers["x-process-time"]) >= 0
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert response.headers.get_list("x-frame-options") == ["DENY"]
+    assert response.headers["cache-control"] == "max-age=60"
+    assert "strict-transport-security" not in response.headers
+
+    [entry] = logged
+    assert entry["request_id"] == request_id
+    assert entry["status_code"] == 200
+    assert entry["metadata"]["query_params"] == {"page": "2"}
+    assert entry["business_context"]["patient_id"] == 42
+    assert entry["business_context"]["endpoint_category"] == "patient_management"
+
+
+@pytest.mark.asyncio
+async def test_sensitive_paths_and_hsts(logged):
+    async with client(make_app(environment="production")) as http:
+        response = await http.get("/api/v1/auth/me")
+        docs_response = await http.get("/docs")
+
+    assert response.headers["cache-control"] == "no-store, no-cache, must-revalidate, private"
+    assert response.headers["pragma"] == "no-cache"
+    assert response.headers["strict-transport-security"].startswith("max-age=31536000")
+    assert docs_response.headers["cache-control"] == "public, max-age=3600"
+
+
+@pytest.mark.asyncio
+async def test_docs_rate_limit_per_ip(logged):
+    async with client(make_app(requests_per_minute=2)) as http:
+        statuses = [(await http.get("/docs")).status_code for _ in range(3)]
+        limited = await http.get("/docs")
+        other_ip = await http.get("/docs", headers={"X-Forwarded-For": "10.0.0.9, 10.0.0.1"})
+        not_limited = await http.get("/api/v1/auth/me")
+
+    assert statuses == [200, 200, 429]
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "60"
+    assert "x-request-id" in limited.headers
+    assert limited.json()["detail"].startswith("Rate limit exceeded")
+    assert other_ip.status_code == 200
+    assert not_limited.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_unhandled_exception_is_logged_and_reraised(logged):
+    async with client(make_app()) as http:
+        with pytest.raises(RuntimeError):
+            await http.get("/boom")
+
+    assert logged[-1]["status_code"] == 500
+    assert logged[-1]["metadata"]["error_type"] == "RuntimeError"
+
+
+def test_business_context():
+    assert business_context("/api/v1/recipes/7", "GET", 404) == {
+        "recipe_id": 7,
+        "http_method": "GET",
+        "endpoint_category": "recipe_management",
+        "has_error": True,
+        "error_category": "not_found",
+    }
+    assert business_context("/api/v1/auth/login", "POST", 200)["action"] == "authentication"
@@ -0,0 +1,181 @@
+"""
+Unit Tests for the Scan Event Buffer and the Per-User Scan Rollup
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import core.database as database
+from services.nom051.scan_buffer import ScanEventBuffer
+from services.nom051.scan_rollup import (
+    HyperLogLog, get_user_scan_rollup, rag_scan_statistics, scan_rollups_table, scan_stats
+)
+
+SCHEMA = [
+    """CREATE TABLE productos_nom051 (
+        id INTEGER PRIMARY KEY, scan_count INTEGER DEFAULT 1,
+        exceso_calorias BOOLEAN DEFAULT 0, exceso_azucares BOOLEAN DEFAULT 0,
+        exceso_grasas_saturadas BOOLEAN DEFAULT 0, exceso_grasas_trans BOOLEAN DEFAULT 0,
+        exceso_sodio BOOLEAN DEFAULT 0, contiene_edulcorantes BOOLEAN DEFAULT 0,
+        contiene_cafeina BOOLEAN DEFAULT 0)""",
+    """CREATE TABLE escaneos_historia (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, usuario_id INTEGER, producto_id INTEGER,
+        codigo_barras VARCHAR(20) NOT NULL, encontrado BOOLEAN NOT NULL, fuente VARCHAR(50),
+        tiempo_respuesta_ms INTEGER, fecha_escaneo TIMESTAMP)""",
+    """CREATE TABLE user_scan_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, product_id INTEGER NOT NULL,
+        scan_type VARCHAR(20) NOT NULL, scanned_at TIMESTAMP, device_info JSON,
+        location_context VARCHAR(100), UNIQUE (user_id, product_id, scanned_at))""",
+]
+
+
+@pytest.fixture
+async def engine(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'scans.db'}")
+    async with engine.begin() as conn:
+        for statement in SCHEMA:
+            await conn.execute(text(statement))
+        await conn.run_sync(scan_rollups_table.create)
+        await conn.execute(text("INSERT INTO productos_nom051 (id, scan_count) VALUES (1, 1), (2, 5)"))
+    monkeypatch.setattr(database, "async_engine", engine)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_flush_batches_rows_and_aggregates_scan_counts(engine):
+    buffer = ScanEventBuffer(batch_size=1000, flush_interval=60)
+    for i in range(5):
+        buffer.record_scan(user_id=7, barcode=f"750000000000{i}", product_id=None,
+                           found=False, source=None, response_time_ms=3)
+    for product_id in (1, 1, 2, 1):
+        buffer.register_user_scan(user_id=7, product_id=product_id, scan_type="label")
+
+    assert buffer.stats()["pending"] == 9
+    assert await buffer.flush() == 9
+    await buffer.stop()
+
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("SELECT COUNT(*) FROM escaneos_historia"))).scalar() == 5
+        assert (await conn.execute(text("SELECT COUNT(*) FROM user_scan_history"))).scalar() == 4
+        counts = dict((await conn.execute(text("SELECT id, scan_count FROM productos_nom051"))).all())
+    assert counts == {1: 4, 2: 6}
+    assert buffer.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_events(engine):
+    buffer = ScanEventBuffer(batch_size=1000, flush_interval=60, max_pending=3)
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE escaneos_historia"))
+
+    for i in range(4):
+        buffer.record_scan(user_id=1, barcode=str(i), product_id=None, found=False, source=None, response_time_ms=1)
+    buffer.register_user_scan(user_id=1, product_id=2, scan_type="barcode")
+
+    assert await buffer.flush() == 0
+    stats = buffer.stats()
+    assert stats["flush_errors"] == 1
+    assert stats["pending"] == 3 and stats["dropped"] == 2
+    assert stats["pending_products"] == 1
+    await buffer.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_the_flush_in_progress(engine, monkeypatch):
+    buffer = ScanEventBuffer(batch_size=1, flush_interval=60)
+    execute = buffer._execute
+    started = asyncio.Event()
+
+    async def slow_execute(*args):
+        started.set()
+        await asyncio.sleep(0.05)
+        await execute(*args)
+
+    monkeypatch.setattr(buffer, "_execute", slow_execute)
+    buffer.register_user_scan(user_id=3, product_id=1, scan_type="barcode")
+    await started.wait()
+    await buffer.stop()
+
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("SELECT COUNT(*) FROM user_scan_history"))).scalar() == 1
+        assert (await conn.execute(text("SELECT scan_count FROM productos_nom051 WHERE id = 1"))).scalar() == 2
+    assert buffer.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_requeues_events(engine):
+    buffer = ScanEventBuffer(batch_size=1000, flush_interval=60)
+    buffer._execute = lambda *args: asyncio.sleep(1)
+    buffer.register_user_scan(user_id=3, product_id=2, scan_type="barcode")
+
+    flush = asyncio.create_task(buffer.flush())
+    await asyncio.sleep(0.01)
+    flush.cancel()
+    await asyncio.gather(flush, return_exceptions=True)
+
+    assert buffer.stats()["pending"] == 1
+    assert buffer.stats()["pending_products"] == 1
+    del buffer._execute
+    await buffer.stop()
+
+
+def test_hyperloglog_estimates_and_merges():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(3000):
+        a.add(f"75010{i:08d}")
+        b.add(f"75010{i + 1500:08d}")
+    assert a.count() == pytest.approx(3000, rel=0.06)
+
+    a.merge(b)
+    assert a.count() == pytest.approx(4500, rel=0.06)
+    assert HyperLogLog(registers=a.to_bytes()).count() == a.count()
+
+    small = HyperLogLog()
+    for barcode in ["1", "2", "3", "2"]:
+        small.add(barcode)
+    assert small.count() == 3
+
+
+@pytest.mark.asyncio
+async def test_rollup_rebuilds_existing_history_then_applies_batches(engine):
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE productos_nom051 SET exceso_azucares = 1, exceso_sodio = 1 WHERE id = 2"))
+        await conn.execute(text("""
+            INSERT INTO escaneos_historia (usuario_id, producto_id, codigo_barras, encontrado, tiempo_respuesta_ms)
+            VALUES (7, 2, 'A', 1, 10), (7, NULL, 'B', 0, 30), (7, 2, 'A', 1, NULL), (8, 1, 'C', 1, 5)
+        """))
+        await conn.execute(text(
+            "INSERT INTO user_scan_history (user_id, product_id, scan_type) VALUES (7, 1, 'label')"
+        ))
+
+    # Historial previo: la primera lectura reconstruye la fila
+    stats = scan_stats(await get_user_scan_rollup(7))
+    assert stats == {
+        "total_scans": 3, "found_count": 2, "not_found_count": 1, "found_rate": 66.7,
+        "avg_response_time_ms": 20, "unique_products": 2,
+    }
+
+    buffer = ScanEventBuffer(batch_size=1000, flush_interval=60)
+    buffer.record_scan(user_id=7, barcode="D", product_id=1, found=True, source="cache_local",
+                       response_time_ms=2, seals={"exceso_calorias": True})
+    buffer.record_scan(user_id=9, barcode="E", product_id=None, found=False, source=None, response_time_ms=4)
+    await buffer.flush()
+
+    rollup = await get_user_scan_rollup(7)
+    assert scan_stats(rollup)["total_scans"] == 4
+    assert scan_stats(rollup)["unique_products"] == 3
+
+    rag = rag_scan_statistics(rollup)
+    # 2 escaneos del producto 2 (2 sellos), 1 del producto 1 (sin sellos), 1 con exceso de calorías
+    assert rag["total_scans"] == 4
+    assert rag["products_with_seals"] == 3
+    assert rag["avg_health_score"] == pytest.approx((50 + 50 + 90 + 70) / 4)
+    assert rag["most_common_seals"][:2] == [
+        {"seal": "exceso_azucares", "count": 2}, {"seal": "exceso_sodio", "count": 2}
+    ]
+
+    # Usuario nuevo creado por el lote, sin contar sus eventos dos veces
+    assert scan_stats(await get_user_scan_rollup(9))["total_scans"] == 1
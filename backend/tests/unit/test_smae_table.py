@@ -0,0 +1,42 @@
+"""
+Unit Tests for the Immutable SMAE Standards Table
+"""
+import pytest
+
+from domain.foods.equivalences import EquivalenceGroup, SMAE_GROUP_STANDARDS
+from domain.foods.smae_table import SMAE_TABLE
+
+
+class TestSmaeTable:
+    """The table must mirror SMAE_GROUP_STANDARDS and stay read-only"""
+
+    def test_rows_match_standards(self):
+        assert SMAE_TABLE.groups == tuple(SMAE_GROUP_STANDARDS)
+        for group, standard in SMAE_GROUP_STANDARDS.items():
+            assert SMAE_TABLE.info(group) == standard
+            assert SMAE_TABLE.row(group.value) is SMAE_TABLE.row(group)
+            i = SMAE_TABLE.index[group]
+            assert SMAE_TABLE.nutrients[:, i].tolist() == [
+                standard["calories"], standard["protein"], standard["carbs"], standard["fat"]
+            ]
+
+    def test_is_immutable(self):
+        with pytest.raises(AttributeError):
+            SMAE_TABLE.calories = None
+        with pytest.raises(ValueError):
+            SMAE_TABLE.calories[0] = 1.0
+        with pytest.raises(TypeError):
+            SMAE_TABLE.index["nuevo"] = 99
+
+        info = SMAE_TABLE.info(EquivalenceGroup.FRUTAS)
+        info["calories"] = 0
+        assert SMAE_TABLE.info(EquivalenceGroup.FRUTAS)["calories"] == 60
+
+    def test_totals_ignore_unknown_groups(self):
+        totals = SMAE_TABLE.totals({
+            "cereales": 2, EquivalenceGroup.FRUTAS: 1.5, "leche_entera": 1, "desconocido": 4
+        })
+
+        assert totals == {"calories": 230.0, "protein": 4.0, "carbs": 52.5, "fat": 0.0}
+        assert SMAE_TABLE.calories_of({"cereales": 2, "frutas": 1.5}) == 230.0
+        assert EquivalenceGroup.LECHE_ENTERA not in SMAE_TABLE
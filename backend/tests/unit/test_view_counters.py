@@ -0,0 +1,169 @@
+"""
+Unit Tests for Write-Behind View Counters
+
+The database write is replaced by a capturing stub; the generated UPDATE is
+checked against an in-memory SQLite table.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select
+
+from core.counters import ShardedCounter, WriteBehindCounter
+
+metadata = MetaData()
+items = Table("items", metadata, Column("id", Integer, primary_key=True), Column("view_count", Integer))
+
+
+class CapturingCounter(WriteBehindCounter):
+    """Counter that records the UPDATE parameters instead of hitting a database"""
+
+    def __init__(self, fail=False, delay=0.0, **kwargs):
+        super().__init__("items", items, **kwargs)
+        self.fail = fail
+        self.delay = delay
+        self.executed = []
+
+    async def _execute(self, params):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        await asyncio.sleep(self.delay)
+        self.executed.append(params)
+
+
+class FakeRedis:
+    """Hash commands and MULTI pipelines over a dict (single event loop, so MULTI is atomic)"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hincrby(self, key, field, amount):
+        values = self.hashes.setdefault(key, {})
+        values[str(field)] = values.get(str(field), 0) + amount
+        return values[str(field)]
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(str(field))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def hgetall(self, key):
+        self.commands.append(lambda: dict(self.redis.hashes.get(key, {})))
+
+    def delete(self, key):
+        self.commands.append(lambda: int(self.redis.hashes.pop(key, None) is not None))
+
+    async def execute(self):
+        await asyncio.sleep(0)
+        return [command() for command in self.commands]
+
+
+@pytest.mark.unit
+class TestWriteBehindCounter:
+    """Unit tests for WriteBehindCounter"""
+
+    def test_sharded_counter_drain(self):
+        counter = ShardedCounter(shards=4)
+        for key in (1, 2, 2, 3, 3, 3):
+            counter.add(key)
+        assert counter.get(3) == 3
+        assert counter.drain() == {1: 1, 2: 2, 3: 3}
+        assert len(counter) == 0
+
+    async def test_read_your_writes_until_flushed(self):
+        counter = CapturingCounter(flush_interval=3600)
+        assert await counter.incr(7) == 1
+        assert await counter.incr(7) == 2
+        assert await counter.pending(7) == 2
+
+        assert await counter.flush() == 1
+        assert counter.executed == [[{"row_id": 7, "amount": 2}]]
+        assert await counter.pending(7) == 0
+        await counter.stop()
+
+    async def test_aggregates_into_one_batch_sorted_by_id(self):
+        counter = CapturingCounter(flush_interval=3600)
+        for row_id in (5, 3, 5, 1, 5):
+            await counter.incr(row_id)
+        await counter.stop()
+
+        assert counter.executed == [[
+            {"row_id": 1, "amount": 1},
+            {"row_id": 3, "amount": 1},
+            {"row_id": 5, "amount": 3},
+        ]]
+
+    async def test_failed_flush_keeps_increments(self):
+        counter = CapturingCounter(fail=True, flush_interval=3600)
+        await counter.incr(1)
+        assert await counter.flush() == 0
+        assert await counter.pending(1) == 1
+        assert counter.stats()["flush_errors"] == 1
+
+        counter.fail = False
+        assert await counter.flush() == 1
+        await counter.stop()
+
+    async def test_stop_waits_for_the_flush_in_progress(self):
+        counter = CapturingCounter(delay=0.05, flush_interval=0.01)
+        await counter.incr(4, 3)
+        while counter._flush_lock is None or not counter._flush_lock.locked():
+            await asyncio.sleep(0.001)
+
+        await counter.stop()
+        assert counter.executed == [[{"row_id": 4, "amount": 3}]]
+        assert await counter.pending(4) == 0
+
+    async def test_cancelled_flush_keeps_increments(self):
+        counter = CapturingCounter(delay=1, flush_interval=3600)
+        await counter.incr(2, 5)
+        flush = asyncio.create_task(counter.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+
+        assert await counter.pending(2) == 5
+        counter.delay = 0
+        await counter.stop()
+        assert counter.executed == [[{"row_id": 2, "amount": 5}]]
+
+    def test_update_statement(self):
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        counter = WriteBehindCounter("items", items)
+        with engine.begin() as conn:
+            conn.execute(items.insert(), [{"id": 1, "view_count": 10}, {"id": 2, "view_count": 0}])
+            conn.execute(counter._statement, [{"row_id": 1, "amount": 5}, {"row_id": 2, "amount": 1}])
+            rows = dict(conn.execute(select(items.c.id, items.c.view_count)).all())
+        assert rows == {1: 15, 2: 1}
+
+    async def test_concurrent_redis_flushes_take_each_increment_once(self):
+        redis = FakeRedis()
+        workers = [CapturingCounter(flush_interval=3600, use_redis=True) for _ in range(3)]
+        for worker in workers:
+            async def shared_redis():
+                return redis
+            worker._redis = shared_redis
+
+        for n in range(30):
+            await workers[n % 3].incr(n % 4)
+        await asyncio.gather(*(worker.flush() for worker in workers))
+        # Nothing left: later flushes find no hash, which is not a Redis error
+        await asyncio.gather(*(worker.flush() for worker in workers))
+
+        flushed = {}
+        for worker in workers:
+            for params in worker.executed:
+                for row in params:
+                    flushed[row["row_id"]] = flushed.get(row["row_id"], 0) + row["amount"]
+            assert worker.stats()["redis_errors"] == 0
+            assert worker._redis_available()
+            await worker.stop()
+        assert flushed == {0: 8, 1: 8, 2: 7, 3: 7}
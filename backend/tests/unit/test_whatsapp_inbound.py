@@ -0,0 +1,100 @@
+"""
+Unit Tests for WhatsApp Inbound Ingestion
+
+Covers phone normalization, the in-memory phone index and batched
+persistence through a stub sink (no database needed).
+"""
+import pytest
+
+from services.whatsapp.inbound import InboundWebhookIngestor, PhoneIndex, normalize_phone
+
+
+@pytest.mark.unit
+class TestNormalizePhone:
+    """Unit tests for normalize_phone"""
+
+    @pytest.mark.parametrize("raw", [
+        "whatsapp:+5215512345678",
+        "+52 55 1234 5678",
+        "55-1234-5678",
+        "(55) 1234 5678",
+        "0052 55 1234 5678",
+    ])
+    def test_equivalent_formats(self, raw):
+        assert normalize_phone(raw) == "525512345678"
+
+    def test_empty(self):
+        assert normalize_phone(None) == ""
+        assert normalize_phone("whatsapp:") == ""
+
+
+@pytest.mark.unit
+class TestPhoneIndex:
+    """Unit tests for PhoneIndex"""
+
+    def test_lookup_through_user(self):
+        index = PhoneIndex()
+        index.load_rows([(10, 1, "55 1234 5678", "Ana", "López")])
+
+        match = index.lookup("whatsapp:+5215512345678")
+        assert match.patient_id == 10
+        assert match.first_name == "Ana"
+        assert match.full_name == "Ana López"
+        assert index.lookup("+525599999999") is None
+
+    def test_phone_change_and_removal(self):
+        index = PhoneIndex()
+        index.load_rows([(10, 1, "5512345678", "Ana", "López")])
+
+        index.upsert_user(1, "5587654321", "Ana", "López")
+        assert index.lookup("5512345678") is None
+        assert index.lookup("5587654321").patient_id == 10
+
+        index.remove_patient(10)
+        assert index.lookup("5587654321") is None
+
+    def test_user_without_patient_is_not_matched(self):
+        index = PhoneIndex()
+        index.upsert_user(2, "5511112222", "Luis", "Pérez")
+        assert index.lookup("5511112222") is None
+        index.upsert_patient(20, 2)
+        assert index.lookup("5511112222").patient_id == 20
+
+
+@pytest.mark.unit
+class TestInboundWebhookIngestor:
+    """Unit tests for InboundWebhookIngestor"""
+
+    async def test_batches_and_resolves_patients(self):
+        index = PhoneIndex()
+        index.load_rows([(10, 1, "5512345678", "Ana", "López")])
+        batches = []
+
+        async def sink(rows):
+            batches.append(rows)
+
+        ingestor = InboundWebhookIngestor(sink=sink, phone_index=index, batch_size=50, flush_interval=0.05)
+        for i in range(120):
+            sender = "whatsapp:+5215512345678" if i % 2 == 0 else f"whatsapp:+5215500000{i:03d}"
+            await ingestor.submit({"From": sender, "Body": f"msg {i}", "MessageSid": f"SM{i}"})
+        await ingestor.stop()
+
+        rows = [row for batch in batches for row in batch]
+        assert len(rows) == 120
+        assert max(len(batch) for batch in batches) == 50
+        assert sum(1 for row in rows if row["patient_id"] == 10) == 60
+        assert rows[0]["recipient_name"] == "Ana López"
+        assert rows[1]["recipient_name"] == "Unknown"
+        assert ingestor.metrics()["persisted"] == 120
+
+    async def test_sink_failure_does_not_block(self):
+        async def failing_sink(rows):
+            raise RuntimeError("db down")
+
+        index = PhoneIndex()
+        index.load_rows([])
+        ingestor = InboundWebhookIngestor(sink=failing_sink, phone_index=index, flush_interval=0.01)
+        await ingestor.submit({"From": "whatsapp:+5215512345678", "Body": "hola"})
+        await ingestor.stop()
+
+        assert ingestor.metrics()["failed"] == 1
@@ -0,0 +1,263 @@
+"""
+Unit Tests for the WhatsApp Outbound Queue
+
+Uses a local stub of the Twilio REST client, so no network access is needed.
+"""
+import asyncio
+import itertools
+import time
+from types import SimpleNamespace
+
+import pytest
+from twilio.base.exceptions import TwilioRestException
+
+from services.whatsapp.outbound_queue import OutboundMessage, WhatsAppOutboundQueue
+from services.whatsapp.twilio_service import WhatsAppService
+
+
+class StubTwilioClient:
+    """Minimal stand-in for ``twilio.rest.Client``"""
+
+    def __init__(self, fail_statuses=()):
+        self.fail_statuses = list(fail_statuses)
+        self.created = []
+        self._sids = itertools.count(1)
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, **params):
+        if self.fail_statuses:
+            status = self.fail_statuses.pop(0)
+            raise TwilioRestException(status, "/Messages.json", f"HTTP {status}")
+        self.created.append(params)
+        return SimpleNamespace(sid=f"SM{next(self._sids):032d}", status="queued")
+
+
+def make_queue(client, **kwargs):
+    service = WhatsAppService(client=client, from_number="whatsapp:+10000000000")
+    kwargs.setdefault("base_backoff", 0.001)
+    return WhatsAppOutboundQueue(send_func=service.send_message, **kwargs)
+
+
+@pytest.mark.unit
+class TestWhatsAppOutboundQueue:
+    """Unit tests for WhatsAppOutboundQueue"""
+
+    async def test_send_uses_stub_client(self):
+        client = StubTwilioClient()
+        result = await make_queue(client).send_now(OutboundMessage("+525512345678", "Hola"))
+
+        assert result["success"] is True
+        assert result["twilio_sid"].startswith("SM")
+        assert client.created[0]["to"] == "whatsapp:+525512345678"
+
+    async def test_retries_throttling_errors(self):
+        client = StubTwilioClient(fail_statuses=[429, 503])
+        queue = make_queue(client)
+        result = await queue.send_now(OutboundMessage("+525512345678", "Hola"))
+
+        assert result["success"] is True
+        assert result["attempts"] == 3
+        assert queue.metrics()["retries"] == 2
+
+    async def test_does_not_retry_client_errors(self):
+        client = StubTwilioClient(fail_statuses=[400])
+        queue = make_queue(client)
+        result = await queue.send_now(OutboundMessage("+52invalid", "Hola"))
+
+        assert result["success"] is False
+        assert result["attempts"] == 1
+        assert "error_status" not in result
+
+    async def test_idempotency_key_sends_once(self):
+        client = StubTwilioClient()
+        queue = make_queue(client)
+        first = await queue.send_now(OutboundMessage("+525512345678", "Hola", idempotency_key="k1"))
+        second = await queue.send_now(OutboundMessage("+525512345678", "Hola", idempotency_key="k1"))
+
+        assert len(client.created) == 1
+        assert first["twilio_sid"] == second["twilio_sid"]
+        assert queue.metrics()["duplicates_skipped"] == 1
+
+    async def test_concurrent_sends_of_one_key_share_the_delivery(self):
+        calls = []
+
+        async def slow_send(to_phone, body, media_url=None):
+            calls.append(to_phone)
+            await asyncio.sleep(0.02)
+            return {"success": True, "twilio_sid": "SM1", "status": "queued", "to": to_phone}
+
+        queue = WhatsAppOutboundQueue(send_func=slow_send)
+        first, second = await asyncio.gather(
+            queue.send_now(OutboundMessage("+525512345678", "Hola", idempotency_key="k2")),
+            queue.send_now(OutboundMessage("+525512345678", "Hola", idempotency_key="k2")),
+        )
+
+        assert calls == ["+525512345678"]
+        assert first == second
+        assert queue.metrics()["duplicates_skipped"] == 1
+
+    async def test_per_number_rate_limit(self):
+        client = StubTwilioClient()
+        queue = make_queue(client, per_number_rate=20.0, per_number_burst=1.0)
+        start = time.monotonic()
+        for _ in range(3):
+            await queue.send_now(OutboundMessage("+525512345678", "Hola"))
+
+        assert time.monotonic() - start >= 0.09
+
+    async def test_campaign_persists_results_in_batches(self):
+        batches = []
+
+        async def sink(batch):
+            batches.append(batch)
+
+        client = StubTwilioClient()
+        queue = make_queue(client, result_sink=sink, workers=4, batch_size=10, per_number_burst=5.0)
+        messages = [OutboundMessage(f"+5255000000{i:02d}", f"Hola {i}") for i in range(25)]
+
+        progress = await queue.enqueue_campaign(messages)
+        await queue.join()
+        await queue.stop()
+
+        assert len(client.created) == 25
+        assert sum(len(b) for b in batches) == 25
+        assert max(len(b) for b in batches) <= 10
+        report = queue.campaign_progress(progress.campaign_id)
+        assert report["status"] == "completed"
+        assert report["messages_sent"] == 25
+
+    async def test_completed_campaigns_are_evicted(self, monkeypatch):
+        client = StubTwilioClient()
+        queue = make_queue(client, workers=2, per_number_burst=5.0, campaign_ttl=60.0, max_campaigns=2)
+        ids = []
+        for i in range(3):
+            progress = await queue.enqueue_campaign([OutboundMessage(f"+52550000001{i}", "Hola")])
+            await queue.join()
+            ids.append(progress.campaign_id)
+
+        # Capped at max_campaigns completed entries, oldest first
+        assert queue.campaign_progress(ids[0]) is None
+        assert queue.campaign_progress(ids[2])["status"] == "completed"
+
+        real_monotonic = time.monotonic
+        monkeypatch.setattr(
+            "services.whatsapp.outbound_queue.time.monotonic", lambda: real_monotonic() + 120
+        )
+        assert queue.campaign_progress(ids[2]) is None
+        await queue.stop()
+
+
+@pytest.mark.unit
+class TestWhatsAppSendEndpoints:
+    """The single-message endpoints deliver through the outbound queue"""
+
+    @pytest.fixture
+    async def app(self, monkeypatch):
+        from fastapi import FastAPI
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlmodel import SQLModel
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        import domain  # noqa: F401
+        import domain.patients.laboratory  # noqa: F401
+        from api.routers import whatsapp
+        from core.database import get_async_session
+        from domain.messaging.whatsapp import WhatsAppMessage
+
+        self.engine = engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=[WhatsAppMessage.__table__]))
+
+        async def session_override():
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                yield session
+
+        self.client = StubTwilioClient()
+        self.queue = make_queue(self.client)
+        monkeypatch.setattr(whatsapp, "get_outbound_queue", lambda: self.queue)
+
+        app = FastAPI()
+        app.include_router(whatsapp.router, prefix="/api/v1")
+        app.dependency_overrides[get_async_session] = session_override
+        yield app
+        await engine.dispose()
+
+    payload = {
+        "patient_id": 7, "patient_name": "Ana", "patient_phone": "+525512345678",
+        "appointment_date": "2026-11-02", "appointment_time": "10:00",
+        "nutritionist_name": "Dra. López", "nutritionist_id": 1,
+    }
+
+    async def stored_messages(self):
+        from sqlmodel import select
+        from sqlmodel.ext.asyncio.session import AsyncSession
+        from domain.messaging.whatsapp import WhatsAppMessage
+
+        async with AsyncSession(self.engine) as session:
+            return (await session.exec(select(WhatsAppMessage).order_by(WhatsAppMessage.id))).all()
+
+    async def test_reminder_uses_queue_and_idempotency_key(self, app):
+        import httpx
+
+        payload = self.payload
+        async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+            first = await http.post("/api/v1/whatsapp/send/appointment-reminder", json=payload,
+                                    headers={"Idempotency-Key": "cita-7"})
+            second = await http.post("/api/v1/whatsapp/send/appointment-reminder", json=payload,
+                                     headers={"Idempotency-Key": "cita-7"})
+
+        assert first.status_code == 200
+        assert len(self.client.created) == 1
+        assert "Dra. López" in self.client.created[0]["body"]
+        assert second.json()["message_id"] == first.json()["message_id"]
+        assert second.json()["twilio_sid"] == first.json()["twilio_sid"]
+        assert "replay" in second.json()["note"]
+        [stored] = await self.stored_messages()
+        assert stored.idempotency_key == "single:cita-7"
+        assert stored.twilio_sid == first.json()["twilio_sid"]
+
+    async def test_key_still_being_sent_is_a_conflict(self, app):
+        import httpx
+        from sqlmodel.ext.asyncio.session import AsyncSession
+        from domain.messaging.whatsapp import MessageType, WhatsAppMessage
+
+        async with AsyncSession(self.engine) as session:
+            session.add(WhatsAppMessage(
+                recipient_phone="+525512345678", message_type=MessageType.APPOINTMENT_REMINDER,
+                message_body="Recordatorio", created_by_id=1, idempotency_key="single:cita-8"
+            ))
+            await session.commit()
+
+        async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+            response = await http.post("/api/v1/whatsapp/send/appointment-reminder", json=self.payload,
+                                       headers={"Idempotency-Key": "cita-8"})
+
+        assert response.status_code == 409
+        assert self.client.created == []
+
+    async def test_failed_send_releases_the_key(self, app):
+        import httpx
+
+        self.queue.max_attempts = 1
+        self.client.fail_statuses = [400]
+        async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+            failed = await http.post("/api/v1/whatsapp/send/appointment-reminder", json=self.payload,
+                                     headers={"Idempotency-Key": "cita-9"})
+            retried = await http.post("/api/v1/whatsapp/send/appointment-reminder", json=self.payload,
+                                      headers={"Idempotency-Key": "cita-9"})
+
+        assert failed.json()["success"] is False
+        assert retried.json()["success"] is True
+        assert len(self.client.created) == 1
+        stored = await self.stored_messages()
+        assert [m.idempotency_key for m in stored] == [None, "single:cita-9"]
+
+
+def test_bulk_message_rendering_ignores_unknown_and_malformed_fields():
+    from api.routers.whatsapp import render_bulk_message
+
+    variables = {"patient_name": "Ana", "promo": "2x1"}
+    assert render_bulk_message("Hola {patient_name}, hoy {promo}", variables) == "Hola Ana, hoy 2x1"
+    assert render_bulk_message("50% {promo y {0} {otro}", variables) == "50% {promo y {0} {otro}"
+    assert render_bulk_message("{patient_name.__class__} {patient_name[0]}", variables) == \
+        "{patient_name.__class__} {patient_name[0]}"